@@ -269,7 +269,8 @@ class FeatureSet:
                       save_csv: bool = False, fname=None, return_fig: bool = False, plot_horizontal: bool = True,
                       plot_ontology_graph: bool = True, ontology_graph_format: Literal['pdf', 'svg', 'png'] = 'pdf',
                       randomization_reps: int = 10000, random_seed: Union[int, None] = None,
-                      parallel: bool = True, gui_mode: bool = False
+                      randomization_stop_after: Union[int, None] = None,
+                      annotation_file: Union[str, Path, None] = None, parallel: bool = True, gui_mode: bool = False
                       ) -> Union[pd.DataFrame, Tuple[pd.DataFrame, plt.Figure]]:
         """
         Calculates enrichment and depletion of the FeatureSet for Gene Ontology (GO) terms against a background set. \
@@ -369,6 +370,21 @@ class FeatureSet:
         :param randomization_reps: if using a randomization test, determine how many randomization repititions to run. \
         Otherwise, this parameter will not affect the analysis.
         :type randomization_reps: int larger than 0 (default=10000)
+        :param randomization_stop_after: if using a randomization test, \
+        stop drawing random sets for an attribute once this many random sets were at least as extreme \
+        as the observed set (the sequential stopping rule of Besag and Clifford). \
+        'randomization_reps' then determines the maximal number of randomization repetitions, \
+        and the number of repetitions drawn for each attribute is reported in the 'reps' column of the results. \
+        This greatly reduces the computation spent on attributes which are clearly not significant. \
+        If None, all 'randomization_reps' repetitions will be drawn for every attribute. \
+        Otherwise, this parameter will not affect the analysis.
+        :type randomization_stop_after: int larger than 0 or None (default=None)
+        :param annotation_file: path to a local GO annotation file in GAF (2.x) or GPAD (1.1/2.0) format, \
+        optionally compressed with gzip. If specified, GO annotations will be read from this file instead of \
+        being fetched from GOlr, and the annotations will be filtered with the same parameters. \
+        Since GPAD files do not specify organisms, 'organism' only affects GAF files; \
+        when 'organism' is 'auto', annotations of all organisms in the file will be used.
+        :type annotation_file: str, Path, or None (default=None)
         :type parallel: bool (default=False)
         :param parallel: if True, will calculate the statistical tests using parallel processing. \
         In most cases parallel processing will lead to shorter computation time, but does not affect the results of \
@@ -401,7 +417,7 @@ class FeatureSet:
         if validation.isinstanceinh(background_genes, FeatureSet):
             background_genes = background_genes.gene_set
         if statistical_test.lower() == 'randomization':
-            kwargs = dict(reps=randomization_reps, random_seed=random_seed)
+            kwargs = dict(reps=randomization_reps, random_seed=random_seed, stop_after=randomization_stop_after)
         else:
             kwargs = {}
         runner = enrichment_runner.GOEnrichmentRunner(self.gene_set, organism, gene_id_type, alpha,
@@ -411,7 +427,8 @@ class FeatureSet:
                                                       fname, return_fig, plot_horizontal, plot_ontology_graph,
                                                       self.set_name, parallel, statistical_test, biotype,
                                                       background_genes, biotype_ref_path,
-                                                      ontology_graph_format=ontology_graph_format, **kwargs)
+                                                      ontology_graph_format=ontology_graph_format,
+                                                      annotation_file=annotation_file, **kwargs)
 
         if gui_mode:
             return runner.run(plot=False), runner
@@ -427,6 +444,7 @@ class FeatureSet:
                         return_nonsignificant: bool = False,
                         save_csv: bool = False, fname=None, return_fig: bool = False, plot_horizontal: bool = True,
                         randomization_reps: int = 10000, random_seed: Union[int, None] = None,
+                        randomization_stop_after: Union[int, None] = None,
                         parallel: bool = True, gui_mode: bool = False
                         ) -> Union[pd.DataFrame, Tuple[pd.DataFrame, plt.Figure]]:
         """
@@ -485,6 +503,15 @@ class FeatureSet:
         :param randomization_reps: if using a randomization test, determine how many randomization repititions to run. \
         Otherwise, this parameter will not affect the analysis.
         :type randomization_reps: int larger than 0 (default=10000)
+        :param randomization_stop_after: if using a randomization test, \
+        stop drawing random sets for an attribute once this many random sets were at least as extreme \
+        as the observed set (the sequential stopping rule of Besag and Clifford). \
+        'randomization_reps' then determines the maximal number of randomization repetitions, \
+        and the number of repetitions drawn for each attribute is reported in the 'reps' column of the results. \
+        This greatly reduces the computation spent on attributes which are clearly not significant. \
+        If None, all 'randomization_reps' repetitions will be drawn for every attribute. \
+        Otherwise, this parameter will not affect the analysis.
+        :type randomization_stop_after: int larger than 0 or None (default=None)
         :type parallel: bool (default=False)
         :param parallel: if True, will calculate the statistical tests using parallel processing. \
         In most cases parallel processing will lead to shorter computation time, but does not affect the results of \
@@ -510,7 +537,7 @@ class FeatureSet:
         if validation.isinstanceinh(background_genes, FeatureSet):
             background_genes = background_genes.gene_set
         if statistical_test.lower() == 'randomization':
-            kwargs = dict(reps=randomization_reps, random_seed=random_seed)
+            kwargs = dict(reps=randomization_reps, random_seed=random_seed, stop_after=randomization_stop_after)
         else:
             kwargs = {}
         runner = enrichment_runner.KEGGEnrichmentRunner(self.gene_set, organism, gene_id_type, alpha,
@@ -631,7 +658,8 @@ class FeatureSet:
                                 return_nonsignificant: bool = True,
                                 save_csv: bool = False, fname=None, return_fig: bool = False,
                                 plot_horizontal: bool = True, randomization_reps: int = 10000,
-                                random_seed: Union[int, None] = None, parallel: bool = True, gui_mode: bool = False
+                                random_seed: Union[int, None] = None, randomization_stop_after: Union[int, None] = None,
+                                parallel: bool = True, gui_mode: bool = False
                                 ) -> Union[pd.DataFrame, Tuple[pd.DataFrame, plt.Figure]]:
         """
         Calculates enrichment and depletion of the FeatureSet for user-defined attributes against a background set.\
@@ -688,6 +716,15 @@ class FeatureSet:
         :param randomization_reps: if using a randomization test, determine how many randomization repititions to run. \
         Otherwise, this parameter will not affect the analysis.
         :type randomization_reps: int larger than 0 (default=10000)
+        :param randomization_stop_after: if using a randomization test, \
+        stop drawing random sets for an attribute once this many random sets were at least as extreme \
+        as the observed set (the sequential stopping rule of Besag and Clifford). \
+        'randomization_reps' then determines the maximal number of randomization repetitions, \
+        and the number of repetitions drawn for each attribute is reported in the 'reps' column of the results. \
+        This greatly reduces the computation spent on attributes which are clearly not significant. \
+        If None, all 'randomization_reps' repetitions will be drawn for every attribute. \
+        Otherwise, this parameter will not affect the analysis.
+        :type randomization_stop_after: int larger than 0 or None (default=None)
         :type parallel: bool (default=True)
         :param parallel: if True, will calculate the statistical tests using parallel processing. \
         In most cases parallel processing will lead to shorter computation time, but does not affect the results of \
@@ -713,7 +750,7 @@ class FeatureSet:
         if validation.isinstanceinh(background_genes, FeatureSet):
             background_genes = background_genes.gene_set
         if statistical_test == 'randomization':
-            kwargs = dict(reps=randomization_reps)
+            kwargs = dict(reps=randomization_reps, stop_after=randomization_stop_after)
         else:
             kwargs = dict()
         runner = enrichment_runner.EnrichmentRunner(self.gene_set, attributes, alpha, attr_ref_path,
@@ -953,7 +990,7 @@ class RankedSet(FeatureSet):
     def __init__(self, ranked_genes: Union[Filter, List[str], Tuple[str], np.ndarray], set_name: str = ''):
 
         if validation.isinstanceinh(ranked_genes, Filter):
-            self.ranked_genes = ranked_genes.df.index.values.astype('str', copy=True)
+            self.ranked_genes = ranked_genes.df_view.index.values.astype('str', copy=True)
         elif isinstance(ranked_genes, (list, tuple)):
             self.ranked_genes = np.array(ranked_genes, dtype='str')
         elif isinstance(ranked_genes, np.ndarray):
@@ -1017,6 +1054,7 @@ class RankedSet(FeatureSet):
                                  save_csv: bool = False, fname=None,
                                  return_fig: bool = False, plot_horizontal: bool = True,
                                  plot_ontology_graph: bool = True, ontology_graph_format: str = 'pdf',
+                                 annotation_file: Union[str, Path, None] = None,
                                  parallel: bool = True, gui_mode: bool = False
                                  ) -> Union[pd.DataFrame, Tuple[pd.DataFrame, plt.Figure]]:
         """
@@ -1102,6 +1140,12 @@ class RankedSet(FeatureSet):
         significant GO terms and their parent nodes.
         :type ontology_graph_format: str (default='pdf')
         :param ontology_graph_format: the file format the ontology graph will be generated in.
+        :param annotation_file: path to a local GO annotation file in GAF (2.x) or GPAD (1.1/2.0) format, \
+        optionally compressed with gzip. If specified, GO annotations will be read from this file instead of \
+        being fetched from GOlr, and the annotations will be filtered with the same parameters. \
+        Since GPAD files do not specify organisms, 'organism' only affects GAF files; \
+        when 'organism' is 'auto', annotations of all organisms in the file will be used.
+        :type annotation_file: str, Path, or None (default=None)
         :type parallel: bool (default=True)
         :param parallel: if True, will calculate the statistical tests using parallel processing. \
         In most cases parallel processing will lead to shorter computation time, but does not affect the results of \
@@ -1137,7 +1181,8 @@ class RankedSet(FeatureSet):
                                                       fname, return_fig, plot_horizontal, plot_ontology_graph,
                                                       self.set_name,
                                                       parallel=parallel, enrichment_func_name='xlmhg', single_set=True,
-                                                      ontology_graph_format=ontology_graph_format)
+                                                      ontology_graph_format=ontology_graph_format,
+                                                      annotation_file=annotation_file)
 
         if gui_mode:
             return runner.run(plot=False), runner
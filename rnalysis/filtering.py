@@ -10,13 +10,16 @@ When you save filtered/modified data, its new file name will include by default
 
 """
 import copy
+import inspect
 import os
 import re
 import types
 import warnings
 from pathlib import Path
-from typing import Any, Iterable, List, Tuple, Union, Callable
+from typing import Any, Dict, Iterable, List, Tuple, Union, Callable
 
+import joblib
+import statsmodels.stats.multitest as multitest
 import yaml
 from scipy.stats import spearmanr
 from scipy.stats.mstats import gmean
@@ -37,7 +40,7 @@ from sklearn.decomposition import PCA
 from sklearn.preprocessing import PowerTransformer, StandardScaler
 
 from rnalysis.utils import clustering, io, parsing, generic, settings, validation, differential_expression
-
+from rnalysis.utils.annotations import AnnotationMatrix
 from rnalysis.utils.param_typing import BIOTYPES, BIOTYPE_ATTRIBUTE_NAMES, GO_EVIDENCE_TYPES, GO_QUALIFIERS, \
     DEFAULT_ORGANISMS, GENE_ID_TYPES
 
@@ -50,6 +53,24 @@ def readable_name(name: str):
     return decorator
 
 
+def _copy_df(df: Union[pd.DataFrame, pd.Series]) -> Union[pd.DataFrame, pd.Series]:
+    # memory-mapped tables are read-only, so they can be shared between Filter objects instead of being copied
+    if io.get_memmap_table_path(df) is not None:
+        return df
+    return df.copy(deep=True)
+
+
+def _may_share_memory(df: Union[pd.DataFrame, pd.Series], other: Union[pd.DataFrame, pd.Series]) -> bool:
+    # tables with non-numpy values (such as categorical columns) are conservatively assumed to share memory
+    other_values = io.get_table_arrays(other)
+    for values in io.get_table_arrays(df):
+        for other_vals in other_values:
+            if not isinstance(values, np.ndarray) or not isinstance(other_vals, np.ndarray) or \
+                np.may_share_memory(values, other_vals):
+                return True
+    return False
+
+
 class Filter:
     """
     An all-purpose Filter object.
@@ -73,14 +94,18 @@ class Filter:
     index_string: string
         A string of all feature indices in the current DataFrame separated by newline.
     """
-    __slots__ = {'fname': 'filename with full path', 'df': 'pandas.DataFrame with the data'}
+    __slots__ = {'fname': 'filename with full path', '_df': 'pandas.DataFrame with the data',
+                 '_df_shared': 'indicates whether the DataFrame may share memory with another Filter object',
+                 '_lazy_copy': 'indicates whether the object is the working copy of a lazy plan'}
 
     def __init__(self, fname: Union[str, Path], drop_columns: Union[str, List[str]] = None):
 
         """
         Load a table.
 
-        :param fname: full path/filename of the .csv file to be loaded into the Filter object
+        :param fname: full path/filename of the .csv file to be loaded into the Filter object. \
+        Parquet ('.parquet') and Feather ('.feather') files are also supported, and are detected by their suffix, \
+        as are memory-mapped tables ('.mmap') created by CountFilter.save_memmap().
         :type fname: Union[str, Path]
         :param drop_columns: if a string or list of strings are specified, \
         the columns of the same name/s will be dropped from the loaded table.
@@ -90,24 +115,131 @@ class Filter:
             >>> from rnalysis import filtering
             >>> d = filtering.Filter("tests/test_files/counted.csv")
 
+        """
+        self._load_table(fname, drop_columns)
+
+    def _load_table(self, fname: Union[str, Path], drop_columns: Union[str, List[str]] = None) -> dict:
+        """
+        Load the table of the Filter object from a file, and return the properties of the Filter object \
+        that were saved alongside the table (only Parquet/Feather files created by 'save_parquet' store them).
         """
         # init from a file (load the csv into a DataFrame/Series)
         assert isinstance(fname, (str, Path))
         self.fname = Path(fname)
-        self.df = io.load_csv(fname, 0, squeeze=True, drop_columns=drop_columns)
+        metadata = {}
+        if io.is_columnar_file(fname):
+            df, metadata = self._load_columnar(fname)
+            self.df = self._drop_columns(df, drop_columns)
+        elif io.is_memmap_table(fname):
+            self.df = self._drop_columns(io.load_memmap_table(fname), drop_columns)
+        else:
+            self.df = io.load_csv(fname, 0, squeeze=True, drop_columns=drop_columns)
         # check for duplicate indices
-        if self.df.index.has_duplicates:
+        if self._df.index.has_duplicates:
             warnings.warn("This Filter object contains multiple rows with the same name/index.")
+        return metadata
+
+    @classmethod
+    def _load_columnar(cls, fname: Union[str, Path]) -> Tuple[Union[pd.DataFrame, pd.Series], dict]:
+        df, metadata = io.load_columnar(fname)
+        filter_type = metadata.pop('filter_type', cls.__name__)
+        if filter_type != cls.__name__:
+            warnings.warn(f"The file '{fname}' was saved from a {filter_type} object, "
+                          f"but is loaded as a {cls.__name__} object.")
+        return df, metadata
+
+    @staticmethod
+    def _resolve_saved_param(fname: Union[str, Path], metadata: dict, name: str, value, default):
+        """
+        Returns the value of a constructor parameter, given the properties of the Filter object \
+        that were saved alongside its table. The saved value is used if the parameter was left at its default value. \
+        If an explicitly given value conflicts with the saved value, the given value is used, and a warning is issued.
+        """
+        if name not in metadata:
+            return value
+        saved = metadata[name]
+        if value == default:
+            return saved
+        if value != saved:
+            warnings.warn(f"The value of '{name}' ({value!r}) differs from the value saved in the file '{fname}' "
+                          f"({saved!r}). Using {name}={value!r}.")
+        return value
+
+    @property
+    def df(self) -> Union[pd.DataFrame, pd.Series]:
+        """
+        The table of the Filter object. Copies of a Filter object share the same table in memory, \
+        and a Filter object only makes its own copy of the table the first time its 'df' attribute is accessed, \
+        so that modifying the table of one Filter object never modifies the table of another Filter object.
+        """
+        if self._df_shared:
+            self._df = _copy_df(self._df)
+            self._df_shared = False
+        return self._df
+
+    @df.setter
+    def df(self, value: Union[pd.DataFrame, pd.Series]):
+        self._df = value
+        self._df_shared = False
+
+    @property
+    def df_view(self) -> Union[pd.DataFrame, pd.Series]:
+        """
+        A read-only view of the table of the Filter object. Unlike the 'df' attribute, \
+        accessing 'df_view' never copies a table that is shared with copies of the Filter object, \
+        so it is suitable for displaying, saving or inspecting the table. \
+        The values of the returned table must not be modified.
+        """
+        return self._df.copy(deep=False)
 
     @classmethod
     def from_dataframe(cls, df: pd.DataFrame, name: Union[str, Path]) -> 'Filter':
         obj = cls.__new__(cls)
-        obj.df = df.copy(deep=True)
+        obj.df = _copy_df(df)
         obj.fname = Path(name)
-        if obj.df.index.has_duplicates:
+        if obj._df.index.has_duplicates:
             warnings.warn("This Filter object contains multiple rows with the same name/index.")
         return obj
 
+    @classmethod
+    def from_parquet(cls, fname: Union[str, Path]) -> 'Filter':
+        """
+        Load a Filter object from a Parquet or Feather file that was saved with the 'save_parquet' method. \
+        Unlike csv files, the data types of the table and the properties of the Filter object \
+        (such as the name of the numerator in a FoldChangeFilter or whether a CountFilter is normalized) \
+        are restored as well.
+
+        :param fname: full path/filename of the Parquet/Feather file to be loaded
+        :type fname: Union[str, Path]
+        :return: the loaded Filter object
+
+        :Examples:
+            >>> from rnalysis import filtering
+            >>> d = filtering.CountFilter("tests/test_files/counted.csv")
+            >>> d.save_parquet('counted')
+            >>> d_loaded = filtering.CountFilter.from_parquet('tests/test_files/counted.parquet')
+
+        """
+        df, metadata = cls._load_columnar(fname)
+        params = inspect.signature(cls.from_dataframe).parameters
+        kwargs = {key: val for key, val in metadata.items() if key in params and key not in {'df', 'name'}}
+        return cls.from_dataframe(df, fname, **kwargs)
+
+    @staticmethod
+    def _drop_columns(df: pd.DataFrame, drop_columns: Union[str, List[str]] = None):
+        if drop_columns:
+            drop_columns_lst = parsing.data_to_list(drop_columns)
+            for col in drop_columns_lst:
+                if col not in df:
+                    raise IndexError(f"The argument {col} in 'drop_columns' is not a column in the loaded file!")
+            df = df.drop(drop_columns_lst, axis=1)
+        return df
+
+    def _get_metadata(self) -> dict:
+        # properties of the Filter object that are saved alongside its table,
+        # named after the matching parameters of 'from_dataframe'
+        return {}
+
     def _init_warnings(self):
         pass
 
@@ -127,18 +259,57 @@ class Filter:
     def __eq__(self, other):
         if type(self) != type(other):
             return False
-        if self.df.equals(other.df) and self.shape == other.shape:
+        if self._df.equals(other._df) and self.shape == other.shape:
             return True
         return False
 
     def __contains__(self, item):
-        return True if item in self.df.index else False
+        return True if item in self._df.index else False
 
     def __iter__(self):
-        yield from self.df.index
+        yield from self._df.index
 
     def __copy__(self):
-        return type(self).from_dataframe(self.df, self.fname)
+        # Filter operations never modify the values of a table in-place, so the copy can share the values
+        # of the table with the original object, until either of them accesses the table through 'df' (copy-on-write)
+        obj = self._shallow_copy()
+        obj._df = self._df.copy(deep=False)
+        self._df_shared = obj._df_shared = True
+        return obj
+
+    def _shallow_copy(self):
+        """
+        Returns a copy of the Filter object that holds the same DataFrame object as the original object.
+        """
+        obj = type(self).__new__(type(self))
+        for cls in type(self).__mro__:
+            for slot in getattr(cls, '__slots__', ()):
+                if hasattr(self, slot):
+                    setattr(obj, slot, getattr(self, slot))
+        return obj
+
+    def lazy(self) -> 'LazyFilter':
+        """
+        Returns a lazy view of the Filter object. Filtering, normalizing and sorting functions called on \
+        the lazy view are not applied immediately, but are recorded into a plan of operations. \
+        The plan is only executed when calling 'collect()', or when calling any other function \
+        (such as saving or plotting functions) on the lazy view. \
+        Consecutive row filters in the plan (for example 'filter_low_reads', 'filter_significant' or \
+        'number_filters') are fused into a single boolean mask, and the table is copied once per fused group \
+        instead of once per function. The original Filter object is never modified.
+
+        :return: a lazy view of the Filter object
+        :rtype: LazyFilter
+
+        :Examples:
+            >>> from rnalysis import filtering
+            >>> d = filtering.DESeqFilter("tests/test_files/test_deseq.csv")
+            >>> d_filtered = d.lazy().filter_significant(0.1).filter_abs_log2_fold_change(1).sort('padj').collect()
+            Filtered 27 features, leaving 1 of the original 28 features. Filtering result saved to new object.
+            Sorted 1 features. Sorting result saved to new object.
+
+        """
+        return LazyFilter(self)
 
     @property
     def columns(self) -> list:
@@ -148,11 +319,14 @@ class Filter:
         :return: a list of the columns in the Filter object.
         :rtype: list
         """
-        return list(self.df.columns)
+        return list(self._df.columns)
 
     @property
     def shape(self) -> Tuple[int, int]:
-        return self.df.shape
+        return self._df.shape
+
+    def _subset_rows(self, mask: pd.Series, suffix: str) -> pd.DataFrame:
+        return self._df[mask]
 
     def _update(self, **kwargs):
         for key, val in kwargs.items():
@@ -184,7 +358,7 @@ class Filter:
             f"Invalid input for variable 'printout_operation': {printout_operation}"
         # when user requests the opposite of a filter, return the Set Difference between the filtering result and self
         if opposite:
-            new_df = self.df.loc[self.df.index.difference(new_df.index)]
+            new_df = self._df.loc[self._df.index.difference(new_df.index)]
             suffix += 'opposite'
 
         # update filename with the suffix of the operation that was just performed
@@ -193,13 +367,13 @@ class Filter:
         # generate printout for user ("Filtered X features, leaving Y... filtered inplace/not inplace")
         printout = ''
         if printout_operation.lower() == 'filter':
-            printout += f"Filtered {self.df.shape[0] - new_df.shape[0]} features, leaving {new_df.shape[0]} " \
-                        f"of the original {self.df.shape[0]} features. "
+            printout += f"Filtered {self._df.shape[0] - new_df.shape[0]} features, leaving {new_df.shape[0]} " \
+                        f"of the original {self._df.shape[0]} features. "
         elif printout_operation.lower() == 'translate':
             printout += f"Translated the gene IDs of {new_df.shape[0]} features. "
             if self.shape[0] != new_df.shape[0]:
-                printout += f"Filtered {self.df.shape[0] - new_df.shape[0]} unmapped features, " \
-                            f"leaving {new_df.shape[0]} of the original {self.df.shape[0]} features. "
+                printout += f"Filtered {self._df.shape[0] - new_df.shape[0]} unmapped features, " \
+                            f"leaving {new_df.shape[0]} of the original {self._df.shape[0]} features. "
 
         else:
             if printout_operation.lower() == 'normalize':
@@ -210,8 +384,8 @@ class Filter:
                 printout += "Transformed"
 
             printout += f" {new_df.shape[0]} features. "
-        # if inplace, modify the df, fname and shape properties of self
-        if inplace:
+        # the working copy of a lazy plan is modified in-place, but is a new object from the user's point of view
+        if inplace and not getattr(self, '_lazy_copy', False):
             if printout_operation.lower() == 'filter':
                 printout += 'Filtered'
             elif printout_operation.lower() == 'normalize':
@@ -223,9 +397,6 @@ class Filter:
             elif printout_operation.lower() == 'translate':
                 printout += 'Translated'
             printout += ' inplace.'
-            print(printout)
-            self._update(df=new_df, fname=new_fname, **filter_update_kwargs)
-        # if not inplace, copy self, modify the df/fname properties of the copy, and return it
         else:
             if printout_operation.lower() == 'filter':
                 printout += 'Filtering'
@@ -235,12 +406,29 @@ class Filter:
                 printout += 'Sorting'
             elif printout_operation.lower() == 'transform':
                 printout += 'Transformation'
+            elif printout_operation.lower() == 'translate':
+                printout += 'Translation'
             printout += ' result saved to new object.'
-            print(printout)
-            new_obj = self.__copy__()
+        print(printout)
+        # if inplace, modify the df, fname and shape properties of self
+        if inplace:
+            # the new table may still share memory with the copies of this Filter object
+            is_shared = self._df_shared and _may_share_memory(new_df, self._df)
+            self._update(df=new_df, fname=new_fname, **filter_update_kwargs)
+            self._df_shared = is_shared
+        # if not inplace, copy self, modify the df/fname properties of the copy, and return it
+        else:
+            new_obj = self._shallow_copy()
+            if new_df is self._df:
+                new_df = new_df.copy(deep=False)
             new_obj._update(df=new_df, fname=new_fname, **filter_update_kwargs)
+            new_obj._mark_shared(self)
             return new_obj
 
+    def _mark_shared(self, other: 'Filter'):
+        if self._df_shared or _may_share_memory(self._df, other._df):
+            self._df_shared = other._df_shared = True
+
     def save_csv(self, alt_filename: Union[None, str, Path] = None):
 
         """
@@ -264,7 +452,36 @@ class Filter:
                 (isinstance(alt_filename, Path) and alt_filename.suffix == suffix):
                 suffix = ''
             alt_filename = os.path.join(str(self.fname.parent), f"{alt_filename}{suffix}")
-        io.save_csv(self.df, alt_filename)
+        io.save_csv(self._df, alt_filename)
+
+    def save_parquet(self, alt_filename: Union[None, str, Path] = None):
+
+        """
+        Saves the current filtered data to a Parquet file. \
+        Parquet files are smaller and considerably faster to save and load than csv files, \
+        and preserve the data types of the table and the properties of the Filter object. \
+        If the alternative filename ends with '.feather', the data will be saved to a Feather file instead. \
+        Saved files can be loaded with the 'from_parquet' method.
+
+        :param alt_filename: If None, file name will be generated automatically \
+        according to the filtering methods used. \
+        If it's a string, it will be used as the name of the saved file. Example input: 'myfilename'
+        :type alt_filename: str, pathlib.Path, or None (default)
+
+        """
+        suffix = '.parquet'
+        # save with the default filename if no alternative filename was given
+        if alt_filename is None:
+            alt_filename = self.fname.parent.joinpath(f"{self.fname.stem}{suffix}")
+        else:
+            assert isinstance(alt_filename, (str, Path)), \
+                f"'alt_filename' must be a string or Path object. Instead got {type(alt_filename)}."
+            # make sure we don't add another suffix on top of an existing suffix
+            if io.is_columnar_file(alt_filename):
+                suffix = ''
+            alt_filename = os.path.join(str(self.fname.parent), f"{alt_filename}{suffix}")
+        metadata = {'filter_type': type(self).__name__, **self._get_metadata()}
+        io.save_columnar(self._df, alt_filename, metadata)
 
     @staticmethod
     def _from_string(msg: str = '', delimiter: str = '\n'):
@@ -363,8 +580,8 @@ class Filter:
     def translate_gene_ids(self, translate_to: Union[str, Literal[GENE_ID_TYPES]],
                            translate_from: Union[str, Literal['auto'], Literal[GENE_ID_TYPES]] = 'auto',
                            remove_unmapped_genes: bool = False, inplace: bool = True):
-        gene_ids = parsing.data_to_tuple(self.df.index)
-        new_df = self.df.copy(deep=True)
+        gene_ids = parsing.data_to_tuple(self._df.index)
+        new_df = self._df.copy(deep=True)
         if translate_from.lower() == 'auto':
             translator, translate_from, _ = io.find_best_gene_mapping(gene_ids, None, (translate_to,))
         else:
@@ -421,9 +638,9 @@ class Filter:
         """
         assert isinstance(percentile, (float, int)) and 0 <= percentile <= 1, \
             "percentile must be a float between 0 and 1!"
-        assert isinstance(column, str) and column in self.df, "Invalid column name!"
+        assert isinstance(column, str) and column in self._df, "Invalid column name!"
         suffix = f'_below{percentile}percentile'
-        new_df = self.df[self.df[column] <= self.df[column].quantile(percentile)]
+        new_df = self._df[self._df[column] <= self._df[column].quantile(percentile)]
         return self._inplace(new_df, opposite, inplace, suffix)
 
     @readable_name('Split by percentile')
@@ -471,7 +688,7 @@ class Filter:
                         if len(mapping) == 0:
                             continue
                         ref_srs = pd.Series(mapping, name='biotype')
-                        if len(ref_srs.index.intersection(self.df.index)) == 0:
+                        if len(ref_srs.index.intersection(self._df.index)) == 0:
                             continue
 
                         pbar.update(8)
@@ -521,8 +738,8 @@ class Filter:
         for bio in biotype:
             mask = mask | (ref_srs == bio)
         # gene names which remain after filtering are True in the mask AND were previously in the df
-        gene_names = ref_srs[mask].index.intersection(self.df.index)
-        new_df = self.df.loc[gene_names]
+        gene_names = ref_srs[mask].index.intersection(self._df.index)
+        new_df = self._df.loc[gene_names]
         return self._inplace(new_df, opposite, inplace, suffix)
 
     @readable_name('Filter by feature biotype (based on a reference table)')
@@ -579,8 +796,8 @@ class Filter:
             assert bio in legal_inputs, f"biotype {bio} is not a legal string!"
             mask = mask | (ref_df['biotype'] == bio)
         # gene names which remain after filtering are the 'True' in the mask AND were previously in the DataFrame
-        gene_names = ref_df[mask].index.intersection(self.df.index)
-        new_df = self.df.loc[gene_names]
+        gene_names = ref_df[mask].index.intersection(self._df.index)
+        new_df = self._df.loc[gene_names]
         return self._inplace(new_df, opposite, inplace, suffix)
 
     @readable_name('Filter by Gene Ontology (GO) annotation')
@@ -598,6 +815,7 @@ class Filter:
                                      Literal[('any',) + GO_QUALIFIERS], Iterable[Literal[GO_QUALIFIERS]]] = 'any',
                                  excluded_qualifiers: Union[
                                      Literal[GO_QUALIFIERS], Iterable[Literal[GO_QUALIFIERS]]] = 'not',
+                                 annotation_file: Union[str, Path, None] = None,
                                  opposite: bool = False, inplace: bool = True):
         suffix = '_filtGO'
         go_ids = parsing.data_to_set(go_ids)
@@ -620,10 +838,22 @@ class Filter:
         # find the minimal set of GO aspects that need to be fetched
         aspects = {dag_tree[go_id].namespace for go_id in go_ids}
 
-        annotations = io.GOlrAnnotationIterator(io.map_taxon_id(organism)[0], aspects,
-                                                evidence_types, excluded_evidence_types,
-                                                databases, excluded_databases,
-                                                qualifiers, excluded_qualifiers)
+        if annotation_file:
+            # read annotations from a local GAF/GPAD file. when organism is 'auto', all organisms in the file are used
+            if isinstance(organism, int):
+                taxon_id = organism
+            else:
+                taxon_id = None if organism.lower() == 'auto' else io.map_taxon_id(organism)[0]
+            annotations = io.GAFAnnotationIterator(annotation_file, aspects,
+                                                   evidence_types, excluded_evidence_types,
+                                                   databases, excluded_databases,
+                                                   qualifiers, excluded_qualifiers,
+                                                   taxon_id=taxon_id, dag_tree=dag_tree)
+        else:
+            annotations = io.GOlrAnnotationIterator(io.map_taxon_id(organism)[0], aspects,
+                                                    evidence_types, excluded_evidence_types,
+                                                    databases, excluded_databases,
+                                                    qualifiers, excluded_qualifiers)
         assert annotations.n_annotations > 0, "No GO annotations were found for the given parameters. " \
                                               "Please try again with a different set of parameters. "
         go_to_genes = {}
@@ -674,22 +904,20 @@ class Filter:
                         go_to_translated_genes[go_id].add(translator[gene_id])
                         go_to_genes[go_id].remove(gene_id)
 
-        # generate list of the indices that are positive for each attribute
+        # generate a sparse annotation matrix of the GO IDs, and find the indices that are positive for each GO ID
+        annotation_mat = AnnotationMatrix.from_sparse_dict(go_to_translated_genes, transpose=True)
         chosen_genes = set()
-        # if in union mode, calculate union between the indices of all attributes
+        # if in union mode, calculate union between the indices of all GO IDs
         if mode == 'union':
             suffix += 'Union'
-            for grp in go_to_translated_genes.values():
-                chosen_genes = chosen_genes.union(grp)
-            chosen_genes = chosen_genes.intersection(self.index_set)
-        # if in intersection mode, calculate intersection between the indices of all attributes
+            chosen_genes = annotation_mat.annotated_genes(mode='union').intersection(self.index_set)
+        # if in intersection mode, calculate intersection between the indices of all GO IDs
         elif mode == 'intersection':
             suffix += 'Intersection'
-            chosen_genes = self.index_set
-            for grp in go_to_translated_genes.values():
-                chosen_genes = chosen_genes.intersection(grp)
+            chosen_genes = self.index_set if annotation_mat.shape[1] == 0 else \
+                annotation_mat.annotated_genes(mode='intersection').intersection(self.index_set)
 
-        new_df = self.df.loc[parsing.data_to_list(chosen_genes)]
+        new_df = self._df.loc[parsing.data_to_list(chosen_genes)]
         return self._inplace(new_df, opposite, inplace, suffix)
 
     @readable_name('Filter by KEGG Pathways annotations')
@@ -753,8 +981,11 @@ class Filter:
 
         kegg_to_translated_genes = {}
         if gene_id_type == 'auto':
+            # the identifier types that are probed are narrowed down by the gene IDs of the table
+            map_to_options = io.guess_gene_id_types(self.index_set, 'to')
             translator, _, gene_id_type = io.find_best_gene_mapping(parsing.data_to_tuple(genes_to_translate),
-                                                                    ('KEGG',), None)
+                                                                    ('KEGG',),
+                                                                    map_to_options if len(map_to_options) > 0 else None)
         else:
             translator = io.map_gene_ids(parsing.data_to_tuple(genes_to_translate), 'KEGG', gene_id_type)
         for kegg_id in kegg_to_genes:
@@ -778,7 +1009,7 @@ class Filter:
             for grp in kegg_to_translated_genes.values():
                 chosen_genes = chosen_genes.intersection(grp)
 
-        new_df = self.df.loc[parsing.data_to_list(chosen_genes)]
+        new_df = self._df.loc[parsing.data_to_list(chosen_genes)]
         return self._inplace(new_df, opposite, inplace, suffix)
 
     @readable_name('Filter by user-defined attribute')
@@ -867,15 +1098,15 @@ class Filter:
             suffix += 'Union'
             for idx in attr_indices_list:
                 indices = indices.union(idx)
-            indices = indices.intersection(self.df.index)
+            indices = indices.intersection(self._df.index)
         # if in intersection mode, calculate intersection between the indices of all attributes
         elif mode == 'intersection':
             suffix += 'Intersection'
-            indices = self.df.index
+            indices = self._df.index
             for idx in attr_indices_list:
                 indices = indices.intersection(idx)
 
-        new_df = self.df.loc[indices]
+        new_df = self._df.loc[indices]
         return self._inplace(new_df, opposite, inplace, suffix)
 
     @readable_name('Split by user-defined attribute')
@@ -963,7 +1194,7 @@ class Filter:
             max    15056.000000  12746.000000  22027.000000  15639.000000
 
         """
-        return self.df.describe(percentiles=parsing.data_to_tuple(percentiles))
+        return self._df.describe(percentiles=parsing.data_to_tuple(percentiles))
 
     @property
     def index_set(self) -> set:
@@ -988,11 +1219,11 @@ class Filter:
             'WBGene00043987', 'WBGene00007071', 'WBGene00043989', 'WBGene00043988', 'WBGene00007075'}
 
         """
-        if self.df.index.has_duplicates:
+        if self._df.index.has_duplicates:
             warnings.warn(" this filter object contains multiple rows with the same WBGene index. When "
                           "returning a set or string of features from this DESeqFilter object, each WBGene index will "
                           "appear ONLY ONCE!")
-        return set(self.df.index)
+        return set(self._df.index)
 
     @property
     def index_string(self) -> str:
@@ -1038,7 +1269,7 @@ class Filter:
             WBGene00044951
 
         """
-        return "\n".join((str(ind) for ind in self.df.index))
+        return "\n".join((str(ind) for ind in self._df.index))
 
     def print_features(self):
 
@@ -1108,7 +1339,7 @@ class Filter:
         ref_df = self._get_ref_srs_from_gtf(gtf_path, attribute_name, feature_type).to_frame('biotype').reset_index(
             names=feature_type)
         # find which genes from tne Filter object don't appear in the Biotype Reference Table
-        not_in_ref = self.df.index.difference(ref_df[feature_type])
+        not_in_ref = self._df.index.difference(ref_df[feature_type])
         if len(not_in_ref) > 0:
             warnings.warn(
                 f'{len(not_in_ref)} of the features in the table do not appear in the Biotype Reference Table')
@@ -1117,14 +1348,14 @@ class Filter:
                 axis=0, join='outer')
         if long_format:
             # additionally return descriptive statistics for each biotype
-            self_df = self.df.__deepcopy__()
-            self_df['biotype'] = ref_df.set_index(feature_type).loc[self.df.index]
+            self_df = self._df.__deepcopy__()
+            self_df['biotype'] = ref_df.set_index(feature_type).loc[self._df.index]
             res = self_df.groupby('biotype').describe()
             res.columns = ['_'.join(col) for col in res.columns.values]
             return res
         else:
             # return just the number of genes/indices belonging to each biotype
-            return ref_df.set_index(feature_type, drop=False).loc[self.df.index].groupby('biotype').count()
+            return ref_df.set_index(feature_type, drop=False).loc[self._df.index].groupby('biotype').count()
 
     @readable_name('Summarize feature biotypes (based on a reference table)')
     def biotypes_from_ref_table(self, long_format: bool = False,
@@ -1172,7 +1403,7 @@ class Filter:
         ref_df = io.load_csv(ref)
         validation.validate_biotype_table(ref_df)
         # find which genes from tne Filter object don't appear in the Biotype Reference Table
-        not_in_ref = self.df.index.difference(ref_df['gene'])
+        not_in_ref = self._df.index.difference(ref_df['gene'])
         if len(not_in_ref) > 0:
             warnings.warn(
                 f'{len(not_in_ref)} of the features in the table do not appear in the Biotype Reference Table')
@@ -1181,15 +1412,15 @@ class Filter:
                 axis=0, join='outer')
         if long_format:
             # additionally return descriptive statistics for each biotype
-            self_df = self.df.__deepcopy__()
-            self_df['biotype'] = ref_df.set_index('gene').loc[self.df.index]
+            self_df = self._df.__deepcopy__()
+            self_df['biotype'] = ref_df.set_index('gene').loc[self._df.index]
             res = self_df.groupby('biotype').describe()
             res.columns = ['_'.join(col) for col in res.columns.values]
             return res
 
         else:
             # return just the number of genes/indices belonging to each biotype
-            return ref_df.set_index('gene', drop=False).loc[self.df.index].groupby('biotype').count()
+            return ref_df.set_index('gene', drop=False).loc[self._df.index].groupby('biotype').count()
 
     @readable_name('Filter with a number filter')
     def number_filters(self, column: str, operator: Literal['greater than', 'equals', 'lesser than'], value: float,
@@ -1232,6 +1463,11 @@ class Filter:
             Filtered 26 features, leaving 2 of the original 28 features. Filtered inplace.
 
         """
+        mask, suffix = self._number_filters_mask(column, operator, value)
+        new_df = self._subset_rows(mask, suffix)
+        return self._inplace(new_df, opposite, inplace, suffix)
+
+    def _number_filters_mask(self, column: str, operator: str, value: float) -> Tuple[pd.Series, str]:
         # determine whether operator is valid
         operator_dict = {'gt': 'gt', 'greater than': 'gt', '>': 'gt', 'eq': 'eq', 'equals': 'eq', '=': 'eq', 'lt': 'lt',
                          'lesser than': 'lt', '<': 'lt', 'equal': 'eq'}
@@ -1246,14 +1482,14 @@ class Filter:
         suffix = f"_{column}{op}{value}"
         # perform operation according to operator
         if op == 'eq':
-            new_df = self.df[self.df[column] == value]
+            mask = self._df[column] == value
         elif op == 'gt':
-            new_df = self.df[self.df[column] > value]
+            mask = self._df[column] > value
         elif op == 'lt':
-            new_df = self.df[self.df[column] < value]
+            mask = self._df[column] < value
 
         # noinspection PyUnboundLocalVariable
-        return self._inplace(new_df, opposite, inplace, suffix)
+        return mask, suffix
 
     @readable_name('Filter with a text filter')
     def text_filters(self, column: str, operator: Literal['equals', 'contains', 'starts with', 'ends with'], value: str,
@@ -1286,6 +1522,11 @@ class Filter:
             Filtered 17 features, leaving 5 of the original 22 features. Filtered inplace.
 
         """
+        mask, suffix = self._text_filters_mask(column, operator, value)
+        new_df = self._subset_rows(mask, suffix)
+        return self._inplace(new_df, opposite, inplace, suffix)
+
+    def _text_filters_mask(self, column: str, operator: str, value: str) -> Tuple[pd.Series, str]:
         # determine whether operator is valid
         operator_dict = {'eq': 'eq', 'equals': 'eq', '=': 'eq', 'ct': 'ct', 'in': 'ct', 'contains': 'ct', 'sw': 'sw',
                          'starts with': 'sw', 'ew': 'ew', 'ends with': 'ew', 'equal': 'eq', 'begins with': 'sw'}
@@ -1300,16 +1541,16 @@ class Filter:
         suffix = f"_{column}{op}{value}"
         # perform operation according to operator
         if op == 'eq':
-            new_df = self.df[self.df[column] == value]
+            mask = self._df[column] == value
         elif op == 'ct':
-            new_df = self.df[self.df[column].str.contains(value)]
+            mask = self._df[column].str.contains(value)
         elif op == 'ew':
-            new_df = self.df[self.df[column].str.endswith(value)]
+            mask = self._df[column].str.endswith(value)
         elif op == 'sw':
-            new_df = self.df[self.df[column].str.startswith(value)]
+            mask = self._df[column].str.startswith(value)
 
         # noinspection PyUnboundLocalVariable
-        return self._inplace(new_df, opposite, inplace, suffix)
+        return mask, suffix
 
     @readable_name('Remove rows with missing values')
     def filter_missing_values(self, columns: Union[str, List[str], Literal['all']] = 'all', opposite: bool = False,
@@ -1339,6 +1580,11 @@ class Filter:
             Filtered 2 features, leaving 26 of the original 28 features. Filtering result saved to new object.
 
         """
+        mask, suffix = self._filter_missing_values_mask(columns)
+        new_df = self._subset_rows(mask, suffix)
+        return self._inplace(new_df, opposite, inplace, suffix)
+
+    def _filter_missing_values_mask(self, columns: Union[str, List[str]] = 'all') -> Tuple[pd.Series, str]:
         subset = None
         suffix = '_removemissingvals'
         if columns == 'all':
@@ -1361,11 +1607,12 @@ class Filter:
         else:
             raise TypeError(f"Invalid type for 'columns': {type(columns)}")
         if subset is not None:
-            new_df = self.df.dropna(axis=0, subset=subset, inplace=False)
+            mask = self._df[subset].notna().all(axis=1)
+        elif isinstance(self._df, pd.DataFrame):
+            mask = self._df.notna().all(axis=1)
         else:
-            new_df = self.df.dropna(axis=0, inplace=False)
-
-        return self._inplace(new_df, opposite, inplace, suffix)
+            mask = self._df.notna()
+        return mask, suffix
 
     @readable_name('Apply a transformation to the table')
     def transform(self, function: Union[Literal['Box-Cox', 'log2', 'log10', 'ln', 'Standardize'], Callable],
@@ -1421,14 +1668,14 @@ class Filter:
             raise TypeError(f"Invalid value for 'function': {function} (type {type(function)}). "
                             f"Please specify a function or a recognized function name. ")
 
-        new_df = self.df.copy(deep=True)
+        new_df = self._df.copy(deep=True)
         try:
             new_df[columns] = function(new_df[columns], **function_kwargs)
         except Exception:
             try:
-                new_df[columns] = self.df.apply(function, axis=1, result_type='broadcast', **function_kwargs)
+                new_df[columns] = self._df.apply(function, axis=1, result_type='broadcast', **function_kwargs)
             except Exception:
-                new_df[columns] = self.df.applymap(function, **function_kwargs)
+                new_df[columns] = self._df.applymap(function, **function_kwargs)
         return self._inplace(new_df, False, inplace, suffix, 'transform')
 
     @readable_name('Sort table rows')
@@ -1474,7 +1721,7 @@ class Filter:
         suffix = f'_sortedby{by}ascending{ascending}na{na_position}'
         new_df = self._sort(by=by, ascending=ascending, inplace=inplace, na_position=na_position)
         if inplace:
-            new_df = self.df
+            new_df = self._df
         return self._inplace(new_df, False, inplace, suffix, 'sort')
 
     def _sort(self, by: Union[str, List[str]], ascending: Union[bool, List[bool]] = True, na_position: str = 'last',
@@ -1495,7 +1742,7 @@ class Filter:
         :return: None if inplace=True, a sorted Filter object otherwise.
         """
 
-        return self.df.sort_values(by=by, axis=0, ascending=ascending, inplace=inplace, na_position=na_position)
+        return self._df.sort_values(by=by, axis=0, ascending=ascending, inplace=inplace, na_position=na_position)
 
     @readable_name('Filter all but top N values')
     def filter_top_n(self, by: Union[str, List[str]], n: int = 100, ascending: Union[bool, List[bool]] = True,
@@ -1549,10 +1796,10 @@ class Filter:
         # sort the DataFrame by the specified column/columns, in the specified order
         self._sort(by=by, ascending=ascending, na_position=na_position, inplace=True)
         # keep only the top n values in the DataFrame after the sort (or the top len(self) items, if n>len(self))
-        if n > self.df.shape[0]:
-            warnings.warn(f'Current number of rows {self.df.shape[0]} is smaller than the specified n={n}. '
-                          f'Therefore output Filter object will only have {self.df.shape[0]} rows. ')
-        new_df = self.df.iloc[0:min(n, self.df.shape[0])]
+        if n > self._df.shape[0]:
+            warnings.warn(f'Current number of rows {self._df.shape[0]} is smaller than the specified n={n}. '
+                          f'Therefore output Filter object will only have {self._df.shape[0]} rows. ')
+        new_df = self._df.iloc[0:min(n, self._df.shape[0])]
         return self._inplace(new_df, opposite, inplace, suffix)
 
     @staticmethod
@@ -1590,7 +1837,7 @@ class Filter:
                 raise TypeError(f"'others' must contain only Filter objects or sets, "
                                 f"instaed got object {other} of type {type(other)}.")
         try:
-            op_indices = op(set(self.df.index), *others, **kwargs)
+            op_indices = op(set(self._df.index), *others, **kwargs)
         except TypeError as e:
             if op == set.symmetric_difference:
                 raise TypeError(
@@ -1636,7 +1883,7 @@ class Filter:
         if inplace:
             suffix = f"_intersection"
             new_set = self._set_ops(others, 'set', set.intersection)
-            return self._inplace(self.df.loc[new_set], opposite=False, inplace=inplace, suffix=suffix)
+            return self._inplace(self._df.loc[new_set], opposite=False, inplace=inplace, suffix=suffix)
         # if intersection is not performed inplace, return a set/string according to user's request
         else:
             new_set = self._set_ops(others, return_type, set.intersection)
@@ -1755,7 +2002,7 @@ class Filter:
         if inplace:
             suffix = f"_difference"
             new_set = self._set_ops(others, 'set', set.difference)
-            return self._inplace(self.df.loc[new_set], opposite=False, inplace=inplace, suffix=suffix)
+            return self._inplace(self._df.loc[new_set], opposite=False, inplace=inplace, suffix=suffix)
         # if difference is not performed inplace, return a set/string according to user's request
         else:
             new_set = self._set_ops(others, return_type, set.difference)
@@ -1846,16 +2093,17 @@ class FoldChangeFilter(Filter):
         structure or content.
         :type suppress_warnings: bool (default=False)
         """
-        super().__init__(fname)
-        self.numerator = numerator_name
-        self.denominator = denominator_name
-        self.df.name = 'Fold Change'
+        metadata = self._load_table(fname)
+        # numerator and denominator names are always given explicitly, so the saved names only serve as a check
+        self.numerator = self._resolve_saved_param(fname, metadata, 'numerator_name', numerator_name, None)
+        self.denominator = self._resolve_saved_param(fname, metadata, 'denominator_name', denominator_name, None)
+        self._df.name = 'Fold Change'
         # inf/0 can be problematic for functions down the line (like randomization test)
         if not suppress_warnings:
             self._init_warnings()
 
     def _init_warnings(self):
-        if np.inf in self.df or 0 in self.df:
+        if np.inf in self._df or 0 in self._df:
             warnings.warn(
                 " FoldChangeFilter does not support 'inf' or '0' values! "
                 "Unexpected results may occur during filtering or statistical analyses. ")
@@ -1871,7 +2119,7 @@ class FoldChangeFilter(Filter):
     def from_dataframe(cls, df: pd.DataFrame, name: Union[str, Path], numerator_name: str = 'numerator',
                        denominator_name: str = 'denominator', suppress_warnings: bool = False) -> 'FoldChangeFilter':
         obj = cls.__new__(cls)
-        obj.df = df.copy(deep=True)
+        obj.df = _copy_df(df)
         obj.fname = Path(name)
         obj.numerator = numerator_name
         obj.denominator = denominator_name
@@ -1879,9 +2127,8 @@ class FoldChangeFilter(Filter):
             obj._init_warnings()
         return obj
 
-    def __copy__(self):
-        return type(self).from_dataframe(self.df, self.fname, numerator_name=self.numerator,
-                                         denominator_name=self.denominator)
+    def _get_metadata(self) -> dict:
+        return {'numerator_name': self.numerator, 'denominator_name': self.denominator}
 
     @property
     def columns(self) -> list:
@@ -1891,11 +2138,12 @@ class FoldChangeFilter(Filter):
         :return: a list of the columns in the Filter object.
         :rtype: list
         """
-        return [self.df.name]
+        return [self._df.name]
 
     @readable_name('Perform randomization test')
     def randomization_test(self, ref, alpha: float = 0.05, reps: int = 10000, save_csv: bool = False,
-                           fname: Union[str, None] = None, random_seed: Union[int, None] = None) -> pd.DataFrame:
+                           fname: Union[str, None] = None, random_seed: Union[int, None] = None,
+                           stop_after: Union[int, None] = None) -> pd.DataFrame:
 
         """
         Perform a randomization test to examine whether the fold change of a group of specific genomic features \
@@ -1918,6 +2166,12 @@ class FoldChangeFilter(Filter):
         :type random_seed: The random seed used to initialize the pseudorandom generator for the randomization test. \
         By default it is picked at random, but you can set it to a particular integer to get consistents results \
         over multiple runs.
+        :type stop_after: int larger than 0 or None (default=None)
+        :param stop_after: if specified, stop drawing random sets once this many random sets were at least as \
+        extreme as the observed set (the sequential stopping rule of Besag and Clifford). \
+        'reps' then determines the maximal number of repetitions, \
+        and the number of repetitions actually drawn is reported in the 'reps' column of the output DataFrame. \
+        If None, all 'reps' repetitions will be drawn.
         :rtype: pandas DataFrame
         :return: A Dataframe with the number of given genes, the observed fold change for the given group of genes, \
         the expected fold change for a group of genes of that size and the p value for the comparison.
@@ -1939,20 +2193,23 @@ class FoldChangeFilter(Filter):
 
         """
         # calculate observed and expected mean fold-change, and the set size (n)
-        obs_fc = self.df.mean(axis=0)
-        exp_fc = ref.df.mean()
-        n = self.df.shape[0]
-        # set random seed if requested
-        if random_seed is not None:
-            assert isinstance(random_seed, int) and random_seed >= 0, f"random_seed must be a non-negative integer. " \
-                                                                      f"Value {random_seed} invalid."
-            np.random.seed(random_seed)
+        obs_fc = self._df.mean(axis=0)
+        exp_fc = ref._df.mean()
+        n = self._df.shape[0]
+        # seed the random stream of the randomization test
+        generic.seed_jit_rng(generic.get_seed_sequence(random_seed))
         # run randomization test
         print('Calculating...')
-        res = self._foldchange_randomization(ref.df.values, reps, obs_fc, exp_fc, n)
+        columns = ['group size', 'observed fold change', 'expected fold change', 'pval']
+        if stop_after is None:
+            res = self._foldchange_randomization(ref._df.values, reps, obs_fc, exp_fc, n)
+        else:
+            assert isinstance(stop_after, int) and stop_after > 0, f"stop_after must be a positive integer. " \
+                                                                   f"Value {stop_after} invalid."
+            res = self._foldchange_adaptive_randomization(ref._df.values, reps, obs_fc, exp_fc, n, stop_after)
+            columns.append('reps')
         # format the output DataFrame
-        res_df = pd.DataFrame(res, columns=['group size', 'observed fold change', 'expected fold change', 'pval'],
-                              index=[0])
+        res_df = pd.DataFrame(res, columns=columns, index=[0])
         res_df['significant'] = res_df['pval'] <= alpha
         # save the output DataFrame if requested
         if save_csv:
@@ -1979,6 +2236,173 @@ class FoldChangeFilter(Filter):
         pval = (success + 1) / (reps + 1)
         return [[n, obs_fc, exp_fc, pval]]
 
+    @staticmethod
+    @generic.numba.jit(nopython=True)
+    def _foldchange_adaptive_randomization(vals: np.ndarray, max_reps: int, obs_fc: float, exp_fc: float, n: int,
+                                           stop_after: int):
+        success = 0
+        for i in range(max_reps):
+            rand_fc = np.mean(np.random.choice(vals, n, replace=False))
+            if (obs_fc > exp_fc and rand_fc >= obs_fc) or (obs_fc <= exp_fc and rand_fc <= obs_fc):
+                success += 1
+                # sequential stopping rule (Besag & Clifford, 1991): once 'stop_after' successes were observed,
+                # the p-value estimator is the number of successes divided by the number of repeats drawn so far
+                if success == stop_after:
+                    return [[n, obs_fc, exp_fc, stop_after / (i + 1), i + 1]]
+        pval = (success + 1) / (max_reps + 1)
+        return [[n, obs_fc, exp_fc, pval, max_reps]]
+
+    @readable_name('Perform randomization test for multiple groups of genes')
+    def randomization_test_many(self, test_sets: Union[Dict[str, Union[Iterable[str], 'Filter']],
+                                                       List[Union[Iterable[str], 'Filter']], None] = None,
+                                attributes: Union[str, List[str], None] = None,
+                                attr_ref_path: Union[str, Path, Literal['predefined']] = 'predefined',
+                                alpha: float = 0.05, reps: int = 10000, save_csv: bool = False,
+                                fname: Union[str, None] = None, random_seed: Union[int, None] = None,
+                                parallel: bool = True) -> pd.DataFrame:
+        """
+        Perform randomization tests to examine whether the fold change of each of multiple groups of genomic features \
+        is significantly different than the fold change of the background set of genomic features \
+        (this FoldChangeFilter object). \
+        The groups can be given as sets of feature indices/Filter objects, \
+        or as user-defined attributes from an Attribute Reference Table. \
+        The random sets of the background are drawn only once for every group size, \
+        and are shared between all groups of that size. \
+        P-values are corrected for multiple comparisons using the Benjamini–Hochberg step-up procedure \
+        (original FDR method).
+
+        :param test_sets: groups of genomic features to test. Can be a dictionary of group names and groups, \
+        or a list of groups. Every group can be a set of feature indices, or a Filter object. \
+        The fold change values of FoldChangeFilter groups are taken from the groups themselves, \
+        and the fold change values of other groups are taken from the background set.
+        :type test_sets: dict or list of sets of feature indices or Filter objects, or None (default=None)
+        :param attributes: user-defined attributes from an Attribute Reference Table. \
+        The genomic features of the background set which belong to each attribute will be tested as a group.
+        :type attributes: str, list of str, or None (default=None)
+        :param attr_ref_path: filename/path of the Attribute Reference Table to be used as reference.
+        :type attr_ref_path: str or pathlib.Path (default='predefined')
+        :type alpha: float between 0 and 1
+        :param alpha: Indicates the FDR threshold for significance.
+        :type reps: int larger than 0
+        :param reps: How many repetitions to run the randomization for. \
+        10,000 is the default. Recommended 10,000 or higher.
+        :type save_csv: bool, default False
+        :param save_csv: If True, will save the results to a .csv file, under the name specified in 'fname'.
+        :type fname: str or pathlib.Path
+        :param fname: The full path and name of the file to which to save the results. For example: \
+        'C:/dir/file'. No '.csv' suffix is required. If None (default), fname will be requested in a manual prompt.
+        :type random_seed: non-negative integer (default=None)
+        :param random_seed: The random seed used to initialize the pseudorandom generator for the randomization test. \
+        By default it is picked at random, but you can set it to a particular integer to get consistents results \
+        over multiple runs, regardless of parallel processing.
+        :type parallel: bool (default=True)
+        :param parallel: if True, groups of different sizes will be tested using parallel processing.
+        :rtype: pandas DataFrame
+        :return: A Dataframe with the name of every group as index, and the number of features, \
+        the observed fold change, the expected fold change, the p-value and the adjusted p-value of every group.
+        """
+        assert test_sets is not None or attributes is not None, "Either 'test_sets' or 'attributes' must be specified."
+        assert isinstance(reps, int) and reps > 0, f"reps must be a positive integer. Value {reps} invalid."
+        groups = self._get_randomization_groups(test_sets, attributes, attr_ref_path)
+        assert len(groups) > 0, "No groups of genomic features were supplied!"
+
+        vals = self._df.values
+        exp_fc = self._df.mean()
+        names = list(groups.keys())
+        sizes = np.array([len(group_vals) for group_vals in groups.values()])
+        obs_fcs = np.array([np.mean(group_vals) if len(group_vals) > 0 else np.nan for group_vals in groups.values()])
+        assert sizes.max() <= vals.shape[0], "Groups cannot be larger than the background set."
+
+        # groups of the same size share the same random draws from the background set.
+        # every group size draws from its own random stream, so the results do not depend on parallel processing
+        print('Calculating...')
+        root_seed = generic.get_seed_sequence(random_seed)
+        unique_sizes = [size for size in np.unique(sizes).tolist() if size > 0]
+        size_args = [(vals, reps, size, obs_fcs[sizes == size], exp_fc, generic.get_seed_sequence(root_seed, key=size))
+                     for size in unique_sizes]
+        if parallel and len(unique_sizes) > 1:
+            size_pvals = generic.ProgressParallel(n_jobs=-2, total=len(unique_sizes), desc="Randomization test",
+                                                  unit='group size')(
+                joblib.delayed(self._foldchange_randomization_batch)(*args) for args in size_args)
+        else:
+            size_pvals = [self._foldchange_randomization_batch(*args) for args in size_args]
+        pvals = np.full(len(names), np.nan)
+        for size, this_pvals in zip(unique_sizes, size_pvals):
+            pvals[sizes == size] = this_pvals
+
+        # format the output DataFrame and correct for multiple comparisons
+        res_df = pd.DataFrame({'group size': sizes, 'observed fold change': obs_fcs, 'expected fold change': exp_fc,
+                               'pval': pvals}, index=pd.Index(names, name='group'))
+        res_df['padj'] = np.nan
+        res_df['significant'] = False
+        tested = res_df['pval'].notna()
+        if tested.any():
+            significant, padj = multitest.fdrcorrection(res_df.loc[tested, 'pval'].values, alpha=alpha)
+            res_df.loc[tested, 'padj'] = padj
+            res_df.loc[tested, 'significant'] = significant
+        # save the output DataFrame if requested
+        if save_csv:
+            io.save_csv(res_df, fname)
+        print(res_df)
+
+        return res_df
+
+    def _get_randomization_groups(self, test_sets, attributes, attr_ref_path) -> Dict[str, np.ndarray]:
+        """
+        Return a dictionary of group names and the fold change values of the genomic features in each group.
+        """
+        groups = {}
+        if test_sets is not None:
+            if not isinstance(test_sets, dict):
+                test_sets = parsing.data_to_list(test_sets) if isinstance(test_sets, (list, tuple)) else [test_sets]
+                names = [Path(group.fname).stem if validation.isinstanceinh(group, Filter) else f'group_{i + 1}' for
+                         i, group in enumerate(test_sets)]
+                assert len(set(names)) == len(names), "Group names must be unique."
+                test_sets = dict(zip(names, test_sets))
+            for name, group in test_sets.items():
+                if validation.isinstanceinh(group, FoldChangeFilter):
+                    groups[name] = group._df.values
+                    continue
+                genes = group.index_set if validation.isinstanceinh(group, Filter) else parsing.data_to_set(group)
+                in_background = self._df.index.isin(parsing.data_to_list(genes))
+                if in_background.sum() < len(genes):
+                    warnings.warn(f"{len(genes) - in_background.sum()} genomic features of group '{name}' do not "
+                                  f"appear in the background set, and are therefore ignored.")
+                groups[name] = self._df.values[in_background]
+
+        if attributes is not None:
+            attributes = parsing.data_to_list(attributes)
+            attr_ref_table = io.load_csv(settings.get_attr_ref_path(attr_ref_path))
+            validation.validate_attr_table(attr_ref_table)
+            attr_ref_table.set_index('gene', inplace=True)
+            for attr in attributes:
+                assert attr in attr_ref_table.columns, f"Attribute '{attr}' does not appear in the " \
+                                                       f"Attribute Reference Table."
+                assert attr not in groups, f"Group names must be unique. Name '{attr}' appears more than once."
+                attr_genes = attr_ref_table.index[attr_ref_table[attr].notna()]
+                groups[attr] = self._df.values[self._df.index.isin(attr_genes)]
+        return groups
+
+    @staticmethod
+    def _foldchange_randomization_batch(vals: np.ndarray, reps: int, n: int, obs_fcs: np.ndarray, exp_fc: float,
+                                        seed_sequence: np.random.SeedSequence) -> np.ndarray:
+        """
+        Perform randomization tests for multiple groups of the same size 'n', using a single set of 'reps' random \
+        draws from the background values. The mean fold changes of the random draws are sorted once, \
+        and the number of random draws which are at least as extreme as each group is found by binary search.
+        """
+        rng = np.random.default_rng(seed_sequence)
+        rand_fcs = np.empty(reps, dtype='float64')
+        for i in range(reps):
+            rand_fcs[i] = np.mean(vals[rng.choice(vals.shape[0], n, replace=False, shuffle=False)])
+        rand_fcs.sort()
+        # count successes: mean(random subset) >= mean(observed) if observed is greater than expected,
+        # and mean(random subset) <= mean(observed) otherwise
+        n_greater_equal = reps - np.searchsorted(rand_fcs, obs_fcs, side='left')
+        n_lesser_equal = np.searchsorted(rand_fcs, obs_fcs, side='right')
+        success = np.where(obs_fcs > exp_fc, n_greater_equal, n_lesser_equal)
+        return (success + 1) / (reps + 1)
+
     @readable_name('Filter by absolute log2 fold-change magnitude')
     def filter_abs_log2_fold_change(self, abslog2fc: float = 1, opposite: bool = False, inplace: bool = True):
 
@@ -2006,11 +2430,15 @@ class FoldChangeFilter(Filter):
             Filtered 18 features, leaving 4 of the original 22 features. Filtered inplace.
 
         """
+        mask, suffix = self._filter_abs_log2_fold_change_mask(abslog2fc)
+        new_df = self._subset_rows(mask, suffix).dropna()
+        return self._inplace(new_df, opposite, inplace, suffix)
+
+    def _filter_abs_log2_fold_change_mask(self, abslog2fc: float = 1) -> Tuple[pd.Series, str]:
         assert isinstance(abslog2fc, (float, int)), "abslog2fc must be a number!"
         assert abslog2fc >= 0, "abslog2fc must be non-negative!"
         suffix = f"_{abslog2fc}abslog2foldchange"
-        new_df = self.df[np.abs(np.log2(self.df)) >= abslog2fc].dropna()
-        return self._inplace(new_df, opposite, inplace, suffix)
+        return np.abs(np.log2(self._df)) >= abslog2fc, suffix
 
     @readable_name('Filter by fold-change direction')
     def filter_fold_change_direction(self, direction: Literal['pos', 'neg'] = 'pos', opposite: bool = False,
@@ -2049,18 +2477,19 @@ class FoldChangeFilter(Filter):
             Filtered 12 features, leaving 10 of the original 22 features. Filtered inplace.
 
         """
+        mask, suffix = self._filter_fold_change_direction_mask(direction)
+        new_df = self._subset_rows(mask, suffix)
+        return self._inplace(new_df, opposite, inplace, suffix)
+
+    def _filter_fold_change_direction_mask(self, direction: Literal['pos', 'neg'] = 'pos') -> Tuple[pd.Series, str]:
         assert isinstance(direction, str), \
             "'direction' must be either 'pos' for positive fold-change, or 'neg' for negative fold-change. "
         if direction == 'pos':
-            new_df = self.df[self.df > 1]
-            suffix = '_PositiveLog2FC'
+            return self._df > 1, '_PositiveLog2FC'
         elif direction == 'neg':
-            new_df = self.df[self.df < 1]
-            suffix = '_NegativeLog2FC'
-        else:
-            raise ValueError(
-                "'direction' must be either 'pos' for positive fold-change, or 'neg' for negative fold-change. ")
-        return self._inplace(new_df, opposite, inplace, suffix)
+            return self._df < 1, '_NegativeLog2FC'
+        raise ValueError(
+            "'direction' must be either 'pos' for positive fold-change, or 'neg' for negative fold-change. ")
 
     @readable_name('Split by fold-change direction')
     def split_fold_change_direction(self) -> tuple:
@@ -2134,9 +2563,9 @@ class DESeqFilter(Filter):
         structure or content.
         :type suppress_warnings: bool (default=False)
         """
-        super().__init__(fname, drop_columns)
-        self.log2fc_col = log2fc_col
-        self.padj_col = padj_col
+        metadata = self._load_table(fname, drop_columns)
+        self.log2fc_col = self._resolve_saved_param(fname, metadata, 'log2fc_col', log2fc_col, 'log2FoldChange')
+        self.padj_col = self._resolve_saved_param(fname, metadata, 'padj_col', padj_col, 'padj')
         if not suppress_warnings:
             self._init_warnings()
 
@@ -2154,7 +2583,7 @@ class DESeqFilter(Filter):
                        log2fc_col: str = 'log2FoldChange', padj_col: str = 'padj',
                        suppress_warnings: bool = False) -> 'DESeqFilter':
         obj = cls.__new__(cls)
-        obj.df = df.copy(deep=True)
+        obj.df = _copy_df(df)
         obj.fname = Path(name)
         obj.log2fc_col = log2fc_col
         obj.padj_col = padj_col
@@ -2162,17 +2591,17 @@ class DESeqFilter(Filter):
             obj._init_warnings()
         return obj
 
-    def __copy__(self):
-        return type(self).from_dataframe(self.df, self.fname, self.log2fc_col, self.padj_col, suppress_warnings=True)
+    def _get_metadata(self) -> dict:
+        return {'log2fc_col': self.log2fc_col, 'padj_col': self.padj_col}
 
     def _assert_padj_col(self):
-        if self.padj_col not in self.df.columns:
+        if self.padj_col not in self._df.columns:
             raise KeyError(f"A column with adjusted p-values under the name padj_col='{self.padj_col}' "
                            f"could not be found. Try setting a different value for the parameter 'padj_col' "
                            f"when creating the DESeqFilter object.")
 
     def _assert_log2fc_col(self):
-        if self.log2fc_col not in self.df.columns:
+        if self.log2fc_col not in self._df.columns:
             raise KeyError(f"A column with log2 fold change values under the name log2fc_col='{self.log2fc_col}' "
                            f"could not be found. Try setting a different value for the parameter 'log2fc_col' "
                            f"when creating the DESeqFilter object.")
@@ -2205,12 +2634,14 @@ class DESeqFilter(Filter):
             Filtered 25 features, leaving 4 of the original 29 features. Filtered inplace.
 
         """
+        mask, suffix = self._filter_significant_mask(alpha)
+        new_df = self._subset_rows(mask, suffix)
+        return self._inplace(new_df, opposite, inplace, suffix)
+
+    def _filter_significant_mask(self, alpha: float = 0.1) -> Tuple[pd.Series, str]:
         assert isinstance(alpha, float), "alpha must be a float!"
         self._assert_padj_col()
-
-        new_df = self.df[self.df[self.padj_col] <= alpha]
-        suffix = f"_sig{alpha}"
-        return self._inplace(new_df, opposite, inplace, suffix)
+        return self._df[self.padj_col] <= alpha, f"_sig{alpha}"
 
     @readable_name('Filter by absolute log2 fold-change magnitude')
     def filter_abs_log2_fold_change(self, abslog2fc: float = 1, opposite: bool = False, inplace: bool = True):
@@ -2239,13 +2670,15 @@ class DESeqFilter(Filter):
             Filtered 1 features, leaving 28 of the original 29 features. Filtered inplace.
 
         """
+        mask, suffix = self._filter_abs_log2_fold_change_mask(abslog2fc)
+        new_df = self._subset_rows(mask, suffix)
+        return self._inplace(new_df, opposite, inplace, suffix)
+
+    def _filter_abs_log2_fold_change_mask(self, abslog2fc: float = 1) -> Tuple[pd.Series, str]:
         assert isinstance(abslog2fc, (float, int)), "abslog2fc must be a number!"
         assert abslog2fc >= 0, "abslog2fc must be non-negative!"
         self._assert_log2fc_col()
-
-        suffix = f"_{abslog2fc}abslog2foldchange"
-        new_df = self.df[np.abs(self.df[self.log2fc_col]) >= abslog2fc]
-        return self._inplace(new_df, opposite, inplace, suffix)
+        return np.abs(self._df[self.log2fc_col]) >= abslog2fc, f"_{abslog2fc}abslog2foldchange"
 
     @readable_name('Filter by log2 fold-change direction')
     def filter_fold_change_direction(self, direction: Literal['pos', 'neg'] = 'pos', opposite: bool = False,
@@ -2281,20 +2714,20 @@ class DESeqFilter(Filter):
             Filtered 26 features, leaving 3 of the original 29 features. Filtered inplace.
 
         """
+        mask, suffix = self._filter_fold_change_direction_mask(direction)
+        new_df = self._subset_rows(mask, suffix)
+        return self._inplace(new_df, opposite, inplace, suffix)
+
+    def _filter_fold_change_direction_mask(self, direction: Literal['pos', 'neg'] = 'pos') -> Tuple[pd.Series, str]:
         assert isinstance(direction, str), \
             "'direction' must be either 'pos' for positive fold-change, or 'neg' for negative fold-change. "
         self._assert_log2fc_col()
-
         if direction == 'pos':
-            new_df = self.df[self.df[self.log2fc_col] > 0]
-            suffix = '_PositiveLog2FC'
+            return self._df[self.log2fc_col] > 0, '_PositiveLog2FC'
         elif direction == 'neg':
-            new_df = self.df[self.df[self.log2fc_col] < 0]
-            suffix = '_NegativeLog2FC'
-        else:
-            raise ValueError(
-                "'direction' must be either 'pos' for positive fold-change, or 'neg' for negative fold-change. ")
-        return self._inplace(new_df, opposite, inplace, suffix)
+            return self._df[self.log2fc_col] < 0, '_NegativeLog2FC'
+        raise ValueError(
+            "'direction' must be either 'pos' for positive fold-change, or 'neg' for negative fold-change. ")
 
     @readable_name('Split by log2 fold-change direction')
     def split_fold_change_direction(self) -> tuple:
@@ -2362,11 +2795,11 @@ class DESeqFilter(Filter):
 
         fig = plt.figure(constrained_layout=True)
         ax = fig.add_subplot(111)
-        colors = pd.Series(index=self.df.index, dtype='float64')
-        colors.loc[(self.df[self.padj_col] <= alpha) & (self.df[self.log2fc_col] > log2fc_threshold)] = 'tab:red'
-        colors.loc[(self.df[self.padj_col] <= alpha) & (self.df[self.log2fc_col] < -log2fc_threshold)] = 'tab:blue'
+        colors = pd.Series(index=self._df.index, dtype='float64')
+        colors.loc[(self._df[self.padj_col] <= alpha) & (self._df[self.log2fc_col] > log2fc_threshold)] = 'tab:red'
+        colors.loc[(self._df[self.padj_col] <= alpha) & (self._df[self.log2fc_col] < -log2fc_threshold)] = 'tab:blue'
         colors.fillna('grey', inplace=True)
-        ax.scatter(self.df[self.log2fc_col], -np.log10(self.df[self.padj_col]), c=colors, s=1)
+        ax.scatter(self._df[self.log2fc_col], -np.log10(self._df[self.padj_col]), c=colors, s=1)
         if title == 'auto':
             title = f"Volcano plot of {self.fname.stem}"
         ax.set_title(title, fontsize=title_fontsize)
@@ -2414,10 +2847,11 @@ class CountFilter(Filter):
                             'jackknife': pwdist.jackknife_distance}
     _transforms = {True: generic.standard_box_cox, False: generic.standardize}
     _numeric_dtypes = ['int16', 'int32', 'int64', 'float16', 'float32', 'float64']
-    __slots__ = {'_is_normalized': 'indicates whether the values in this CountFilter were normalized'}
+    __slots__ = {'_is_normalized': 'indicates whether the values in this CountFilter were normalized',
+                 '_memmap_dir': 'directory of the memory-mapped tables created by operations on this CountFilter'}
 
     def __init__(self, fname: Union[str, Path, tuple], drop_columns: Union[str, List[str]] = None,
-                 is_normalized: bool = False):
+                 is_normalized: bool = False, memmap_dir: Union[str, Path, None] = None):
         """
         Load a count matrix. A valid count matrix should have one row per gene/genomic feature \
         and one column per condition/RNA library. The contents of the count matrix can be raw or pre-normalized.
@@ -2431,29 +2865,78 @@ class CountFilter(Filter):
         RNAlysis issues a warning when a function meant for normalized tables is applied to a \
         table that was not already normalized.
         :type is_normalized: bool (default=False)
+        :param memmap_dir: only used when loading a memory-mapped table ('.mmap'). \
+        The directory in which filtering and normalization functions write their results as new \
+        memory-mapped tables. If None, the results are written to the directory of the loaded table. \
+        These intermediate tables are deleted from the disk once no CountFilter object uses them anymore.
+        :type memmap_dir: str, Path, or None (default=None)
         """
-        super().__init__(fname, drop_columns)
-        self._is_normalized = is_normalized
+        metadata = self._load_table(fname, drop_columns)
+        self._is_normalized = self._resolve_saved_param(fname, metadata, 'is_normalized', is_normalized, False)
+        self._memmap_dir = None if memmap_dir is None else Path(memmap_dir)
 
     def _init_warnings(self):
         if len(self._numeric_columns) < len(self.columns):
             warnings.warn(f"The following columns in the CountFilter are not numeric, and will therefore be ignored "
                           f"when running some CountFilter-specific functions: "
-                          f"{set(self.df.columns).difference(self._numeric_columns)}")
+                          f"{set(self._df.columns).difference(self._numeric_columns)}")
 
     @classmethod
     def from_dataframe(cls, df: pd.DataFrame, name: Union[str, Path], is_normalized: bool = False,
                        suppress_warnings: bool = False) -> 'CountFilter':
         obj = cls.__new__(cls)
-        obj.df = df.copy(deep=True)
+        obj.df = _copy_df(df)
         obj.fname = Path(name)
         obj._is_normalized = is_normalized
         if not suppress_warnings:
             obj._init_warnings()
         return obj
 
-    def __copy__(self):
-        return type(self).from_dataframe(self.df, self.fname, self.is_normalized, suppress_warnings=True)
+    def _get_metadata(self) -> dict:
+        return {'is_normalized': self.is_normalized}
+
+    def save_memmap(self, alt_filename: Union[None, str, Path] = None):
+
+        """
+        Saves the current count matrix as a memory-mapped table (a directory with the suffix '.mmap'). \
+        When a memory-mapped table is loaded into a CountFilter, its values are read from the disk on demand \
+        instead of being loaded into memory, which allows analyzing count matrices that are larger than the memory. \
+        Filtering and normalization functions such as 'filter_low_reads', 'filter_by_row_sum' and \
+        'normalize_to_rpm' process memory-mapped tables one chunk of rows at a time, \
+        and write their results to new memory-mapped tables, either in the same directory or in the directory \
+        given by the 'memmap_dir' parameter of CountFilter. Every such function writes a full-size table to the disk. \
+        These intermediate tables are deleted once no CountFilter object uses them anymore \
+        (for example, once a later step of a Pipeline replaced them), \
+        and tables that are still in use when Python exits are kept. \
+        To keep a result permanently, save it with 'save_memmap'. \
+        Memory-mapped tables can only contain numeric columns.
+
+        :param alt_filename: If None, file name will be generated automatically \
+        according to the filtering methods used. \
+        If it's a string, it will be used as the name of the saved table. Example input: 'myfilename'
+        :type alt_filename: str, pathlib.Path, or None (default)
+
+        :Examples:
+            >>> from rnalysis import filtering
+            >>> c = filtering.CountFilter("tests/test_files/counted.csv")
+            >>> c.save_memmap('counted')
+            >>> c_mmap = filtering.CountFilter("tests/test_files/counted.mmap")
+
+        """
+        suffix = io.MEMMAP_TABLE_SUFFIX
+        # save with the default filename if no alternative filename was given
+        if alt_filename is None:
+            alt_filename = self.fname.parent.joinpath(f"{self.fname.stem}{suffix}")
+        else:
+            assert isinstance(alt_filename, (str, Path)), \
+                f"'alt_filename' must be a string or Path object. Instead got {type(alt_filename)}."
+            # make sure we don't add another suffix on top of an existing suffix
+            if Path(alt_filename).suffix.lower() == suffix:
+                suffix = ''
+            alt_filename = os.path.join(str(self.fname.parent), f"{alt_filename}{suffix}")
+        assert Path(alt_filename) != io.get_memmap_table_path(self._df), \
+            "Cannot overwrite the memory-mapped table that this CountFilter is reading from."
+        io.save_memmap_table(self._df, alt_filename)
 
     @property
     def is_normalized(self) -> bool:
@@ -2464,7 +2947,7 @@ class CountFilter(Filter):
         """
         Returns a list of the numeric (int/float) columns in the DataFrame.
         """
-        return list(self.df.columns[[dtype in self._numeric_dtypes for dtype in self.df.dtypes]])
+        return list(self._df.columns[[dtype in self._numeric_dtypes for dtype in self._df.dtypes]])
 
     @property
     def triplicates(self):
@@ -2516,7 +2999,7 @@ class CountFilter(Filter):
         data_path = io.get_todays_cache_dir().joinpath(self.fname.name)
         if not io.get_todays_cache_dir().exists():
             io.get_todays_cache_dir().mkdir(parents=True)
-        io.save_csv(self.df.round(), data_path)
+        io.save_csv(self._df.round(), data_path)
         output_dir = differential_expression.run_deseq2_analysis(data_path, design_matrix, comparisons,
                                                                  r_installation_folder)
         outputs = []
@@ -2575,13 +3058,13 @@ class CountFilter(Filter):
 
         numeric_cols = self._numeric_columns
         for num in numerator:
-            assert num in self.df, f"'{num}' is not a column in the CountFilter object!"
-            assert num in numeric_cols, f"Invalid dtype for column '{num}': {self.df.dtypes[num]}"
+            assert num in self._df, f"'{num}' is not a column in the CountFilter object!"
+            assert num in numeric_cols, f"Invalid dtype for column '{num}': {self._df.dtypes[num]}"
         for den in denominator:
-            assert den in self.df, f"'{den}' is not a column in the CountFilter object!"
-            assert den in numeric_cols, f"Invalid dtype for column '{den}': {self.df.dtypes[den]}"
+            assert den in self._df, f"'{den}' is not a column in the CountFilter object!"
+            assert den in numeric_cols, f"Invalid dtype for column '{den}': {self._df.dtypes[den]}"
 
-        srs = (self.df[numerator].mean(axis=1) + 1) / (self.df[denominator].mean(axis=1) + 1)
+        srs = (self._df[numerator].mean(axis=1) + 1) / (self._df[denominator].mean(axis=1) + 1)
         new_fname = Path(f"{str(self.fname.parent)}/{self.fname.stem}'_fold_change_'"
                          f"{numer_name}_over_{denom_name}_{self.fname.suffix}")
         # init the FoldChangeFilter object from an existing Series
@@ -2631,7 +3114,7 @@ class CountFilter(Filter):
 
         """
         if samples == 'all':
-            sample_df = self.df
+            sample_df = self._df
         else:
             sample_df = self._avg_subsamples(samples)
 
@@ -2719,7 +3202,7 @@ class CountFilter(Filter):
         assert function in {'mean', 'median', 'geometric_mean'}, \
             f"'function' must be 'mean', 'median', or 'geometric_mean'!"
 
-        averaged_df = pd.DataFrame(index=self.df.index)
+        averaged_df = pd.DataFrame(index=self._df.index)
         if new_column_names == 'auto':
             new_column_names = []
             for i, group in enumerate(sample_grouping):
@@ -2737,17 +3220,17 @@ class CountFilter(Filter):
         for group, new_name in zip(sample_grouping, new_column_names):
             if isinstance(group, str):
                 assert group in self.columns, f"Column '{group}' does not exist in the original table!"
-                averaged_df[new_name] = self.df[group].values
+                averaged_df[new_name] = self._df[group].values
             elif isinstance(group, (list, tuple, set)):
                 group = parsing.data_to_list(group)
                 for item in group:
                     assert item in self.columns, f"Column '{item}' does not exist in the original table!"
                     if function == 'mean':
-                        averaged_df[new_name] = self.df[group].mean(axis=1).values
+                        averaged_df[new_name] = self._df[group].mean(axis=1).values
                     elif function == 'median':
-                        averaged_df[new_name] = self.df[group].median(axis=1).values
+                        averaged_df[new_name] = self._df[group].median(axis=1).values
                     else:
-                        averaged_df[new_name] = gmean(self.df[group].values, axis=1)
+                        averaged_df[new_name] = gmean(self._df[group].values, axis=1)
             else:
                 raise TypeError(f"'sample_list' cannot contain objects of type {type(group)}.")
 
@@ -2760,10 +3243,50 @@ class CountFilter(Filter):
             warnings.warn(
                 "This function is meant for raw, unnormalize counts, and your count matrix appears to be normalized. ")
 
-    def _norm_scaling_factors(self, scaling_factors: pd.Series):
+    def _get_out_of_core_path(self, suffix: str) -> Union[Path, None]:
+        """
+        Returns a path for a new memory-mapped table that will hold the result of an operation, \
+        or None if this CountFilter is stored in memory.
+        """
+        memmap_path = io.get_memmap_table_path(self._df)
+        if memmap_path is None:
+            return None
+        out_dir = getattr(self, '_memmap_dir', None)
+        if out_dir is None:
+            out_dir = memmap_path.parent
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{self.fname.stem}{suffix}"
+        out_path = out_dir.joinpath(f"{stem}{io.MEMMAP_TABLE_SUFFIX}")
+        i = 1
+        # never overwrite an existing table, since other CountFilter objects may still be reading it
+        while out_path.exists():
+            out_path = out_dir.joinpath(f"{stem}_{i}{io.MEMMAP_TABLE_SUFFIX}")
+            i += 1
+        return out_path
+
+    def _row_mask(self, func: Callable[[pd.DataFrame], pd.Series]) -> pd.Series:
+        """
+        Apply a row-wise reduction to the numeric columns of the CountFilter, one chunk of rows at a time, \
+        and return the results as a boolean mask.
+        """
+        numeric_cols = self._numeric_columns
+        data = self._df if len(numeric_cols) == self._df.shape[1] else self._df[numeric_cols]
+        return pd.concat([func(chunk) for chunk in io.iter_row_chunks(data)]).astype(bool)
+
+    def _subset_rows(self, mask: pd.Series, suffix: str) -> pd.DataFrame:
+        out_path = self._get_out_of_core_path(suffix)
+        if out_path is None:
+            return self._df.loc[mask.to_numpy()]
+        return io.subset_memmap_table(self._df, mask, out_path, temporary=True)
+
+    def _norm_scaling_factors(self, scaling_factors: pd.Series, suffix: str = ''):
         assert isinstance(scaling_factors,
                           pd.Series), f"Invalid dimensions for 'scaling_factors' table: {scaling_factors.shape}"
-        new_df = self.df.copy()
+        out_path = self._get_out_of_core_path(suffix)
+        if out_path is not None:
+            # memory-mapped tables are normalized one chunk of rows at a time, and written back to the disk
+            return io.scale_memmap_table(self._df, scaling_factors[self._numeric_columns], out_path, temporary=True)
+        new_df = self._df.copy()
         numeric_cols = self._numeric_columns
         for column in new_df.columns:
             if column in numeric_cols:
@@ -2795,7 +3318,6 @@ class CountFilter(Filter):
 
         """
         suffix = '_normtoRPMhtseqcount'
-        new_df = self.df.copy()
         if isinstance(special_counter_fname, (str, Path)):
             features = io.load_csv(special_counter_fname, 0)
         elif isinstance(special_counter_fname, pd.DataFrame):
@@ -2803,11 +3325,11 @@ class CountFilter(Filter):
         else:
             raise TypeError("Invalid type for 'special_counter_fname'!")
         numeric_cols = self._numeric_columns
-        for column in new_df.columns:
-            if column in numeric_cols:
-                norm_factor = (new_df[column].sum() + features.loc[r'__ambiguous', column] + features.loc[
-                    r'__no_feature', column] + features.loc[r'__alignment_not_unique', column]) / (10 ** 6)
-                new_df[column] /= norm_factor
+        scaling_factors = pd.Series({column: (self._df[column].sum() + features.loc[r'__ambiguous', column] +
+                                              features.loc[r'__no_feature', column] +
+                                              features.loc[r'__alignment_not_unique', column]) / (10 ** 6)
+                                     for column in numeric_cols}, dtype='float64')
+        new_df = self._norm_scaling_factors(scaling_factors, suffix)
         return self._inplace(new_df, opposite=False, inplace=inplace, suffix=suffix, printout_operation='normalize',
                              _is_normalized=True)
 
@@ -2831,12 +3353,10 @@ class CountFilter(Filter):
 
         """
         suffix = '_normtoRPM'
-        new_df = self.df.copy()
         numeric_cols = self._numeric_columns
-        for column in new_df.columns:
-            if column in numeric_cols:
-                norm_factor = new_df[column].sum() / (10 ** 6)
-                new_df[column] /= norm_factor
+        scaling_factors = pd.Series({column: self._df[column].sum() / (10 ** 6) for column in numeric_cols},
+                                    dtype='float64')
+        new_df = self._norm_scaling_factors(scaling_factors, suffix)
         return self._inplace(new_df, opposite=False, inplace=inplace, suffix=suffix, printout_operation='normalize',
                              _is_normalized=True)
 
@@ -2866,14 +3386,14 @@ class CountFilter(Filter):
             Normalized the values of 22 features. Normalized inplace.
         """
         suffix = f'_normto{quantile}quantile'
-        data = self.df[self._numeric_columns]
+        data = self._df[self._numeric_columns]
         expressed_genes = data[data.sum(axis=1) != 0]
         quantiles = expressed_genes.quantile(quantile, axis=0)
         if quantiles.min() == 0:
             warnings.warn("One or more quantiles are zero")
         scaling_factors = quantiles / quantiles.mean()
 
-        new_df = self._norm_scaling_factors(scaling_factors)
+        new_df = self._norm_scaling_factors(scaling_factors, suffix)
         return self._inplace(new_df, opposite=False, inplace=inplace, suffix=suffix, printout_operation='normalize',
                              _is_normalized=True)
 
@@ -2925,15 +3445,15 @@ class CountFilter(Filter):
         suffix = f'_normTMM'
 
         if isinstance(ref_column, str) and ref_column.lower() == 'auto':
-            upper_quartiles = self.df[self._numeric_columns].quantile(0.75, axis=0)
+            upper_quartiles = self._df[self._numeric_columns].quantile(0.75, axis=0)
             ref_index = np.argmin(abs(upper_quartiles - upper_quartiles.mean()))
             ref_column = self.columns[ref_index]
 
         columns = self._numeric_columns
         m_data, a_data = self._calculate_ma(ref_column, columns)
         scaling_factors = {}
-        norm_data = self.df / self.df.sum(axis=0)
-        weights = (1 - norm_data).divide(self.df)
+        norm_data = self._df / self._df.sum(axis=0)
+        weights = (1 - norm_data).divide(self._df)
         weights = 1 / (weights.add(weights[ref_column], axis=0))
         for i, col in enumerate(columns):
             a_post_cutoff = a_data[i][a_data[i] > a_cutoff] if a_cutoff is not None else a_data[i]
@@ -2945,7 +3465,7 @@ class CountFilter(Filter):
             trimmed_m = this_m.sort_values().iloc[m_trim_number:this_m.shape[0] - m_trim_number]
             trimmed_a = a_post_cutoff.sort_values().iloc[a_trim_number:a_post_cutoff.shape[0] - a_trim_number]
 
-            zero_genes = self.df[col][self.df[col] == 0].index
+            zero_genes = self._df[col][self._df[col] == 0].index
             genes_post_trimming = trimmed_m.index.intersection(trimmed_a.index).difference(zero_genes)
             tmm = np.average(trimmed_m.loc[genes_post_trimming], weights=weights.loc[genes_post_trimming, col])
             scaling_factors[col] = tmm
@@ -2954,7 +3474,7 @@ class CountFilter(Filter):
         # adjust scaling factors to multiply, for symmetry, to 1
         scaling_factors -= scaling_factors.mean()
         scaling_factors = 2 ** scaling_factors
-        new_df = self._norm_scaling_factors(scaling_factors)
+        new_df = self._norm_scaling_factors(scaling_factors, suffix)
         return self._inplace(new_df, opposite=False, inplace=inplace, suffix=suffix, printout_operation='normalize',
                              _is_normalized=True)
 
@@ -2982,7 +3502,7 @@ class CountFilter(Filter):
             Normalized the values of 22 features. Normalized inplace.
         """
         suffix = f'_normRLE'
-        data = self.df[self._numeric_columns].dropna(axis=0)
+        data = self._df[self._numeric_columns].dropna(axis=0)
         with np.errstate(invalid='ignore', divide='ignore'):
             pseudo_sample = pd.Series(gmean(data, axis=1), index=data.index)
             ratios = data.divide(pseudo_sample, axis=0)
@@ -2990,7 +3510,7 @@ class CountFilter(Filter):
 
         # TODO: implement a 'control genes' parameter that calculates ratios only for the given control genes
 
-        new_df = self._norm_scaling_factors(scaling_factors)
+        new_df = self._norm_scaling_factors(scaling_factors, suffix)
         return self._inplace(new_df, opposite=False, inplace=inplace, suffix=suffix, printout_operation='normalize',
                              _is_normalized=True)
 
@@ -3037,7 +3557,7 @@ class CountFilter(Filter):
                                                        f"is larger than the number of sample groups!"
 
         suffix = f'_normMRN'
-        data = self.df[self._numeric_columns]
+        data = self._df[self._numeric_columns]
         weighed_expression = data / data.sum(axis=0)
         weighted_means = []
         for grp in sample_grouping:
@@ -3048,13 +3568,13 @@ class CountFilter(Filter):
             ratios[ratios == np.inf] = np.nan
             median_of_ratios = ratios.median()
             for cond in grp:
-                scaling_factors[cond] = median_of_ratios * self.df[cond].sum()
+                scaling_factors[cond] = median_of_ratios * self._df[cond].sum()
         scaling_factors = pd.Series(scaling_factors)
 
         # adjust scaling factors to multiply, for symmetry, to 1
         scaling_factors = scaling_factors / gmean(scaling_factors)
 
-        new_df = self._norm_scaling_factors(scaling_factors)
+        new_df = self._norm_scaling_factors(scaling_factors, suffix)
         return self._inplace(new_df, opposite=False, inplace=inplace, suffix=suffix, printout_operation='normalize',
                              _is_normalized=True)
 
@@ -3089,14 +3609,14 @@ class CountFilter(Filter):
             scaling_factors = scaling_factor_fname
         else:
             raise TypeError("Invalid type for 'scaling_factor_fname'!")
-        new_df = self._norm_scaling_factors(scaling_factors)
+        new_df = self._norm_scaling_factors(scaling_factors, suffix)
         return self._inplace(new_df, opposite=False, inplace=inplace, suffix=suffix, printout_operation='normalize',
                              _is_normalized=True)
 
     def _calculate_ma(self, ref_column: str, columns: List[str]):
         m_data = []
         a_data = []
-        norm_data = self.df / self.df.sum(axis=0)
+        norm_data = self._df / self._df.sum(axis=0)
         for col in columns:
             this_m = np.log2(norm_data[col] / norm_data[ref_column])
             this_a = 0.5 * np.log2(norm_data[col] * norm_data[ref_column])
@@ -3136,7 +3656,7 @@ class CountFilter(Filter):
             ref_column = self.columns[ref_column]
         elif isinstance(ref_column, str):
             if ref_column.lower() == 'auto':
-                upper_quartiles = self.df.quantile(0.75, axis=0)
+                upper_quartiles = self._df.quantile(0.75, axis=0)
                 ref_index = np.argmin(abs(upper_quartiles - upper_quartiles.mean()))
                 ref_column = self.columns[ref_index]
             else:
@@ -3214,13 +3734,14 @@ class CountFilter(Filter):
             Filtered 6 features, leaving 16 of the original 22 features. Filtered inplace.
 
         """
+        mask, suffix = self._filter_low_reads_mask(threshold)
+        new_df = self._subset_rows(mask, suffix)
+        return self._inplace(new_df, opposite, inplace, suffix)
+
+    def _filter_low_reads_mask(self, threshold: float = 5) -> Tuple[pd.Series, str]:
         validation.validate_threshold(threshold)
         self._validate_is_normalized()
-
-        new_df = self.df.loc[[True if max(vals) > threshold else False for gene, vals in
-                              self.df.loc[:, self._numeric_columns].iterrows()]]
-        suffix = f"_filt{threshold}reads"
-        return self._inplace(new_df, opposite, inplace, suffix)
+        return self._row_mask(lambda chunk: chunk.max(axis=1) > threshold), f"_filt{threshold}reads"
 
     @readable_name('Split into Higly and Lowly expressed genes')
     def split_by_reads(self, threshold: float = 5) -> tuple:
@@ -3251,10 +3772,9 @@ class CountFilter(Filter):
         validation.validate_threshold(threshold)
         self._validate_is_normalized()
 
-        high_expr = self.df.loc[[True if max(vals) > threshold else False for gene, vals in
-                                 self.df.loc[:, self._numeric_columns].iterrows()]]
-        low_expr = self.df.loc[[False if max(vals) > threshold else True for gene, vals in
-                                self.df.loc[:, self._numeric_columns].iterrows()]]
+        mask = self._row_mask(lambda chunk: chunk.max(axis=1) > threshold)
+        high_expr = self._subset_rows(mask, f'_below{threshold}reads')
+        low_expr = self._subset_rows(~mask, f'_above{threshold}reads')
         return self._inplace(high_expr, opposite=False, inplace=False, suffix=f'_below{threshold}reads'), self._inplace(
             low_expr, opposite=False, inplace=False, suffix=f'_above{threshold}reads')
 
@@ -3283,12 +3803,14 @@ class CountFilter(Filter):
             Filtered 4 features, leaving 18 of the original 22 features. Filtered inplace.
 
         """
+        mask, suffix = self._filter_by_row_sum_mask(threshold)
+        new_df = self._subset_rows(mask, suffix)
+        return self._inplace(new_df, opposite, inplace, suffix)
+
+    def _filter_by_row_sum_mask(self, threshold: float = 5) -> Tuple[pd.Series, str]:
         validation.validate_threshold(threshold)
         self._validate_is_normalized()
-
-        new_df = self.df.loc[self.df.sum(axis=1) >= threshold]
-        suffix = f"_filt{threshold}sum"
-        return self._inplace(new_df, opposite, inplace, suffix)
+        return self._row_mask(lambda chunk: chunk.sum(axis=1) >= threshold), f"_filt{threshold}sum"
 
     @readable_name('K-Means clustering')
     def split_kmeans(self, n_clusters: Union[int, List[int], Literal['gap', 'silhouette']], n_init: int = 3,
@@ -3361,7 +3883,7 @@ class CountFilter(Filter):
 
            Example plot of split_kmeans()
         """
-        runner = clustering.KMeansRunner(self.df.loc[:, self._numeric_columns], power_transform, n_clusters,
+        runner = clustering.KMeansRunner(self._df.loc[:, self._numeric_columns], power_transform, n_clusters,
                                          max_n_clusters_estimate, random_seed, n_init, max_iter, plot_style,
                                          split_plots)
         clusterers = runner.run(plot=not gui_mode)
@@ -3369,7 +3891,7 @@ class CountFilter(Filter):
         for clusterer in clusterers:
             # split the CountFilter object
             filt_obj_tuples.append(
-                tuple([self._inplace(self.df.loc[clusterer.labels_ == i], opposite=False, inplace=False,
+                tuple([self._inplace(self._df.loc[clusterer.labels_ == i], opposite=False, inplace=False,
                                      suffix=f'_kmeanscluster{i + 1}') for i in range(clusterer.n_clusters_)]))
         # if only a single K was calculated, don't return it as a list of length
         return_val = filt_obj_tuples[0] if len(filt_obj_tuples) == 1 else filt_obj_tuples
@@ -3450,7 +3972,7 @@ class CountFilter(Filter):
 
            Example plot of split_hierarchical()
         """
-        runner = clustering.HierarchicalRunner(self.df.loc[:, self._numeric_columns], power_transform, n_clusters,
+        runner = clustering.HierarchicalRunner(self._df.loc[:, self._numeric_columns], power_transform, n_clusters,
                                                max_n_clusters_estimate, metric, linkage, distance_threshold, plot_style,
                                                split_plots)
         clusterers = runner.run(plot=not gui_mode)
@@ -3459,7 +3981,7 @@ class CountFilter(Filter):
             # split the CountFilter object
             this_n_clusters = np.max(np.unique(clusterer.labels_)) + 1
             filt_obj_tuples.append(
-                tuple([self._inplace(self.df.loc[clusterer.labels_ == i], opposite=False, inplace=False,
+                tuple([self._inplace(self._df.loc[clusterer.labels_ == i], opposite=False, inplace=False,
                                      suffix=f'_kmedoidscluster{i + 1}') for i in range(this_n_clusters)]))
         # if only a single K was calculated, don't return it as a list of length
         return_val = filt_obj_tuples[0] if len(filt_obj_tuples) == 1 else filt_obj_tuples
@@ -3541,7 +4063,7 @@ class CountFilter(Filter):
 
            Example plot of split_kmedoids()
         """
-        runner = clustering.KMedoidsRunner(self.df.loc[:, self._numeric_columns], power_transform, n_clusters,
+        runner = clustering.KMedoidsRunner(self._df.loc[:, self._numeric_columns], power_transform, n_clusters,
                                            max_n_clusters_estimate, metric, random_seed, n_init, max_iter, plot_style,
                                            split_plots)
         clusterers = runner.run(plot=not gui_mode)
@@ -3549,7 +4071,7 @@ class CountFilter(Filter):
         for clusterer in clusterers:
             # split the CountFilter object
             filt_obj_tuples.append(
-                tuple([self._inplace(self.df.loc[clusterer.labels_ == i], opposite=False, inplace=False,
+                tuple([self._inplace(self._df.loc[clusterer.labels_ == i], opposite=False, inplace=False,
                                      suffix=f'_kmedoidscluster{i + 1}') for i in range(clusterer.n_clusters_)]))
         # if only a single K was calculated, don't return it as a list of length 1
         return_val = filt_obj_tuples[0] if len(filt_obj_tuples) == 1 else filt_obj_tuples
@@ -3668,7 +4190,7 @@ class CountFilter(Filter):
                 for cond in grp:
                     assert cond in self.columns, f"column '{cond}' does not exist!"
 
-        runner = clustering.CLICOMRunner(self.df.loc[:, self._numeric_columns], replicate_grouping, power_transform,
+        runner = clustering.CLICOMRunner(self._df.loc[:, self._numeric_columns], replicate_grouping, power_transform,
                                          evidence_threshold, cluster_unclustered_features, min_cluster_size,
                                          *parameter_dicts, plot_style=plot_style, split_plots=split_plots)
         [clusterer] = runner.run(plot=not gui_mode)
@@ -3682,7 +4204,7 @@ class CountFilter(Filter):
                   f"Number of unclustered genes is {unclustered}, "
                   f"which are {100 * (unclustered / len(clusterer.labels_)) :.2f}% of the genes.")
 
-        filt_objs = tuple([self._inplace(self.df.loc[clusterer.labels_ == i], opposite=False, inplace=False,
+        filt_objs = tuple([self._inplace(self._df.loc[clusterer.labels_ == i], opposite=False, inplace=False,
                                          suffix=f'_clicomcluster{i + 1}') for i in range(n_clusters)])
 
         return_val = filt_objs
@@ -3768,7 +4290,7 @@ class CountFilter(Filter):
            """
         validation.validate_hdbscan_parameters(min_cluster_size, metric, cluster_selection_method, self.shape[0])
 
-        runner = clustering.HDBSCANRunner(self.df.loc[:, self._numeric_columns], power_transform, min_cluster_size,
+        runner = clustering.HDBSCANRunner(self._df.loc[:, self._numeric_columns], power_transform, min_cluster_size,
                                           min_samples, metric, cluster_selection_epsilon, cluster_selection_method,
                                           return_probabilities, plot_style, split_plots)
         if return_probabilities:
@@ -3788,7 +4310,7 @@ class CountFilter(Filter):
                   f"Number of unclustered genes is {unclustered}, "
                   f"which are {100 * (unclustered / len(clusterer.labels_)) :.2f}% of the genes.")
 
-        filt_objs = tuple([self._inplace(self.df.loc[clusterer.labels_ == i], opposite=False, inplace=False,
+        filt_objs = tuple([self._inplace(self._df.loc[clusterer.labels_ == i], opposite=False, inplace=False,
                                          suffix=f'_hdbscancluster{i + 1}') for i in range(n_clusters)])
 
         # noinspection PyUnboundLocalVariable
@@ -3841,10 +4363,10 @@ class CountFilter(Filter):
         assert linkage in linkages, f"Invalid linkage {linkage}."
 
         if sample_names == 'all':
-            sample_names = list(self.df.columns)
+            sample_names = list(self._df.columns)
         print('Calculating clustergram...')
         plt.style.use('seaborn-whitegrid')
-        clustergram = sns.clustermap(np.log2(self.df[sample_names] + 1), method=linkage, metric=metric,
+        clustergram = sns.clustermap(np.log2(self._df[sample_names] + 1), method=linkage, metric=metric,
                                      cmap=sns.color_palette("RdBu_r", 12), yticklabels=False)
         if title == 'auto':
             title = f"Clustegram of {self.fname.stem}"
@@ -3884,7 +4406,7 @@ class CountFilter(Filter):
         features = parsing.data_to_list(features)
         assert validation.isinstanceiter(features, str), "'features' must be a string or list of strings!"
         for feature in features:
-            assert feature in self.df.index, f"Supplied feature '{feature}' does not appear in this table. "
+            assert feature in self._df.index, f"Supplied feature '{feature}' does not appear in this table. "
 
         if isinstance(samples, str) and samples.lower() == 'all':
             samples = [[item] for item in self.columns]
@@ -3914,15 +4436,15 @@ class CountFilter(Filter):
             else:
                 ax = fig.add_subplot(subplots[i])
             axes.append(ax)
-            mean = [self.df.loc[feature].iloc[ind].mean() if validation.isinstanceiter(ind, int) else
-                    self.df.loc[feature, ind].mean() for ind in samples]
+            mean = [self._df.loc[feature].iloc[ind].mean() if validation.isinstanceiter(ind, int) else
+                    self._df.loc[feature, ind].mean() for ind in samples]
 
-            sem = [self.df.loc[feature].iloc[ind].sem() if validation.isinstanceiter(ind, int) else
-                   self.df.loc[feature, ind].sem() for ind in samples]
+            sem = [self._df.loc[feature].iloc[ind].sem() if validation.isinstanceiter(ind, int) else
+                   self._df.loc[feature, ind].sem() for ind in samples]
 
             points_y = parsing.flatten(
-                [[self.df.loc[feature].iloc[i] for i in ind] if validation.isinstanceiter(ind, int) else
-                 [self.df.loc[feature, i] for i in ind] for ind in samples])
+                [[self._df.loc[feature].iloc[i] for i in ind] if validation.isinstanceiter(ind, int) else
+                 [self._df.loc[feature, i] for i in ind] for ind in samples])
             points_x = []
             for i, grouping in enumerate(samples):
                 for _ in grouping:
@@ -3979,7 +4501,7 @@ class CountFilter(Filter):
             f"'n_components' must be an integer >=2. Instead got {n_components}."
         if samples == 'all':
             samples = [[col] for col in self._numeric_columns]
-        data = self.df[parsing.flatten(samples)].transpose()
+        data = self._df[parsing.flatten(samples)].transpose()
         data_standardized = generic.standard_box_cox(data) if power_transform else generic.standardize(data)
 
         pca_obj = PCA(n_components=n_components)
@@ -4088,10 +4610,10 @@ class CountFilter(Filter):
         self._validate_is_normalized()
         sample1, sample2 = parsing.data_to_list(sample1), parsing.data_to_list(sample2)
 
-        xvals = np.log10(self.df[sample1].values + 1) if isinstance(sample1, str) else np.log10(
-            self.df[sample1].mean(axis=1).values + 1)
-        yvals = np.log10(self.df[sample2].values + 1) if isinstance(sample2, str) else np.log10(
-            self.df[sample2].mean(axis=1).values + 1)
+        xvals = np.log10(self._df[sample1].values + 1) if isinstance(sample1, str) else np.log10(
+            self._df[sample1].mean(axis=1).values + 1)
+        yvals = np.log10(self._df[sample2].values + 1) if isinstance(sample2, str) else np.log10(
+            self._df[sample2].mean(axis=1).values + 1)
 
         plt.style.use('seaborn-whitegrid')
         if xlabel.lower() == 'auto':
@@ -4118,10 +4640,10 @@ class CountFilter(Filter):
                     f'{len(highlight_features) - len(highlight_valid)} features are missing from the '
                     f'CountFilter object and will not be highlighted.')
 
-            xvals_highlight = np.log10(self.df.loc[highlight_valid, sample1].values + 1) if \
-                isinstance(sample1, str) else np.log10(self.df.loc[highlight_valid, sample1].mean(axis=1).values + 1)
-            yvals_highlight = np.log10(self.df.loc[highlight_valid, sample2].values + 1) if \
-                isinstance(sample2, str) else np.log10(self.df.loc[highlight_valid, sample2].mean(axis=1).values + 1)
+            xvals_highlight = np.log10(self._df.loc[highlight_valid, sample1].values + 1) if \
+                isinstance(sample1, str) else np.log10(self._df.loc[highlight_valid, sample1].mean(axis=1).values + 1)
+            yvals_highlight = np.log10(self._df.loc[highlight_valid, sample2].values + 1) if \
+                isinstance(sample2, str) else np.log10(self._df.loc[highlight_valid, sample2].mean(axis=1).values + 1)
 
             ax.scatter(xvals_highlight, yvals_highlight, s=3, c=np.array([[0.75, 0.1, 0.1]]))
         plt.show()
@@ -4170,7 +4692,7 @@ class CountFilter(Filter):
         """
         self._validate_is_normalized()
         if samples == 'all':
-            samples_df = self.df
+            samples_df = self._df
         else:
             samples_df = self._avg_subsamples(samples)
 
@@ -4234,7 +4756,7 @@ class CountFilter(Filter):
         """
         self._validate_is_normalized()
         if samples == 'all':
-            samples_df = self.df
+            samples_df = self._df
         else:
             samples_df = self._avg_subsamples(samples)
 
@@ -4295,7 +4817,7 @@ class CountFilter(Filter):
         """
         self._validate_is_normalized()
         if samples == 'all':
-            samples_df = self.df
+            samples_df = self._df
         else:
             samples_df = self._avg_subsamples(samples)
 
@@ -4391,6 +4913,127 @@ class CountFilter(Filter):
         return count_filter_obj
 
 
+class LazyFilter:
+    """
+    A lazy view of a Filter object, created by calling 'lazy()' on a Filter object. \
+    Filtering, normalizing and sorting functions called on the lazy view are recorded into a plan of operations \
+    instead of being applied immediately. \
+    The plan is executed when calling 'collect()', or when calling any other function or attribute \
+    of the Filter object (such as saving or plotting functions) through the lazy view. \
+    Consecutive row filters (functions with a private row mask counterpart, for example 'filter_significant') \
+    are fused into a single boolean mask that is applied in one pass, and all other functions are applied in-place \
+    to a single working copy of the Filter object, so no intermediate copies of the table are made.
+
+
+    **Attributes**
+
+    plan: list
+        The recorded functions and their parameters, in the order they will be applied.
+    """
+    __slots__ = {'_filter_obj': 'the Filter object the plan will be applied to',
+                 '_plan': 'list of recorded functions and their bound arguments',
+                 '_collected': 'cached result of the plan'}
+
+    def __init__(self, filter_obj: Filter):
+        assert isinstance(filter_obj, Filter), f"Expected a Filter object, got {type(filter_obj)}."
+        self._filter_obj = filter_obj
+        self._plan = []
+        self._collected = None
+
+    def __repr__(self):
+        return f"{self._filter_obj!r}.lazy() with {len(self._plan)} pending operations"
+
+    def __len__(self):
+        return len(self._plan)
+
+    @property
+    def plan(self) -> List[Tuple[str, tuple, dict]]:
+        """
+        The recorded functions and their parameters, in the order they will be applied.
+        """
+        return [(func.__name__, bound.args[1:], bound.kwargs) for func, bound in self._plan]
+
+    def __getattr__(self, item: str):
+        if item.startswith('_'):
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{item}'")
+        func = getattr(type(self._filter_obj), item, None)
+        if self.is_lazy_function(func):
+            return lambda *args, **kwargs: self._record(func, args, kwargs)
+        # any other function or attribute requires the result of the plan
+        return getattr(self.collect(), item)
+
+    @staticmethod
+    def is_lazy_function(func) -> bool:
+        """
+        Returns True if the given Filter function can be recorded into a lazy plan, \
+        i.e. if it is a filtering, normalizing or sorting function that can be applied in-place.
+        """
+        return isinstance(func, types.FunctionType) and not func.__name__.startswith('split') and \
+            'inplace' in inspect.signature(func).parameters
+
+    def _record(self, func: types.FunctionType, args: tuple, kwargs: dict) -> 'LazyFilter':
+        bound = inspect.signature(func).bind(self._filter_obj, *args, **kwargs)
+        bound.apply_defaults()
+        assert bound.arguments['inplace'], \
+            "Functions cannot be applied with inplace=False to a lazy Filter. Use 'collect()' instead."
+        bound.arguments['inplace'] = True
+        self._plan.append((func, bound))
+        self._collected = None
+        return self
+
+    def collect(self) -> Filter:
+        """
+        Execute the recorded plan of operations, and return the result as a new Filter object. \
+        The original Filter object is not modified.
+
+        :return: a new Filter object, with all of the recorded operations applied to it.
+        :rtype: Filter, CountFilter, DESeqFilter, or FoldChangeFilter
+        """
+        if self._collected is not None:
+            return self._collected
+
+        obj = self._filter_obj._shallow_copy()
+        # 'sort' and 'filter_top_n' sort the DataFrame of the working copy in-place, so the working copy must hold
+        # its own DataFrame object. a shallow copy detaches it from the source Filter object without copying any data
+        obj._df = obj._df.copy(deep=False)
+        obj._df_shared = True
+        obj._lazy_copy = True
+        mask = None
+        suffix = ''
+        for func, bound in self._plan:
+            mask_func = getattr(obj, f'_{func.__name__}_mask', None)
+            if mask_func is not None and getattr(type(obj), func.__name__) is func and \
+                not bound.arguments.get('opposite', False):
+                # row filters are evaluated on the table as it was at the start of the fused group,
+                # since a row-wise filter does not depend on which other rows were already filtered out
+                mask_kwargs = {key: val for key, val in list(bound.arguments.items())[1:] if
+                               key not in {'opposite', 'inplace'}}
+                step_mask, step_suffix = mask_func(**mask_kwargs)
+                step_mask = np.asarray(pd.Series(step_mask).fillna(False), dtype=bool)
+                mask = step_mask if mask is None else mask & step_mask
+                suffix += step_suffix
+            else:
+                self._apply_mask(obj, mask, suffix)
+                mask = None
+                suffix = ''
+                func(obj, *bound.args[1:], **bound.kwargs)
+        self._apply_mask(obj, mask, suffix)
+
+        obj._lazy_copy = False
+        obj._df_shared = False
+        obj._mark_shared(self._filter_obj)
+        self._collected = obj
+        return obj
+
+    @staticmethod
+    def _apply_mask(obj: Filter, mask: Union[np.ndarray, None], suffix: str):
+        if mask is None:
+            return
+        # the subset is a new table, so a shallow copy detaches it from the source table without copying any data
+        new_df = obj._subset_rows(pd.Series(mask, index=obj._df.index), suffix).copy(deep=False)
+        obj._inplace(new_df, opposite=False, inplace=True, suffix=suffix)
+
+
 class Pipeline:
     """
     A collection of functions to be applied sequentially to Filter objects.
@@ -4410,6 +5053,7 @@ class Pipeline:
     FILTER_TYPES = {'filter': Filter, 'deseqfilter': DESeqFilter, 'foldchangefilter': FoldChangeFilter,
                     'countfilter': CountFilter}
     FILTER_TYPES_REV = {val: key for key, val in FILTER_TYPES.items()}
+    PARALLEL_BACKENDS = {'process': 'loky', 'thread': 'threading'}
 
     def __init__(self, filter_type: Union[str, 'Filter', 'CountFilter', 'DESeqFilter', 'FoldChangeFilter'] = Filter):
         """
@@ -4618,6 +5262,26 @@ class Pipeline:
                 raise e.__class__(f"Invalid function signature {self._func_signature(func, args, kwargs)}")
         return filter_object
 
+    def _record_lazy(self, func: types.FunctionType, lazy_object: 'LazyFilter', args: tuple, kwargs: dict):
+        """
+        Record a filtering/normalizing/sorting function into the plan of a lazy Filter object.
+
+        :param func: function to record
+        :type func: function
+        :param lazy_object: lazy Filter object to record the function into
+        :type lazy_object: LazyFilter
+        :param args: arguments for the function
+        :type args: tuple
+        :param kwargs: keyworded arguments for the function
+        :type kwargs: dict
+        """
+        kwargs = kwargs.copy()
+        kwargs.pop('inplace', None)
+        try:
+            lazy_object._record(func, args, kwargs)
+        except (ValueError, AssertionError, TypeError) as e:
+            raise e.__class__(f"Invalid function signature {self._func_signature(func, args, kwargs)}")
+
     def _apply_split(self, func: types.FunctionType,
                      filter_object: Union['Filter', 'CountFilter', 'DESeqFilter', 'FoldChangeFilter'],
                      args: tuple, kwargs: dict, other_outputs: dict, other_cnt: dict):
@@ -4761,9 +5425,24 @@ class Pipeline:
         original_filter_obj = copy.copy(filter_object)
         other_outputs = dict()
         other_cnt = dict()
+        lazy_object = None
         # iterate over all functions and arguments
         for func, (args, kwargs) in zip(self.functions, self.params):
-            if 'filter' in func.__name__ or func.__name__.startswith('normalize') or func.__name__ == 'sort':
+            is_filter_norm_sort = 'filter' in func.__name__ or func.__name__.startswith('normalize') or \
+                                  func.__name__ == 'sort'
+            # when not applying inplace, consecutive filtering/normalizing/sorting functions are recorded into
+            # a single lazy plan, so that the table is not copied after every function
+            if is_filter_norm_sort and not inplace and isinstance(filter_object, Filter) and \
+                LazyFilter.is_lazy_function(func):
+                if lazy_object is None:
+                    lazy_object = filter_object.lazy()
+                self._record_lazy(func, lazy_object, args, kwargs)
+                continue
+            if lazy_object is not None:
+                filter_object = lazy_object.collect()
+                lazy_object = None
+
+            if is_filter_norm_sort:
                 filter_object = self._apply_filter_norm_sort(func, filter_object, args, kwargs, inplace)
             elif func.__name__.startswith('split'):
                 assert not inplace, f"Cannot apply the split function {self._func_signature(func, args, kwargs)} " \
@@ -4771,6 +5450,8 @@ class Pipeline:
                 filter_object = self._apply_split(func, filter_object, args, kwargs, other_outputs, other_cnt)
             else:
                 self._apply_other(func, filter_object, args, kwargs, other_outputs, other_cnt)
+        if lazy_object is not None:
+            filter_object = lazy_object.collect()
 
         if not inplace or isinstance(filter_object, tuple):
             if filter_object != original_filter_obj:
@@ -4780,6 +5461,56 @@ class Pipeline:
         if len(other_outputs) > 0:
             return other_outputs
 
+    def apply_to_many(self, filter_objects: Iterable[Union['Filter', 'CountFilter', 'DESeqFilter', 'FoldChangeFilter']],
+                      n_jobs: int = -2, backend: Literal['process', 'thread'] = 'process') -> list:
+        """
+        Apply the Pipeline to multiple Filter objects in parallel. \
+        Each Filter object is processed exactly like in 'apply_to(filter_object, inplace=False)', \
+        and the original Filter objects are not modified.
+
+        :param filter_objects: filter objects to apply the Pipeline to. \
+        Type of every filter object must be identical to `Pipeline.filter_type`.
+        :type filter_objects: iterable of Filter, CountFilter, DESeqFilter, or FoldChangeFilter objects
+        :param n_jobs: the maximal number of Filter objects to process at the same time. \
+        If n_jobs is negative, (n_cpus + 1 + n_jobs) CPU cores will be used \
+        (for example, n_jobs=-1 uses all CPU cores, and n_jobs=-2 uses all CPU cores but one).
+        :type n_jobs: int (default=-2)
+        :param backend: determines whether the Filter objects will be processed in separate processes \
+        (faster for CPU-bound pipelines), or in separate threads of the current process \
+        (avoids transferring the Filter objects between processes).
+        :type backend: 'process' or 'thread' (default='process')
+        :return: a list containing the output of the Pipeline for every Filter object, \
+        in the same order as the given Filter objects. \
+        Each output is identical to the output of 'apply_to(filter_object, inplace=False)'.
+        :rtype: list
+
+        :Examples:
+            >>> from rnalysis import filtering
+            >>> pipe = filtering.Pipeline('DESeqFilter')
+            >>> pipe.add_function('filter_significant', alpha=0.1)
+            Added function 'DESeqFilter.filter_significant(alpha=0.1)' to the pipeline.
+            >>> d1 = filtering.DESeqFilter('tests/test_files/test_deseq.csv')
+            >>> d2 = filtering.DESeqFilter('tests/test_files/test_deseq_with_nan.csv')
+            >>> d1_filtered, d2_filtered = pipe.apply_to_many([d1, d2], n_jobs=2)
+
+        """
+        filter_objects = list(filter_objects)
+        assert len(filter_objects) > 0, "No Filter objects were supplied!"
+        for filter_object in filter_objects:
+            # noinspection PyTypeHints
+            assert issubclass(filter_object.__class__, self.filter_type), \
+                f"Supplied filter object of type {type(filter_object)} " \
+                f"mismatches the specified filter_type {self.filter_type}. "
+        assert len(self.functions) > 0 and len(self.params) > 0, "Cannot apply an empty pipeline!"
+        assert isinstance(n_jobs, int) and n_jobs != 0, f"'n_jobs' must be a non-zero integer, instead got {n_jobs}."
+        assert backend in self.PARALLEL_BACKENDS, \
+            f"Invalid backend '{backend}'. Must be one of {list(self.PARALLEL_BACKENDS.keys())}."
+
+        # joblib returns the outputs in the order of the inputs, regardless of the order the jobs were completed in
+        return generic.ProgressParallel(n_jobs=n_jobs, backend=self.PARALLEL_BACKENDS[backend],
+                                        total=len(filter_objects), desc="Applying pipeline", unit='object')(
+            joblib.delayed(self.apply_to)(filter_object, inplace=False) for filter_object in filter_objects)
+
     def remove_last_function(self):
 
         """
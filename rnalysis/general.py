@@ -149,6 +149,6 @@ def save_to_csv(df: Union[pd.DataFrame, Filter], filename: str):
     if isinstance(df, pd.DataFrame):
         io.save_csv(df, filename)
     elif validation.isinstanceinh(df, Filter):
-        io.save_csv(df.df, filename)
+        io.save_csv(df.df_view, filename)
     else:
         raise TypeError(f"Object of type {type(df)} cannot be saved to csv")
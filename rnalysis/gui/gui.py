@@ -361,7 +361,8 @@ class EnrichmentWindow(gui_widgets.MinMaxDialog):
 
     ORDINAL_STATISTICAL_TESTS = {'One-sample T-test (parametric)': True, 'Sign test (non-parametric)': False}
 
-    STATISTICAL_TEST_ARGS = {'randomization': {'alpha', 'randomization_reps', 'random_seed'},
+    STATISTICAL_TEST_ARGS = {'randomization': {'alpha', 'randomization_reps', 'random_seed',
+                                               'randomization_stop_after'},
                              'fisher': {'alpha'},
                              'hypergeometric': {'alpha'},
                              'single_set': {'alpha'},
@@ -1471,7 +1472,8 @@ class FuncTypeStack(QtWidgets.QWidget):
 
 class FilterTabPage(TabPage):
     EXCLUDED_FUNCS = {'union', 'intersection', 'majority_vote_intersection', 'difference', 'symmetric_difference',
-                      'from_folder', 'save_txt', 'save_csv', 'from_dataframe', 'print_features'}
+                      'from_folder', 'save_txt', 'save_csv', 'from_dataframe', 'print_features', 'lazy',
+                      'save_parquet', 'from_parquet', 'save_memmap'}
     CLUSTERING_FUNCS = {'split_kmeans': 'K-Means', 'split_kmedoids': 'K-Medoids',
                         'split_hierarchical': 'Hierarchical (Agglomerative)', 'split_hdbscan': 'HDBSCAN',
                         'split_clicom': 'CLICOM (Ensemble)'}
@@ -1547,7 +1549,7 @@ class FilterTabPage(TabPage):
         base_str = str(time.time_ns()) + str(self.filter_obj.fname) + str(len(self.filter_obj.shape))
         hex_hash = hashlib.sha1(base_str.encode('utf-8')).hexdigest()
         filename = f"{hex_hash}.csv"
-        io.cache_gui_file(self.filter_obj.df, filename)
+        io.cache_gui_file(self.filter_obj.df_view, filename)
         return filename
 
     def is_empty(self):
@@ -1728,14 +1730,14 @@ class FilterTabPage(TabPage):
             self.deseq_window.show()
 
     def view_full_dataframe(self):
-        df_window = gui_windows.DataFrameView(self.filter_obj.df, self.name)
+        df_window = gui_windows.DataFrameView(self.filter_obj.df_view, self.name)
         self.overview_widgets['full_table_view'] = df_window
         df_window.show()
 
     def update_table_preview(self):
         if self.is_empty():
             return
-        model = gui_windows.DataFramePreviewModel(self.filter_obj.df)
+        model = gui_windows.DataFramePreviewModel(self.filter_obj.df_view)
         self.overview_widgets['preview'].setModel(model)
         self.update_table_preview_width()
 
@@ -1628,7 +1628,7 @@ def param_to_widget(param, name: str,
         for action in actions_to_connect:
             widget.textChanged.connect(action)
         if is_default:
-            widget.setText(str(param.default))
+            widget.setText('' if param.default is None else str(param.default))
     elif param.annotation == typing.Union[str, None]:
         widget = OptionalLineEdit()
         for action in actions_to_connect:
@@ -0,0 +1,351 @@
+"""
+This module contains a sparse annotation store, used to hold gene-to-term annotations \
+(such as GO terms or KEGG pathways) for enrichment analysis and annotation-based filtering. \
+This module is used mainly by other modules, and is meant for internal use only.
+"""
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from tqdm.auto import tqdm
+
+from rnalysis.utils import parsing
+
+
+class AnnotationMatrix:
+    """
+    A sparse gene-by-term annotation table. \
+    Genes are stored as rows and annotation terms are stored as columns of a compressed sparse column (CSC) matrix, \
+    so that memory usage scales with the number of annotations rather than with the number of genes times the \
+    number of terms. Non-zero entries mark an annotation of a gene to a term. \
+    Entries can either be boolean (annotated/not annotated) or float (annotation weights).
+    """
+    __slots__ = {'matrix': 'scipy.sparse CSC matrix of annotations, with genes as rows and terms as columns',
+                 'index': 'gene IDs, matching the rows of the matrix',
+                 'columns': 'annotation terms, matching the columns of the matrix'}
+
+    def __init__(self, matrix: Union[sparse.spmatrix, np.ndarray], index: Iterable, columns: Iterable):
+        self.matrix: sparse.csc_matrix = sparse.csc_matrix(matrix)
+        self.index: pd.Index = pd.Index(index)
+        self.columns: pd.Index = pd.Index(columns)
+        assert self.matrix.shape == (len(self.index), len(self.columns)), \
+            f"Matrix shape {self.matrix.shape} does not match the shape of the index and columns " \
+            f"({len(self.index)}, {len(self.columns)})."
+
+    @classmethod
+    def from_sparse_dict(cls, sparse_dict: Dict[str, Set[str]], transpose: bool = False,
+                         progress_bar_desc: str = '') -> 'AnnotationMatrix':
+        """
+        Create an AnnotationMatrix from a sparse dictionary of annotations.
+
+        :param sparse_dict: a dictionary where every key is a gene ID, \
+        and every value is a set of the annotation terms associated with that gene.
+        :type sparse_dict: dict
+        :param transpose: if True, the keys of 'sparse_dict' are treated as annotation terms, \
+        and the values of 'sparse_dict' are treated as sets of gene IDs.
+        :type transpose: bool (default=False)
+        :param progress_bar_desc: description for the progress bar.
+        :type progress_bar_desc: str
+        """
+        keys = parsing.data_to_list(sparse_dict.keys())
+        value_positions = {}
+        indices = []
+        indptr = [0]
+        for key in tqdm(keys, desc=progress_bar_desc, unit='genes' if not transpose else 'terms'):
+            for val in sparse_dict[key]:
+                indices.append(value_positions.setdefault(val, len(value_positions)))
+            indptr.append(len(indices))
+        values = parsing.data_to_list(value_positions.keys())
+
+        matrix = sparse.csr_matrix((np.ones(len(indices), dtype='bool'), np.array(indices, dtype='int64'),
+                                    np.array(indptr, dtype='int64')), shape=(len(keys), len(values)))
+        if transpose:
+            return cls(matrix.T, values, keys)
+        return cls(matrix, keys, values)
+
+    @classmethod
+    def from_codes(cls, gene_codes: np.ndarray, term_codes: np.ndarray, index: Iterable,
+                   columns: Iterable) -> 'AnnotationMatrix':
+        """
+        Create a boolean AnnotationMatrix from pairs of integer-interned gene and term IDs. \
+        Every pair (gene_codes[i], term_codes[i]) marks an annotation of the gene index[gene_codes[i]] \
+        to the term columns[term_codes[i]]. Duplicate pairs are allowed.
+
+        :param gene_codes: integer codes of the annotated genes, pointing into 'index'.
+        :type gene_codes: numpy array of ints
+        :param term_codes: integer codes of the annotation terms, pointing into 'columns'.
+        :type term_codes: numpy array of ints
+        :param index: the gene IDs that the gene codes refer to.
+        :param columns: the annotation terms that the term codes refer to.
+        """
+        index = pd.Index(index)
+        columns = pd.Index(columns)
+        matrix = sparse.csc_matrix((np.ones(len(gene_codes), dtype='bool'), (gene_codes, term_codes)),
+                                   shape=(len(index), len(columns)))
+        return cls(matrix, index, columns)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'AnnotationMatrix':
+        """
+        Create an AnnotationMatrix from a dense annotation table. \
+        For boolean tables, True values mark an annotation; for any other table, non-NaN values mark an annotation.
+
+        :param df: a dense annotation table, with genes as the index and annotation terms as the columns.
+        :type df: pandas DataFrame
+        """
+        if all(pd.api.types.is_bool_dtype(dtype) for dtype in df.dtypes):
+            values = df.values
+        else:
+            values = df.notna().values
+        return cls(values, df.index, df.columns)
+
+    @classmethod
+    def load_npz(cls, path: Union[str, Path]) -> 'AnnotationMatrix':
+        """
+        Load an AnnotationMatrix that was previously saved with AnnotationMatrix.save_npz().
+
+        :param path: path of the .npz file to load.
+        :type path: str or Path
+        """
+        with np.load(path, allow_pickle=False) as npz_file:
+            matrix = sparse.csc_matrix((npz_file['data'], npz_file['indices'], npz_file['indptr']),
+                                       shape=tuple(npz_file['shape']))
+            return cls(matrix, npz_file['index'].astype('object'), npz_file['columns'].astype('object'))
+
+    def save_npz(self, path: Union[str, Path]):
+        """
+        Save the AnnotationMatrix to a compressed .npz file. \
+        The file is written to a temporary path first and then moved into place, \
+        so that concurrent readers never encounter a partially-written file.
+
+        :param path: path of the .npz file to save.
+        :type path: str or Path
+        """
+        path = Path(path)
+        temp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(temp_path, 'wb') as f:
+            np.savez_compressed(f, data=self.matrix.data, indices=self.matrix.indices, indptr=self.matrix.indptr,
+                                shape=np.array(self.shape), index=self.index.values.astype('str'),
+                                columns=self.columns.values.astype('str'))
+        os.replace(temp_path, path)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Return a dense DataFrame representation of the AnnotationMatrix.
+        """
+        return pd.DataFrame(self.matrix.toarray(), index=self.index, columns=self.columns)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.matrix.shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.matrix.dtype
+
+    @property
+    def nnz(self) -> int:
+        return self.matrix.nnz
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.shape[0]} genes x {self.shape[1]} terms, " \
+               f"{self.nnz} annotations, dtype={self.dtype})"
+
+    def copy(self) -> 'AnnotationMatrix':
+        return type(self)(self.matrix.copy(), self.index, self.columns)
+
+    def astype(self, dtype) -> 'AnnotationMatrix':
+        return type(self)(self.matrix.astype(dtype), self.index, self.columns)
+
+    def equals(self, other) -> bool:
+        if not isinstance(other, AnnotationMatrix):
+            return False
+        if self.shape != other.shape or self.dtype != other.dtype:
+            return False
+        return self.index.equals(other.index) and self.columns.equals(other.columns) and \
+            (self.matrix != other.matrix).nnz == 0
+
+    def gene_positions(self, genes: Iterable) -> np.ndarray:
+        """
+        Return the row positions of the given gene IDs.
+        """
+        return self._get_positions(self.index, genes)
+
+    def gene_mask(self, genes: Union[Iterable, np.ndarray]) -> np.ndarray:
+        """
+        Return a boolean mask over the rows of the matrix, marking the given gene IDs. \
+        If 'genes' is already a boolean mask over the rows of the matrix, it is returned as-is.
+        """
+        if isinstance(genes, np.ndarray) and genes.dtype == 'bool' and genes.shape == (self.shape[0],):
+            return genes
+        mask = np.zeros(self.shape[0], dtype='bool')
+        mask[self.gene_positions(genes)] = True
+        return mask
+
+    def term_positions(self, terms: Iterable) -> np.ndarray:
+        """
+        Return the column positions of the given annotation terms.
+        """
+        return self._get_positions(self.columns, terms)
+
+    @staticmethod
+    def _get_positions(index: pd.Index, keys: Iterable) -> np.ndarray:
+        keys = parsing.data_to_list(keys)
+        positions = index.get_indexer(keys)
+        if np.any(positions < 0):
+            missing = [key for key, pos in zip(keys, positions) if pos < 0]
+            raise KeyError(f"{missing} not in index")
+        return positions
+
+    def _term_slice(self, term: str) -> slice:
+        col = self.term_positions([term])[0]
+        return slice(self.matrix.indptr[col], self.matrix.indptr[col + 1])
+
+    def subset(self, genes: Iterable = None, terms: Iterable = None) -> 'AnnotationMatrix':
+        """
+        Return a new AnnotationMatrix containing only the given genes and/or terms, in the order they were given.
+
+        :param genes: gene IDs to keep. If None, all genes will be kept.
+        :param terms: annotation terms to keep. If None, all terms will be kept.
+        """
+        matrix = self.matrix
+        index = self.index
+        columns = self.columns
+        if terms is not None:
+            positions = self.term_positions(terms)
+            matrix = matrix[:, positions]
+            columns = columns[positions]
+        if genes is not None:
+            positions = self.gene_positions(genes)
+            matrix = matrix[positions]
+            index = index[positions]
+        if matrix is self.matrix:
+            matrix = matrix.copy()
+        return type(self)(matrix, index, columns)
+
+    def rename_genes(self, mapping) -> 'AnnotationMatrix':
+        """
+        Return a new AnnotationMatrix with its gene IDs renamed according to a mapping. \
+        Genes that do not appear in the mapping are dropped. \
+        If several genes are renamed to the same gene ID, only the annotations of the last of them are kept.
+
+        :param mapping: a dictionary (or a dictionary-like object) mapping current gene IDs to new gene IDs.
+        """
+        rows = [i for i, gene_id in enumerate(self.index) if gene_id in mapping]
+        new_index = pd.Index([mapping[self.index[i]] for i in rows], dtype='object')
+        unique = ~new_index.duplicated(keep='last')
+        return type(self)(self.matrix[np.array(rows, dtype='int64')[unique]], new_index[unique], self.columns)
+
+    def sort_index(self) -> 'AnnotationMatrix':
+        """
+        Return a new AnnotationMatrix with its rows sorted by gene ID.
+        """
+        order = self.index.argsort()
+        return type(self)(self.matrix[order], self.index[order], self.columns)
+
+    def sum(self, terms: Iterable = None, genes: Iterable = None) -> np.ndarray:
+        """
+        Return the sum of annotations (the number of annotated genes, or the sum of annotation weights) \
+        of each annotation term.
+
+        :param terms: annotation terms to sum. If None, all terms will be summed.
+        :param genes: if specified, only annotations of those gene IDs will be counted.
+        """
+        matrix = self.matrix if terms is None else self.matrix[:, self.term_positions(terms)]
+        if genes is not None:
+            matrix = matrix[self.gene_positions(genes)]
+        return np.asarray(matrix.sum(axis=0)).ravel()
+
+    def term_sum(self, term: str, genes: Iterable = None):
+        """
+        Return the sum of annotations (the number of annotated genes, or the sum of annotation weights) \
+        of a single annotation term.
+
+        :param term: the annotation term to sum.
+        :param genes: if specified, only annotations of those gene IDs (or of the genes marked by a boolean mask \
+        over the rows of the matrix) will be counted.
+        """
+        term_slice = self._term_slice(term)
+        data = self.matrix.data[term_slice]
+        if genes is not None:
+            data = data[self.gene_mask(genes)[self.matrix.indices[term_slice]]]
+        return data.sum()
+
+    def term_vector(self, term: str, genes: Iterable = None) -> np.ndarray:
+        """
+        Return a dense vector of the annotations of a single annotation term.
+
+        :param term: the annotation term.
+        :param genes: if specified, the vector will contain only those gene IDs, in the order they were given.
+        """
+        term_slice = self._term_slice(term)
+        vec = np.zeros(self.shape[0], dtype=self.dtype)
+        vec[self.matrix.indices[term_slice]] = self.matrix.data[term_slice]
+        if genes is not None:
+            return vec[self.gene_positions(genes)]
+        return vec
+
+    def term_mask(self, term: str) -> np.ndarray:
+        """
+        Return a boolean mask over the rows of the matrix, marking the genes annotated to a single annotation term.
+        """
+        term_slice = self._term_slice(term)
+        mask = np.zeros(self.shape[0], dtype='bool')
+        mask[self.matrix.indices[term_slice][self.matrix.data[term_slice] != 0]] = True
+        return mask
+
+    def term_genes(self, term: str) -> pd.Index:
+        """
+        Return the gene IDs annotated to a single annotation term.
+        """
+        return self.index[self.term_mask(term)]
+
+    def remove_annotations(self, term: str, genes: Union[Iterable, np.ndarray]):
+        """
+        Remove the annotations of the given gene IDs (or of the genes marked by a boolean mask \
+        over the rows of the matrix) to a single annotation term, in-place.
+        """
+        self._update_term_data(term, genes, 0)
+
+    def scale_annotations(self, term: str, genes: Union[Iterable, np.ndarray], factor: float):
+        """
+        Multiply the annotation weights of the given gene IDs (or of the genes marked by a boolean mask \
+        over the rows of the matrix) to a single annotation term by 'factor', in-place. \
+        Boolean annotations are converted to float weights before scaling them.
+        """
+        if self.dtype == 'bool':
+            self.matrix = self.matrix.astype('float64')
+        self._update_term_data(term, genes, factor, multiply=True)
+
+    def _update_term_data(self, term: str, genes: Union[Iterable, np.ndarray], value, multiply: bool = False):
+        # annotations are modified in-place without changing the sparsity structure of the matrix,
+        # so that modifying annotations never requires re-allocating the matrix
+        term_slice = self._term_slice(term)
+        mask = self.gene_mask(genes)[self.matrix.indices[term_slice]]
+        data = self.matrix.data[term_slice]
+        if multiply:
+            data[mask] *= value
+        else:
+            data[mask] = value
+
+    def annotated_genes(self, terms: Iterable = None, mode: str = 'union') -> Set[str]:
+        """
+        Return the gene IDs annotated to any ('union') or all ('intersection') of the given annotation terms.
+
+        :param terms: annotation terms to query. If None, all terms will be queried.
+        :param mode: 'union' or 'intersection'.
+        """
+        assert mode in {'union', 'intersection'}, f"Illegal mode '{mode}'."
+        matrix = self.matrix if terms is None else self.matrix[:, self.term_positions(terms)]
+        counts = np.asarray((matrix != 0).sum(axis=1)).ravel()
+        if mode == 'union':
+            mask = counts > 0
+        else:
+            mask = counts == matrix.shape[1] if matrix.shape[1] > 0 else np.zeros_like(counts, dtype='bool')
+        return parsing.data_to_set(self.index[mask])
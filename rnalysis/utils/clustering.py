@@ -287,7 +287,7 @@ class CLICOM:
 
         n_calculations = (n_clusters ** 2) // 2
         batch_size = 1 + n_calculations // joblib.cpu_count()
-        similarities = generic.ProgressParallel(n_jobs=-1, batch_size=batch_size,
+        similarities = generic.ProgressParallel(n_jobs=-2, batch_size=batch_size,
                                                 desc='Generating cluster similarity matrix')(
             joblib.delayed(CLICOM.inter_cluster_similarity)(*ind, self.clustering_solutions.cluster_sets,
                                                             self.n_features, len(self.clustering_solutions)) for ind in
@@ -592,9 +592,11 @@ class ClusteringRunnerWithNClusters(ClusteringRunner, ABC):
         n_clusters_range = np.arange(1, self.max_n_clusters_estimate + 1)
         print(f"Estimating the optimal number of clusters using the Gap Statistic method in range "
               f"{2}:{self.max_n_clusters_estimate}...")
-        # set the random state, if one was supplied
-        if random_seed is not None:
-            np.random.seed(random_seed)
+        # use the random seed of the clustering algorithm, if none was supplied
+        if random_seed is None:
+            random_seed = self.clusterer_kwargs.get('random_state', None)
+        # every reference array is drawn from its own random stream, derived from the random seed
+        ref_rngs = generic.spawn_rngs(random_seed, n_refs)
         # calculate the SVD of the observed data (X), and transform via X' = x_tag = dot(X, V)
         # note: the data is centered by sklearn.decomposition.PCA, no need to pre-center it.
         pca = PCA(random_state=random_seed).fit(raw_data)
@@ -607,8 +609,7 @@ class ClusteringRunnerWithNClusters(ClusteringRunner, ABC):
         # draw uniform features Z' over the ranges of the columns of X', and back-transform via Z = dot(Z', V.T), then
         # transform the random reference data using Box-Cox, and then standardize it
         refs = [self.transform(generic.shift_to_baseline(
-            pca.inverse_transform(np.random.random_sample(size=raw_data.shape) * (b - a) + a))) for _
-            in range(n_refs)]
+            pca.inverse_transform(rng.random(size=raw_data.shape) * (b - a) + a))) for rng in ref_rngs]
         # allocate empty arrays for observed/expected log(inertia), gap scores Gap(K) and gap error S(K)
         log_disp_obs = np.zeros((len(n_clusters_range)))
         log_disp_exp = np.zeros((len(n_clusters_range)))
@@ -1,3 +1,4 @@
+import array
 import collections
 import io as builtin_io
 import itertools
@@ -5,6 +6,7 @@ import logging
 import queue
 import sys
 import warnings
+import zipfile
 from functools import lru_cache
 from pathlib import Path
 from typing import Iterable, List, Tuple, Union, Collection, Set, Dict
@@ -17,11 +19,13 @@ import numpy as np
 import pandas as pd
 import statsmodels.stats.multitest as multitest
 from matplotlib.cm import ScalarMappable
+from scipy import sparse
 from scipy.stats import hypergeom, ttest_1samp, fisher_exact
 from statsmodels.stats.descriptivestats import sign_test
 from tqdm.auto import tqdm
 
 from rnalysis.utils import ontology, io, parsing, settings, validation, generic
+from rnalysis.utils.annotations import AnnotationMatrix
 
 try:
     import xlmhg
@@ -55,7 +59,7 @@ XLMHG_SUPPORTED = does_python_version_support_single_set()
 
 class EnrichmentRunner:
     __slots__ = {'results': 'DataFrame containing enrichment analysis results',
-                 'annotation_df': 'DataFrame containing all annotation data per gene',
+                 'annotation_df': 'DataFrame (or sparse AnnotationMatrix) containing all annotation data per gene',
                  'gene_set': 'the set of genes/genomic features whose enrichment to calculate',
                  'attributes': 'the list of attributes/terms to calculate enrichment for',
                  'alpha': 'the statistical signifiacnce threshold',
@@ -80,6 +84,8 @@ class EnrichmentRunner:
                  'ranked_genes': 'the set of genes/genomic features whose enrichment to calculate, '
                                  'pre-sorted and ranked by the user'}
     printout_params = "appear in the Attribute Reference Table"
+    # number of randomization repetitions which are drawn and scored together, bounding the memory of the draws
+    RANDOMIZATION_CHUNK_SIZE = 1000
 
     def __init__(self, genes: Union[set, np.ndarray], attributes: Union[Iterable, str, int], alpha: float,
                  attr_ref_path: str, return_nonsignificant: bool, save_csv: bool, fname: str, return_fig: bool,
@@ -109,6 +115,10 @@ class EnrichmentRunner:
         if not self.enrichment_func:
             return
         self.pvalue_kwargs = pvalue_kwargs
+        if self.pvalue_kwargs.get('stop_after', None) is not None:
+            stop_after = self.pvalue_kwargs['stop_after']
+            assert isinstance(stop_after, int) and stop_after > 0, \
+                f"'stop_after' must be a positive integer. Value '{stop_after}' is invalid."
         self.single_set = single_set
         if self.single_set:
             assert biotypes is None, "Enrichment in single_set mode does not accept a 'biotypes' argument."
@@ -227,29 +237,201 @@ class EnrichmentRunner:
         else:
             raise ValueError(f"Unknown enrichment function '{pval_func_name}'.")
 
+    def _get_attribute_vector(self, attribute: str, genes: Iterable = None) -> np.ndarray:
+        """
+        Return a boolean vector marking which genes are annotated to the given attribute. \
+        If 'genes' is specified, the vector will contain only those genes, in the order they were given.
+        """
+        if genes is None:
+            return self.annotation_df[attribute].notna().values
+        return self.annotation_df.loc[parsing.data_to_list(genes), attribute].notna().values
+
     def _get_hypergeometric_parameters(self, attribute: str) -> Tuple[int, int, int, int]:
         bg_size = self.annotation_df.shape[0]
         de_size = len(self.gene_set)
-        go_size = self.annotation_df[attribute].notna().sum()
-        go_de_size = self.annotation_df.loc[list(self.gene_set), attribute].notna().sum()
+        go_size = self._get_attribute_vector(attribute).sum()
+        go_de_size = self._get_attribute_vector(attribute, self.gene_set).sum()
+        return bg_size, de_size, go_size, go_de_size
+
+    def _get_batch_enrichment_func(self):
+        # enrichment functions that have a vectorized implementation, which evaluates all attributes at once
+        batch_funcs = {'_hypergeometric_enrichment': self._hypergeometric_enrichment_batch,
+                       '_fisher_enrichment': self._fisher_enrichment_batch,
+                       '_randomization_enrichment': self._randomization_enrichment_batch,
+                       '_xlmhg_enrichment': self._xlmhg_enrichment_batch}
+        return batch_funcs.get(getattr(self.enrichment_func, '__name__', None), None)
+
+    @staticmethod
+    def _get_annotation_matrix(annotation_df: pd.DataFrame, attributes: List[str]) -> np.ndarray:
+        return annotation_df[attributes].notna().values
+
+    def _get_randomization_matrix(self, annotation_df: Union[pd.DataFrame, AnnotationMatrix], attributes: List[str]
+                                  ) -> Union[np.ndarray, sparse.csc_matrix]:
+        """
+        Return a numeric gene-by-attribute annotation matrix, \
+        which random draws of genes can be scored against with a single matrix product.
+        """
+        if isinstance(annotation_df, AnnotationMatrix):
+            return annotation_df.matrix[:, annotation_df.term_positions(attributes)]
+        return self._get_annotation_matrix(annotation_df, attributes).astype('float64')
+
+    def _get_annotation_counts(self, annotation_df: pd.DataFrame, attributes: List[str]
+                               ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Count the annotated genes of every attribute in the background set and in the enrichment set, \
+        using a single reduction over a gene-by-attribute annotation matrix.
+        """
+        annotation_mat = self._get_annotation_matrix(annotation_df, attributes)
+        de_mask = annotation_df.index.isin(parsing.data_to_list(self.gene_set))
+        return annotation_mat.sum(axis=0), annotation_mat[de_mask].sum(axis=0)
+
+    def _get_hypergeometric_parameters_batch(self, attributes: List[str]
+                                             ) -> Tuple[int, int, np.ndarray, np.ndarray]:
+        bg_size = self.annotation_df.shape[0]
+        de_size = len(self.gene_set)
+        go_size, go_de_size = self._get_annotation_counts(self.annotation_df, attributes)
         return bg_size, de_size, go_size, go_de_size
 
+    @staticmethod
+    def _calc_log2_fold_enrichment(expected_fraction: np.ndarray, observed_fraction: np.ndarray) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log2_fold_enrichment = np.full(observed_fraction.shape, -np.inf)
+            positive = observed_fraction > 0
+            log2_fold_enrichment[positive] = np.log2(observed_fraction[positive] / expected_fraction[positive])
+        return log2_fold_enrichment
+
+    @staticmethod
+    def _format_batch_results(names: list, bg_size: int, de_size: int, go_size: np.ndarray, go_de_size: np.ndarray,
+                              pvals: np.ndarray) -> list:
+        expected_fraction = go_size / bg_size
+        observed_fraction = go_de_size / de_size
+        log2_fold_enrichment = EnrichmentRunner._calc_log2_fold_enrichment(expected_fraction, observed_fraction)
+        obs = (de_size * observed_fraction).astype(int)
+        exp = de_size * expected_fraction
+        return [[name, de_size, this_obs, this_exp, this_log2fc, pval] for name, this_obs, this_exp, this_log2fc, pval
+                in zip(names, obs.tolist(), exp.tolist(), log2_fold_enrichment.tolist(), pvals.tolist())]
+
+    def _hypergeometric_enrichment_batch(self, attributes: List[str]) -> list:
+        bg_size, de_size, go_size, go_de_size = self._get_hypergeometric_parameters_batch(attributes)
+        pvals = self._calc_hypergeometric_pvals(bg_size, de_size, go_size, go_de_size)
+        return self._format_batch_results(attributes, bg_size, de_size, go_size, go_de_size, pvals)
+
+    def _fisher_enrichment_batch(self, attributes: List[str]) -> list:
+        bg_size, de_size, go_size, go_de_size = self._get_hypergeometric_parameters_batch(attributes)
+        pvals = self._calc_fisher_pvals(bg_size, de_size, go_size, go_de_size)
+        return self._format_batch_results(attributes, bg_size, de_size, go_size, go_de_size, pvals)
+
+    def _randomization_enrichment_batch(self, attributes: List[str]) -> list:
+        bg_size, de_size, go_size, go_de_size = self._get_hypergeometric_parameters_batch(attributes)
+        observed_fraction = go_de_size / de_size
+        log2_fold_enrichment = self._calc_log2_fold_enrichment(go_size / bg_size, observed_fraction)
+        pvals, achieved_reps = self._calc_randomization_pvals(
+            de_size, log2_fold_enrichment, self._get_randomization_matrix(self.annotation_df, attributes),
+            self.pvalue_kwargs['reps'], observed_fraction, self.random_seed, n_jobs=-2 if self.parallel else 1,
+            stop_after=self.pvalue_kwargs.get('stop_after', None))
+        results = self._format_batch_results(attributes, bg_size, de_size, go_size, go_de_size, pvals)
+        return self._add_achieved_reps(results, achieved_reps)
+
+    def _add_achieved_reps(self, results: list, achieved_reps: np.ndarray) -> list:
+        # adaptive randomization tests also report how many repetitions were drawn for each attribute
+        if self.pvalue_kwargs.get('stop_after', None) is None:
+            return results
+        return [row + [this_reps] for row, this_reps in zip(results, achieved_reps.tolist())]
+
+    def _get_results_columns(self) -> list:
+        if self.single_set:
+            columns = ['name', 'samples', self.en_score_col, 'pval']
+        else:
+            columns = ['name', 'samples', 'obs', 'exp', self.en_score_col, 'pval']
+        if self.pvalue_kwargs.get('stop_after', None) is not None:
+            columns.append('reps')
+        return columns
+
     def _get_xlmhg_parameters(self, index_vec):
         n = len(self.ranked_genes)
+        X, L = self._get_xlmhg_cutoffs(n, len(index_vec), self.pvalue_kwargs)
+        # pre-allocate empty array to speed up computation
+        table = np.empty((len(index_vec) + 1, n - len(index_vec) + 1), dtype=np.longdouble)
+        return n, X, L, table
+
+    @staticmethod
+    def _get_xlmhg_cutoffs(n: int, k: int, pvalue_kwargs: dict) -> Tuple[int, int]:
         # X = the minimal amount of 'positive' elements above the hypergeometric cutoffs out of all of the positive
         # elements in the ranked set. Determined to be the minimum between x_min and ceil(x_frac * k),
         # where 'k' is the number of 'positive' elements in the ranked set.
         x_frac = 0.5
         x_min = 10
-        X = min(x_min, int(np.ceil(x_frac * len(index_vec)))) if 'X' not in self.pvalue_kwargs \
-            else self.pvalue_kwargs['X']
+        X = min(x_min, int(np.ceil(x_frac * k))) if 'X' not in pvalue_kwargs else pvalue_kwargs['X']
         # L = the lowest possible cutoff (n) to be tested out of the entire list.
         # Determined to be floor(l_frac * N), where 'N' is total number of elements in the ranked set (n).
         l_frac = 0.1
-        L = int(np.floor(l_frac * n)) if 'L' not in self.pvalue_kwargs else self.pvalue_kwargs['L']
-        # pre-allocate empty array to speed up computation
-        table = np.empty((len(index_vec) + 1, n - len(index_vec) + 1), dtype=np.longdouble)
-        return n, X, L, table
+        L = int(np.floor(l_frac * n)) if 'L' not in pvalue_kwargs else pvalue_kwargs['L']
+        return X, L
+
+    def _get_xlmhg_index_vectors_batch(self, annotation_df: Union[pd.DataFrame, AnnotationMatrix],
+                                       attributes: List[str]) -> List[np.ndarray]:
+        """
+        Return the XL-mHG index vectors (the ranks of the annotated genes) of all attributes at once. \
+        The annotations of the ranked genes are gathered once into a rank-ordered sparse CSC matrix, \
+        so that the index vector of each attribute is simply the sorted row indices of its column.
+        """
+        if isinstance(annotation_df, AnnotationMatrix):
+            ranked_mat = annotation_df.matrix[annotation_df.gene_positions(self.ranked_genes)]
+            ranked_mat = ranked_mat[:, annotation_df.term_positions(attributes)]
+        else:
+            ranked_mat = self._get_annotation_matrix(annotation_df.loc[parsing.data_to_list(self.ranked_genes)],
+                                                     attributes)
+        ranked_mat = sparse.csc_matrix(ranked_mat)
+        ranked_mat.eliminate_zeros()
+        ranked_mat.sort_indices()
+        return [np.uint16(ranked_mat.indices[start:end]) for start, end in
+                zip(ranked_mat.indptr[:-1], ranked_mat.indptr[1:])]
+
+    def _calc_xlmhg_batch(self, index_vecs: List[np.ndarray], n_jobs: int = 1) -> List[Tuple[float, float]]:
+        """
+        Calculate the XL-mHG test results of many index vectors. \
+        The index vectors are split into one batch per worker, \
+        and every batch re-uses a single dynamic programming table buffer for all of its tests.
+        """
+        n = len(self.ranked_genes)
+        if n_jobs == 1 or len(index_vecs) <= 1:
+            return self._calc_xlmhg_on_batch(n, index_vecs, self.pvalue_kwargs)
+        n_batches = min(len(index_vecs), joblib.effective_n_jobs(n_jobs))
+        # interleave the index vectors between the batches, to balance the sizes of the tables between workers
+        batch_inds = [np.arange(i, len(index_vecs), n_batches) for i in range(n_batches)]
+        batch_results = generic.ProgressParallel(n_jobs=n_jobs, total=n_batches, desc="Calculating XL-mHG tests",
+                                                 unit='batch')(
+            joblib.delayed(self._calc_xlmhg_on_batch)(n, [index_vecs[i] for i in inds], self.pvalue_kwargs) for inds
+            in batch_inds)
+        results = [None] * len(index_vecs)
+        for inds, this_batch_results in zip(batch_inds, batch_results):
+            for i, res in zip(inds, this_batch_results):
+                results[i] = res
+        return results
+
+    @classmethod
+    def _calc_xlmhg_on_batch(cls, n: int, index_vecs: List[np.ndarray], pvalue_kwargs: dict
+                             ) -> List[Tuple[float, float]]:
+        if len(index_vecs) == 0:
+            return []
+        # allocate a single table, large enough for the largest test. every test uses a (k+1) x (n-k+1) view of it
+        table_buffer = np.empty(max((len(vec) + 1) * (n - len(vec) + 1) for vec in index_vecs), dtype=np.longdouble)
+        results = []
+        for index_vec in index_vecs:
+            k = len(index_vec)
+            X, L = cls._get_xlmhg_cutoffs(n, k, pvalue_kwargs)
+            table = table_buffer[:(k + 1) * (n - k + 1)].reshape((k + 1, n - k + 1))
+            rev_index_vec = np.uint16(n - 1 - index_vec[::-1].astype('int64'))
+            res_obj_fwd = xlmhg.get_xlmhg_test_result(N=n, indices=index_vec, X=X, L=L, table=table)
+            res_obj_rev = xlmhg.get_xlmhg_test_result(N=n, indices=rev_index_vec, X=X, L=L, table=table)
+            results.append(cls._extract_xlmhg_results(res_obj_fwd, res_obj_rev))
+        return results
+
+    def _xlmhg_enrichment_batch(self, attributes: List[str]) -> list:
+        index_vecs = self._get_xlmhg_index_vectors_batch(self.annotation_df, attributes)
+        results = self._calc_xlmhg_batch(index_vecs, n_jobs=-2 if self.parallel else 1)
+        n = len(self.ranked_genes)
+        return [[attribute, n, en_score, pval] for attribute, (en_score, pval) in zip(attributes, results)]
 
     def _xlmhg_enrichment(self, attribute: str) -> list:
         index_vec, rev_index_vec = self._generate_xlmhg_index_vectors(attribute)
@@ -277,9 +459,9 @@ class EnrichmentRunner:
 
     def _generate_xlmhg_index_vectors(self, attribute) -> Tuple[np.ndarray, np.ndarray]:
         n = len(self.ranked_genes)
-        ranked_srs = self.annotation_df.loc[self.ranked_genes, attribute]
-        assert ranked_srs.shape[0] == n
-        index_vec = np.uint16(np.nonzero(ranked_srs.notna().values)[0])
+        ranked_vec = self._get_attribute_vector(attribute, self.ranked_genes)
+        assert ranked_vec.shape[0] == n
+        index_vec = np.uint16(np.nonzero(ranked_vec)[0])
         rev_index_vec = np.uint16([n - 1 - index_vec[i - 1] for i in range(len(index_vec), 0, -1)])
         return index_vec, rev_index_vec
 
@@ -293,13 +475,19 @@ class EnrichmentRunner:
         obs, exp = int(de_size * observed_fraction), de_size * expected_fraction
         return [attribute, de_size, obs, exp, log2_fold_enrichment, pval]
 
-    def _randomization_enrichment(self, attribute: str, reps: int) -> list:
-        bg_array = self.annotation_df[attribute].notna().values
-        obs_array = self.annotation_df.loc[list(self.gene_set), attribute].notna().values
+    def _randomization_enrichment(self, attribute: str, reps: int, stop_after: Union[int, None] = None) -> list:
+        bg_array = self._get_attribute_vector(attribute)
+        obs_array = self._get_attribute_vector(attribute, self.gene_set)
         n = len(self.gene_set)
         expected_fraction = np.sum(bg_array) / bg_array.shape[0]
         observed_fraction = np.sum(obs_array) / n
         log2_fold_enrichment = np.log2(observed_fraction / expected_fraction) if observed_fraction > 0 else -np.inf
+        generic.seed_jit_rng(generic.get_seed_sequence(self.random_seed, key=attribute))
+        if stop_after is not None:
+            pval, achieved_reps = self._calc_adaptive_randomization_pval(n, log2_fold_enrichment, bg_array, reps,
+                                                                         observed_fraction, stop_after)
+            return [attribute, n, int(n * observed_fraction), n * expected_fraction, log2_fold_enrichment, pval,
+                    achieved_reps]
         pval = self._calc_randomization_pval(n, log2_fold_enrichment, bg_array, reps, observed_fraction)
 
         return [attribute, n, int(n * observed_fraction), n * expected_fraction, log2_fold_enrichment, pval]
@@ -330,6 +518,144 @@ class EnrichmentRunner:
         pval = (success + 1) / (reps + 1)
         return pval
 
+    @staticmethod
+    @generic.numba.jit(nopython=True)
+    def _calc_adaptive_randomization_pval(n: int, log2fc: float, bg_array: np.ndarray, max_reps: int, obs_frac: float,
+                                          stop_after: int) -> Tuple[float, int]:
+        """
+        An adaptive version of _calc_randomization_pval(), which uses the sequential stopping rule of \
+        Besag and Clifford (1991): random sets are drawn until 'stop_after' of them are at least as extreme as the \
+        observed set (in which case p = stop_after / number of draws), or until 'max_reps' sets were drawn \
+        (in which case p = (successes + 1) / (max_reps + 1)). Returns the p-value and the number of draws.
+        """
+        ind_range = np.arange(bg_array.shape[0])
+        success = 0
+        for i in range(max_reps):
+            drawn_frac = np.sum(bg_array[np.random.choice(ind_range, n, replace=False)]) / n
+            if (log2fc >= 0 and drawn_frac >= obs_frac) or (log2fc < 0 and drawn_frac <= obs_frac):
+                success += 1
+                if success == stop_after:
+                    return stop_after / (i + 1), i + 1
+        return (success + 1) / (max_reps + 1), max_reps
+
+    @classmethod
+    def _calc_randomization_pvals(cls, n: int, log2fc: np.ndarray, annotation_mat: Union[np.ndarray, sparse.spmatrix],
+                                  reps: int, obs_frac: np.ndarray,
+                                  random_seed: Union[int, np.random.SeedSequence, None] = None,
+                                  n_jobs: int = 1, stop_after: Union[int, None] = None
+                                  ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        A vectorized version of _calc_randomization_pval(), which performs the randomization test \
+        on many attributes at once. The 'reps' random draws of 'n' genes from the background set are shared \
+        between all attributes. The draws are made in chunks of 'RANDOMIZATION_CHUNK_SIZE' repetitions, \
+        and every chunk is scored against all attributes with a single matrix product. \
+        Every chunk draws from its own random stream, spawned from 'random_seed', \
+        so the p-values are identical for a given seed regardless of 'n_jobs'. \
+        If 'stop_after' is specified, the sequential stopping rule of Besag and Clifford (1991) is used: \
+        an attribute is no longer scored once 'stop_after' random draws were at least as extreme as the observed set, \
+        and its p-value is 'stop_after' divided by the number of draws made until that point.
+
+        :param n: number of genes in the test set.
+        :type n: positive int
+        :param log2fc: log2 fold enrichment of each attribute. Attributes with log2fc >= 0 are tested for enrichment, \
+        and the rest are tested for depletion.
+        :type log2fc: numpy.ndarray of floats
+        :param annotation_mat: a gene-by-attribute annotation matrix of the background set.
+        :type annotation_mat: numpy.ndarray or scipy.sparse matrix
+        :param reps: number of randomization repetitions (or the maximal number of repetitions, \
+        if 'stop_after' is specified).
+        :type reps: positive int
+        :param obs_frac: observed fraction of annotated genes in the test set for each attribute.
+        :type obs_frac: numpy.ndarray of floats
+        :param random_seed: seed of the random draws. If None, the draws will not be reproducible.
+        :type random_seed: non-negative int, numpy.random.SeedSequence, or None (default=None)
+        :param n_jobs: number of chunks to draw and score in parallel. If n_jobs=-1, all CPU cores will be used.
+        :type n_jobs: int (default=1)
+        :param stop_after: if specified, the number of extreme random draws after which to stop scoring an attribute.
+        :type stop_after: positive int or None (default=None)
+        :return: randomization p-values for each attribute, and the number of repetitions drawn for each attribute.
+        :rtype: Tuple[numpy.ndarray of floats between 0 and 1, numpy.ndarray of ints]
+        """
+        chunk_reps = [min(cls.RANDOMIZATION_CHUNK_SIZE, reps - start) for start in
+                      range(0, reps, cls.RANDOMIZATION_CHUNK_SIZE)]
+        random_seed = generic.get_seed_sequence(random_seed)
+        seeds = [generic.get_seed_sequence(random_seed, key=i) for i in range(len(chunk_reps))]
+        enriched = np.asarray(log2fc) >= 0
+        obs_frac = np.asarray(obs_frac)
+        successes = np.zeros(obs_frac.shape[0], dtype='int64')
+        achieved_reps = np.full(obs_frac.shape[0], reps, dtype='int64')
+
+        if stop_after is None:
+            for chunk_successes in cls._map_randomization_chunks(n, annotation_mat, chunk_reps, seeds, obs_frac,
+                                                                 enriched, True, n_jobs):
+                successes += chunk_successes
+            return (successes + 1) / (reps + 1), achieved_reps
+
+        # in adaptive mode, chunks are drawn in rounds of n_jobs chunks, and only the attributes which have not
+        # reached 'stop_after' yet are scored in the next round.
+        # chunks are always evaluated in order, so the results do not depend on the number of jobs.
+        round_size = 1 if n_jobs == 1 else joblib.effective_n_jobs(n_jobs)
+        active = np.arange(obs_frac.shape[0])
+        n_drawn = 0
+        for round_start in range(0, len(chunk_reps), round_size):
+            if len(active) == 0:
+                break
+            round_slice = slice(round_start, round_start + round_size)
+            round_exceedances = cls._map_randomization_chunks(n, annotation_mat[:, active], chunk_reps[round_slice],
+                                                              seeds[round_slice], obs_frac[active], enriched[active],
+                                                              False, n_jobs)
+            still_active = np.ones(len(active), dtype='bool')
+            for this_reps, exceedances in zip(chunk_reps[round_slice], round_exceedances):
+                cols = active[still_active]
+                cumulative = np.cumsum(exceedances[:, still_active], axis=0) + successes[cols]
+                reached = cumulative[-1] >= stop_after
+                achieved_reps[cols[reached]] = n_drawn + np.argmax(cumulative[:, reached] >= stop_after, axis=0) + 1
+                successes[cols] = np.minimum(cumulative[-1], stop_after)
+                still_active[np.flatnonzero(still_active)[reached]] = False
+                n_drawn += this_reps
+            active = active[still_active]
+
+        stopped = successes >= stop_after
+        pvals = np.where(stopped, stop_after / achieved_reps, (successes + 1) / (reps + 1))
+        return pvals, achieved_reps
+
+    @classmethod
+    def _map_randomization_chunks(cls, n: int, annotation_mat: Union[np.ndarray, sparse.spmatrix],
+                                  chunk_reps: List[int], seeds: List[np.random.SeedSequence], obs_frac: np.ndarray,
+                                  enriched: np.ndarray, reduce: bool, n_jobs: int) -> list:
+        if n_jobs == 1 or len(chunk_reps) <= 1:
+            return [cls._count_randomization_successes(n, annotation_mat, this_reps, obs_frac, enriched, seed, reduce)
+                    for this_reps, seed in zip(chunk_reps, seeds)]
+        return generic.ProgressParallel(n_jobs=n_jobs, total=len(chunk_reps),
+                                        desc="Calculating randomization p-values", unit='chunk')(
+            joblib.delayed(cls._count_randomization_successes)(n, annotation_mat, this_reps, obs_frac, enriched, seed,
+                                                               reduce) for this_reps, seed in zip(chunk_reps, seeds))
+
+    @staticmethod
+    def _count_randomization_successes(n: int, annotation_mat: Union[np.ndarray, sparse.spmatrix], reps: int,
+                                       obs_frac: np.ndarray, enriched: np.ndarray, seed: np.random.SeedSequence,
+                                       reduce: bool = True) -> np.ndarray:
+        """
+        Draw 'reps' random sets of 'n' genes from the background set, \
+        and count for every attribute how many of the random sets are at least as extreme as the observed set. \
+        If 'reduce' is False, return a boolean matrix marking which random sets were at least as extreme \
+        for every attribute, instead of their counts.
+        """
+        rng = np.random.default_rng(seed)
+        bg_size = annotation_mat.shape[0]
+        drawn = np.empty((reps, n), dtype='int64')
+        for i in range(reps):
+            drawn[i] = rng.choice(bg_size, n, replace=False, shuffle=False)
+        # each row of the selection matrix marks the genes of a single random draw
+        selection = sparse.csr_matrix((np.ones(reps * n), drawn.ravel(), np.arange(0, reps * n + 1, n)),
+                                      shape=(reps, bg_size))
+        drawn_frac = selection @ annotation_mat
+        drawn_frac = (drawn_frac.toarray() if sparse.issparse(drawn_frac) else np.asarray(drawn_frac)) / n
+        exceedances = np.where(enriched, drawn_frac >= obs_frac, drawn_frac <= obs_frac)
+        if reduce:
+            return exceedances.sum(axis=0)
+        return exceedances
+
     @staticmethod
     @lru_cache(maxsize=256, typed=False)
     def _calc_fisher_pval(bg_size: int, de_size: int, go_size: int, go_de_size: int) -> float:
@@ -369,6 +695,103 @@ class EnrichmentRunner:
         except ZeroDivisionError:
             return hypergeom.cdf(go_de_size, bg_size, go_size, de_size)
 
+    @staticmethod
+    def _calc_hypergeometric_pvals(bg_size: int, de_size: int, go_size: np.ndarray, go_de_size: np.ndarray
+                                   ) -> np.ndarray:
+        """
+        A vectorized version of _calc_hypergeometric_pval(), \
+        which performs the hypergeometric test on many attributes at once.
+
+        :param bg_size: size of the background set. Usually denoted as 'M'.
+        :type bg_size: positive int
+        :param de_size: size of the differentially-expressed set, or size of test set. usually denoted as 'N'.
+        :type de_size: positive int
+        :param go_size: number of features in the background set corresponding to each attribute.
+        :type go_size: numpy.ndarray of non-negative ints
+        :param go_de_size: number of features in the test set corresponding to each attribute.
+        :type go_de_size: numpy.ndarray of non-negative ints
+        :return: p-values of the hypergeometric test for each attribute.
+        :rtype: numpy.ndarray of floats between 0 and 1
+        """
+        go_size = np.asarray(go_size)
+        go_de_size = np.asarray(go_de_size)
+        if de_size == 0:
+            return hypergeom.cdf(go_de_size, bg_size, go_size, de_size)
+        depleted = go_de_size / de_size < go_size / bg_size
+        pvals = np.empty(go_size.shape, dtype='float64')
+        pvals[depleted] = hypergeom.cdf(go_de_size[depleted], bg_size, go_size[depleted], de_size)
+        pvals[~depleted] = hypergeom.sf(go_de_size[~depleted] - 1, bg_size, go_size[~depleted], de_size)
+        return pvals
+
+    @staticmethod
+    def _calc_fisher_pvals(bg_size: int, de_size: int, go_size: np.ndarray, go_de_size: np.ndarray) -> np.ndarray:
+        """
+        A vectorized version of _calc_fisher_pval(), which performs a two-sided Fisher's Exact test \
+        on many attributes at once. \
+        The p-values are computed the same way as scipy.stats.fisher_exact(): \
+        the probability of the observed table is summed with the tail on the other side of the distribution's mode, \
+        where the boundary of that tail is found with a vectorized binary search.
+
+        :param bg_size: size of the background set.
+        :type bg_size: positive int
+        :param de_size: size of the differentially-expressed set, or size of test set.
+        :type de_size: positive int
+        :param go_size: number of features in the background set corresponding to each attribute.
+        :type go_size: numpy.ndarray of non-negative ints
+        :param go_de_size: number of features in the test set corresponding to each attribute.
+        :type go_de_size: numpy.ndarray of non-negative ints
+        :return: p-values of the two-sided Fisher's Exact test for each attribute.
+        :rtype: numpy.ndarray of floats between 0 and 1
+        """
+        go_size = np.asarray(go_size, dtype='int64')
+        go_de_size = np.asarray(go_de_size, dtype='int64')
+        pvals = np.ones(go_size.shape, dtype='float64')
+        # if both values in a row or column of the contingency table are zero, the p-value is 1
+        if de_size == 0 or de_size == bg_size:
+            return pvals
+        informative = (go_size > 0) & (go_size < bg_size)
+
+        def pmf(x, ind):
+            return hypergeom.pmf(x, bg_size, go_size[ind], de_size)
+
+        mode = ((de_size + 1) * (go_size + 1)) // (bg_size + 2)
+        pexact = hypergeom.pmf(go_de_size, bg_size, go_size, de_size)
+        pmode = hypergeom.pmf(mode, bg_size, go_size, de_size)
+        epsilon = 1e-14
+        gamma = 1 + epsilon
+        with np.errstate(divide='ignore', invalid='ignore'):
+            at_mode = np.abs(pexact - pmode) / np.maximum(pexact, pmode) <= epsilon
+        target = pexact * gamma
+
+        lower = informative & ~at_mode & (go_de_size < mode)
+        upper = informative & ~at_mode & (go_de_size >= mode)
+        pvals[lower] = hypergeom.cdf(go_de_size[lower], bg_size, go_size[lower], de_size)
+        pvals[upper] = hypergeom.sf(go_de_size[upper] - 1, bg_size, go_size[upper], de_size)
+
+        # observed value is below the mode: find the first value above the mode whose probability is below pexact
+        lower_tail = lower & ~(pmf(de_size, slice(None)) > target)
+        ind = np.nonzero(lower_tail)[0]
+        lo, hi = mode[ind], np.full(ind.shape, de_size + 1)
+        while np.any(lo < hi):
+            mid = (lo + hi) // 2
+            below = pmf(mid, ind) < target[ind]
+            hi = np.where(below, mid, hi)
+            lo = np.where(below, lo, mid + 1)
+        pvals[ind] += hypergeom.sf(lo - 1, bg_size, go_size[ind], de_size)
+
+        # observed value is above the mode: find the first value below the mode whose probability exceeds pexact
+        upper_tail = upper & ~(pmf(0, slice(None)) > target)
+        ind = np.nonzero(upper_tail)[0]
+        lo, hi = np.zeros(ind.shape, dtype='int64'), mode[ind]
+        while np.any(lo < hi):
+            mid = (lo + hi) // 2
+            above = pmf(mid, ind) > target[ind]
+            hi = np.where(above, mid, hi)
+            lo = np.where(above, lo, mid + 1)
+        pvals[ind] += hypergeom.cdf(lo - 1, bg_size, go_size[ind], de_size)
+
+        return np.minimum(pvals, 1.0)
+
     def _get_background_set_from_biotype(self):
         if self.biotypes == 'all':
             self.background_set = parsing.data_to_set(self.annotation_df.index)
@@ -452,12 +875,15 @@ class EnrichmentRunner:
         return self._calculate_enrichment_serial()
 
     def set_random_seed(self):
-        if self.random_seed is not None:
-            assert isinstance(self.random_seed, int) and self.random_seed >= 0, \
-                f"random_seed must be a non-negative integer. Value '{self.random_seed}' is invalid."
-            np.random.seed(self.random_seed)
+        # randomized tests derive an independent random stream for every attribute/chunk of repetitions from a single
+        # root SeedSequence, instead of seeding the global random state of numpy.
+        # the root is fixed here (even when no seed was given), so every worker process derives the same streams.
+        self.random_seed = generic.get_seed_sequence(self.random_seed)
 
     def _calculate_enrichment_serial(self) -> list:
+        batch_func = self._get_batch_enrichment_func()
+        if batch_func is not None:
+            return batch_func(self.attributes)
         result = []
         for attribute in tqdm(self.attributes, desc="Calculating enrichment", unit='attributes'):
             assert isinstance(attribute, str), f"Error in attribute {attribute}: attributes must be strings!"
@@ -466,15 +892,16 @@ class EnrichmentRunner:
         return result
 
     def _calculate_enrichment_parallel(self) -> list:
-        result = generic.ProgressParallel(n_jobs=-1, desc="Calculating enrichment", unit='attribute')(
+        # vectorized enrichment functions evaluate all attributes at once, faster than any process pool could
+        batch_func = self._get_batch_enrichment_func()
+        if batch_func is not None:
+            return batch_func(self.attributes)
+        result = generic.ProgressParallel(n_jobs=-2, desc="Calculating enrichment", unit='attribute')(
             joblib.delayed(self.enrichment_func)(attribute, **self.pvalue_kwargs) for attribute in self.attributes)
         return result
 
     def format_results(self, unformatted_results_list: list):
-        if self.single_set:
-            columns = ['name', 'samples', self.en_score_col, 'pval']
-        else:
-            columns = ['name', 'samples', 'obs', 'exp', self.en_score_col, 'pval']
+        columns = self._get_results_columns()
         self.results = pd.DataFrame(unformatted_results_list, columns=columns).set_index('name')
         self._correct_multiple_comparisons()
 
@@ -816,10 +1243,7 @@ class KEGGEnrichmentRunner(EnrichmentRunner):
         return io.KEGGAnnotationIterator(self.taxon_id)
 
     def format_results(self, unformatted_results_list: list):
-        if self.single_set:
-            columns = ['KEGG ID', 'name', 'samples', self.en_score_col, 'pval']
-        else:
-            columns = ['KEGG ID', 'name', 'samples', 'obs', 'exp', self.en_score_col, 'pval']
+        columns = ['KEGG ID'] + self._get_results_columns()
         named_results_list = [[entry[0], self.pathway_names_dict[entry[0]]] + entry[1:] for entry in
                               unformatted_results_list]
         self.results = pd.DataFrame(named_results_list, columns=columns).set_index('KEGG ID')
@@ -845,7 +1269,7 @@ class KEGGEnrichmentRunner(EnrichmentRunner):
             # save query results to KEGG_DF_QUERIES
             self.KEGG_DF_QUERIES[query_key] = self.annotation_df, self.pathway_names_dict
 
-    def _generate_annotation_df(self) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    def _generate_annotation_df(self) -> Tuple[AnnotationMatrix, Dict[str, str]]:
         # fetch and process KEGG annotations
         sparse_annotation_dict, pathway_name_dict = self._process_annotations()
         print(f"Found annotations for {len(sparse_annotation_dict)} genes.")
@@ -853,12 +1277,25 @@ class KEGGEnrichmentRunner(EnrichmentRunner):
         # translate gene IDs
         translated_sparse_annotation_dict = self._translate_gene_ids(sparse_annotation_dict)
 
-        # get boolean DataFrame for enrichment
-        annotation_df = parsing.sparse_dict_to_bool_df(translated_sparse_annotation_dict,
-                                                       progress_bar_desc="Generating Gene Ontology Referene Table")
-        annotation_df[~annotation_df] = np.nan
+        # get sparse annotation matrix for enrichment
+        annotation_df = AnnotationMatrix.from_sparse_dict(translated_sparse_annotation_dict,
+                                                          progress_bar_desc="Generating KEGG Reference Table")
         return annotation_df, pathway_name_dict
 
+    def filter_annotations(self):
+        if self.single_set:
+            self.annotation_df = self.annotation_df.subset(terms=self.attributes).sort_index()
+        else:
+            self.annotation_df = self.annotation_df.subset(genes=self.background_set,
+                                                           terms=self.attributes).sort_index()
+
+    def _get_attribute_vector(self, attribute: str, genes: Iterable = None) -> np.ndarray:
+        return self.annotation_df.term_vector(attribute, genes)
+
+    def _get_annotation_counts(self, annotation_df: AnnotationMatrix, attributes: List[str]
+                               ) -> Tuple[np.ndarray, np.ndarray]:
+        return annotation_df.sum(attributes), annotation_df.sum(attributes, genes=self.gene_set)
+
     def _process_annotations(self) -> Tuple[Dict[str, Set[str]], Dict[str, str]]:
         desc = f"Fetching KEGG annotations for organism '{self.organism}' (taxon ID:{self.taxon_id})"
 
@@ -884,8 +1321,11 @@ class KEGGEnrichmentRunner(EnrichmentRunner):
         translated_sparse_annotation_dict = {}
         sparse_dict_cp = sparse_annotation_dict.copy()
         if self.gene_id_type.lower() == 'auto':
+            # the identifier types that are probed are narrowed down by the gene IDs of the enrichment set
+            map_to_options = io.guess_gene_id_types(self.gene_set, 'to')
             translator, _, self.gene_id_type = io.find_best_gene_mapping(
-                parsing.data_to_tuple(sparse_annotation_dict.keys()), (source,), None)
+                parsing.data_to_tuple(sparse_annotation_dict.keys()), (source,),
+                map_to_options if len(map_to_options) > 0 else None)
         else:
             translator = io.map_gene_ids(parsing.data_to_list(sparse_annotation_dict.keys()), source, self.gene_id_type)
         for gene_id in sparse_annotation_dict:
@@ -920,6 +1360,7 @@ class GOEnrichmentRunner(EnrichmentRunner):
                                           'statistically significant after enrichment analysis',
                  'plot_ontology_graph': 'indicates whether to plot ontology graph of the statistically significant GO Terms',
                  'ontology_graph_format': 'file format for the generated ontology graph',
+                 'annotation_file': 'local GAF/GPAD file from which to read GO Annotations instead of GOlr',
                  'attributes_set': 'set of the attributes/GO Terms for which enrichment should be calculated'}
     printout_params = "have any GO Annotations asocciated with them"
     GOA_DF_QUERIES = {}
@@ -932,7 +1373,8 @@ class GOEnrichmentRunner(EnrichmentRunner):
                  return_nonsignificant: bool, save_csv: bool, fname: str, return_fig: bool, plot_horizontal: bool,
                  plot_ontology_graph: bool, set_name: str, parallel: bool, enrichment_func_name: str, biotypes=None,
                  background_set: set = None, biotype_ref_path: str = None, single_set: bool = False,
-                 random_seed: int = None, ontology_graph_format='pdf', **pvalue_kwargs):
+                 random_seed: int = None, ontology_graph_format='pdf',
+                 annotation_file: Union[str, Path, None] = None, **pvalue_kwargs):
 
         self.propagate_annotations = propagate_annotations.lower()
         super().__init__(genes, [], alpha, '', return_nonsignificant, save_csv, fname, return_fig, plot_horizontal,
@@ -942,8 +1384,11 @@ class GOEnrichmentRunner(EnrichmentRunner):
         if not self.enrichment_func:
             return
         self.dag_tree: ontology.DAGTree = io.fetch_go_basic()
-        self.mod_annotation_dfs: Tuple[pd.DataFrame, ...] = tuple()
+        self.mod_annotation_dfs: Tuple[AnnotationMatrix, ...] = tuple()
         self.gene_id_type = gene_id_type
+        self.annotation_file = Path(annotation_file) if annotation_file else None
+        assert self.annotation_file is None or self.annotation_file.exists(), \
+            f"Annotation file '{self.annotation_file}' does not exist."
         self.taxon_id, self.organism = self.get_taxon_id(organism)
         self.aspects = aspects
         self.evidence_types = evidence_types
@@ -967,6 +1412,12 @@ class GOEnrichmentRunner(EnrichmentRunner):
         return enrichment_func
 
     def get_taxon_id(self, organism: str):
+        if self.annotation_file is not None:
+            # local annotation files are read as-is, without querying remote databases for the organism
+            if isinstance(organism, str) and organism.lower() == 'auto':
+                return None, 'all organisms'
+            elif isinstance(organism, int):
+                return organism, f'taxon ID {organism}'
         if isinstance(organism, str) and organism.lower() == 'auto':
             id_type = None if self.gene_id_type.lower() == 'auto' else self.gene_id_type
             res, map_from = io.infer_taxon_from_gene_ids(self.gene_set, id_type)
@@ -983,89 +1434,144 @@ class GOEnrichmentRunner(EnrichmentRunner):
             self.annotation_df = self.GOA_DF_QUERIES[query_key]
             return
         else:
-            self.annotation_df = self._generate_annotation_df()
+            # check if annotations for the requested query were previously saved to the on-disk cache
+            self.annotation_df = self._load_cached_annotation_df(query_key)
+            if self.annotation_df is None:
+                self.annotation_df = self._generate_annotation_df()
+                # the gene ID type might have been inferred while generating the annotations, so the query key for
+                # the on-disk cache is re-generated
+                self._cache_annotation_df(self._get_query_key())
             # save query results to GOA_DF_QUERIES
             self.GOA_DF_QUERIES[query_key] = self.annotation_df
 
-    def _generate_annotation_df(self) -> pd.DataFrame:
+    def _get_annotation_cache_path(self, query_key: tuple) -> Path:
+        # the version of the GO DAG is part of the key, since annotations are propagated and validated according to it
+        return io.get_annotation_cache_path(('GOA', self.dag_tree.data_version) + tuple(query_key))
+
+    def _load_cached_annotation_df(self, query_key: tuple) -> Union[AnnotationMatrix, None]:
+        # when the gene ID type is inferred automatically, the annotations depend on the enrichment set itself
+        if self.gene_id_type.lower() == 'auto':
+            return None
+        cache_path = self._get_annotation_cache_path(query_key)
+        if not cache_path.exists():
+            return None
+        try:
+            return AnnotationMatrix.load_npz(cache_path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+
+    def _cache_annotation_df(self, query_key: tuple):
+        cache_path = self._get_annotation_cache_path(query_key)
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self.annotation_df.save_npz(cache_path)
+        except OSError:
+            warnings.warn(f"Could not save GO annotations to the on-disk cache at '{cache_path}'.")
+
+    def _generate_annotation_df(self) -> AnnotationMatrix:
         # fetch and process GO annotations
-        sparse_annotation_dict, source_to_gene_id_dict = self._process_annotations()
-        print(f"Found annotations for {len(sparse_annotation_dict)} genes.")
+        annotation_df, source_to_gene_id_dict = self._process_annotations()
+        print(f"Found annotations for {len(annotation_df)} genes.")
 
         # translate gene IDs
-        translated_sparse_annotation_dict = self._translate_gene_ids(sparse_annotation_dict, source_to_gene_id_dict)
+        annotation_df = self._translate_gene_ids(annotation_df, source_to_gene_id_dict)
 
-        # get boolean DataFrame for enrichment
-        annotation_df = parsing.sparse_dict_to_bool_df(translated_sparse_annotation_dict,
-                                                       progress_bar_desc="Generating Gene Ontology Referene Table")
-        return annotation_df
+        # propagate annotations
+        return self._propagate_annotation(annotation_df)
 
-    def _process_annotations(self) -> Tuple[Dict[str, Set[str]], Dict[str, Set[str]]]:
-        if self.propagate_annotations != 'no':
+    def filter_annotations(self):
+        if self.single_set:
+            self.annotation_df = self.annotation_df.subset(terms=self.attributes).sort_index()
+        else:
+            self.annotation_df = self.annotation_df.subset(genes=self.background_set,
+                                                           terms=self.attributes).sort_index()
+
+    def _process_annotations(self) -> Tuple[AnnotationMatrix, Dict[str, Set[str]]]:
+        if self.annotation_file is not None:
+            desc = f"Reading GO annotations from '{self.annotation_file.name}' for {self.organism}"
+        elif self.propagate_annotations != 'no':
             desc = f"Fetching and propagating GO annotations for organism '{self.organism}' (taxon ID:{self.taxon_id})"
         else:
             desc = f"Fetching GO annotations for organism '{self.organism}' (taxon ID:{self.taxon_id})"
 
-        sparse_annotation_dict = {}
+        # gene IDs and GO IDs are interned into dense int32 codes, and every annotation is stored as a pair of codes
+        gene_codes = {}
+        annotation_gene_codes = array.array('i')
+        annotation_term_codes = array.array('i')
         source_to_gene_id_dict = {}
         annotation_iter = self._get_annotation_iterator()
         assert annotation_iter.n_annotations > 0, "No GO annotations were found for the given parameters. " \
                                                   "Please try again with a different set of parameters. "
         for annotation in tqdm(annotation_iter, desc=desc, total=annotation_iter.n_annotations, unit=' annotations'):
             # extract gene_id, go_id, source from the annotation. skip annotations that don't appear in the GO DAG
-
-            if annotation['annotation_class'] not in self.dag_tree:
+            try:
+                # alt_ids are encoded with the code of their main id
+                term_code = self.dag_tree.term_code(annotation['annotation_class'])
+            except KeyError:
                 continue
-            go_id: str = self.dag_tree[annotation['annotation_class']].id  # replace alt_ids with their main id
             gene_id: str = annotation['bioentity_internal_id']
             source: str = annotation['source']
 
-            # add annotation to annotation dictionary
-            if gene_id not in sparse_annotation_dict:
-                sparse_annotation_dict[gene_id] = (set())
-            sparse_annotation_dict[gene_id].add(go_id)
+            # add annotation to annotation arrays
+            annotation_gene_codes.append(gene_codes.setdefault(gene_id, len(gene_codes)))
+            annotation_term_codes.append(term_code)
 
             # add gene id and source to source dict
             if source not in source_to_gene_id_dict:
                 source_to_gene_id_dict[source] = set()
             source_to_gene_id_dict[source].add(gene_id)
-            # propagate annotations
-            self._propagate_annotation(gene_id, go_id, sparse_annotation_dict)
-        return sparse_annotation_dict, source_to_gene_id_dict
+
+        # re-encode the GO IDs densely, so that only GO terms with annotations become columns of the matrix
+        term_codes, annotation_term_codes = np.unique(np.frombuffer(annotation_term_codes, dtype='int32'),
+                                                      return_inverse=True)
+        annotation_df = AnnotationMatrix.from_codes(np.frombuffer(annotation_gene_codes, dtype='int32'),
+                                                    annotation_term_codes, list(gene_codes.keys()),
+                                                    self.dag_tree.decode(term_codes))
+        return annotation_df, source_to_gene_id_dict
 
     def _get_annotation_iterator(self):
+        if self.annotation_file is not None:
+            return io.GAFAnnotationIterator(self.annotation_file, self.aspects,
+                                            self.evidence_types, self.excluded_evidence_types,
+                                            self.databases, self.excluded_databases,
+                                            self.qualifiers, self.excluded_qualifiers,
+                                            taxon_id=self.taxon_id, dag_tree=self.dag_tree)
         return io.GOlrAnnotationIterator(self.taxon_id, self.aspects,
                                          self.evidence_types, self.excluded_evidence_types,
                                          self.databases, self.excluded_databases,
                                          self.qualifiers, self.excluded_qualifiers)
 
-    def _propagate_annotation(self, gene_id: str, go_id: str, sparse_annotation_dict: dict):
+    def _propagate_annotation(self, annotation_df: AnnotationMatrix) -> AnnotationMatrix:
         if self.propagate_annotations != 'no':
-            parents = set(self.dag_tree.upper_induced_graph_iter(go_id))
-            sparse_annotation_dict[gene_id].update(parents)
+            return self.dag_tree.propagate_annotations(annotation_df)
+        return annotation_df
 
-    def _translate_gene_ids(self, sparse_annotation_dict: dict, source_to_gene_id_dict: dict):
-        translated_sparse_annotation_dict = {}
-        sparse_dict_cp = sparse_annotation_dict.copy()
+    def _translate_gene_ids(self, annotation_df: AnnotationMatrix, source_to_gene_id_dict: dict) -> AnnotationMatrix:
+        mapping = {}
         if self.gene_id_type.lower() == 'auto':
             _, self.gene_id_type, _ = io.find_best_gene_mapping(parsing.data_to_tuple(self.gene_set), None,
                                                                 ('UniProtKB',))
         for source in source_to_gene_id_dict:
             translator = io.map_gene_ids(source_to_gene_id_dict[source], source, self.gene_id_type)
-            for gene_id in sparse_dict_cp.copy():
-                if gene_id in translator:
-                    translated_sparse_annotation_dict[translator[gene_id]] = sparse_dict_cp.pop(gene_id)
-        return translated_sparse_annotation_dict
+            for gene_id in annotation_df.index:
+                if gene_id not in mapping and gene_id in translator:
+                    mapping[gene_id] = translator[gene_id]
+        return annotation_df.rename_genes(mapping)
 
     def _get_query_key(self):
-        return (self.taxon_id, self.gene_id_type, parsing.data_to_tuple(self.aspects, sort=True),
-                parsing.data_to_tuple(self.evidence_types, sort=True),
-                parsing.data_to_tuple(self.excluded_evidence_types, sort=True),
-                parsing.data_to_tuple(self.databases, sort=True),
-                parsing.data_to_tuple(self.excluded_databases, sort=True),
-                parsing.data_to_tuple(self.qualifiers, sort=True),
-                parsing.data_to_tuple(self.excluded_qualifiers, sort=True),
-                self.propagate_annotations != 'no')
+        query_key = (self.taxon_id, self.gene_id_type, parsing.data_to_tuple(self.aspects, sort=True),
+                     parsing.data_to_tuple(self.evidence_types, sort=True),
+                     parsing.data_to_tuple(self.excluded_evidence_types, sort=True),
+                     parsing.data_to_tuple(self.databases, sort=True),
+                     parsing.data_to_tuple(self.excluded_databases, sort=True),
+                     parsing.data_to_tuple(self.qualifiers, sort=True),
+                     parsing.data_to_tuple(self.excluded_qualifiers, sort=True),
+                     self.propagate_annotations != 'no')
+        if self.annotation_file is not None:
+            # annotations read from a local file are invalidated whenever the file is modified
+            stat = self.annotation_file.stat()
+            query_key += (str(self.annotation_file.resolve()), stat.st_mtime_ns, stat.st_size)
+        return query_key
 
     def fetch_attributes(self):
         self.attributes = parsing.data_to_list(self.annotation_df.columns)
@@ -1186,10 +1692,7 @@ class GOEnrichmentRunner(EnrichmentRunner):
         return True
 
     def format_results(self, unformatted_results_dict: dict):
-        if self.single_set:
-            columns = ['name', 'samples', self.en_score_col, 'pval']
-        else:
-            columns = ['name', 'samples', 'obs', 'exp', self.en_score_col, 'pval']
+        columns = self._get_results_columns()
         self.results = pd.DataFrame.from_dict(unformatted_results_dict, orient='index', columns=columns)
         self._correct_multiple_comparisons()
         # filter non-significant results
@@ -1207,10 +1710,10 @@ class GOEnrichmentRunner(EnrichmentRunner):
             self.mod_annotation_dfs = (self.annotation_df,)
             result = self._go_classic_pvalues_serial(desc)
         elif self.propagate_annotations == 'elim':
-            self.mod_annotation_dfs = (self.annotation_df.copy(deep=True),)
+            self.mod_annotation_dfs = (self.annotation_df.copy(),)
             result = self._go_elim_pvalues_serial(desc)
         elif self.propagate_annotations == 'weight':
-            self.mod_annotation_dfs = (self.annotation_df.astype("float64", copy=True),)
+            self.mod_annotation_dfs = (self.annotation_df.astype("float64"),)
             result = self._go_weight_pvalues_serial(desc)
         elif self.propagate_annotations == 'all.m':
             result = self._go_allm_pvalues_serial()
@@ -1226,12 +1729,12 @@ class GOEnrichmentRunner(EnrichmentRunner):
             result = self._go_classic_pvalues_parallel(desc)
         elif self.propagate_annotations == 'elim':
             self.mod_annotation_dfs = tuple(
-                self.annotation_df.loc[:, self._go_level_iterator(namespace)].copy(deep=True) for namespace in
+                self.annotation_df.subset(terms=self._go_level_iterator(namespace)) for namespace in
                 self.dag_tree.namespaces)
             result = self._go_elim_pvalues_parallel(desc)
         elif self.propagate_annotations == 'weight':
             self.mod_annotation_dfs = tuple(
-                self.annotation_df.loc[:, self._go_level_iterator(namespace)].astype("float64", copy=True) for namespace
+                self.annotation_df.subset(terms=self._go_level_iterator(namespace)).astype("float64") for namespace
                 in self.dag_tree.namespaces)
             result = self._go_weight_pvalues_parallel(desc)
         elif self.propagate_annotations == 'all.m':
@@ -1261,6 +1764,10 @@ class GOEnrichmentRunner(EnrichmentRunner):
         :return:
         :rtype:
         """
+        batch_func = self._get_batch_enrichment_func()
+        if batch_func is not None:
+            go_term_batch = parsing.data_to_list(go_term_batch)
+            return dict(zip(go_term_batch, batch_func(go_term_batch, mod_df_ind=mod_df_index)))
         return {go_id: self.enrichment_func(go_id, mod_df_ind=mod_df_index, **self.pvalue_kwargs) for go_id in
                 go_term_batch}
 
@@ -1271,7 +1778,7 @@ class GOEnrichmentRunner(EnrichmentRunner):
     def _parallel_over_grouping(self, func, grouping: Iterable, mod_df_inds: Iterable[int],
                                 max_nbytes: Union[str, None] = '1M', progress_bar_desc: str = '') -> dict:
         assert validation.is_method_of_class(func, type(self))
-        result_dicts = generic.ProgressParallel(n_jobs=-1, max_nbytes=max_nbytes, desc=progress_bar_desc)(
+        result_dicts = generic.ProgressParallel(n_jobs=-2, max_nbytes=max_nbytes, desc=progress_bar_desc)(
             joblib.delayed(func)(group, ind) for group, ind in zip(grouping, mod_df_inds))
         result = {}
         for d in result_dicts:
@@ -1288,22 +1795,27 @@ class GOEnrichmentRunner(EnrichmentRunner):
 
     def _go_elim_on_aspect(self, go_aspect: str, mod_df_ind: int = 0, progress_bar_desc: str = None) -> dict:
         result_dict = {}
+        mod_df = self.mod_annotation_dfs[mod_df_ind]
+        n_genes = mod_df.shape[0]
+        # the marked genes of each GO ID are stored as packed bit arrays over the rows of the annotation matrix
         marked_nodes = {}
         go_id_iter = self._go_level_iterator(go_aspect) if progress_bar_desc is None \
             else tqdm(self._go_level_iterator(go_aspect), unit=' GO terms', desc=progress_bar_desc,
                       total=len(self.attributes))
         for go_id in go_id_iter:
             if go_id in marked_nodes:  # if this node was marked, remove from it all marked genes
-                self.mod_annotation_dfs[mod_df_ind].loc[list(marked_nodes[go_id]), go_id] = False
+                mod_df.remove_annotations(go_id, np.unpackbits(marked_nodes.pop(go_id), count=n_genes).astype('bool'))
             result_dict[go_id] = self.enrichment_func(go_id, mod_df_ind=mod_df_ind, **self.pvalue_kwargs)
             # if current GO ID is significantly ENRICHED, mark its ancestors
             if result_dict[go_id][-1] <= self.alpha and result_dict[go_id][-2] > 0:
-                new_marked_genes = set(
-                    self.mod_annotation_dfs[mod_df_ind][go_id][self.mod_annotation_dfs[mod_df_ind][go_id]].index)
+                new_marked_genes = np.packbits(mod_df.term_mask(go_id))
                 for ancestor in self.dag_tree.upper_induced_graph_iter(go_id):
-                    if ancestor not in marked_nodes:
-                        marked_nodes[ancestor] = set()
-                    marked_nodes[ancestor] = marked_nodes[ancestor].union(new_marked_genes)
+                    if ancestor not in self.attributes_set:  # GO IDs without annotations are never tested
+                        continue
+                    if ancestor in marked_nodes:
+                        np.bitwise_or(marked_nodes[ancestor], new_marked_genes, out=marked_nodes[ancestor])
+                    else:
+                        marked_nodes[ancestor] = new_marked_genes.copy()
         return result_dict
 
     def _go_weight_pvalues_serial(self, progress_bar_desc: str = '') -> dict:
@@ -1423,7 +1935,8 @@ class GOEnrichmentRunner(EnrichmentRunner):
         # CASE 1: if go_id is more significant than all children, re-weigh the children and recompute their stats
         if len(sig_children) == 0:
             for child in children:
-                self.mod_annotation_dfs[mod_df_ind].loc[self.annotation_df[go_id], child] *= weights[child]
+                self.mod_annotation_dfs[mod_df_ind].scale_annotations(child, self.annotation_df.term_mask(go_id),
+                                                                      weights[child])
                 result[child][-1] = self._calc_fisher_pval(
                     *self._get_hypergeometric_parameters(child, mod_df_ind=mod_df_ind))
             return
@@ -1434,23 +1947,33 @@ class GOEnrichmentRunner(EnrichmentRunner):
                                itertools.chain([go_id], self.dag_tree.upper_induced_graph_iter(go_id)) if
                                ancestor in self.attributes_set}
         for sig_child in sig_children:
+            sig_child_mask = self.annotation_df.term_mask(sig_child)
             for inclusive_ancestor in inclusive_ancestors:
-                self.mod_annotation_dfs[mod_df_ind].loc[self.annotation_df[sig_child], inclusive_ancestor] *= (
-                    1 / weights[sig_child])
+                self.mod_annotation_dfs[mod_df_ind].scale_annotations(inclusive_ancestor, sig_child_mask,
+                                                                      1 / weights[sig_child])
         # re-run compute_term_sig, only with the children which were not more significant than their parents
         self._compute_term_sig(mod_df_ind, go_id, children.difference(sig_children), weights, result, tolerance)
 
-    def _randomization_enrichment(self, go_id: str, reps: int, mod_df_ind: int = None) -> list:
+    def _randomization_enrichment(self, go_id: str, reps: int, mod_df_ind: int = None,
+                                  stop_after: Union[int, None] = None) -> list:
         mod_df_ind = 0 if mod_df_ind is None else mod_df_ind
         go_name = self.dag_tree[go_id].name
-        bg_df = self.mod_annotation_dfs[mod_df_ind][go_id]
+        mod_df = self.mod_annotation_dfs[mod_df_ind]
         bg_size = self.annotation_df.shape[0]
         n = len(self.gene_set)
-        expected_fraction = self.annotation_df[go_id].sum() / bg_size
-        observed_fraction = self.annotation_df.loc[list(self.gene_set), go_id].sum() / n
-        mod_observed_fraction = bg_df.loc[list(self.gene_set)].sum() / n
+        expected_fraction = self.annotation_df.term_sum(go_id) / bg_size
+        observed_fraction = self.annotation_df.term_sum(go_id, self.gene_set) / n
+        mod_observed_fraction = mod_df.term_sum(go_id, self.gene_set) / n
         log2_fold_enrichment = np.log2(observed_fraction / expected_fraction) if observed_fraction > 0 else -np.inf
-        pval = self._calc_randomization_pval(n, log2_fold_enrichment, bg_df.values, reps, mod_observed_fraction)
+        generic.seed_jit_rng(generic.get_seed_sequence(self.random_seed, key=go_id))
+        if stop_after is not None:
+            pval, achieved_reps = self._calc_adaptive_randomization_pval(n, log2_fold_enrichment,
+                                                                         mod_df.term_vector(go_id), reps,
+                                                                         mod_observed_fraction, stop_after)
+            return [go_name, n, int(n * observed_fraction), n * expected_fraction, log2_fold_enrichment, pval,
+                    achieved_reps]
+        pval = self._calc_randomization_pval(n, log2_fold_enrichment, mod_df.term_vector(go_id), reps,
+                                             mod_observed_fraction)
         return [go_name, n, int(n * observed_fraction), n * expected_fraction, log2_fold_enrichment, pval]
 
     def _xlmhg_enrichment(self, go_id: str, mod_df_ind: int = None) -> list:
@@ -1464,11 +1987,19 @@ class GOEnrichmentRunner(EnrichmentRunner):
         en_score, pval = self._extract_xlmhg_results(res_obj_fwd, res_obj_rev)
         return [go_name, n, en_score, pval]
 
+    def _xlmhg_enrichment_batch(self, go_ids: List[str], mod_df_ind: int = None) -> list:
+        mod_df_ind = 0 if mod_df_ind is None else mod_df_ind
+        index_vecs = self._get_xlmhg_index_vectors_batch(self.mod_annotation_dfs[mod_df_ind], go_ids)
+        # GO term batches are already distributed between worker processes when running in parallel
+        results = self._calc_xlmhg_batch(index_vecs)
+        n = len(self.ranked_genes)
+        return [[self.dag_tree[go_id].name, n, en_score, pval] for go_id, (en_score, pval) in zip(go_ids, results)]
+
     def _generate_xlmhg_index_vectors(self, attribute: str, mod_df_ind: int = None) -> Tuple[np.ndarray, np.ndarray]:
         n = len(self.ranked_genes)
-        ranked_srs = self.mod_annotation_dfs[mod_df_ind].loc[self.ranked_genes, attribute]
-        assert ranked_srs.shape[0] == len(self.ranked_genes)
-        index_vec = np.uint16(np.nonzero(ranked_srs.values)[0])
+        ranked_vec = self.mod_annotation_dfs[mod_df_ind].term_vector(attribute, self.ranked_genes)
+        assert ranked_vec.shape[0] == len(self.ranked_genes)
+        index_vec = np.uint16(np.nonzero(ranked_vec)[0])
         rev_index_vec = np.uint16([n - 1 - index_vec[i - 1] for i in range(len(index_vec), 0, -1)])
         return index_vec, rev_index_vec
 
@@ -1476,8 +2007,8 @@ class GOEnrichmentRunner(EnrichmentRunner):
         bg_size, de_size, go_size, go_de_size = self._get_hypergeometric_parameters(go_id, mod_df_ind=mod_df_ind)
 
         go_name = self.dag_tree[go_id].name
-        expected_fraction = self.annotation_df[go_id].sum() / bg_size
-        observed_fraction = self.annotation_df.loc[list(self.gene_set), go_id].sum() / de_size
+        expected_fraction = self.annotation_df.term_sum(go_id) / bg_size
+        observed_fraction = self.annotation_df.term_sum(go_id, self.gene_set) / de_size
         log2_fold_enrichment = np.log2(observed_fraction / expected_fraction) if observed_fraction > 0 else -np.inf
         pval = self._calc_hypergeometric_pval(bg_size=bg_size, de_size=de_size, go_size=go_size, go_de_size=go_de_size)
         obs, exp = int(de_size * observed_fraction), de_size * expected_fraction
@@ -1486,8 +2017,8 @@ class GOEnrichmentRunner(EnrichmentRunner):
     def _fisher_enrichment(self, go_id: str, mod_df_ind: int = None) -> list:
         bg_size, de_size, go_size, go_de_size = self._get_hypergeometric_parameters(go_id, mod_df_ind)
 
-        expected_fraction = self.annotation_df[go_id].sum() / bg_size
-        observed_fraction = self.annotation_df.loc[list(self.gene_set), go_id].sum() / de_size
+        expected_fraction = self.annotation_df.term_sum(go_id) / bg_size
+        observed_fraction = self.annotation_df.term_sum(go_id, self.gene_set) / de_size
         log2_fold_enrichment = np.log2(observed_fraction / expected_fraction) if observed_fraction > 0 else -np.inf
         pval = self._calc_fisher_pval(bg_size=bg_size, de_size=de_size, go_size=go_size, go_de_size=go_de_size)
         obs, exp = int(de_size * observed_fraction), de_size * expected_fraction
@@ -1496,6 +2027,47 @@ class GOEnrichmentRunner(EnrichmentRunner):
     def _get_hypergeometric_parameters(self, go_id: str, mod_df_ind: int = None) -> Tuple[int, int, int, int]:
         bg_size = self.mod_annotation_dfs[mod_df_ind].shape[0]
         de_size = len(self.gene_set)
-        go_size = int(np.ceil(self.mod_annotation_dfs[mod_df_ind][go_id].sum()))
-        go_de_size = int(np.ceil(self.mod_annotation_dfs[mod_df_ind].loc[list(self.gene_set), go_id].sum()))
+        go_size = int(np.ceil(self.mod_annotation_dfs[mod_df_ind].term_sum(go_id)))
+        go_de_size = int(np.ceil(self.mod_annotation_dfs[mod_df_ind].term_sum(go_id, self.gene_set)))
         return bg_size, de_size, go_size, go_de_size
+
+    def _get_annotation_counts(self, annotation_df: AnnotationMatrix, attributes: List[str]
+                               ) -> Tuple[np.ndarray, np.ndarray]:
+        return annotation_df.sum(attributes), annotation_df.sum(attributes, genes=self.gene_set)
+
+    def _get_hypergeometric_parameters_batch(self, go_ids: List[str], mod_df_ind: int = None
+                                             ) -> Tuple[int, int, np.ndarray, np.ndarray]:
+        bg_size = self.mod_annotation_dfs[mod_df_ind].shape[0]
+        de_size = len(self.gene_set)
+        go_size, go_de_size = self._get_annotation_counts(self.mod_annotation_dfs[mod_df_ind], go_ids)
+        return bg_size, de_size, np.ceil(go_size).astype(int), np.ceil(go_de_size).astype(int)
+
+    def _format_go_batch_results(self, go_ids: List[str], bg_size: int, de_size: int, pvals: np.ndarray) -> list:
+        # observed and expected values are always reported based on the original (unmodified) annotations
+        go_size, go_de_size = self._get_annotation_counts(self.annotation_df, go_ids)
+        names = [self.dag_tree[go_id].name for go_id in go_ids]
+        return self._format_batch_results(names, bg_size, de_size, go_size, go_de_size, pvals)
+
+    def _hypergeometric_enrichment_batch(self, go_ids: List[str], mod_df_ind: int = None) -> list:
+        bg_size, de_size, go_size, go_de_size = self._get_hypergeometric_parameters_batch(go_ids, mod_df_ind)
+        pvals = self._calc_hypergeometric_pvals(bg_size, de_size, go_size, go_de_size)
+        return self._format_go_batch_results(go_ids, bg_size, de_size, pvals)
+
+    def _fisher_enrichment_batch(self, go_ids: List[str], mod_df_ind: int = None) -> list:
+        bg_size, de_size, go_size, go_de_size = self._get_hypergeometric_parameters_batch(go_ids, mod_df_ind)
+        pvals = self._calc_fisher_pvals(bg_size, de_size, go_size, go_de_size)
+        return self._format_go_batch_results(go_ids, bg_size, de_size, pvals)
+
+    def _randomization_enrichment_batch(self, go_ids: List[str], mod_df_ind: int = None) -> list:
+        mod_df_ind = 0 if mod_df_ind is None else mod_df_ind
+        mod_df = self.mod_annotation_dfs[mod_df_ind]
+        bg_size = self.annotation_df.shape[0]
+        de_size = len(self.gene_set)
+        go_size, go_de_size = self._get_annotation_counts(self.annotation_df, go_ids)
+        _, mod_go_de_size = self._get_annotation_counts(mod_df, go_ids)
+        log2_fold_enrichment = self._calc_log2_fold_enrichment(go_size / bg_size, go_de_size / de_size)
+        # GO term batches are already distributed between worker processes when running in parallel
+        pvals, achieved_reps = self._calc_randomization_pvals(
+            de_size, log2_fold_enrichment, self._get_randomization_matrix(mod_df, go_ids), self.pvalue_kwargs['reps'],
+            mod_go_de_size / de_size, self.random_seed, stop_after=self.pvalue_kwargs.get('stop_after', None))
+        return self._add_achieved_reps(self._format_go_batch_results(go_ids, bg_size, de_size, pvals), achieved_reps)
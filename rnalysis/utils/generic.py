@@ -1,7 +1,8 @@
+import hashlib
 import itertools
 import inspect
 from functools import lru_cache
-from typing import Union, Callable, Tuple
+from typing import Union, Callable, Tuple, List
 import warnings
 
 import numpy as np
@@ -38,7 +39,8 @@ class ProgressParallel(joblib.Parallel):
         self._total = total
         self._desc = desc
         self._unit = unit
-        kwargs['n_jobs'] = -2
+        # by default, use all CPU cores but one
+        kwargs.setdefault('n_jobs', -2)
         super().__init__(*args, **kwargs, verbose=100)
 
     def __call__(self, *args, **kwargs):
@@ -54,6 +56,64 @@ class ProgressParallel(joblib.Parallel):
         self._pbar.refresh()
 
 
+def get_seed_sequence(random_seed: Union[int, np.random.SeedSequence, None] = None, key: str = None
+                      ) -> np.random.SeedSequence:
+    """
+    Return the root of a reproducible family of random streams. \
+    If 'key' is specified, return an independent stream of that family, which depends only on 'random_seed' and on \
+    'key' (and not on the order of calls or on the process it was created in), \
+    so that randomized computations of the same key (for example, an attribute name) \
+    give identical results in serial and in parallel.
+
+    :param random_seed: a non-negative integer seed, an existing SeedSequence, or None to pick a seed at random.
+    :param key: an optional name of the random stream.
+    """
+    if not isinstance(random_seed, np.random.SeedSequence):
+        assert random_seed is None or (isinstance(random_seed, int) and random_seed >= 0), \
+            f"random_seed must be a non-negative integer. Value '{random_seed}' is invalid."
+        random_seed = np.random.SeedSequence(random_seed)
+    if key is None:
+        return random_seed
+    return np.random.SeedSequence(random_seed.entropy, spawn_key=random_seed.spawn_key + _get_spawn_key(key))
+
+
+def _get_spawn_key(key) -> Tuple[int, ...]:
+    # the key is hashed into 128 bits, so that tens of thousands of keys (such as GO terms) practically never collide.
+    # keys of different types (such as 1 and '1') give different streams,
+    # while numpy scalars give the same streams as the matching Python values
+    if isinstance(key, str):
+        key_str = f'str:{key}'
+    elif isinstance(key, (int, np.integer)):
+        key_str = f'int:{int(key)}'
+    else:
+        key_str = f'{type(key).__name__}:{key!r}'
+    digest = hashlib.sha256(key_str.encode('utf-8')).digest()
+    return tuple(int(word) for word in np.frombuffer(digest, dtype=np.uint32)[:4])
+
+
+def spawn_rngs(random_seed: Union[int, np.random.SeedSequence, None], n_streams: int) -> List[np.random.Generator]:
+    """
+    Return 'n_streams' statistically independent random number generators, derived from the given seed. \
+    Each stream can be used by a different worker, and a given seed always gives the same streams.
+    """
+    random_seed = get_seed_sequence(random_seed)
+    return [np.random.default_rng(get_seed_sequence(random_seed, key=i)) for i in range(n_streams)]
+
+
+def seed_jit_rng(seed_sequence: np.random.SeedSequence):
+    """
+    Seed the random number generator used by jit-compiled functions from a SeedSequence. \
+    numba keeps a separate random state, which is not affected by calling numpy.random.seed() from Python code; \
+    when numba is not installed, the legacy global random state of numpy is seeded instead.
+    """
+    _seed_jit_rng(int(seed_sequence.generate_state(1, np.uint32)[0]))
+
+
+@numba.jit(nopython=True)
+def _seed_jit_rng(seed: int):
+    np.random.seed(seed)
+
+
 def standard_box_cox(data: Union[np.ndarray, pd.DataFrame]) -> Union[np.ndarray, pd.DataFrame]:
     """
 
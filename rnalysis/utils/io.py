@@ -1,19 +1,28 @@
+import collections
 import concurrent.futures
+import contextlib
+import csv
 import functools
+import gzip
+import hashlib
 import inspect
 import json
 import os
+import pickle
 import queue
 import re
 import shutil
+import sqlite3
 import subprocess
+import threading
 import time
 import typing
 import warnings
+import weakref
 from datetime import date, datetime
 from functools import lru_cache
 from io import BytesIO, StringIO
-from itertools import chain
+from itertools import chain, islice
 from pathlib import Path
 from typing import List, Set, Union, Iterable, Tuple, Dict, Any, Callable
 from urllib.parse import urlparse, parse_qs, urlencode
@@ -31,6 +40,14 @@ try:
     from typing import Literal
 except ImportError:
     from typing_extensions import Literal
+try:
+    import pyarrow
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
 from rnalysis.utils import parsing, validation, ontology, __path__
 from rnalysis import __version__
 
@@ -56,6 +73,19 @@ def get_todays_cache_dir() -> Path:
     return cache_dir.joinpath(today)
 
 
+def get_annotation_cache_dir() -> Path:
+    cache_dir = Path(appdirs.user_cache_dir('RNAlysis'))
+    return cache_dir.joinpath('annotations')
+
+
+def get_annotation_cache_path(key: tuple, suffix: str = '.npz') -> Path:
+    """
+    Returns the path of a persistent (not date-stamped) annotation cache file, named by a hash of the given query key.
+    """
+    key_hash = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    return get_annotation_cache_dir().joinpath(f'{key_hash}{suffix}')
+
+
 def load_cached_file(filename: str):
     directory = get_todays_cache_dir()
     file_path = directory.joinpath(filename)
@@ -200,8 +230,11 @@ def load_gui_session(session_filename: Union[str, Path]):
     return items, item_names, item_types, item_properties, pipeline_names, pipeline_files
 
 
+CSV_SNIFF_SIZE = 2 ** 16
+
+
 def load_csv(filename: Union[str, Path], index_col: int = None, drop_columns: Union[str, List[str]] = False,
-             squeeze=False, comment: str = None):
+             squeeze=False, comment: str = None, dtype: Union[str, type, Dict[Any, Union[str, type]], None] = None):
     """
     loads a csv df into a pandas dataframe.
 
@@ -217,30 +250,37 @@ def load_csv(filename: Union[str, Path], index_col: int = None, drop_columns: Un
     :type comment: str (optional)
     :param comment: Indicates remainder of line should not be parsed. \
     If found at the beginning of a line, the line will be ignored altogether. This parameter must be a single character.
+    :type dtype: str, type, dict of column name -> str/type, or None (default=None)
+    :param dtype: optional data type hints for the columns of the csv file (for example 'float32', \
+    or {'gene_name': 'category'}). Columns that are not specified will have their data type inferred.
     :return: a pandas dataframe of the csv file
     """
     assert isinstance(filename,
                       (str, Path)), f"Filename must be of type str or pathlib.Path, is instead {type(filename)}."
     encoding = 'ISO-8859-1'
-    kwargs = dict(sep=None, engine='python', encoding=encoding, comment=comment, skipinitialspace=True)
+    kwargs = dict(encoding=encoding, comment=comment, skipinitialspace=True, dtype=dtype)
+    # the delimiter is detected once from the beginning of the file, so the file can be parsed by the fast C engine.
+    # if the delimiter cannot be detected, the (much slower) Python engine is used to detect it line by line.
+    delimiter = _sniff_delimiter(filename, encoding, comment)
+    if delimiter is None:
+        kwargs.update(sep=None, engine='python')
+    else:
+        kwargs.update(sep=delimiter, engine='c')
     if index_col is not None:
         kwargs['index_col'] = index_col
     df = pd.read_csv(filename, **kwargs)
     if squeeze:
         df = df.squeeze("columns")
-    df.index = [ind.strip() if isinstance(ind, str) else ind for ind in df.index]
+    df.index = _strip_index(df.index)
     if isinstance(df, pd.DataFrame):
-        df.columns = [col.strip() if isinstance(col, str) else col for col in df.columns]
-
-        for col in df.columns:
-            # check if the columns contains string data
-            if pd.api.types.is_string_dtype(df[col]):
-                df[col] = df[col].str.strip()
-    else:
-        if pd.api.types.is_string_dtype(df):
-            df = df.str.strip()
-    # if there remained only empty string "", change to Nan
-    df = df.replace({"": np.nan})
+        df.columns = _strip_index(df.columns)
+        # check which columns contain string data
+        str_cols = [col for col in df.columns if df[col].dtype == object]
+        if len(str_cols) > 0:
+            df[str_cols] = df[str_cols].apply(lambda col: col.str.strip()).replace({"": np.nan})
+    elif pd.api.types.is_string_dtype(df) and df.dtype == object:
+        # if there remained only empty string "", change to Nan
+        df = df.str.strip().replace({"": np.nan})
     if drop_columns:
         drop_columns_lst = parsing.data_to_list(drop_columns)
         assert validation.isinstanceiter(drop_columns_lst,
@@ -255,6 +295,44 @@ def load_csv(filename: Union[str, Path], index_col: int = None, drop_columns: Un
     return df
 
 
+def _sniff_delimiter(filename: Union[str, Path], encoding: str, comment: Union[str, None]) -> Union[str, None]:
+    if Path(filename).suffix.lower() in {'.zip', '.bz2', '.xz', '.zst', '.tar'}:
+        return None
+    with open(filename, 'rb') as f:
+        is_gzip = f.read(2) == b'\x1f\x8b'
+    opener = gzip.open if is_gzip else open
+    with opener(filename, 'rb') as f:
+        sample = f.read(CSV_SNIFF_SIZE).decode(encoding)
+
+    lines = sample.splitlines(keepends=True)
+    # the last line of the sample may be truncated
+    if len(sample) == CSV_SNIFF_SIZE and len(lines) > 1:
+        lines = lines[:-1]
+    if comment is not None:
+        lines = [line[:line.find(comment)] if comment in line else line for line in lines]
+        lines = [line for line in lines if len(line) > 0]
+    if len(lines) == 0:
+        return None
+
+    # the delimiter is sniffed from the first line, like the Python engine of pandas does.
+    # if that fails, the rest of the sample is used as well.
+    sniffer = csv.Sniffer()
+    for sniff_sample in (lines[0], ''.join(lines)):
+        try:
+            return sniffer.sniff(sniff_sample).delimiter
+        except csv.Error:
+            continue
+    return None
+
+
+def _strip_index(index: pd.Index) -> pd.Index:
+    if index.dtype == object:
+        if pd.api.types.infer_dtype(index, skipna=False) == 'string':
+            return pd.Index(index.str.strip().to_numpy())
+        return pd.Index([ind.strip() if isinstance(ind, str) else ind for ind in index])
+    return pd.Index(index.to_numpy())
+
+
 def save_csv(df: pd.DataFrame, filename: Union[str, Path], suffix: str = None, index: bool = True):
     """
     save a pandas DataFrame to csv.
@@ -274,6 +352,396 @@ def save_csv(df: pd.DataFrame, filename: Union[str, Path], suffix: str = None, i
     df.to_csv(new_fname, header=True, index=index)
 
 
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+FEATHER_SUFFIXES = ('.feather', '.arrow')
+COLUMNAR_METADATA_KEY = b'rnalysis'
+
+
+def is_columnar_file(filename: Union[str, Path]) -> bool:
+    """
+    Returns True if the suffix of the file indicates a columnar binary table (Parquet or Feather), and False otherwise.
+    """
+    return Path(filename).suffix.lower() in PARQUET_SUFFIXES + FEATHER_SUFFIXES
+
+
+def _assert_pyarrow():
+    if not HAS_PYARROW:
+        raise ImportError("Python package 'pyarrow' is not installed. \n"
+                          "If you want to read or write Parquet/Feather files, "
+                          "please install python package 'pyarrow' and try again. ")
+
+
+def save_columnar(df: Union[pd.DataFrame, pd.Series], filename: Union[str, Path], metadata: dict = None):
+    """
+    Save a pandas DataFrame or Series to a columnar binary file. \
+    The format of the file is determined by its suffix: '.feather'/'.arrow' for Feather files, \
+    and '.parquet'/'.pq' (or any other suffix) for Parquet files. \
+    Unlike csv files, columnar files preserve the data types of the table.
+
+    :param df: pandas DataFrame or Series to be saved
+    :param filename: path of the saved file
+    :type filename: str or Path
+    :param metadata: optional JSON-serializable metadata to store alongside the table.
+    :type metadata: dict or None (default=None)
+    """
+    _assert_pyarrow()
+    metadata = {} if metadata is None else dict(metadata)
+    if isinstance(df, pd.Series):
+        metadata['_series_name'] = df.name
+        df = df.to_frame(name='values' if df.name is None else df.name)
+    metadata['_rnalysis_version'] = __version__
+
+    table = pyarrow.Table.from_pandas(df, preserve_index=True)
+    schema_metadata = dict(table.schema.metadata or {})
+    schema_metadata[COLUMNAR_METADATA_KEY] = json.dumps(metadata).encode('utf8')
+    table = table.replace_schema_metadata(schema_metadata)
+
+    if Path(filename).suffix.lower() in FEATHER_SUFFIXES:
+        pyarrow.feather.write_feather(table, filename)
+    else:
+        pyarrow.parquet.write_table(table, filename)
+
+
+def load_columnar(filename: Union[str, Path]) -> Tuple[Union[pd.DataFrame, pd.Series], dict]:
+    """
+    Load a table from a columnar binary file (Parquet or Feather), along with the metadata that was saved with it.
+
+    :param filename: path of the file to load
+    :type filename: str or Path
+    :return: the loaded table (a Series if a Series was saved, otherwise a DataFrame), \
+    and a dictionary of the metadata saved alongside it.
+    :rtype: Tuple[pd.DataFrame or pd.Series, dict]
+    """
+    _assert_pyarrow()
+    assert Path(filename).exists(), f"File '{filename}' does not exist."
+    if Path(filename).suffix.lower() in FEATHER_SUFFIXES:
+        table = pyarrow.feather.read_table(filename)
+    else:
+        table = pyarrow.parquet.read_table(filename)
+    schema_metadata = table.schema.metadata or {}
+    metadata = json.loads(schema_metadata[COLUMNAR_METADATA_KEY]) if COLUMNAR_METADATA_KEY in schema_metadata else {}
+    metadata.pop('_rnalysis_version', None)
+
+    df = table.to_pandas()
+    if '_series_name' in metadata:
+        df = df.squeeze('columns')
+        df.name = metadata.pop('_series_name')
+    return df, metadata
+
+
+MEMMAP_TABLE_SUFFIX = '.mmap'
+MEMMAP_VALUES_FILENAME = 'values.npy'
+MEMMAP_LABELS_FILENAME = 'labels.json'
+MEMMAP_CHUNK_ROWS = 2 ** 16
+# range of pandas versions (inclusive, exclusive) whose block manager exposes the arrays of a table through '_mgr.arrays'
+PANDAS_INTERNALS_VERSIONS = ((1, 3), (3, 0))
+
+
+def is_memmap_table(filename: Union[str, Path]) -> bool:
+    """
+    Returns True if the path points to a memory-mapped table (a '.mmap' directory created by save_memmap_table), \
+    and False otherwise.
+    """
+    path = Path(filename)
+    return path.suffix.lower() == MEMMAP_TABLE_SUFFIX and path.joinpath(MEMMAP_VALUES_FILENAME).exists()
+
+
+def create_memmap_table(path: Union[str, Path], index: pd.Index, columns: pd.Index, dtype) -> np.memmap:
+    """
+    Create an empty memory-mapped table on disk, and return its (writeable) array of values. \
+    Values are stored column by column, so every column of the table can be read from the disk on its own.
+
+    :param path: path of the memory-mapped table (a directory with the suffix '.mmap')
+    :type path: str or Path
+    :param index: row labels of the table
+    :type index: pd.Index
+    :param columns: column labels of the table
+    :type columns: pd.Index
+    :param dtype: numeric data type of the table
+    :return: a writeable memory-mapped array of shape (len(index), len(columns))
+    :rtype: np.memmap
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    labels = {'index': pd.Index(index).tolist(), 'index_name': pd.Index(index).name,
+              'columns': pd.Index(columns).tolist()}
+    with open(path.joinpath(MEMMAP_LABELS_FILENAME), 'w') as f:
+        json.dump(labels, f)
+    return np.lib.format.open_memmap(path.joinpath(MEMMAP_VALUES_FILENAME), mode='w+', dtype=dtype,
+                                     shape=(len(index), len(columns)), fortran_order=True)
+
+
+def save_memmap_table(df: pd.DataFrame, path: Union[str, Path], chunk_rows: int = MEMMAP_CHUNK_ROWS):
+    """
+    Save a numeric pandas DataFrame as a memory-mapped table. The table is written in chunks of rows, \
+    so DataFrames that are themselves memory-mapped are never loaded into memory in full.
+
+    :param df: numeric pandas DataFrame to be saved
+    :type df: pd.DataFrame
+    :param path: path of the memory-mapped table (a directory with the suffix '.mmap')
+    :type path: str or Path
+    :param chunk_rows: number of rows to write at a time
+    :type chunk_rows: int (default=65536)
+    """
+    assert isinstance(df, pd.DataFrame), f"Only DataFrames can be saved as memory-mapped tables, got {type(df)}."
+    non_numeric = [col for col in df.columns if not pd.api.types.is_numeric_dtype(df[col])]
+    assert len(non_numeric) == 0, f"Memory-mapped tables can only contain numeric columns. " \
+                                  f"The following columns are not numeric: {non_numeric}"
+    dtype = np.result_type(*df.dtypes) if df.shape[1] > 0 else np.float64
+    values = create_memmap_table(path, df.index, df.columns, dtype)
+    for chunk_start in range(0, df.shape[0], chunk_rows):
+        values[chunk_start:chunk_start + chunk_rows] = df.iloc[chunk_start:chunk_start + chunk_rows].to_numpy()
+    values.flush()
+
+
+def load_memmap_table(path: Union[str, Path], temporary: bool = False) -> pd.DataFrame:
+    """
+    Load a memory-mapped table as a read-only pandas DataFrame. \
+    The values of the table are not read into memory: they are read from the disk on demand \
+    whenever they are accessed.
+
+    :param path: path of the memory-mapped table (a directory with the suffix '.mmap')
+    :type path: str or Path
+    :param temporary: if True, the table will be deleted from the disk once the returned DataFrame \
+    and all of the tables that share its values are no longer in use. \
+    Tables that are still in use when Python exits are kept.
+    :type temporary: bool (default=False)
+    :return: a read-only DataFrame backed by the memory-mapped table
+    :rtype: pd.DataFrame
+    """
+    path = Path(path)
+    assert is_memmap_table(path), f"'{path}' is not a memory-mapped table."
+    with open(path.joinpath(MEMMAP_LABELS_FILENAME)) as f:
+        labels = json.load(f)
+    values = np.load(path.joinpath(MEMMAP_VALUES_FILENAME), mmap_mode='r')
+    if temporary:
+        # every view of the table keeps the memory-mapped array alive, so it is only collected once no table uses it
+        finalizer = weakref.finalize(values, shutil.rmtree, str(path), True)
+        finalizer.atexit = False
+    return pd.DataFrame(values, index=pd.Index(labels['index'], name=labels['index_name']),
+                        columns=pd.Index(labels['columns']), copy=False)
+
+
+def _is_pandas_internals_supported(version: str = pd.__version__) -> bool:
+    version = tuple(int(i) for i in re.findall(r'\d+', version)[:2])
+    return PANDAS_INTERNALS_VERSIONS[0] <= version < PANDAS_INTERNALS_VERSIONS[1]
+
+
+def get_table_arrays(df: Union[pd.DataFrame, pd.Series]) -> list:
+    """
+    Returns the arrays that hold the values of the given DataFrame or Series. \
+    Values with a non-numpy data type (such as categorical columns) are returned as pandas extension arrays. \
+    On supported versions of pandas, the arrays are read directly from the block manager of the table. \
+    Otherwise, they are gathered column by column through the public pandas API.
+    """
+    if _is_pandas_internals_supported():
+        return list(df._mgr.arrays)
+    columns = [df] if isinstance(df, pd.Series) else [df.iloc[:, i] for i in range(df.shape[1])]
+    return [col.to_numpy(copy=False) if isinstance(col.dtype, np.dtype) else col.array for col in columns]
+
+
+def get_memmap_table_path(df: Union[pd.DataFrame, pd.Series]) -> Union[Path, None]:
+    """
+    Returns the path of the memory-mapped table that backs the given DataFrame, \
+    or None if the DataFrame is stored in memory.
+    """
+    if not isinstance(df, pd.DataFrame) or df.shape[1] == 0:
+        return None
+    paths = set()
+    for arr in get_table_arrays(df):
+        path = None
+        while isinstance(arr, np.ndarray):
+            if isinstance(arr, np.memmap) and arr.filename is not None:
+                path = Path(arr.filename).parent
+                break
+            arr = arr.base
+        paths.add(path)
+    return paths.pop() if len(paths) == 1 else None
+
+
+def subset_memmap_table(df: pd.DataFrame, mask: Union[pd.Series, np.ndarray], path: Union[str, Path],
+                        chunk_rows: int = MEMMAP_CHUNK_ROWS, temporary: bool = False) -> pd.DataFrame:
+    """
+    Write the rows of a DataFrame that match a boolean mask to a new memory-mapped table, \
+    streaming over chunks of rows, and return the new table. \
+    If 'temporary' is True, the new table is deleted once it is no longer in use (see load_memmap_table).
+    """
+    mask = np.asarray(mask, dtype=bool)
+    values = create_memmap_table(path, df.index[mask], df.columns, np.result_type(*df.dtypes))
+    row = 0
+    for chunk_start in range(0, df.shape[0], chunk_rows):
+        chunk = df.iloc[chunk_start:chunk_start + chunk_rows].to_numpy()[mask[chunk_start:chunk_start + chunk_rows]]
+        values[row:row + chunk.shape[0]] = chunk
+        row += chunk.shape[0]
+    values.flush()
+    del values
+    return load_memmap_table(path, temporary)
+
+
+def scale_memmap_table(df: pd.DataFrame, scaling_factors: pd.Series, path: Union[str, Path],
+                       chunk_rows: int = MEMMAP_CHUNK_ROWS, temporary: bool = False) -> pd.DataFrame:
+    """
+    Divide every column of a DataFrame by its scaling factor and write the result to a new memory-mapped table, \
+    streaming over chunks of rows, and return the new table. \
+    If 'temporary' is True, the new table is deleted once it is no longer in use (see load_memmap_table).
+    """
+    factors = scaling_factors.reindex(df.columns).fillna(1).to_numpy(dtype='float64')
+    values = create_memmap_table(path, df.index, df.columns, np.result_type(*df.dtypes, np.float64))
+    for chunk_start in range(0, df.shape[0], chunk_rows):
+        values[chunk_start:chunk_start + chunk_rows] = \
+            df.iloc[chunk_start:chunk_start + chunk_rows].to_numpy() / factors
+    values.flush()
+    del values
+    return load_memmap_table(path, temporary)
+
+
+def iter_row_chunks(df: Union[pd.DataFrame, pd.Series], chunk_rows: int = MEMMAP_CHUNK_ROWS):
+    """
+    Iterate over a DataFrame in chunks of rows. Chunks of memory-mapped tables are views of the table, \
+    so only one chunk at a time is read into memory.
+    """
+    for chunk_start in range(0, max(df.shape[0], 1), chunk_rows):
+        yield df.iloc[chunk_start:chunk_start + chunk_rows]
+
+
+class HTTPClient:
+    """
+    A thread-safe HTTP client that is shared by the remote annotation fetchers of RNAlysis. \
+    Connections are pooled and kept alive, so consecutive requests to the same host reuse the same connections. \
+    Requests that fail due to connection errors or transient server errors (429, 500, 502, 503, 504) \
+    are retried with exponential backoff. Requests with non-idempotent methods (such as POST) \
+    are only retried if the connection to the server could not be established, so they are never sent twice. \
+    In addition, the number of concurrent requests and the rate of requests to every host can be limited.
+    """
+    __slots__ = {'session': 'requests Session with a pooled and retrying HTTP adapter',
+                 'max_concurrent_requests': 'maximal number of concurrent requests to a single host',
+                 'host_rate_limits': 'maximal number of requests per second to specific hosts',
+                 '_host_semaphores': 'semaphores limiting the number of concurrent requests to every host',
+                 '_host_next_request_times': 'the earliest time at which the next request to every host may start',
+                 '_lock': 'lock guarding the per-host semaphores and request times'}
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+    # rate limits published by the services' usage guidelines (requests per second)
+    DEFAULT_HOST_RATE_LIMITS = {'rest.ensembl.org': 15}
+
+    def __init__(self, max_retries: int = 5, backoff_factor: float = 0.25, max_concurrent_requests: int = 8,
+                 host_rate_limits: Union[Dict[str, float], None] = None, pool_size: int = 16):
+        """
+        :param max_retries: maximal number of times a failed request will be retried.
+        :type max_retries: int (default=5)
+        :param backoff_factor: the n-th retry of a request will be delayed by backoff_factor * 2^(n-1) seconds, \
+        unless the server specifies a different delay via a 'Retry-After' header.
+        :type backoff_factor: float (default=0.25)
+        :param max_concurrent_requests: maximal number of concurrent requests to a single host.
+        :type max_concurrent_requests: int (default=8)
+        :param host_rate_limits: maximal number of requests per second to specific hosts \
+        (for example: {'rest.ensembl.org': 15}). If None, the default rate limits will be used.
+        :type host_rate_limits: dict of str to float or None (default=None)
+        :param pool_size: maximal number of connections to keep alive for every host.
+        :type pool_size: int (default=16)
+        """
+        assert isinstance(max_retries, int) and max_retries >= 0, f"Invalid value for 'max_retries': {max_retries}."
+        assert backoff_factor >= 0, f"Invalid value for 'backoff_factor': {backoff_factor}."
+        assert isinstance(max_concurrent_requests, int) and max_concurrent_requests > 0, \
+            f"Invalid value for 'max_concurrent_requests': {max_concurrent_requests}."
+        self.max_concurrent_requests = max_concurrent_requests
+        self.host_rate_limits = self.DEFAULT_HOST_RATE_LIMITS.copy() if host_rate_limits is None else \
+            host_rate_limits.copy()
+        for host, rate in self.host_rate_limits.items():
+            assert rate > 0, f"Invalid rate limit for host '{host}': {rate}."
+
+        # only idempotent methods (urllib3's default) are retried after the request was sent, since retrying a POST
+        # (such as submitting a UniProt ID mapping job) could repeat its effect. connection errors are retried for
+        # all methods. the last response is returned if all retries failed, so callers can inspect its status as usual
+        retries = Retry(total=max_retries, backoff_factor=backoff_factor, status_forcelist=self.RETRY_STATUS_CODES,
+                        raise_on_status=False)
+        adapter = HTTPAdapter(max_retries=retries, pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_next_request_times: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _get_host_semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._host_semaphores:
+                self._host_semaphores[host] = threading.BoundedSemaphore(self.max_concurrent_requests)
+            return self._host_semaphores[host]
+
+    def _wait_for_rate_limit(self, host: str):
+        if host not in self.host_rate_limits:
+            return
+        # reserve the next free time slot for this host, then wait outside the lock until the slot begins
+        with self._lock:
+            now = time.monotonic()
+            request_time = max(now, self._host_next_request_times.get(host, now))
+            self._host_next_request_times[host] = request_time + 1 / self.host_rate_limits[host]
+        if request_time > now:
+            time.sleep(request_time - now)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send an HTTP request through the client's connection pool, and return the server's response. \
+        Accepts the same keyword arguments as requests.request().
+
+        :param method: HTTP method of the request (for example: 'GET', 'POST').
+        :type method: str
+        :param url: URL of the request.
+        :type url: str
+        """
+        host = urlparse(url).netloc
+        with self._get_host_semaphore(host):
+            self._wait_for_rate_limit(host)
+            return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_HTTP_CLIENT: Union[HTTPClient, None] = None
+_HTTP_CLIENT_LOCK = threading.Lock()
+
+
+def get_http_client() -> HTTPClient:
+    """
+    Returns the shared HTTPClient used for remote requests, creating it with the default settings if needed.
+    """
+    global _HTTP_CLIENT
+    with _HTTP_CLIENT_LOCK:
+        if _HTTP_CLIENT is None:
+            _HTTP_CLIENT = HTTPClient()
+        return _HTTP_CLIENT
+
+
+def configure_http_client(**kwargs) -> HTTPClient:
+    """
+    Replace the shared HTTPClient used for remote requests with a new HTTPClient. \
+    Accepts the same keyword arguments as HTTPClient.
+    """
+    global _HTTP_CLIENT
+    client = HTTPClient(**kwargs)
+    with _HTTP_CLIENT_LOCK:
+        old_client, _HTTP_CLIENT = _HTTP_CLIENT, client
+    if old_client is not None:
+        old_client.close()
+    return client
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    return get_http_client().get(url, **kwargs)
+
+
+def http_post(url: str, **kwargs) -> requests.Response:
+    return get_http_client().post(url, **kwargs)
+
+
 class KEGGAnnotationIterator:
     URL = 'https://rest.kegg.jp/'
     TAXON_MAPPING_URL = 'https://www.genome.jp/kegg-bin/download_htext?htext=br08610'
@@ -305,7 +773,7 @@ class KEGGAnnotationIterator:
 
         is_cached = False
         address = KEGGAnnotationIterator.URL + operation + '/' + '/'.join(parsing.data_to_list(arguments))
-        response = requests.get(address)
+        response = http_get(address)
         if not response.ok:
             response.raise_for_status()
         if cached_filename is not None:
@@ -326,7 +794,7 @@ class KEGGAnnotationIterator:
                 return taxon_tree
             except json.decoder.JSONDecodeError:
                 pass
-        with requests.get(KEGGAnnotationIterator.TAXON_MAPPING_URL, params=dict(format='json')) as req:
+        with http_get(KEGGAnnotationIterator.TAXON_MAPPING_URL, params=dict(format='json')) as req:
             content = req.content.decode('utf8')
             cache_file(content, cached_filename)
             taxon_tree = json.loads(content)
@@ -428,6 +896,8 @@ class GOlrAnnotationIterator:
                  'default_params': 'the default parameters for GET requests',
                  'n_annotations': 'number of annotations matching the filtering criteria'}
     URL = 'http://golr-aux.geneontology.io/solr/select?'
+    # maximal number of annotation pages that are requested or held in memory at the same time
+    MAX_PENDING_PAGES = 4
 
     _EXPERIMENTAL_EVIDENCE = {'EXP', 'IDA', 'IPI', 'IMP', 'IGI', 'IEP', 'HTP', 'HDA', 'HMP', 'HGI', 'HEP'}
     _PHYLOGENETIC_EVIDENCE = {'IBA', 'IBD', 'IKR', 'IRD'}
@@ -554,7 +1024,7 @@ class GOlrAnnotationIterator:
             if cached_file is not None:
                 return cached_file
 
-        response = requests.get(GOlrAnnotationIterator.URL, params=params)
+        response = http_get(GOlrAnnotationIterator.URL, params=params)
         if not response.ok:
             response.raise_for_status()
         if cached_filename is not None:
@@ -652,30 +1122,290 @@ class GOlrAnnotationIterator:
             query.append(' OR '.join([f'qualifier:"{qual}"' for qual in self.qualifiers]))
         return query
 
+    def _fetch_annotation_page(self, params: dict) -> List[dict]:
+        """
+        Fetch a single page of annotations from GOlr, and return its decoded annotation records. \
+        The page's raw JSON text is discarded as soon as it is decoded.
+        :param params: the get request's parameters.
+        :type params: dict
+        """
+        return json.loads(self._golr_request(params, self._generate_cached_filename(params['start'])))['response'][
+            'docs']
+
     def _annotation_generator_func(self):
         """
-        Generator function that fetches all annotations from GOlr that match the user's input and yields them.
+        Generator function that fetches all annotations from GOlr that match the user's input and yields them. \
+        Pages of annotations are fetched concurrently, but at most MAX_PENDING_PAGES pages are requested \
+        or held in memory at the same time, so memory usage does not grow with the total number of annotations. \
+        Pages are yielded in order, and a new page is requested whenever a page is consumed.
         """
         max_iters = int(np.ceil(self.n_annotations / self.iter_size))
         params = self.default_params.copy()
         params['omitHeader'] = "true"  # omit the header from the json response
-        param_dicts_list = []
-        start = 0
 
-        for i in range(max_iters):
-            params['start'] = start
-            start += self.iter_size
-            params['rows'] = self.iter_size if i <= max_iters - 1 else self.n_annotations % self.iter_size
-            param_dicts_list.append(params.copy())
+        def param_dicts_iter():
+            start = 0
+            for i in range(max_iters):
+                params['start'] = start
+                start += self.iter_size
+                params['rows'] = self.iter_size if i <= max_iters - 1 else self.n_annotations % self.iter_size
+                yield params.copy()
+
+        param_dicts = param_dicts_iter()
+        pending_pages = collections.deque()
+        with concurrent.futures.ThreadPoolExecutor(self.MAX_PENDING_PAGES) as executor:
+            try:
+                for param_dict in islice(param_dicts, self.MAX_PENDING_PAGES):
+                    pending_pages.append(executor.submit(self._fetch_annotation_page, param_dict))
+                while len(pending_pages) > 0:
+                    records = pending_pages.popleft().result()
+                    # refill the window before yielding, so the next pages are fetched while records are consumed
+                    for param_dict in islice(param_dicts, 1):
+                        pending_pages.append(executor.submit(self._fetch_annotation_page, param_dict))
+                    yield from records
+                    del records
+            finally:
+                # if the generator is closed early, do not wait for pages that were not started yet
+                for task in pending_pages:
+                    task.cancel()
+
+    def __iter__(self):
+        return self._annotation_generator_func()
 
-        processes = []
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            for param_dict in param_dicts_list:
-                processes.append(executor.submit(self._golr_request, param_dict,
-                                                 self._generate_cached_filename(param_dict['start'])))
-        for task in concurrent.futures.as_completed(processes):
-            for record in json.loads(task.result())['response']['docs']:
-                yield record
+
+class GAFAnnotationIterator:
+    """
+    A class that reads GO annotations from a local GO Annotation File (GAF 2.x) \
+    or Gene Product Association Data file (GPAD 1.1 or 2.0), optionally compressed with gzip. \
+    Annotations are filtered with the same parameters as GOlrAnnotationIterator, \
+    so this class can be used in place of GOlrAnnotationIterator when no internet connection is available. \
+    This class can be used as an iterable.
+
+
+    **Attributes**
+
+    n_annotations: int
+        The number of annotations in the file that match the user's query.
+    """
+    __slots__ = {'path': 'path of the annotation file',
+                 'file_format': "format of the annotation file ('gaf', 'gpad1' or 'gpad2')",
+                 'taxon_id': 'NCBI Taxon ID for which to read GO Annotations, or None to read all annotations',
+                 'aspects': 'the GO Aspects for which GO Annotations should be read',
+                 'qualifiers': 'the qualifiers for which GO Annotations should be read',
+                 'excluded_qualifiers': 'the qualifiers for which GO Annotations should NOT be read',
+                 'databases': 'the ontology databases from which GO Annotations should be read',
+                 'excluded_databases': 'the ontology databases from which GO Annotations should NOT be read',
+                 'evidence_types': 'the evidence types for which GO Annotations should be read',
+                 'excluded_evidence_types': 'the evidence types for which GO Annotations should NOT be read',
+                 'chunk_size': 'number of lines to be parsed at once',
+                 'dag_tree': 'GO DAG Tree used to find the aspects of GO Terms in GPAD files',
+                 'n_annotations': 'number of annotations matching the filtering criteria',
+                 '_annotation_chunks': 'filtered annotations, stored as tables of categorical columns'}
+    _COLUMNS = {'gaf': dict(n_columns=17, db=0, gene_id=1, qualifier=3, go_id=4, evidence=6, aspect=8, taxon=12),
+                'gpad1': dict(n_columns=12, db=0, gene_id=1, qualifier=2, go_id=3, evidence=5),
+                'gpad2': dict(n_columns=12, gene_id=0, negation=1, relation=2, go_id=3, evidence=5)}
+    # default mapping of ECO evidence codes (used by GPAD files) to GO evidence codes,
+    # according to the GO Consortium's gaf-eco-mapping
+    _ECO_TO_EVIDENCE = {'ECO:0000269': 'EXP', 'ECO:0000314': 'IDA', 'ECO:0000353': 'IPI', 'ECO:0000315': 'IMP',
+                        'ECO:0000316': 'IGI', 'ECO:0000270': 'IEP', 'ECO:0006056': 'HTP', 'ECO:0007005': 'HDA',
+                        'ECO:0007001': 'HMP', 'ECO:0007003': 'HGI', 'ECO:0007007': 'HEP', 'ECO:0000318': 'IBA',
+                        'ECO:0000319': 'IBD', 'ECO:0000320': 'IKR', 'ECO:0000321': 'IRD', 'ECO:0000250': 'ISS',
+                        'ECO:0000266': 'ISO', 'ECO:0000247': 'ISA', 'ECO:0000255': 'ISM', 'ECO:0000317': 'IGC',
+                        'ECO:0000245': 'RCA', 'ECO:0000304': 'TAS', 'ECO:0000303': 'NAS', 'ECO:0000305': 'IC',
+                        'ECO:0000307': 'ND', 'ECO:0000501': 'IEA', 'ECO:0000256': 'IEA', 'ECO:0000265': 'IEA',
+                        'ECO:0000322': 'IEA', 'ECO:0000323': 'IEA', 'ECO:0000363': 'IEA', 'ECO:0000364': 'IEA',
+                        'ECO:0007669': 'IEA'}
+    # GPAD 2.0 files specify qualifiers as Relations Ontology IDs
+    _RELATION_TO_QUALIFIER = {'RO:0002326': 'contributes_to', 'RO:0002325': 'colocalizes_with'}
+    _NAMESPACE_TO_ASPECT = {'biological_process': 'P', 'molecular_function': 'F', 'cellular_component': 'C'}
+
+    def __init__(self, path: Union[str, Path], aspects: Union[str, Iterable[str]] = 'any',
+                 evidence_types: Union[str, Iterable[str]] = 'any',
+                 excluded_evidence_types: Union[str, Iterable[str]] = None,
+                 databases: Union[str, Iterable[str]] = 'any',
+                 excluded_databases: Union[str, Iterable[str]] = None,
+                 qualifiers: Union[str, Iterable[str]] = 'any',
+                 excluded_qualifiers: Union[str, Iterable[str]] = None,
+                 taxon_id: Union[int, None] = None, dag_tree: Union[ontology.DAGTree, None] = None,
+                 chunk_size: int = 200000):
+        """
+        :param path: path of a GAF or GPAD annotation file. The file may be compressed with gzip.
+        :type path: str or Path
+        :param aspects: only annotations from the specified GO aspects will be included in the analysis. \
+        Legal aspects are 'biological_process' (P), 'molecular_function' (F), and 'cellular_component' (C).
+        :type aspects: str, Iterable of str, 'biological_process', 'molecular_function', 'cellular_component', \
+        or 'any' (default='any')
+        :param evidence_types: only annotations with the specified evidence types will be included in the analysis. \
+        GPAD files specify evidence with ECO codes, which are converted to GO evidence codes.
+        :type evidence_types: str, Iterable of str, 'experimental', 'phylogenetic' ,'computational', 'author', \
+        'curator', 'electronic', or 'any' (default='any')
+        :param excluded_evidence_types: annotations with the specified evidence types will be \
+        excluded from the analysis.
+        :type excluded_evidence_types: str, Iterable of str, 'experimental', 'phylogenetic' ,'computational', \
+        'author', 'curator', 'electronic', or None (default=None)
+        :param databases: only annotations from the specified databases will be included in the analysis.
+        :type databases: str, Iterable of str, or 'any' (default)
+        :param excluded_databases: annotations from the specified databases will be excluded from the analysis.
+        :type excluded_databases: str, Iterable of str, or None (default)
+        :param qualifiers: only annotations with the speficied qualifiers will be included in the analysis. \
+        Legal qualifiers are 'not', 'contributes_to', and/or 'colocalizes_with'.
+        :type qualifiers: str, Iterable of str, or 'any' (default)
+        :param excluded_qualifiers: annotations with the speficied qualifiers will be excluded from the analysis. \
+        Legal qualifiers are 'not', 'contributes_to', and/or 'colocalizes_with'.
+        :type excluded_qualifiers: str, iterable of str, or None (default)
+        :param taxon_id: if specified, only annotations of this NCBI Taxon ID will be included in the analysis. \
+        GPAD files do not specify taxon IDs, and therefore this parameter does not affect them.
+        :type taxon_id: int or None (default=None)
+        :param dag_tree: GO DAG Tree used to find the GO aspect of annotations in GPAD files, \
+        which do not specify GO aspects. If None, the GO DAG Tree will be fetched if needed.
+        :type dag_tree: DAGTree or None (default=None)
+        :param chunk_size: number of lines of the annotation file that are parsed at once.
+        :type chunk_size: int (default=200000)
+        """
+        self.path = Path(path)
+        self.taxon_id = taxon_id
+        self.chunk_size = chunk_size
+        self.dag_tree = dag_tree
+        self.aspects: Set[str] = GOlrAnnotationIterator._parse_go_aspects(aspects)
+        self.qualifiers: Set[str] = set() if qualifiers == 'any' else parsing.data_to_set(qualifiers)
+        self.excluded_qualifiers: Set[str] = set() if excluded_qualifiers is None else \
+            parsing.data_to_set(excluded_qualifiers)
+        self.databases: Set[str] = parsing.data_to_set(databases)
+        self.excluded_databases: Set[str] = set() if excluded_databases is None else \
+            parsing.data_to_set(excluded_databases)
+        self.evidence_types: Set[str] = GOlrAnnotationIterator._parse_evidence_types(evidence_types)
+        self.excluded_evidence_types: Set[str] = GOlrAnnotationIterator._parse_evidence_types(
+            excluded_evidence_types)
+        self._validate_parameters()
+
+        self.file_format, n_header_lines = self._parse_header()
+        self._annotation_chunks = [chunk for chunk in self._read_chunks(n_header_lines) if len(chunk) > 0]
+        self.n_annotations = sum(len(chunk) for chunk in self._annotation_chunks)
+
+    def _validate_parameters(self):
+        """
+        Validate the type and legality of the user's inputs.
+        """
+        assert self.path.exists(), f"Annotation file '{self.path}' does not exist."
+        assert self.taxon_id is None or isinstance(self.taxon_id, int), \
+            f"'taxon_id' must be an integer or None. Instead got type {type(self.taxon_id)}."
+        assert isinstance(self.chunk_size, int) and self.chunk_size > 0, \
+            f"Invalid value for 'chunk_size': {self.chunk_size}."
+        for field, legals in zip((self.aspects, chain(self.evidence_types, self.excluded_evidence_types),
+                                  chain(self.qualifiers, self.excluded_qualifiers)),
+                                 (GOlrAnnotationIterator.LEGAL_ASPECTS, GOlrAnnotationIterator.LEGAL_EVIDENCES,
+                                  GOlrAnnotationIterator.LEGAL_QUALIFIERS)):
+            for item in field:
+                assert item in legals, f"Illegal item {item}. Legal items are {legals}."
+
+    def _get_compression(self) -> Union[str, None]:
+        with open(self.path, 'rb') as f:
+            return 'gzip' if f.read(2) == b'\x1f\x8b' else None
+
+    def _parse_header(self) -> Tuple[str, int]:
+        """
+        Detect the format of the annotation file from its header, and count the number of header lines.
+        """
+        opener = gzip.open if self._get_compression() == 'gzip' else open
+        file_format = None
+        n_header_lines = 0
+        with opener(self.path, 'rt', encoding='utf8') as f:
+            for line in f:
+                if not line.startswith('!'):
+                    break
+                n_header_lines += 1
+                tag = line[1:].split(':', 1)[0].strip().lower()
+                if tag == 'gaf-version':
+                    file_format = 'gaf'
+                elif tag in {'gpa-version', 'gpad-version'}:
+                    version = line.split(':', 1)[1].strip()
+                    file_format = 'gpad2' if version.startswith('2') else 'gpad1'
+        if file_format is None:
+            # files without a version header are assumed to be GAF files, like in most GO Consortium tools
+            file_format = 'gaf'
+        return file_format, n_header_lines
+
+    def _read_chunks(self, n_header_lines: int):
+        """
+        Parse the annotation file in chunks using pandas' C parser, and yield the filtered annotations of every chunk.
+        """
+        columns = self._COLUMNS[self.file_format]
+        usecols = sorted({val for key, val in columns.items() if key != 'n_columns'})
+        reader = pd.read_csv(self.path, sep='\t', header=None, names=list(range(columns['n_columns'])),
+                             usecols=usecols, skiprows=n_header_lines, dtype=str, na_filter=False, quoting=3,
+                             compression=self._get_compression(), chunksize=self.chunk_size, comment=None,
+                             engine='c')
+        for chunk in reader:
+            yield self._filter_chunk(chunk, columns)
+
+    def _filter_chunk(self, chunk: pd.DataFrame, columns: dict) -> pd.DataFrame:
+        if self.file_format == 'gpad2':
+            # GPAD 2.0 files specify the database and the gene ID together, as a single CURIE (e.g. 'UniProtKB:P12345')
+            curies = chunk[columns['gene_id']].str.partition(':')
+            dbs = curies[0]
+            gene_ids = curies[2]
+            qualifiers = (chunk[columns['negation']].str.upper() == 'NOT').map({True: 'not', False: ''}) + '|' + \
+                         chunk[columns['relation']].map(self._RELATION_TO_QUALIFIER).fillna('')
+        else:
+            dbs = chunk[columns['db']]
+            gene_ids = chunk[columns['gene_id']]
+            qualifiers = chunk[columns['qualifier']].str.lower()
+        go_ids = chunk[columns['go_id']]
+
+        keep = np.ones(len(chunk), dtype='bool')
+        # filter by taxon ID
+        if self.taxon_id is not None and 'taxon' in columns:
+            # the first taxon is that of the gene product. additional taxa refer to interacting organisms
+            taxon = f'taxon:{self.taxon_id}'
+            taxa = chunk[columns['taxon']]
+            keep &= ((taxa == taxon) | taxa.str.startswith(taxon + '|')).values
+        # filter by aspect
+        if self.aspects != GOlrAnnotationIterator.LEGAL_ASPECTS:
+            if 'aspect' in columns:
+                aspects = chunk[columns['aspect']]
+            else:
+                aspects = go_ids.map(self._get_aspect)
+            keep &= aspects.isin(self.aspects).values
+        # filter by evidence type
+        if self.file_format == 'gaf':
+            evidence = chunk[columns['evidence']]
+        else:
+            evidence = chunk[columns['evidence']].map(self._ECO_TO_EVIDENCE)
+        if self.evidence_types != GOlrAnnotationIterator.LEGAL_EVIDENCES:
+            keep &= evidence.isin(self.evidence_types).values
+        keep &= ~evidence.isin(self.excluded_evidence_types).values
+        # filter by database
+        if self.databases != {'any'}:
+            keep &= dbs.isin(self.databases).values
+        keep &= ~dbs.isin(self.excluded_databases).values
+        # filter by qualifier
+        if len(self.qualifiers) > 0:
+            keep &= np.logical_or.reduce([self._has_qualifier(qualifiers, qual) for qual in self.qualifiers])
+        for qual in self.excluded_qualifiers:
+            keep &= ~self._has_qualifier(qualifiers, qual)
+
+        return pd.DataFrame({'annotation_class': go_ids[keep], 'bioentity_internal_id': gene_ids[keep],
+                             'source': dbs[keep]}).astype('category')
+
+    @staticmethod
+    def _has_qualifier(qualifiers: pd.Series, qualifier: str) -> np.ndarray:
+        return qualifiers.str.contains(rf'(?:^|\|){re.escape(qualifier.lower())}(?:\||$)', regex=True).values
+
+    def _get_aspect(self, go_id: str) -> Union[str, None]:
+        if self.dag_tree is None:
+            self.dag_tree = fetch_go_basic()
+        if go_id not in self.dag_tree:
+            return None
+        return self._NAMESPACE_TO_ASPECT.get(self.dag_tree[go_id].namespace)
+
+    def _annotation_generator_func(self):
+        """
+        Generator function that yields all annotations from the file that match the user's input.
+        """
+        for chunk in self._annotation_chunks:
+            for go_id, gene_id, source in zip(chunk['annotation_class'].tolist(),
+                                              chunk['bioentity_internal_id'].tolist(), chunk['source'].tolist()):
+                yield {'annotation_class': go_id, 'bioentity_internal_id': gene_id, 'source': source}
 
     def __iter__(self):
         return self._annotation_generator_func()
@@ -702,7 +1432,7 @@ def _ensmbl_lookup_post_request(gene_ids: Tuple[str]) -> Dict[str, Dict[str, Any
         for chunk in data_chunks:
             data = {"ids": parsing.data_to_list(chunk)}
             processes.append(
-                executor.submit(requests.post, url, headers=headers, data=data.__repr__().replace("'", '"')))
+                executor.submit(http_post, url, headers=headers, data=data.__repr__().replace("'", '"')))
 
     # req = requests.post(url, headers=headers, data=data.__repr__().replace("'", '"'))
     for task in concurrent.futures.as_completed(processes):
@@ -785,7 +1515,7 @@ def map_taxon_id(taxon_name: Union[str, int]) -> Tuple[int, str]:
         'format': 'tsv',
         'query': taxon_name,
     }
-    req = requests.get(url, params=params)
+    req = http_get(url, params=params)
     if not req.ok:
         req.raise_for_status()
     res = pd.read_csv(StringIO(req.text), sep='\t').sort_values(by='Taxon Id', ascending=True)
@@ -843,8 +1573,84 @@ class GeneIDTranslator:
             return False
 
 
+def get_gene_id_cache_path() -> Path:
+    return get_annotation_cache_dir().joinpath('gene_id_translations.sqlite')
+
+
+class GeneIDCache:
+    """
+    A persistent on-disk store of gene ID translations, backed by an SQLite database. \
+    Translations are keyed by the UniProt names of the source and target identifier types and by the gene ID, \
+    and gene IDs that could not be mapped are stored as well, so that they are not re-submitted to UniProt. \
+    Stored translations expire after 'max_age_days' days, since UniProt's mappings change between releases.
+    """
+    __slots__ = {'path': 'path of the SQLite database file',
+                 'max_age_days': 'number of days after which stored translations expire'}
+    MAX_VARIABLES = 900  # SQLite limits the number of variables in a single statement
+
+    def __init__(self, path: Union[str, Path, None] = None, max_age_days: float = 90):
+        self.path = get_gene_id_cache_path() if path is None else Path(path)
+        self.max_age_days = max_age_days
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("CREATE TABLE IF NOT EXISTS translations (map_from TEXT NOT NULL, map_to TEXT NOT NULL, "
+                     "gene_id TEXT NOT NULL, mapped_id TEXT, timestamp REAL NOT NULL, "
+                     "PRIMARY KEY (map_from, map_to, gene_id))")
+        return conn
+
+    def lookup(self, map_from: str, map_to: str, ids: Iterable[str]) -> Tuple[Dict[str, str], Set[str]]:
+        """
+        Look up stored translations of the given gene IDs.
+
+        :return: a dictionary of the stored translations, and a set of the gene IDs which are known to be unmappable.
+        """
+        mapped = {}
+        unmapped = set()
+        ids = parsing.data_to_list(ids)
+        min_timestamp = time.time() - self.max_age_days * 86400
+        try:
+            with contextlib.closing(self._connect()) as conn:
+                for start in range(0, len(ids), self.MAX_VARIABLES):
+                    chunk = ids[start:start + self.MAX_VARIABLES]
+                    rows = conn.execute(f"SELECT gene_id, mapped_id FROM translations WHERE map_from = ? AND "
+                                        f"map_to = ? AND timestamp >= ? AND gene_id IN "
+                                        f"({','.join('?' * len(chunk))})",
+                                        [map_from, map_to, min_timestamp] + chunk)
+                    for gene_id, mapped_id in rows:
+                        if mapped_id is None:
+                            unmapped.add(gene_id)
+                        else:
+                            mapped[gene_id] = mapped_id
+        except sqlite3.Error:
+            warnings.warn(f"Could not read gene ID translations from the cache at '{self.path}'.")
+        return mapped, unmapped
+
+    def store(self, map_from: str, map_to: str, ids: Iterable[str], mapping_dict: Dict[str, str]):
+        """
+        Store the translations of the given gene IDs. Gene IDs that do not appear in 'mapping_dict' \
+        are stored as unmappable.
+        """
+        timestamp = time.time()
+        rows = [(map_from, map_to, gene_id, mapping_dict.get(gene_id), timestamp) for gene_id in
+                parsing.data_to_set(ids).union(mapping_dict.keys())]
+        try:
+            with contextlib.closing(self._connect()) as conn, conn:
+                conn.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)", rows)
+        except sqlite3.Error:
+            warnings.warn(f"Could not save gene ID translations to the cache at '{self.path}'.")
+
+    def clear(self):
+        """
+        Remove all stored translations.
+        """
+        if self.path.exists():
+            self.path.unlink()
+
+
 def submit_id_mapping(url: str, from_db: str, to_db: str, ids: List[str]):
-    req = requests.post(f"{url}/idmapping/run", data={"from": from_db, "to": to_db, "ids": ",".join(ids)})
+    req = http_post(f"{url}/idmapping/run", data={"from": from_db, "to": to_db, "ids": ",".join(ids)})
     req.raise_for_status()
     return req.json()["jobId"]
 
@@ -954,12 +1760,88 @@ def get_mapping_results(api_url: str, from_db: str, to_db: str, ids: List[str],
         return results
 
 
+def _map_gene_ids_request(ids: List[str], map_from: str, map_to: str, id_dict_from: Dict[str, str],
+                          id_dict_to: Dict[str, str], verbose: bool = True) -> Union[Dict[str, str], None]:
+    """
+    Submit gene IDs to the UniProt ID Mapping service, and resolve duplicate mappings by their annotation score.
+
+    :return: a dictionary of the uniquely mapped gene IDs, or None if the mapping job failed.
+    """
+    UNIPROTKB_TO = "UniProtKB_to"
+    POLLING_INTERVAL = 3
+    API_URL = "https://rest.uniprot.org"
+
+    session = get_http_client()
+    results = get_mapping_results(api_url=API_URL, from_db=id_dict_from[map_from], to_db=id_dict_to[map_to],
+                                  ids=ids,
+                                  polling_interval=POLLING_INTERVAL, session=session, verbose=verbose)
+
+    # a failed mapping job is not cached, while an empty result means that none of the gene IDs could be mapped
+    if results is None:
+        return None
+    if len(results) <= 1:
+        return {}
+
+    df = pd.DataFrame([line.split('\t') for line in results[1:]], columns=results[0].split('\t'))
+    # sort annotations by decreasing annotation score, so that the most relevant annotations are at the top
+    if 'Annotation' in df.columns:
+        df['Annotation'][df['Annotation'] == ''] = '0'
+        df['Annotation'] = (df['Annotation']).astype(float)
+        df = df.sort_values('Annotation', ascending=False)
+    output_dict = {}
+    duplicates = {}
+
+    # sort duplicates from one-to-one mappings
+    for match in df.iterrows():
+        match_from = match[1][0]
+        match_to = match[1][1]
+        if match_from in output_dict or match_from in duplicates:
+            if match_from not in duplicates:
+                duplicates[match_from] = [output_dict.pop(match_from)]
+            duplicates[match_from].append(match_to)
+        else:
+            output_dict[match_from] = match_to
+
+    # handle duplicates
+    if len(duplicates) > 0:
+        if map_to == UNIPROTKB_TO:
+            for match_from, match_to_options in duplicates.items():
+                output_dict[match_from] = match_to_options[0]
+            duplicates_chosen = {match_from: match_to[0] for match_from, match_to in duplicates.items()}
+
+        # if there are unproccessed duplicates, map them in reverse and sort then by annotation score
+        else:
+            ids_to_rev_map = parsing.flatten(parsing.data_to_list(duplicates.values()))
+
+            rev_results = get_mapping_results(api_url=API_URL, from_db=id_dict_to[map_to],
+                                              to_db=id_dict_from[UNIPROTKB_TO], ids=ids_to_rev_map,
+                                              polling_interval=POLLING_INTERVAL, session=session, verbose=verbose)
+            # TODO: if job fails?
+            rev_df = pd.DataFrame([line.split('\t') for line in rev_results[1:]],
+                                  columns=rev_results[0].split('\t'))
+            rev_df['Annotation'] = (rev_df['Annotation']).astype(float)
+            rev_df = rev_df.sort_values('Annotation', ascending=False)
+            duplicates_chosen = {}
+            for match in rev_df.iterrows():
+                match_from_rev = match[1][0]
+                match_to_rev = match[1][1]
+                if match_to_rev not in output_dict:
+                    output_dict[match_to_rev] = match_from_rev
+                    duplicates_chosen[match_to_rev] = match_from_rev
+        if verbose:
+            warnings.warn(f"Duplicate mappings were found for {len(duplicates)} genes.  The following mapping "
+                          f"was chosen for them based on their annotation score: {duplicates_chosen}")
+    return output_dict
+
+
 def map_gene_ids(ids: Union[str, Iterable[str]], map_from: str, map_to: str = 'UniProtKB AC',
                  verbose: bool = True) -> GeneIDTranslator:
     """
     Map gene IDs from one identifier type to another using the UniProt ID Mapping service. \
     If some IDs cannot be mapped uniquely, duplicate mappings will be resolved by their UniProtKB Annotation Score. \
-    Gene IDs that could not be mapped or were not recognized will be dropped from the output.
+    Gene IDs that could not be mapped or were not recognized will be dropped from the output. \
+    Translations are saved to a persistent on-disk cache, and only gene IDs that were not translated before \
+    are submitted to UniProt.
 
     :param ids: gene IDs to be mapped
     :type ids: str or an Iterable of strings
@@ -1015,71 +1897,23 @@ def map_gene_ids(ids: Union[str, Iterable[str]], map_from: str, map_to: str = 'U
 
     # make sure that 'map_from' and 'map_to' are recognized identifier types
     elif id_dict_to[map_to] != 'Null' and id_dict_from[map_from] != 'Null':
-        POLLING_INTERVAL = 3
-        API_URL = "https://rest.uniprot.org"
-
-        retries = Retry(total=5, backoff_factor=0.25, status_forcelist=[500, 502, 503, 504])
-        session = requests.Session()
-        session.mount("https://", HTTPAdapter(max_retries=retries))
-
-        results = get_mapping_results(api_url=API_URL, from_db=id_dict_from[map_from], to_db=id_dict_to[map_to],
-                                      ids=ids,
-                                      polling_interval=POLLING_INTERVAL, session=session, verbose=verbose)
+        # only gene IDs that were not translated in previous sessions are submitted to UniProt
+        cache = GeneIDCache()
+        from_db, to_db = id_dict_from[map_from], id_dict_to[map_to]
+        output_dict, unmappable = cache.lookup(from_db, to_db, ids)
+        ids_to_map = [gene_id for gene_id in ids if gene_id not in output_dict and gene_id not in unmappable]
+        if len(ids_to_map) > 0:
+            mapped = _map_gene_ids_request(ids_to_map, map_from, map_to, id_dict_from, id_dict_to, verbose)
+            if mapped is None:
+                mapped = {}
+            else:
+                cache.store(from_db, to_db, ids_to_map, mapped)
+            output_dict.update(mapped)
 
-        if results is None or len(results) <= 1:
+        if len(output_dict) == 0:
             if verbose:
                 warnings.warn(f"No entries were mapped successfully.")
             return GeneIDTranslator({})
-
-        df = pd.DataFrame([line.split('\t') for line in results[1:]], columns=results[0].split('\t'))
-        # sort annotations by decreasing annotation score, so that the most relevant annotations are at the top
-        if 'Annotation' in df.columns:
-            df['Annotation'][df['Annotation'] == ''] = '0'
-            df['Annotation'] = (df['Annotation']).astype(float)
-            df = df.sort_values('Annotation', ascending=False)
-        output_dict = {}
-        duplicates = {}
-
-        # sort duplicates from one-to-one mappings
-        for match in df.iterrows():
-            match_from = match[1][0]
-            match_to = match[1][1]
-            if match_from in output_dict or match_from in duplicates:
-                if match_from not in duplicates:
-                    duplicates[match_from] = [output_dict.pop(match_from)]
-                duplicates[match_from].append(match_to)
-            else:
-                output_dict[match_from] = match_to
-
-        # handle duplicates
-        if len(duplicates) > 0:
-            if map_to == UNIPROTKB_TO:
-                for match_from, match_to_options in duplicates.items():
-                    output_dict[match_from] = match_to_options[0]
-                duplicates_chosen = {match_from: match_to[0] for match_from, match_to in duplicates.items()}
-
-            # if there are unproccessed duplicates, map them in reverse and sort then by annotation score
-            else:
-                ids_to_rev_map = parsing.flatten(parsing.data_to_list(duplicates.values()))
-
-                rev_results = get_mapping_results(api_url=API_URL, from_db=id_dict_to[map_to],
-                                                  to_db=id_dict_from[UNIPROTKB_TO], ids=ids_to_rev_map,
-                                                  polling_interval=POLLING_INTERVAL, session=session, verbose=verbose)
-                # TODO: if job fails?
-                rev_df = pd.DataFrame([line.split('\t') for line in rev_results[1:]],
-                                      columns=rev_results[0].split('\t'))
-                rev_df['Annotation'] = (rev_df['Annotation']).astype(float)
-                rev_df = rev_df.sort_values('Annotation', ascending=False)
-                duplicates_chosen = {}
-                for match in rev_df.iterrows():
-                    match_from_rev = match[1][0]
-                    match_to_rev = match[1][1]
-                    if match_to_rev not in output_dict:
-                        output_dict[match_to_rev] = match_from_rev
-                        duplicates_chosen[match_to_rev] = match_from_rev
-            if verbose:
-                warnings.warn(f"Duplicate mappings were found for {len(duplicates)} genes.  The following mapping "
-                              f"was chosen for them based on their annotation score: {duplicates_chosen}")
     else:
         output_dict = {}
     if len(output_dict) < n_queries and verbose:
@@ -1104,6 +1938,80 @@ def _format_ids_iter(ids: Union[str, int, list, set], chunk_size: int = 250):
             yield " ".join((str(item) for item in ids[i:i + j]))
 
 
+# regular expressions that match the gene IDs of common identifier types, in the order in which they should be
+# prioritized when several identifier types match the same gene IDs equally well
+GENE_ID_SIGNATURES = {
+    'Ensembl': r'ENS[A-Z]*G\d{11}(\.\d+)?',
+    'Ensembl Transcript': r'ENS[A-Z]*T\d{11}(\.\d+)?',
+    'Ensembl Protein': r'ENS[A-Z]*P\d{11}(\.\d+)?',
+    'WormBase': r'WBGene\d{8}',
+    'WormBase Protein': r'CE\d{5}',
+    'FlyBase': r'FBgn\d{7}',
+    'ZFIN': r'ZDB-GENE-\d{6}-\d+',
+    'MGI': r'MGI:\d+',
+    'HGNC': r'HGNC:\d+',
+    'RGD': r'RGD:\d+',
+    'VGNC': r'VGNC:\d+',
+    'Xenbase': r'XB-GENE-\d+',
+    'dictyBase': r'DDB_G\d+',
+    'SGD': r'S\d{9}',
+    'Araport': r'AT[1-5CM]G\d{5}(\.\d+)?',
+    'TAIR': r'AT[1-5CM]G\d{5}(\.\d+)?',
+    'PomBase': r'SP[A-Z0-9]+\.\d+[a-z]?c?',
+    'Ensembl Genomes': r'(Y[A-P][LR]\d{3}[WC](-[A-Z])?|AT[1-5CM]G\d{5}|SP[A-Z0-9]+\.\d+[a-z]?c?)',
+    'RefSeq Nucleotide': r'[NX][MR]_\d+(\.\d+)?',
+    'RefSeq Protein': r'[NXYWA]P_\d+(\.\d+)?',
+    'KEGG': r'[a-z]{3,4}:\S+',
+    'UniProtKB AC/ID': r'([OPQ]\d[A-Z\d]{3}\d|[A-NR-Z]\d([A-Z][A-Z\d]{2}\d){1,2})(-\d+)?|[A-Z\d]{1,10}_[A-Z\d]{1,5}',
+    'GeneID': r'\d+',
+    'Gene Name': r'[A-Za-z][A-Za-z\d\-.]{0,14}'}
+# identifier types with permissive patterns, which are only considered if no other identifier type matches
+FALLBACK_GENE_ID_TYPES = ('Gene Name',)
+
+
+def guess_gene_id_types(ids: Iterable[str], direction: Literal['from', 'to'] = 'from', max_candidates: int = 3,
+                        min_score: float = 0.5, sample_size: int = 1000) -> Tuple[str, ...]:
+    """
+    Guess the identifier type of a collection of gene IDs, by matching a sample of the gene IDs against \
+    the patterns of common identifier types (such as Ensembl, WormBase, RefSeq, Entrez Gene ID and UniProtKB).
+
+    :param ids: gene IDs to classify
+    :type ids: Iterable of str
+    :param direction: whether the identifier types will be mapped from ('from') or to ('to'). \
+    Only identifier types that are supported by the UniProt ID Mapping service in this direction are returned.
+    :type direction: 'from' or 'to' (default='from')
+    :param max_candidates: maximal number of identifier types to return
+    :type max_candidates: int (default=3)
+    :param min_score: minimal fraction of the sampled gene IDs that should match an identifier type's pattern.
+    :type min_score: float between 0 and 1 (default=0.5)
+    :param sample_size: maximal number of gene IDs to classify
+    :type sample_size: int (default=1000)
+    :return: a tuple of the best-matching identifier types, sorted from the best match to the worst. \
+    The tuple is empty if no identifier type matches the gene IDs.
+    :rtype: tuple of str
+    """
+    assert direction in {'from', 'to'}, f"Invalid direction '{direction}'."
+    ids = [str(gene_id).strip() for gene_id in parsing.data_to_list(ids)]
+    if len(ids) == 0:
+        return tuple()
+    # sample gene IDs evenly across the collection, since gene IDs are often sorted
+    if len(ids) > sample_size:
+        ids = [ids[i] for i in np.linspace(0, len(ids) - 1, sample_size, dtype='int64')]
+
+    id_dict_to, id_dict_from = _get_id_abbreviation_dicts()
+    legal_types = id_dict_from if direction == 'from' else id_dict_to
+    scores = {}
+    for id_type, pattern in GENE_ID_SIGNATURES.items():
+        if id_type not in legal_types or (id_type in FALLBACK_GENE_ID_TYPES and len(scores) > 0):
+            continue
+        regex = re.compile(pattern)
+        score = sum(1 for gene_id in ids if regex.fullmatch(gene_id)) / len(ids)
+        if score >= min_score:
+            scores[id_type] = score
+    # sorting is stable, so identifier types with equal scores keep their order of priority
+    return tuple(sorted(scores, key=scores.get, reverse=True)[:max_candidates])
+
+
 @functools.lru_cache(maxsize=2048)
 def find_best_gene_mapping(ids: Tuple[str, ...], map_from_options: Union[Tuple[str, ...], None],
                            map_to_options: Union[Tuple[str, ...], None]):
@@ -1111,8 +2019,18 @@ def find_best_gene_mapping(ids: Tuple[str, ...], map_from_options: Union[Tuple[s
     if map_to_options is None:
         map_to_options = all_map_to_options
     if map_from_options is None:
+        # only the identifier types that match the gene IDs' patterns are probed through UniProt.
+        # if none of them can be mapped, all identifier types are probed
+        candidates = guess_gene_id_types(ids, 'from')
+        if len(candidates) > 0:
+            result = _find_best_gene_mapping(ids, candidates, map_to_options)
+            if len(result[0]) > 0:
+                return result
         map_from_options = all_map_from_options
+    return _find_best_gene_mapping(ids, map_from_options, map_to_options)
+
 
+def _find_best_gene_mapping(ids: Tuple[str, ...], map_from_options: Iterable[str], map_to_options: Iterable[str]):
     def _key_func(items: Tuple[int, str, str]):
         key = [items[0]]
         key.append(list(map_from_options).index(items[1]))
@@ -1170,7 +2088,7 @@ def get_legal_gene_id_types():
     abbrev_dict_to = {}
     abbrev_dict_from = {}
 
-    req = requests.get(URL)
+    req = http_get(URL)
     req.raise_for_status()
     entries = json.loads(req.text)['groups']
     entries_filtered = []
@@ -1222,17 +2140,38 @@ def fetch_go_basic() -> ontology.DAGTree:
     cached_filename = 'go-basic.obo'
     cached_file = load_cached_file(cached_filename)
     if cached_file is not None:
-        lines = cached_file.split('\n')
         try:
-            return ontology.DAGTree(lines)
+            return _parse_go_basic(cached_file)
         except (ValueError, IndexError):
             pass
 
-    with requests.get(url, stream=True) as obo_stream:
+    with http_get(url, stream=True) as obo_stream:
         content = obo_stream.content.decode('utf8')
         cache_file(content, cached_filename)
+        return _parse_go_basic(content)
+
+
+def _parse_go_basic(content: str) -> ontology.DAGTree:
+    # parsed DAGTrees are cached persistently, according to the data version of the go-basic.obo file
+    data_version = ontology.parse_data_version(content)
+    if data_version is None:
         return ontology.DAGTree(content.split('\n'))
 
+    cache_path = get_annotation_cache_path(('go-basic.obo', data_version), suffix='.pickle')
+    if cache_path.exists():
+        try:
+            return ontology.DAGTree.load(cache_path)
+        except (OSError, ValueError, EOFError, AttributeError, pickle.UnpicklingError):
+            pass
+
+    dag_tree = ontology.DAGTree(content.split('\n'))
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        dag_tree.save(cache_path)
+    except OSError:
+        warnings.warn(f"Could not save the parsed GO ontology to the on-disk cache at '{cache_path}'.")
+    return dag_tree
+
 
 def get_datetime():
     now = datetime.now()
@@ -1329,54 +2268,227 @@ def update_rnalysis():
     run_subprocess([executable, '-m', 'pip', 'install', '--upgrade', 'RNAlysis'])
 
 
-def map_gene_to_attr(gtf_path: Union[str, Path], attribute: str, feature_type: str, use_name: bool, use_version: bool,
-                     split_ids: bool):
-    assert feature_type in {'gene', 'transcript'}, f"Invalid feature_type: '{feature_type}'"
+# attributes that are always included in GTF indices, since they are used to identify genes and transcripts
+GTF_INDEX_ATTRIBUTES = ('gene_id', 'gene_version', 'gene_name', 'name', 'transcript_id', 'transcript_version',
+                        'transcript_name', 'biotype', 'gene_biotype', 'transcript_biotype', 'gene_type',
+                        'transcript_type')
+GTF_INDEX_FORMAT_VERSION = 1
+_GTF_INDEX_CACHE = collections.OrderedDict()
+_GTF_INDEX_CACHE_SIZE = 4
 
-    mapping = {}
-    with open(gtf_path, errors="ignore") as f:
-        for line in f.readlines():
-            if len(line) == 0 or line[0] == '#':
-                continue
-            line_split = line.strip().split('\t')
-            attributes = line_split[8]
-            attributes_dict = parsing.parse_gtf_attributes(attributes)
-            if attribute not in attributes_dict:
-                continue
-
-            feature_name = None
-            if feature_type == 'gene':
-                feature_id = attributes_dict['gene_id'].split(".")[0] if split_ids else attributes_dict['gene_id']
-                if use_version:
-                    feature_id += '.' + attributes_dict['gene_version']
-
-                if use_name:
-                    if 'gene_name' in attributes_dict:
-                        feature_name = attributes_dict['gene_name']
-                    elif 'name' in attributes_dict:
-                        feature_name = attributes_dict['name']
-                    else:
-                        continue
 
-            else:
-                feature_id = attributes_dict['transcript_id'].split(".")[0] if split_ids else attributes_dict[
-                    'transcript_id']
-                if use_version:
-                    feature_id += '.' + attributes_dict['transcript_version']
+def get_gtf_index_path(gtf_path: Union[str, Path], feature_type: Union[str, None] = None) -> Path:
+    """
+    Returns the path of the on-disk index of a GTF file. The index is keyed by the GTF file's path, \
+    modification time and size, so it is invalidated whenever the GTF file changes.
+    """
+    gtf_path = Path(gtf_path).resolve()
+    stat = gtf_path.stat()
+    key = ('GTF index', GTF_INDEX_FORMAT_VERSION, str(gtf_path), stat.st_mtime_ns, stat.st_size, feature_type)
+    return get_annotation_cache_path(key, suffix='.pkl')
+
+
+def load_gtf_index(gtf_path: Union[str, Path], feature_type: Union[str, None] = None,
+                   attributes: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    Load a columnar table of the features in a GTF file and their attributes. \
+    The GTF file is only parsed the first time it is indexed: the table is saved to an on-disk cache \
+    and kept in memory, and is re-used by all following queries until the GTF file is modified.
+
+    :param gtf_path: path to the GTF file
+    :type gtf_path: str or Path
+    :param feature_type: if specified, only features of this type (for example 'gene' or 'transcript') \
+    will be indexed.
+    :type feature_type: str or None (default=None)
+    :param attributes: attributes to index in addition to the gene/transcript identifiers and biotypes. \
+    Attributes that do not appear in the GTF file are indexed as missing values.
+    :type attributes: Iterable of str
+    :return: a DataFrame with a 'feature' column and a column for every indexed attribute, \
+    with a row for every feature in the GTF file.
+    :rtype: pd.DataFrame
+    """
+    index_path = get_gtf_index_path(gtf_path, feature_type)
+    attributes = parsing.data_to_list(attributes)
+    if index_path in _GTF_INDEX_CACHE:
+        index = _GTF_INDEX_CACHE[index_path]
+        _GTF_INDEX_CACHE.move_to_end(index_path)
+    else:
+        index = None
+        if index_path.exists():
+            try:
+                index = pd.read_pickle(index_path)
+            except (OSError, EOFError, ValueError, pickle.UnpicklingError, AttributeError, ImportError):
+                index = None
+
+    missing_attributes = [attr for attr in attributes if index is None or attr not in index.columns]
+    if index is None or len(missing_attributes) > 0:
+        index_attributes = list(GTF_INDEX_ATTRIBUTES) if index is None else \
+            [col for col in index.columns if col != 'feature']
+        index_attributes += [attr for attr in missing_attributes if attr not in index_attributes]
+        index = _build_gtf_index(gtf_path, feature_type, index_attributes)
+        try:
+            index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = index_path.with_name(f'{index_path.name}.{os.getpid()}.tmp')
+            index.to_pickle(tmp_path)
+            os.replace(tmp_path, index_path)
+        except OSError:
+            warnings.warn(f"Could not save the index of GTF file '{gtf_path}' to the on-disk cache.")
+
+    _GTF_INDEX_CACHE[index_path] = index
+    while len(_GTF_INDEX_CACHE) > _GTF_INDEX_CACHE_SIZE:
+        _GTF_INDEX_CACHE.popitem(last=False)
+    return index
+
+
+def _build_gtf_index(gtf_path: Union[str, Path], feature_type: Union[str, None],
+                     attributes: List[str]) -> pd.DataFrame:
+    return read_gtf(gtf_path, attributes, feature_type)
+
+
+GTF_COLUMNS = ('seqname', 'source', 'feature', 'start', 'end', 'score', 'strand', 'frame', 'attribute')
+GTF_CHUNK_SIZE = 250000
+
+
+def read_gtf(gtf_path: Union[str, Path], attributes: Iterable[str] = GTF_INDEX_ATTRIBUTES,
+             feature_type: Union[str, None] = None, columns: Iterable[str] = ('feature',),
+             chunksize: int = GTF_CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Read the features of a GTF file into a DataFrame with a column for every requested GTF field and attribute. \
+    The GTF file is read in chunks by the C parser of pandas, \
+    and only the requested attributes are extracted from each chunk.
+
+    :param gtf_path: path to the GTF file. Compressed GTF files (for example '.gtf.gz') are decompressed on the fly.
+    :type gtf_path: str or Path
+    :param attributes: names of the attributes to extract from the 'attribute' field of the GTF file. \
+    Attributes that do not appear in a feature are returned as missing values.
+    :type attributes: Iterable of str
+    :param feature_type: if specified, only features of this type (for example 'gene' or 'transcript') \
+    will be read.
+    :type feature_type: str or None (default=None)
+    :param columns: names of the GTF fields to include in the output \
+    ('seqname', 'source', 'feature', 'start', 'end', 'score', 'strand', 'frame').
+    :type columns: Iterable of str (default=('feature',))
+    :param chunksize: number of GTF lines to parse at a time.
+    :type chunksize: int (default=250000)
+    :return: a DataFrame with a column for every requested GTF field and attribute, \
+    and a row for every matching feature in the GTF file. 'start' and 'end' are returned as integers, \
+    and all other columns are returned as categories.
+    :rtype: pd.DataFrame
+    """
+    attributes = parsing.data_to_list(attributes)
+    columns = parsing.data_to_list(columns)
+    assert all(col in GTF_COLUMNS[:-1] for col in columns), f"Invalid GTF columns: {columns}"
+    assert isinstance(chunksize, int) and chunksize > 0, f"'chunksize' must be a positive integer, got {chunksize}."
+    field_inds = sorted({0, 2, 8}.union(GTF_COLUMNS.index(col) for col in columns))
+
+    with open(gtf_path, 'rb') as f:
+        compression = 'gzip' if f.read(2) == b'\x1f\x8b' else None
+    opener = gzip.open if compression == 'gzip' else open
+    n_header_lines = 0
+    with opener(gtf_path, 'rt', errors='ignore') as f:
+        for line in f:
+            if not line.startswith('#'):
+                break
+            n_header_lines += 1
+
+    chunks = []
+    try:
+        reader = pd.read_csv(gtf_path, sep='\t', header=None, names=GTF_COLUMNS, usecols=field_inds, dtype=str,
+                             quoting=3, na_filter=False, on_bad_lines='skip', engine='c', chunksize=chunksize,
+                             skiprows=n_header_lines, compression=compression, encoding_errors='ignore')
+        with reader:
+            for chunk in reader:
+                chunks.append(_parse_gtf_chunk(chunk, attributes, feature_type, columns))
+    except pd.errors.EmptyDataError:
+        pass
+
+    if len(chunks) == 0:
+        gtf = pd.DataFrame({col: pd.Series([], dtype=str) for col in columns + attributes},
+                           columns=columns + attributes)
+    else:
+        gtf = pd.concat(chunks, ignore_index=True)
+    gtf = gtf.astype({col: 'int64' if col in {'start', 'end'} else 'category' for col in gtf.columns})
+    return gtf
 
-                if use_name:
-                    if 'gene_name' in attributes_dict:
-                        feature_name = attributes_dict['transcript_name']
-                    elif 'name' in attributes_dict:
-                        feature_name = attributes_dict['name']
-                    else:
-                        continue
 
-            if feature_id in mapping:
-                continue
-            mapping[feature_name if use_name else feature_id] = attributes_dict[attribute]
+class _GTFAttributeKeys(dict):
+    def __missing__(self, token: str) -> str:
+        # tokens may include unquoted attributes that precede the key (for example '; level 2; gene_name ')
+        key = token.rsplit('; ', 1)[-1].strip(' ;')
+        self[token] = key
+        return key
 
-    return mapping
+
+def _parse_gtf_chunk(chunk: pd.DataFrame, attributes: List[str], feature_type: Union[str, None],
+                     columns: List[str]) -> pd.DataFrame:
+    # comment lines and lines with less than 9 fields are skipped,
+    # and the feature type filter is applied before any attributes are extracted
+    keep = (~chunk['seqname'].str.startswith('#')) & chunk['attribute'].notna()
+    if feature_type is not None:
+        keep &= chunk['feature'] == feature_type
+    chunk = chunk[keep]
+
+    parsed = pd.DataFrame({col: chunk[col].to_numpy() for col in columns}, columns=columns + attributes)
+    if len(chunk) == 0:
+        return parsed
+
+    # attribute strings have the form 'key1 "value1"; key2 "value2"; ...'.
+    # splitting them by the quotation marks puts the keys at even positions and the values at odd positions.
+    # the raw key tokens repeat across lines, so each one is only cleaned once.
+    # when an attribute appears more than once (for example 'tag'), the last occurrence is kept.
+    get_key = _GTFAttributeKeys().__getitem__
+    records = []
+    for attr_str in chunk['attribute'].tolist():
+        tokens = attr_str.split('"')
+        records.append(dict(zip(map(get_key, tokens[0:-1:2]), tokens[1::2])))
+    values = pd.DataFrame.from_records(records, columns=attributes)
+    for attr in attributes:
+        parsed[attr] = values[attr].to_numpy()
+    return parsed
+
+
+def _split_gtf_ids(ids: pd.Series, split_ids: bool) -> pd.Series:
+    ids = ids.astype(object)
+    if split_ids:
+        return ids.str.split('.', n=1).str[0]
+    return ids
+
+
+def map_gene_to_attr(gtf_path: Union[str, Path], attribute: str, feature_type: str, use_name: bool, use_version: bool,
+                     split_ids: bool):
+    assert feature_type in {'gene', 'transcript'}, f"Invalid feature_type: '{feature_type}'"
+
+    index = load_gtf_index(gtf_path, attributes=[attribute])
+    index = index[index[attribute].notna()]
+    id_col = f'{feature_type}_id'
+    version_col = f'{feature_type}_version'
+    # features that are annotated with the attribute must all have an ID (and a version, if versions are used)
+    if index[id_col].isna().any():
+        raise KeyError(id_col)
+    feature_ids = _split_gtf_ids(index[id_col], split_ids)
+    if use_version:
+        if index[version_col].isna().any():
+            raise KeyError(version_col)
+        feature_ids = feature_ids + '.' + index[version_col].astype(object)
+
+    if use_name:
+        if feature_type == 'gene':
+            names = index['gene_name'].astype(object).fillna(index['name'].astype(object))
+        else:
+            has_gene_name = index['gene_name'].notna()
+            if index.loc[has_gene_name, 'transcript_name'].isna().any():
+                raise KeyError('transcript_name')
+            names = index['transcript_name'].astype(object).where(has_gene_name, index['name'].astype(object))
+        keys = names
+        keep = 'last'
+    else:
+        keys = feature_ids
+        keep = 'first'
+
+    mapping = pd.Series(index[attribute].astype(object).values, index=keys.values)
+    mapping = mapping[mapping.index.notna()]
+    mapping = mapping[~mapping.index.duplicated(keep=keep)]
+    return mapping.to_dict()
 
 
 def get_method_docstring(method: Union[str, Callable], obj: object = None) -> Tuple[str, dict]:
@@ -1393,33 +2505,21 @@ def get_method_docstring(method: Union[str, Callable], obj: object = None) -> Tu
 
 def map_transcripts_to_genes(gtf_path: Union[str, Path], use_name: bool = False, use_version: bool = True,
                              split_ids: bool = True):
-    mapping = {}
-    with open(gtf_path, errors="ignore") as f:
-        for line in f.readlines():
-            if len(line) == 0 or line[0] == '#':
-                continue
-            line_split = line.strip().split('\t')
-            if line_split[2] == 'transcript':
-                attributes = line_split[8]
-                attributes_dict = parsing.parse_gtf_attributes(attributes)
-                if 'transcript_id' not in attributes_dict or 'gene_id' not in attributes_dict:
-                    continue
-
-                transcript_id = attributes_dict['transcript_id'].split(".")[0] if split_ids else attributes_dict[
-                    'transcript_id']
-                gene_id = attributes_dict['gene_id'].split(".")[0] if split_ids else attributes_dict['gene_id']
-                if use_version:
-                    if 'transcript_version' in attributes_dict and 'gene_version' in attributes_dict:
-                        transcript_id += '.' + attributes_dict['transcript_version']
-                        gene_id += '.' + attributes_dict['gene_version']
-                gene_name = None
-                if use_name:
-                    if 'gene_name' not in attributes_dict:
-                        continue
-                    gene_name = attributes_dict['gene_name']
-
-                if transcript_id in mapping:
-                    continue
-
-                mapping[transcript_id] = gene_name if use_name else gene_id
-    return mapping
+    index = load_gtf_index(gtf_path, 'transcript')
+    index = index[index['transcript_id'].notna() & index['gene_id'].notna()]
+    if use_name:
+        index = index[index['gene_name'].notna()]
+
+    transcript_ids = _split_gtf_ids(index['transcript_id'], split_ids)
+    gene_ids = _split_gtf_ids(index['gene_id'], split_ids)
+    if use_version:
+        # versions are only appended when both the transcript and the gene have one
+        has_version = (index['transcript_version'].notna() & index['gene_version'].notna()).values
+        transcript_ids = transcript_ids.where(~has_version, transcript_ids + '.' +
+                                              index['transcript_version'].astype(object))
+        gene_ids = gene_ids.where(~has_version, gene_ids + '.' + index['gene_version'].astype(object))
+
+    values = index['gene_name'].astype(object) if use_name else gene_ids
+    mapping = pd.Series(values.values, index=transcript_ids.values)
+    mapping = mapping[~mapping.index.duplicated(keep='first')]
+    return mapping.to_dict()
@@ -1,9 +1,17 @@
+import contextlib
 import functools
-import queue
+import gc
+import os
+import pickle
 import re
+from pathlib import Path
 from typing import Dict, List, Union, Tuple, Iterable, Set
 
+import numpy as np
+from scipy.sparse import csr_matrix
+
 from rnalysis.utils import parsing
+from rnalysis.utils.annotations import AnnotationMatrix
 
 
 class GOTerm:
@@ -21,6 +29,12 @@ class GOTerm:
         self.relationships: Dict[str, List[str]] = {'is_a': [], 'part_of': []}
         self.children_relationships: Dict[str, List[str]] = {'is_a': [], 'part_of': []}
 
+    def __getstate__(self):
+        return self._id, self._name, self._namespace, self._level, self.relationships, self.children_relationships
+
+    def __setstate__(self, state):
+        self._id, self._name, self._namespace, self._level, self.relationships, self.children_relationships = state
+
     @classmethod
     def with_properties(cls, go_id: str, name: str, namespace: str, level: int):
         go_term = cls()
@@ -75,14 +89,48 @@ def parse_go_id(sequence: str) -> str:
     return re.findall("GO:[0-9]{7}", sequence)[0]
 
 
+def parse_data_version(obo_content: str) -> Union[str, None]:
+    # the data-version tag appears in the header of the OBO file, before the first stanza
+    header_end = obo_content.find('[Term]')
+    header = obo_content if header_end == -1 else obo_content[:header_end]
+    for line in header.split('\n'):
+        line = line.strip()
+        if line.startswith('data-version:'):
+            return line[14:]
+    return None
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    # unpickling creates a large number of small objects, which repeatedly triggers the cyclic garbage collector
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def _get_leading_go_id(value: str) -> str:
+    # in a well-formed OBO file the GO ID is at the start of the value, so a regex search is only needed as a fallback
+    if value[:3] == 'GO:' and value[3:10].isdigit():
+        return value[:10]
+    return parse_go_id(value)
+
+
 class DAGTree:
+    CACHE_FORMAT_VERSION = 2
     __slots__ = {'data_version': 'version of the go-basic.obo file',
                  'go_terms': 'dictionary of GO Terms in the DAG Tree',
                  'alt_ids': 'mapping of alternagive GO IDs to their main GO ID',
                  'namespaces': "namespaces included in the DAGTree",
                  'levels': 'list of levels in the DAG Tree',
                  'parent_relationship_types': 'the types of relationships that constitute parenthood in the DAG Tree',
-                 '_upper_induced_graphs': 'memoized upper-induced graphs'}
+                 '_term_ids': 'array of GO IDs in topological order (every GO Term appears after its ancestors)',
+                 '_term_positions': 'mapping of GO IDs to their position in _term_ids',
+                 '_ancestor_indptr': 'CSR index pointer of the ancestor-closure index',
+                 '_ancestor_indices': 'CSR positions of the ancestors of every GO Term, sorted in topological order'}
 
     def __init__(self, line_iterator: Iterable[str],
                  parent_relationship_types: Union[str, Iterable[str]] = ('is_a', 'part_of')):
@@ -93,11 +141,10 @@ class DAGTree:
         self.levels: List[dict] = []
         self.parent_relationship_types: tuple = parsing.data_to_tuple(parent_relationship_types)
 
-        self._upper_induced_graphs: Dict[str, Set[str]] = {}
-
         self._parse_file(line_iterator)
         self._populate_levels()
         self._populate_children()
+        self._populate_ancestors()
 
     def __getitem__(self, key) -> 'GOTerm':
         if key in self.go_terms:
@@ -113,30 +160,60 @@ class DAGTree:
         except KeyError:
             return False
 
+    def save(self, path: Union[str, Path]):
+        """
+        Serialize the parsed DAGTree into a binary cache file. \
+        The file is written to a temporary path first and then moved into place, \
+        so that concurrent readers never encounter a partially-written file.
+
+        :param path: path of the cache file to save.
+        :type path: str or Path
+        """
+        path = Path(path)
+        temp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(temp_path, 'wb') as f:
+            pickle.dump((self.CACHE_FORMAT_VERSION, self), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'DAGTree':
+        """
+        Load a DAGTree that was previously saved with DAGTree.save().
+
+        :param path: path of the cache file to load.
+        :type path: str or Path
+        """
+        with _gc_paused(), open(path, 'rb') as f:
+            format_version, dag_tree = pickle.load(f)
+        if format_version != cls.CACHE_FORMAT_VERSION or not isinstance(dag_tree, cls):
+            raise ValueError(f"Incompatible DAGTree cache file '{path}'.")
+        return dag_tree
+
     def _parse_file(self, line_iterator: Iterable[str]):
         current_term = None
         in_frame = False
         for line in line_iterator:
             line = line.strip()
             if in_frame:
-                if line.startswith('id: '):
-                    current_term.set_id(parse_go_id(line))
-                elif line.startswith('namespace: '):
-                    current_term.set_namespace(line[11:])
-                    if current_term.namespace not in self.namespaces:
-                        self.namespaces.add(current_term.namespace)
-                elif line.startswith('name: '):
-                    current_term.set_name(line[6:])
-                elif line.startswith('alt_id: '):
-                    self.alt_ids[parse_go_id(line)] = current_term.id
-                elif line.startswith('is_a: '):
-                    current_term.relationships['is_a'].append(parse_go_id(line))
-                elif line.startswith('relationship: '):
-                    relationship_type = line.split(' ')[1]
+                # split every line into its tag and value once, instead of testing it against every possible tag
+                tag, _, value = line.partition(': ')
+                if tag == 'id':
+                    current_term.set_id(_get_leading_go_id(value))
+                elif tag == 'namespace':
+                    current_term.set_namespace(value)
+                    self.namespaces.add(value)
+                elif tag == 'name':
+                    current_term.set_name(value)
+                elif tag == 'alt_id':
+                    self.alt_ids[_get_leading_go_id(value)] = current_term.id
+                elif tag == 'is_a':
+                    current_term.relationships['is_a'].append(_get_leading_go_id(value))
+                elif tag == 'relationship':
+                    relationship_type, _, target = value.partition(' ')
                     if relationship_type not in current_term.relationships:
                         current_term.relationships[relationship_type] = []
-                    current_term.relationships[relationship_type].append(parse_go_id(line))
-                elif line.startswith('is_obsolete: true'):
+                    current_term.relationships[relationship_type].append(_get_leading_go_id(target))
+                elif tag == 'is_obsolete' and value.startswith('true'):
                     in_frame = False
                 elif line == '':
                     self.go_terms[current_term.id] = current_term
@@ -167,20 +244,135 @@ class DAGTree:
     def _get_term_level_rec(self, go_term: GOTerm):
         if go_term.level is not None:
             pass
-        elif len(go_term.get_parents(self.parent_relationship_types)) == 0:
-            go_term.set_level(0)
         else:
-            go_term.set_level(1 + max([self._get_term_level_rec(self[parent_id]) for parent_id in
-                                       go_term.get_parents(self.parent_relationship_types)]))
+            parents = [parent_id for rel_type in self.parent_relationship_types for parent_id in
+                       go_term.relationships.get(rel_type, ())]
+            if len(parents) == 0:
+                go_term.set_level(0)
+            else:
+                go_term.set_level(1 + max([self._get_term_level_rec(self[parent_id]) for parent_id in parents]))
         return go_term.level
 
     def _populate_children(self):
         for go_id in self.level_iter():
+            relationships = self.go_terms[go_id].relationships
             for rel_type in self.parent_relationship_types:
-                for parent_id in self[go_id].get_parents(rel_type):
-                    if rel_type not in self[parent_id].children_relationships:
-                        self[parent_id].children_relationships[rel_type] = []
-                    self[parent_id].children_relationships[rel_type].append(go_id)
+                for parent_id in relationships.get(rel_type, ()):
+                    children_relationships = self[parent_id].children_relationships
+                    if rel_type not in children_relationships:
+                        children_relationships[rel_type] = []
+                    children_relationships[rel_type].append(go_id)
+
+    def _populate_ancestors(self):
+        # GO Terms are sorted by level, so that every GO Term is positioned after all of its ancestors.
+        # This allows the ancestor closure of every GO Term to be built in a single pass from its parents' closures.
+        term_ids = [go_id for level in self.levels for go_id in level]
+        self._term_ids = np.array(term_ids, dtype=object)
+        self._term_positions = {go_id: i for i, go_id in enumerate(term_ids)}
+
+        closures = []
+        no_ancestors = np.empty(0, dtype='int32')
+        for go_id in term_ids:
+            relationships = self.go_terms[go_id].relationships
+            parents = [self._term_positions[self[parent_id].id] for rel_type in self.parent_relationship_types for
+                       parent_id in relationships.get(rel_type, ())]
+            if len(parents) == 0:
+                closures.append(no_ancestors)
+            elif len(parents) == 1:
+                # all ancestors of a GO Term precede it in topological order, so the closure remains sorted
+                closures.append(np.append(closures[parents[0]], np.int32(parents[0])))
+            else:
+                closures.append(np.unique(np.concatenate([np.array(parents, dtype='int32')] +
+                                                         [closures[parent] for parent in parents])))
+
+        self._ancestor_indptr = np.zeros(len(term_ids) + 1, dtype='int64')
+        np.cumsum([len(closure) for closure in closures], out=self._ancestor_indptr[1:])
+        self._ancestor_indices = np.concatenate(closures) if len(closures) > 0 else no_ancestors
+
+    def term_code(self, go_id: str) -> int:
+        """
+        Return the integer code of a GO Term - its position in the topological order of the DAG Tree. \
+        Alternative GO IDs are mapped to the code of their main GO ID.
+
+        :param go_id: GO ID (or alternative GO ID) of the GO Term.
+        :type go_id: str
+        :rtype: int
+        """
+        try:
+            return self._term_positions[go_id]
+        except KeyError:
+            return self._term_positions[self[go_id].id]
+
+    def encode(self, go_ids: Iterable[str]) -> np.ndarray:
+        """
+        Return the integer codes of the given GO IDs (see DAGTree.term_code()).
+
+        :param go_ids: GO IDs (or alternative GO IDs) to encode.
+        :type go_ids: iterable of str
+        :rtype: numpy array of int32
+        """
+        return np.array([self.term_code(go_id) for go_id in go_ids], dtype='int32')
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """
+        Return the GO IDs that match the given integer codes (see DAGTree.term_code()).
+
+        :param codes: integer codes of GO Terms.
+        :type codes: numpy array of ints
+        :rtype: numpy array of str
+        """
+        return self._term_ids[codes]
+
+    def _ancestor_slice(self, position: int) -> np.ndarray:
+        return self._ancestor_indices[self._ancestor_indptr[position]:self._ancestor_indptr[position + 1]]
+
+    def ancestors(self, go_id: str) -> np.ndarray:
+        """
+        Return the GO IDs of all ancestors of the given GO Term (its upper-induced graph, not including itself), \
+        sorted in topological order.
+
+        :param go_id: GO ID (or alternative GO ID) of the GO Term.
+        :type go_id: str
+        :rtype: numpy.ndarray
+        """
+        return self.decode(self._ancestor_slice(self.term_code(go_id)))
+
+    def _get_closure_matrix(self) -> csr_matrix:
+        # a square boolean matrix where row i marks GO Term i and all of its ancestors
+        n_terms = len(self._term_ids)
+        lengths = np.diff(self._ancestor_indptr)
+        indptr = self._ancestor_indptr + np.arange(n_terms + 1)
+        indices = np.empty(indptr[-1], dtype='int32')
+        self_positions = indptr[:-1] + lengths
+        ancestor_mask = np.ones(indptr[-1], dtype='bool')
+        ancestor_mask[self_positions] = False
+        indices[ancestor_mask] = self._ancestor_indices
+        indices[self_positions] = np.arange(n_terms, dtype='int32')
+        return csr_matrix((np.ones(indptr[-1], dtype='bool'), indices, indptr), shape=(n_terms, n_terms))
+
+    def propagate_annotations(self, annotations: AnnotationMatrix) -> AnnotationMatrix:
+        """
+        Propagate gene annotations up the DAG Tree, \
+        such that every gene is also annotated to all ancestors of the GO Terms it is annotated to. \
+        The annotations of all genes are propagated at once, \
+        as a single sparse product of the annotations and the ancestor-closure index.
+
+        :param annotations: annotations of genes (rows) to GO IDs or alternative GO IDs (columns).
+        :type annotations: AnnotationMatrix
+        :return: boolean annotations of the same genes after propagation. \
+        The columns include every GO Term that at least one gene is annotated to, sorted in topological order.
+        :rtype: AnnotationMatrix
+        """
+        n_terms = len(self._term_ids)
+        column_positions = self.encode(annotations.columns)
+        # map the columns of the annotation matrix onto the positions of the GO Terms in the ancestor-closure index
+        column_map = csr_matrix((np.ones(len(column_positions), dtype='bool'), column_positions,
+                                 np.arange(len(column_positions) + 1)), shape=(len(column_positions), n_terms))
+        direct = annotations.matrix.tocsr().astype('bool')
+
+        propagated = (direct @ column_map @ self._get_closure_matrix()).tocsc()
+        annotated_terms = np.flatnonzero(np.diff(propagated.indptr))
+        return AnnotationMatrix(propagated[:, annotated_terms], annotations.index, self.decode(annotated_terms))
 
     def level_iter(self, namespace: str = 'all'):
         if namespace == 'all':
@@ -194,34 +386,5 @@ class DAGTree:
                         yield go_id
 
     def upper_induced_graph_iter(self, go_id: str):
-        if go_id in self._upper_induced_graphs:
-            for upper_induced_node in self._upper_induced_graphs[go_id]:
-                yield upper_induced_node
-
-        else:
-            # put go_id's parents into the queue
-            node_queue = queue.SimpleQueue()
-            processed_nodes = set()
-            parents = self[go_id].get_parents(self.parent_relationship_types)
-            for parent in parents:
-                node_queue.put(parent)
-            processed_nodes.update(parents)
-            # iterate over the queue until it is empty (meaning we reached the top of the graph)
-            while not node_queue.empty():
-                this_node = node_queue.get()
-                yield this_node
-                # if this_node's upper-induced graph was already calculated, yield those unprocessed nodes
-                if this_node in self._upper_induced_graphs:
-                    for upper_induced_node in self._upper_induced_graphs[this_node]:
-                        if upper_induced_node not in processed_nodes:
-                            yield upper_induced_node
-                    processed_nodes.update(self._upper_induced_graphs[this_node])
-                # if this_node's upper-induced graph was yet to be calculated, add its unprocessed parents to the queue
-                else:
-                    parents = self[this_node].get_parents(self.parent_relationship_types)
-                    for parent in parents:
-                        if parent not in processed_nodes:
-                            node_queue.put(parent)
-                    processed_nodes.update(parents)
-            # memoize the function's output for go_id
-            self._upper_induced_graphs[go_id] = processed_nodes
+        for ancestor in self.ancestors(go_id):
+            yield ancestor
@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from rnalysis.utils.annotations import *
+
+
+def _get_sparse_dict():
+    return {'gene1': {'term1', 'term2'}, 'gene2': {'term1'}, 'gene3': set(), 'gene4': {'term2', 'term3'}}
+
+
+def _get_truth_df():
+    return pd.DataFrame([[True, True, False], [True, False, False], [False, False, False], [False, True, True]],
+                        index=['gene1', 'gene2', 'gene3', 'gene4'], columns=['term1', 'term2', 'term3'])
+
+
+def test_annotation_matrix_from_sparse_dict():
+    truth = _get_truth_df()
+    res = AnnotationMatrix.from_sparse_dict(_get_sparse_dict())
+    assert res.shape == truth.shape
+    assert res.dtype == 'bool'
+    assert res.nnz == 5
+    assert res.to_dataframe().loc[truth.index, truth.columns].equals(truth)
+
+
+def test_annotation_matrix_from_sparse_dict_transpose():
+    truth = _get_truth_df().drop('gene3')
+    sparse_dict = {'term1': {'gene1', 'gene2'}, 'term2': {'gene1', 'gene4'}, 'term3': {'gene4'}}
+    res = AnnotationMatrix.from_sparse_dict(sparse_dict, transpose=True)
+    assert res.to_dataframe().loc[truth.index, truth.columns].equals(truth)
+
+
+@pytest.mark.parametrize('df', [_get_truth_df(), _get_truth_df().replace(False, np.nan)])
+def test_annotation_matrix_from_dataframe(df):
+    res = AnnotationMatrix.from_dataframe(df)
+    assert res.dtype == 'bool'
+    assert res.to_dataframe().equals(_get_truth_df())
+
+
+def test_annotation_matrix_copy_equals():
+    mat = AnnotationMatrix.from_dataframe(_get_truth_df())
+    mat_copy = mat.copy()
+    assert mat.equals(mat_copy)
+    assert mat_copy.matrix is not mat.matrix
+    mat_copy.remove_annotations('term1', ['gene1'])
+    assert not mat.equals(mat_copy)
+    assert mat.term_sum('term1') == 2
+    assert mat_copy.term_sum('term1') == 1
+    assert not mat.equals(mat.astype('float64'))
+    assert not mat.equals(_get_truth_df())
+
+
+@pytest.mark.parametrize('genes,terms', [(None, None), (['gene4', 'gene1'], None), (None, ['term3', 'term1']),
+                                         (['gene2', 'gene3', 'gene4'], ['term2'])])
+def test_annotation_matrix_subset(genes, terms):
+    truth = _get_truth_df()
+    truth = truth.loc[truth.index if genes is None else genes, truth.columns if terms is None else terms]
+    mat = AnnotationMatrix.from_dataframe(_get_truth_df())
+    res = mat.subset(genes, terms)
+    assert res.to_dataframe().equals(truth)
+    assert res.matrix is not mat.matrix
+
+
+def test_annotation_matrix_subset_missing_key():
+    mat = AnnotationMatrix.from_dataframe(_get_truth_df())
+    with pytest.raises(KeyError):
+        mat.subset(genes=['gene1', 'gene5'])
+    with pytest.raises(KeyError):
+        mat.subset(terms=['term4'])
+
+
+def test_annotation_matrix_sort_index():
+    df = _get_truth_df().iloc[[3, 1, 0, 2]]
+    res = AnnotationMatrix.from_dataframe(df).sort_index()
+    assert res.to_dataframe().equals(_get_truth_df())
+
+
+@pytest.mark.parametrize('terms,genes,truth', [(None, None, [2, 2, 1]), (['term3', 'term2'], None, [1, 2]),
+                                               (None, {'gene1', 'gene3'}, [1, 1, 0]),
+                                               (['term1'], ['gene2', 'gene4'], [1])])
+def test_annotation_matrix_sum(terms, genes, truth):
+    mat = AnnotationMatrix.from_dataframe(_get_truth_df())
+    assert list(mat.sum(terms, genes)) == truth
+    if terms is not None:
+        assert [mat.term_sum(term, genes) for term in terms] == truth
+
+
+def test_annotation_matrix_term_vector_and_genes():
+    mat = AnnotationMatrix.from_dataframe(_get_truth_df())
+    assert list(mat.term_vector('term2')) == [True, False, False, True]
+    assert list(mat.term_vector('term2', ['gene4', 'gene3'])) == [True, False]
+    assert list(mat.term_genes('term2')) == ['gene1', 'gene4']
+
+
+def test_annotation_matrix_modify_annotations():
+    mat = AnnotationMatrix.from_dataframe(_get_truth_df())
+    mat.remove_annotations('term2', ['gene1', 'gene2'])
+    assert list(mat.term_genes('term2')) == ['gene4']
+    assert list(mat.term_genes('term1')) == ['gene1', 'gene2']
+
+    weights = AnnotationMatrix.from_dataframe(_get_truth_df())
+    weights.scale_annotations('term1', ['gene1', 'gene3'], 0.5)
+    assert weights.dtype == 'float64'
+    assert list(weights.term_vector('term1')) == [0.5, 1, 0, 0]
+    assert weights.term_sum('term1') == 1.5
+
+
+@pytest.mark.parametrize('terms,mode,truth', [(None, 'union', {'gene1', 'gene2', 'gene4'}),
+                                              (['term1', 'term2'], 'intersection', {'gene1'}),
+                                              (['term2', 'term3'], 'intersection', {'gene4'}),
+                                              (['term1', 'term3'], 'union', {'gene1', 'gene2', 'gene4'}),
+                                              (['term1', 'term3'], 'intersection', set())])
+def test_annotation_matrix_annotated_genes(terms, mode, truth):
+    mat = AnnotationMatrix.from_dataframe(_get_truth_df())
+    assert mat.annotated_genes(terms, mode) == truth
+
+
+def test_annotation_matrix_gene_mask_term_mask():
+    mat = AnnotationMatrix.from_dataframe(_get_truth_df())
+    assert list(mat.gene_mask(['gene4', 'gene2'])) == [False, True, False, True]
+    mask = np.array([True, False, False, True])
+    assert mat.gene_mask(mask) is mask
+    assert list(mat.term_mask('term2')) == [True, False, False, True]
+    mat.remove_annotations('term2', mat.term_mask('term3'))
+    assert list(mat.term_mask('term2')) == [True, False, False, False]
+
+
+def test_annotation_matrix_modify_annotations_with_mask():
+    mat = AnnotationMatrix.from_dataframe(_get_truth_df())
+    ids_mat = mat.copy()
+    mask = np.array([True, True, False, False])
+    mat.scale_annotations('term2', mask, 0.25)
+    ids_mat.scale_annotations('term2', ['gene1', 'gene2'], 0.25)
+    assert mat.equals(ids_mat)
+    assert mat.term_sum('term2', mask) == 0.25
+    assert mat.term_sum('term2', ['gene1', 'gene2']) == 0.25
+
+
+def test_annotation_matrix_save_load_npz(tmp_path):
+    mat = AnnotationMatrix.from_dataframe(_get_truth_df())
+    path = tmp_path.joinpath('annotations.npz')
+    mat.save_npz(path)
+    assert list(tmp_path.iterdir()) == [path]
+    res = AnnotationMatrix.load_npz(path)
+    assert res.equals(mat)
+    assert res.index.dtype == 'object'
+
+
+def test_annotation_matrix_from_codes():
+    truth = _get_truth_df()
+    gene_codes = np.array([0, 0, 1, 3, 3, 0], dtype='int32')
+    term_codes = np.array([0, 1, 0, 1, 2, 0], dtype='int32')
+    res = AnnotationMatrix.from_codes(gene_codes, term_codes, truth.index, truth.columns)
+    assert res.dtype == 'bool'
+    assert res.nnz == 5
+    assert res.to_dataframe().equals(truth)
+
+
+@pytest.mark.parametrize('mapping,truth_rows,truth_index', [
+    ({}, [], []),
+    ({'gene1': 'new1', 'gene4': 'new4'}, [0, 3], ['new1', 'new4']),
+    ({'gene1': 'new1', 'gene2': 'new1', 'gene3': 'new3'}, [1, 2], ['new1', 'new3'])])
+def test_annotation_matrix_rename_genes(mapping, truth_rows, truth_index):
+    truth = _get_truth_df().iloc[truth_rows]
+    truth.index = truth_index
+    res = AnnotationMatrix.from_dataframe(_get_truth_df()).rename_genes(mapping)
+    assert res.to_dataframe().equals(truth)
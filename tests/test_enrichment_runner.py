@@ -1,14 +1,15 @@
 from collections import namedtuple
 
-import copy
 import joblib
 import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
 import pytest
+from scipy import sparse
 
 from rnalysis import filtering
 from rnalysis.utils import enrichment_runner, validation
+from rnalysis.utils.annotations import AnnotationMatrix
 from rnalysis.utils.enrichment_runner import *
 from rnalysis.utils.io import *
 from tests import __attr_ref__, __biotype_ref__
@@ -64,6 +65,117 @@ def test_calc_hypergeometric_pvalues():
     assert np.isclose(truth, pval, atol=0, rtol=0.00001)
 
 
+@pytest.mark.parametrize('bg_size,de_size', [(38, 6), (30, 10), (20000, 700), (13588, 611), (50, 50), (50, 0)])
+def test_calc_pvals_batch(bg_size, de_size):
+    rng = np.random.default_rng(42)
+    go_size = rng.integers(0, bg_size + 1, 200)
+    go_de_size = np.array([rng.integers(max(0, g + de_size - bg_size), min(g, de_size) + 1) for g in go_size])
+
+    hypergeom_truth = [EnrichmentRunner._calc_hypergeometric_pval(bg_size, de_size, g, x) for g, x in
+                       zip(go_size.tolist(), go_de_size.tolist())]
+    fisher_truth = [EnrichmentRunner._calc_fisher_pval(bg_size, de_size, g, x) for g, x in
+                    zip(go_size.tolist(), go_de_size.tolist())]
+
+    assert np.allclose(EnrichmentRunner._calc_hypergeometric_pvals(bg_size, de_size, go_size, go_de_size),
+                       hypergeom_truth, atol=0, rtol=10 ** -9, equal_nan=True)
+    assert np.allclose(EnrichmentRunner._calc_fisher_pvals(bg_size, de_size, go_size, go_de_size), fisher_truth,
+                       atol=0, rtol=10 ** -9)
+
+
+@pytest.mark.parametrize('func_name', ['_hypergeometric_enrichment', '_fisher_enrichment'])
+def test_enrichment_runner_enrichment_batch(func_name):
+    runner = EnrichmentRunner.__new__(EnrichmentRunner)
+    runner.annotation_df = pd.read_csv('tests/test_files/attr_ref_table_for_tests.csv', index_col=0)
+    runner.gene_set = {'WBGene00000019', 'WBGene00000041', 'WBGene00000106', 'WBGene00001133', 'WBGene00003915',
+                       'WBGene00268195'}
+    runner.enrichment_func = getattr(runner, func_name)
+    runner.attributes = list(runner.annotation_df.columns)
+    truth = [runner.enrichment_func(attr) for attr in runner.attributes]
+
+    assert runner._get_batch_enrichment_func().__name__ == func_name + '_batch'
+    for serial_func in (runner._calculate_enrichment_serial, runner._calculate_enrichment_parallel):
+        res = serial_func()
+        assert len(res) == len(truth)
+        for res_row, truth_row in zip(res, truth):
+            assert res_row[:3] == truth_row[:3]
+            assert np.allclose(res_row[3:], truth_row[3:], atol=0)
+
+
+@pytest.mark.parametrize('parallel', [False, True])
+def test_enrichment_runner_randomization_enrichment_batch(parallel):
+    runner = EnrichmentRunner.__new__(EnrichmentRunner)
+    runner.annotation_df = pd.read_csv('tests/test_files/attr_ref_table_for_tests.csv', index_col=0)
+    runner.gene_set = {'WBGene00000019', 'WBGene00000041', 'WBGene00000106', 'WBGene00001133', 'WBGene00003915',
+                       'WBGene00268195'}
+    runner.enrichment_func = runner._randomization_enrichment
+    runner.attributes = list(runner.annotation_df.columns)
+    runner.pvalue_kwargs = {'reps': 20000}
+    runner.random_seed = 42
+    runner.parallel = parallel
+    np.random.seed(42)
+    truth = [runner.enrichment_func(attr, **runner.pvalue_kwargs) for attr in runner.attributes]
+
+    assert runner._get_batch_enrichment_func().__name__ == '_randomization_enrichment_batch'
+    res = runner._calculate_enrichment_serial()
+    assert len(res) == len(truth)
+    for res_row, truth_row in zip(res, truth):
+        assert res_row[:3] == truth_row[:3]
+        assert np.allclose(res_row[3:5], truth_row[3:5], atol=0)
+        assert np.isclose(res_row[5], truth_row[5], atol=2 * 10 ** -3, rtol=0.25)
+
+
+@pytest.mark.parametrize('stop_after', [None, 10])
+def test_calc_randomization_pvals_reproducible(stop_after):
+    rng = np.random.default_rng(0)
+    annotation_mat = (rng.random((2000, 50)) < 0.1).astype('float64')
+    obs_frac = rng.integers(0, 20, 50) / 100
+    log2fc = np.log2(obs_frac / annotation_mat.mean(axis=0))
+    res, reps = EnrichmentRunner._calc_randomization_pvals(100, log2fc, annotation_mat, 2500, obs_frac,
+                                                           random_seed=7, stop_after=stop_after)
+    res_parallel, reps_parallel = EnrichmentRunner._calc_randomization_pvals(100, log2fc, annotation_mat, 2500,
+                                                                             obs_frac, random_seed=7, n_jobs=2,
+                                                                             stop_after=stop_after)
+    res_sparse, reps_sparse = EnrichmentRunner._calc_randomization_pvals(100, log2fc, sparse.csc_matrix(annotation_mat),
+                                                                         2500, obs_frac, random_seed=7,
+                                                                         stop_after=stop_after)
+    assert np.all(res == res_parallel)
+    assert np.all(res == res_sparse)
+    assert np.all(reps == reps_parallel)
+    assert np.all(reps == reps_sparse)
+    assert np.all((res > 0) & (res <= 1))
+    assert np.all((reps > 0) & (reps <= 2500))
+
+
+def test_calc_randomization_pvals_adaptive():
+    rng = np.random.default_rng(0)
+    annotation_mat = (rng.random((2000, 50)) < 0.1).astype('float64')
+    obs_frac = rng.integers(0, 20, 50) / 100
+    log2fc = np.log2(obs_frac / annotation_mat.mean(axis=0))
+    full_res, full_reps = EnrichmentRunner._calc_randomization_pvals(100, log2fc, annotation_mat, 5000, obs_frac,
+                                                                     random_seed=0)
+    res, reps = EnrichmentRunner._calc_randomization_pvals(100, log2fc, annotation_mat, 5000, obs_frac, random_seed=0,
+                                                           stop_after=20)
+    assert np.all(full_reps == 5000)
+    stopped = reps < 5000
+    # attributes which are obviously non-significant should stop early, and their p-values should be h / L
+    assert stopped.any()
+    assert np.allclose(res[stopped], 20 / reps[stopped])
+    assert np.all(full_res[stopped] > 20 / 5000)
+    # attributes which did not stop early are identical to the non-adaptive test, since they share the same draws
+    assert np.all(res[~stopped] == full_res[~stopped])
+
+
+def test_calc_adaptive_randomization_pval():
+    np.random.seed(42)
+    bg_array = np.random.random(5000) < 0.1
+    pval, reps = EnrichmentRunner._calc_adaptive_randomization_pval(50, 0.1, bg_array, 10000, 0.1, 10)
+    assert reps < 10000
+    assert pval == 10 / reps
+    pval, reps = EnrichmentRunner._calc_adaptive_randomization_pval(50, 2, bg_array, 1000, 0.6, 10)
+    assert reps == 1000
+    assert pval == 1 / 1001
+
+
 def test_enrichment_get_attrs_int_index_attributes():
     genes = {'WBGene00000041', 'WBGene00002074', 'WBGene00000105', 'WBGene00000106', 'WBGene00199484',
              'WBGene00001436', 'WBGene00000137', 'WBGene00001996', 'WBGene00014208', 'WBGene00001133'}
@@ -215,7 +327,7 @@ def _comp_go_res_df(res, truth):
 
 
 def test_classic_pvals(monkeypatch):
-    goa_df = pd.read_csv('tests/test_files/goa_table.csv', index_col=0).astype('bool')
+    goa_df = AnnotationMatrix.from_dataframe(pd.read_csv('tests/test_files/goa_table.csv', index_col=0).astype('bool'))
     gene_set = {'gene1', 'gene2', 'gene5', 'gene12', 'gene13', 'gene17', 'gene19', 'gene25', 'gene27', 'gene28'}
     truth = pd.read_csv('tests/test_files/go_pvalues_classic_truth.csv', index_col=0).sort_index()
     dummy_go_node = namedtuple('DummyGONode', field_names='name')
@@ -241,7 +353,7 @@ def test_classic_pvals(monkeypatch):
 
 
 def test_elim_pvals(monkeypatch):
-    goa_df = pd.read_csv('tests/test_files/goa_table.csv', index_col=0).astype('bool')
+    goa_df = AnnotationMatrix.from_dataframe(pd.read_csv('tests/test_files/goa_table.csv', index_col=0).astype('bool'))
     threshold = 0.2  # make sure there are both significant and non-significant examples with our small bg size (30)
     gene_set = {'gene1', 'gene2', 'gene5', 'gene12', 'gene13', 'gene17', 'gene19', 'gene25', 'gene27', 'gene28'}
     truth = pd.read_csv('tests/test_files/go_pvalues_elim_truth.csv', index_col=0).sort_index()
@@ -252,7 +364,7 @@ def test_elim_pvals(monkeypatch):
     e = GOEnrichmentRunner(gene_set, 'elegans', 'WBGene', threshold, 'classic', 'any', 'any', None, 'any', None, 'any',
                            None, False, False, '', False, False, False, '', False, 'hypergeometric', 'all')
     e.annotation_df = goa_df
-    e.mod_annotation_dfs = goa_df.copy(deep=True),
+    e.mod_annotation_dfs = goa_df.copy(),
     e.attributes = list(goa_df.columns)
     e.attributes_set = set(e.attributes)
 
@@ -263,7 +375,7 @@ def test_elim_pvals(monkeypatch):
 
 
 def test_weight_pvals(monkeypatch):
-    goa_df = pd.read_csv('tests/test_files/goa_table.csv', index_col=0).astype('bool')
+    goa_df = AnnotationMatrix.from_dataframe(pd.read_csv('tests/test_files/goa_table.csv', index_col=0).astype('bool'))
     gene_set = {'gene1', 'gene2', 'gene5', 'gene12', 'gene13', 'gene17', 'gene19', 'gene25', 'gene27', 'gene28'}
     truth = pd.read_csv('tests/test_files/go_pvalues_weight_truth.csv', index_col=0).sort_index()
     with open('tests/test_files/obo_for_go_tests.obo', 'r') as f:
@@ -274,7 +386,7 @@ def test_weight_pvals(monkeypatch):
     e = GOEnrichmentRunner(gene_set, 'elegans', 'WBGene', 0.05, 'classic', 'any', 'any', None, 'any', None, 'any', None,
                            False, False, '', False, False, False, '', False, 'hypergeometric', 'all')
     e.annotation_df = goa_df
-    e.mod_annotation_dfs = goa_df.copy(deep=True),
+    e.mod_annotation_dfs = goa_df.copy(),
     e.attributes = list(goa_df.columns)
     e.attributes_set = set(e.attributes)
 
@@ -284,7 +396,7 @@ def test_weight_pvals(monkeypatch):
 
 
 def test_allm_pvals(monkeypatch):
-    goa_df = pd.read_csv('tests/test_files/goa_table.csv', index_col=0).astype('bool')
+    goa_df = AnnotationMatrix.from_dataframe(pd.read_csv('tests/test_files/goa_table.csv', index_col=0).astype('bool'))
     threshold = 0.2  # make sure there are both significant and non-significant examples with our small bg size (30)
     gene_set = {'gene1', 'gene2', 'gene5', 'gene12', 'gene13', 'gene17', 'gene19', 'gene25', 'gene27', 'gene28'}
     truth = pd.read_csv('tests/test_files/go_pvalues_allm_truth.csv', index_col=0).sort_index()
@@ -295,7 +407,7 @@ def test_allm_pvals(monkeypatch):
     e = GOEnrichmentRunner(gene_set, 'elegans', 'WBGene', threshold, 'classic', 'any', 'any', None, 'any', None, 'any',
                            None, False, False, '', False, False, False, '', False, 'hypergeometric', 'all')
     e.annotation_df = goa_df
-    e.mod_annotation_dfs = goa_df.copy(deep=True),
+    e.mod_annotation_dfs = goa_df.copy(),
     e.attributes = list(goa_df.columns)
     e.attributes_set = set(e.attributes)
 
@@ -374,7 +486,7 @@ def _randomization_enrichment_setup_runner(monkeypatch, truth, runner_class, not
     bg_array_truth = pd.read_csv('tests/test_files/annotation_df_bg_array_truth.csv', index_col=0)[truth[0]].values
 
     if notna:
-        df = df.notna()
+        df = AnnotationMatrix.from_dataframe(df)
 
     gene_set_truth = {'WBGene00000019', 'WBGene00000041', 'WBGene00000106',
                       'WBGene00001133', 'WBGene00003915', 'WBGene00268195'}
@@ -393,6 +505,7 @@ def _randomization_enrichment_setup_runner(monkeypatch, truth, runner_class, not
     runner.gene_set = gene_set_truth
     runner.annotation_df = df
     runner.pvalue_kwargs = {'reps': reps_truth}
+    runner.random_seed = None
     return runner
 
 
@@ -471,6 +584,7 @@ def test_enrichment_runner_format_results(monkeypatch):
     truth = pd.read_csv('tests/test_files/enrichment_runner_format_results_truth.csv', index_col=0)
     runner.en_score_col = 'colName'
     runner.single_set = False
+    runner.pvalue_kwargs = {}
     runner.return_nonsignificant = True
 
     runner.format_results(results_list)
@@ -484,6 +598,7 @@ def test_enrichment_runner_format_results_single_list(monkeypatch):
     truth = pd.read_csv('tests/test_files/enrichment_runner_single_list_format_results_truth.csv', index_col=0)
     runner.en_score_col = 'colName'
     runner.single_set = True
+    runner.pvalue_kwargs = {}
     runner.return_nonsignificant = True
 
     runner.format_results(results_list)
@@ -661,10 +776,8 @@ def test_enrichment_runner_set_random_seed(seed, is_legal):
     runner.random_seed = seed
     if is_legal:
         runner.set_random_seed()
-        val = np.random.random()
-        np.random.seed(seed)
-        truth = np.random.random()
-        assert val == truth
+        assert isinstance(runner.random_seed, np.random.SeedSequence)
+        assert runner.random_seed.entropy == seed
     else:
         with pytest.raises(AssertionError):
             runner.set_random_seed()
@@ -972,6 +1085,7 @@ def test_go_enrichment_runner_get_taxon_id(monkeypatch, organism, got_gene_id_ty
     runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
     runner.gene_set = {'gene1', 'gene2', 'gene4'}
     runner.organism = organism
+    runner.annotation_file = None
 
     if got_gene_id_type:
         runner.gene_id_type = gene_id_type_truth
@@ -986,6 +1100,8 @@ def test_go_enrichment_runner_get_taxon_id(monkeypatch, organism, got_gene_id_ty
 def test_go_enrichment_runner_fetch_annotations(monkeypatch):
     monkeypatch.setattr(GOEnrichmentRunner, '_get_query_key', lambda self: 'the_query_key')
     monkeypatch.setattr(GOEnrichmentRunner, '_generate_annotation_df', lambda self: 'goa_df')
+    monkeypatch.setattr(GOEnrichmentRunner, '_load_cached_annotation_df', lambda self, query_key: None)
+    monkeypatch.setattr(GOEnrichmentRunner, '_cache_annotation_df', lambda self, query_key: None)
     runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
     runner.fetch_annotations()
     assert runner.annotation_df == 'goa_df'
@@ -997,6 +1113,41 @@ def test_go_enrichment_runner_fetch_annotations(monkeypatch):
     assert runner.GOA_DF_QUERIES['the_query_key'] == 'another_goa_df'
 
 
+@pytest.mark.parametrize('gene_id_type,expect_disk_cache', [('WormBase', True), ('auto', False)])
+def test_go_enrichment_runner_fetch_annotations_disk_cache(monkeypatch, tmp_path, gene_id_type, expect_disk_cache):
+    class DAGTreePlaceHolder:
+        def __init__(self):
+            self.data_version = 'releases/2020-07-16'
+
+    goa_df = AnnotationMatrix.from_dataframe(pd.read_csv('tests/test_files/goa_table.csv', index_col=0).astype('bool'))
+    monkeypatch.setattr(io, 'get_annotation_cache_dir', lambda: tmp_path)
+    monkeypatch.setattr(GOEnrichmentRunner, 'GOA_DF_QUERIES', {})
+    monkeypatch.setattr(GOEnrichmentRunner, '_get_query_key', lambda self: ('taxon_id', self.gene_id_type))
+    monkeypatch.setattr(GOEnrichmentRunner, '_generate_annotation_df', lambda self: goa_df)
+    runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
+    runner.gene_id_type = gene_id_type
+    runner.dag_tree = DAGTreePlaceHolder()
+    runner.fetch_annotations()
+    assert runner.annotation_df is goa_df
+
+    def generate_annotation_df(self):
+        raise AssertionError('annotations should have been loaded from the on-disk cache')
+
+    monkeypatch.setattr(GOEnrichmentRunner, 'GOA_DF_QUERIES', {})
+    monkeypatch.setattr(GOEnrichmentRunner, '_generate_annotation_df', generate_annotation_df)
+    runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
+    runner.gene_id_type = gene_id_type
+    runner.dag_tree = DAGTreePlaceHolder()
+    if expect_disk_cache:
+        runner.fetch_annotations()
+        assert runner.annotation_df.equals(goa_df)
+        runner.dag_tree.data_version = 'releases/2022-01-01'
+        assert runner._load_cached_annotation_df(runner._get_query_key()) is None
+    else:
+        with pytest.raises(AssertionError):
+            runner.fetch_annotations()
+
+
 def test_go_enrichment_runner_get_annotation_iterator(monkeypatch):
     def alt_init(self, taxon_id, aspects, evidence_types, excluded_evidence_types, databases, excluded_databases,
                  qualifiers, excluded_qualifiers):
@@ -1019,39 +1170,80 @@ def test_go_enrichment_runner_get_annotation_iterator(monkeypatch):
     runner.excluded_databases = 'exc_databases'
     runner.qualifiers = 'qualifiers'
     runner.excluded_qualifiers = 'exc_qualifiers'
+    runner.annotation_file = None
     res = runner._get_annotation_iterator()
     assert isinstance(res, io.GOlrAnnotationIterator)
 
 
-@pytest.mark.parametrize('propagate', ['other', 'no'])
-@pytest.mark.parametrize("gene_id,go_id,truth",
-                         [('gene1', 'GO1',
-                           {'gene1': {'GO1', 'GO2', 'GO3', 'GO4', 'GO5'}, 'gene2': {'GO1'}, 'gene3': {'GO2'}}),
-                          ('gene2', 'GO1',
-                           {'gene1': {'GO1', 'GO2'}, 'gene2': {'GO1', 'GO3', 'GO4', 'GO5'}, 'gene3': {'GO2'}}),
-                          ('gene1', 'GO2',
-                           {'gene1': {'GO1', 'GO2'}, 'gene2': {'GO1'}, 'gene3': {'GO2'}}),
-                          ('gene3', 'GO2',
-                           {'gene1': {'GO1', 'GO2'}, 'gene2': {'GO1'}, 'gene3': {'GO2'}}),
-                          ])
-def test_go_enrichment_runner_propagate_annotation(monkeypatch, propagate, gene_id, go_id, truth):
-    annotation_dict = {'gene1': {'GO1', 'GO2'}, 'gene2': {'GO1'}, 'gene3': {'GO2'}}
-    if propagate == 'no':
-        truth = copy.deepcopy(annotation_dict)
+@pytest.mark.parametrize('organism,truth', [('auto', (None, 'all organisms')), (6239, (6239, 'taxon ID 6239')),
+                                            ('c elegans', ('c elegans_mapped_id', 'organism'))])
+def test_go_enrichment_runner_get_taxon_id_annotation_file(monkeypatch, organism, truth):
+    def infer_taxon_id(gene_set, gene_id_type=None):
+        raise AssertionError('the taxon ID should not be inferred when reading a local annotation file')
+
+    monkeypatch.setattr(io, 'map_taxon_id', lambda input_organism: (input_organism + '_mapped_id', 'organism'))
+    monkeypatch.setattr(io, 'infer_taxon_from_gene_ids', infer_taxon_id)
+    runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
+    runner.gene_set = {'gene1', 'gene2', 'gene4'}
+    runner.gene_id_type = 'UniProtKB'
+    runner.annotation_file = Path('tests/test_files/go_annotations_for_tests.gaf')
+    assert runner.get_taxon_id(organism) == truth
+
+
+def test_go_enrichment_runner_annotation_file(tmp_path):
+    with open('tests/test_files/go_mini.obo') as f:
+        dag = ontology.DAGTree(f, ['is_a', 'part_of', 'regulates'])
+    runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
+    runner.propagate_annotations = 'no'
+    runner.organism = 'all organisms'
+    runner.taxon_id = None
+    runner.gene_id_type = 'WormBase'
+    runner.aspects = 'biological_process'
+    runner.evidence_types = 'any'
+    runner.excluded_evidence_types = None
+    runner.databases = 'WB'
+    runner.excluded_databases = None
+    runner.qualifiers = 'any'
+    runner.excluded_qualifiers = 'not'
+    runner.dag_tree = dag
+    annotation_file = tmp_path.joinpath('annotations.gaf')
+    shutil.copyfile('tests/test_files/go_annotations_for_tests.gaf', annotation_file)
+    runner.annotation_file = annotation_file
+
+    assert isinstance(runner._get_annotation_iterator(), io.GAFAnnotationIterator)
+    annotation_df, source_dict = runner._process_annotations()
+    res_df = annotation_df.to_dataframe()
+    assert {gene_id: set(res_df.columns[res_df.loc[gene_id]]) for gene_id in res_df.index} == \
+           {'WBGene00000001': {'GO:0034308', 'GO:0006040'}, 'WBGene00000003': {'GO:2001315'}}
+    assert source_dict == {'WB': {'WBGene00000001', 'WBGene00000003'}}
+
+    # modifying the annotation file should invalidate cached annotations
+    key = runner._get_query_key()
+    assert key[-3] == str(annotation_file.resolve())
+    with open(annotation_file, 'a') as f:
+        f.write('WB\tWBGene00000004\tgene-4\t\tGO:0006793\tWB_REF:1\tIMP\t\tP\t\t\tgene\ttaxon:6239\t20200101\tWB\t\t\n')
+    assert runner._get_query_key() != key
 
-    def upper_induced_graph_iter(self, go_id):
-        if go_id == 'GO1':
-            for upper_go_id in {'GO3', 'GO4', 'GO5'}:
-                yield upper_go_id
 
-    monkeypatch.setattr(ontology.DAGTree, 'upper_induced_graph_iter', upper_induced_graph_iter)
-    dag = ontology.DAGTree.__new__(ontology.DAGTree)
+@pytest.mark.parametrize('propagate', ['other', 'no'])
+def test_go_enrichment_runner_propagate_annotation(propagate):
+    annotation_dict = {'gene1': {'GO:0007584'}, 'gene2': {'GO:0050896', 'GO:0007610'}, 'gene3': set()}
+    if propagate == 'no':
+        truth = annotation_dict
+    else:
+        truth = {'gene1': {'GO:0007584', 'GO:0042221', 'GO:0031667', 'GO:0008150', 'GO:0050896', 'GO:0009605',
+                           'GO:0009991'},
+                 'gene2': {'GO:0050896', 'GO:0007610', 'GO:0008150'}, 'gene3': set()}
+    with open('tests/test_files/obo_for_go_tests.obo') as f:
+        dag = ontology.DAGTree(f, ['is_a'])
     runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
     runner.dag_tree = dag
     runner.propagate_annotations = propagate
-    runner._propagate_annotation(gene_id, go_id, annotation_dict)
+    res = runner._propagate_annotation(AnnotationMatrix.from_sparse_dict(annotation_dict))
 
-    assert annotation_dict == truth
+    res_df = res.to_dataframe()
+    assert list(res_df.index) == ['gene1', 'gene2', 'gene3']
+    assert {gene_id: set(res_df.columns[res_df.loc[gene_id]]) for gene_id in res_df.index} == truth
 
 
 @pytest.mark.parametrize("mapping_dict,truth", [
@@ -1063,13 +1255,15 @@ def test_go_enrichment_runner_propagate_annotation(monkeypatch, propagate, gene_
 def test_go_enrichment_runner_translate_gene_ids(monkeypatch, mapping_dict, truth):
     monkeypatch.setattr(io, 'map_gene_ids', lambda gene_id, source, gene_id_type: mapping_dict)
     source_to_gene_id_dict = {'source1': {'gene1', 'gene3'}, 'source2': {'gene2'}}
-    sparse_annotation_dict = {'gene1': {'GO1', 'GO2'}, 'gene2': {'GO1'}, 'gene3': {'GO2'}}
+    annotation_df = AnnotationMatrix.from_sparse_dict({'gene1': {'GO1', 'GO2'}, 'gene2': {'GO1'}, 'gene3': {'GO2'}})
 
     runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
     runner.gene_id_type = 'gene_id_type'
 
-    res = runner._translate_gene_ids(sparse_annotation_dict, source_to_gene_id_dict)
-    assert res == truth
+    res = runner._translate_gene_ids(annotation_df, source_to_gene_id_dict)
+    assert isinstance(res, AnnotationMatrix)
+    res_df = res.to_dataframe()
+    assert {gene_id: set(res_df.columns[res_df.loc[gene_id]]) for gene_id in res_df.index} == truth
 
 
 @pytest.mark.parametrize('propagate_annotations', ['no', 'elim'])
@@ -1085,6 +1279,7 @@ def test_go_enrichment_runner_get_query_key(propagate_annotations):
     runner.excluded_databases = set()
     runner.qualifiers = {'qual1'}
     runner.excluded_qualifiers = set()
+    runner.annotation_file = None
 
     propagate = True if propagate_annotations != 'no' else False
 
@@ -1189,6 +1384,7 @@ def test_go_enrichment_runner_format_results(monkeypatch, return_nonsignificant,
     runner.dag_tree = dag_tree
     runner.en_score_col = 'colName'
     runner.single_set = False
+    runner.pvalue_kwargs = {}
     runner.return_nonsignificant = return_nonsignificant
 
     runner.format_results(results_dict)
@@ -1210,7 +1406,8 @@ def test_go_enrichment_runner_calculate_enrichment_serial(monkeypatch, propagate
     runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
     runner.propagate_annotations = propagate_annotations
     runner.attributes = []
-    runner.annotation_df = pd.read_csv('tests/test_files/attr_ref_table_for_tests.csv', index_col=0).notna()
+    runner.annotation_df = AnnotationMatrix.from_dataframe(
+        pd.read_csv('tests/test_files/attr_ref_table_for_tests.csv', index_col=0))
 
     res = runner._calculate_enrichment_serial()
 
@@ -1223,8 +1420,8 @@ def test_go_enrichment_runner_calculate_enrichment_serial(monkeypatch, propagate
         assert runner.annotation_df.equals(runner.mod_annotation_dfs[0])
         assert runner.annotation_df is not runner.mod_annotation_dfs[0]
     elif propagate_annotations == 'weight':
-        assert runner.annotation_df.equals((runner.mod_annotation_dfs[0] == 1))
-        assert runner.mod_annotation_dfs[0].values.dtype.name == 'float64'
+        assert runner.annotation_df.equals(runner.mod_annotation_dfs[0].astype('bool'))
+        assert runner.mod_annotation_dfs[0].dtype.name == 'float64'
         assert runner.annotation_df is not runner.mod_annotation_dfs[0]
 
     assert res == truth
@@ -1257,7 +1454,8 @@ def test_go_enrichment_runner_calculate_enrichment_parallel(monkeypatch, propaga
     runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
     runner.propagate_annotations = propagate_annotations
     runner.attributes = []
-    runner.annotation_df = pd.read_csv('tests/test_files/attr_ref_table_for_tests.csv', index_col=0).notna()
+    runner.annotation_df = AnnotationMatrix.from_dataframe(
+        pd.read_csv('tests/test_files/attr_ref_table_for_tests.csv', index_col=0))
     runner.dag_tree = DAGTreePlaceHolder()
 
     res = runner._calculate_enrichment_parallel()
@@ -1268,41 +1466,39 @@ def test_go_enrichment_runner_calculate_enrichment_parallel(monkeypatch, propaga
     elif propagate_annotations == 'elim':
         assert len(runner.mod_annotation_dfs) == len(runner.dag_tree.namespaces)
         for namespace, mod_df in zip(runner.dag_tree.namespaces, runner.mod_annotation_dfs):
-            assert runner.annotation_df[go_level_iter(None, namespace)].equals(mod_df)
+            assert runner.annotation_df.subset(terms=go_level_iter(None, namespace)).equals(mod_df)
     elif propagate_annotations == 'weight':
         assert len(runner.mod_annotation_dfs) == len(runner.dag_tree.namespaces)
         for namespace, mod_df in zip(runner.dag_tree.namespaces, runner.mod_annotation_dfs):
-            assert runner.annotation_df[go_level_iter(None, namespace)].equals(mod_df == 1)
-            assert mod_df.values.dtype.name == 'float64'
+            assert runner.annotation_df.subset(terms=go_level_iter(None, namespace)).equals(mod_df.astype('bool'))
+            assert mod_df.dtype.name == 'float64'
 
     assert res == truth
 
 
 def test_go_enrichment_runner_generate_annotation_df(monkeypatch):
-    annotation_dict = {}
     source_to_id_dict = {}
 
     def process_annotations(self):
-        annotation_dict['proccess_annotations'] = True
         source_to_id_dict['process_annotations_source'] = True
-        return annotation_dict, source_to_id_dict
+        return 'annotation_matrix', source_to_id_dict
 
-    def translate_gene_ids(self, annotation_dict, source_dict):
-        assert annotation_dict['proccess_annotations']
-        assert source_to_id_dict['process_annotations_source']
-        return {'translate_annotation': True}
+    def translate_gene_ids(self, annotation_df, source_dict):
+        assert annotation_df == 'annotation_matrix'
+        assert source_dict['process_annotations_source']
+        return 'translated_annotation_matrix'
 
-    def sparse_dict_to_bool_df(annotation_dict, progress_bar_desc):
-        assert annotation_dict['translate_annotation']
-        return 'bool_df'
+    def propagate_annotation(self, annotation_df):
+        assert annotation_df == 'translated_annotation_matrix'
+        return 'propagated_annotation_matrix'
 
     monkeypatch.setattr(GOEnrichmentRunner, '_process_annotations', process_annotations)
     monkeypatch.setattr(GOEnrichmentRunner, '_translate_gene_ids', translate_gene_ids)
-    monkeypatch.setattr(parsing, 'sparse_dict_to_bool_df', sparse_dict_to_bool_df)
+    monkeypatch.setattr(GOEnrichmentRunner, '_propagate_annotation', propagate_annotation)
     runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
 
     res = runner._generate_annotation_df()
-    assert res == 'bool_df'
+    assert res == 'propagated_annotation_matrix'
 
 
 def test_go_enrichment_runner_process_annotations_no_annotations(monkeypatch):
@@ -1322,57 +1518,50 @@ def test_go_enrichment_runner_process_annotations_no_annotations(monkeypatch):
         runner.propagate_annotations = "no"
         runner.organism = "organism"
         runner.taxon_id = "taxon id"
+        runner.annotation_file = None
         runner._process_annotations()
     print(e)
 
 
 def test_go_enrichment_runner_process_annotations(monkeypatch):
-    propagated_annotations = set()
-    propagated_annotations_truth = {('gene_id1', 'go_id1'), ('gene_id1', 'go_id2'), ('gene_id2', 'go_id1'),
-                                    ('gene_id2', 'go_id3'), ('gene_id3', 'go_id4')}
-    annotation_dict_truth = {'gene_id1': {'go_id1', 'go_id2'}, 'gene_id2': {'go_id1', 'go_id3'}, 'gene_id3': {'go_id4'}}
+    annotation_dict_truth = {'gene_id1': {'GO:0034308', 'GO:0006793'}, 'gene_id2': {'GO:0034308', 'GO:0006040'},
+                             'gene_id3': {'GO:2001315'}}
     source_dict_truth = {'source1': {'gene_id1', 'gene_id3'}, 'source2': {'gene_id2'}}
 
     def get_annotation_iter(self):
         iterator = io.GOlrAnnotationIterator.__new__(io.GOlrAnnotationIterator)
-        iterator.n_annotations = 5
+        iterator.n_annotations = 6
         return iterator
 
     def annotation_iter(self):
-        annotations = [{'bioentity_internal_id': 'gene_id1', 'annotation_class': 'go_id1', 'source': 'source1'},
-                       {'bioentity_internal_id': 'gene_id1', 'annotation_class': 'go_id2', 'source': 'source1'},
-                       {'bioentity_internal_id': 'gene_id2', 'annotation_class': 'go_id1', 'source': 'source2'},
-                       {'bioentity_internal_id': 'gene_id2', 'annotation_class': 'go_id3', 'source': 'source2'},
-                       {'bioentity_internal_id': 'gene_id3', 'annotation_class': 'go_id4', 'source': 'source1'}]
+        annotations = [{'bioentity_internal_id': 'gene_id1', 'annotation_class': 'GO:0034308', 'source': 'source1'},
+                       {'bioentity_internal_id': 'gene_id1', 'annotation_class': 'GO:0006793', 'source': 'source1'},
+                       {'bioentity_internal_id': 'gene_id2', 'annotation_class': 'GO:0034308', 'source': 'source2'},
+                       {'bioentity_internal_id': 'gene_id2', 'annotation_class': 'GO:0034619', 'source': 'source2'},
+                       {'bioentity_internal_id': 'gene_id3', 'annotation_class': 'GO:2001315', 'source': 'source1'},
+                       {'bioentity_internal_id': 'gene_id4', 'annotation_class': 'GO:9999999', 'source': 'source3'}]
         for annotation in annotations:
             yield annotation
 
-    def propagate_annotation(self, gene_id, go_id, sparse_annotation_dict):
-        propagated_annotations.add((gene_id, go_id))
-
     monkeypatch.setattr(io.GOlrAnnotationIterator, '_annotation_generator_func', annotation_iter)
-    monkeypatch.setattr(GOEnrichmentRunner, '_propagate_annotation', propagate_annotation)
     monkeypatch.setattr(GOEnrichmentRunner, '_get_annotation_iterator', get_annotation_iter)
 
-    dag = ontology.DAGTree.__new__(ontology.DAGTree)
-    dag.alt_ids = {}
-    dag.go_terms = {'go_id1': ontology.GOTerm(), 'go_id2': ontology.GOTerm(), 'go_id3': ontology.GOTerm(),
-                    'go_id4': ontology.GOTerm()}
-    dag.go_terms['go_id1'].set_id('go_id1')
-    dag.go_terms['go_id2'].set_id('go_id2')
-    dag.go_terms['go_id3'].set_id('go_id3')
-    dag.go_terms['go_id4'].set_id('go_id4')
+    with open('tests/test_files/go_mini.obo') as f:
+        dag = ontology.DAGTree(f, ['is_a', 'part_of', 'regulates'])
 
     runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
     runner.propagate_annotations = 'classic'
     runner.organism = 'organism'
     runner.taxon_id = 'taxon_id'
     runner.dag_tree = dag
+    runner.annotation_file = None
 
-    annotation_dict, source_dict = runner._process_annotations()
+    annotation_df, source_dict = runner._process_annotations()
 
-    assert propagated_annotations == propagated_annotations_truth
-    assert annotation_dict == annotation_dict_truth
+    assert isinstance(annotation_df, AnnotationMatrix)
+    assert annotation_df.dtype == 'bool'
+    res_df = annotation_df.to_dataframe()
+    assert {gene_id: set(res_df.columns[res_df.loc[gene_id]]) for gene_id in res_df.index} == annotation_dict_truth
     assert source_dict == source_dict_truth
 
 
@@ -1628,12 +1817,61 @@ def test_go_enrichment_runner_generate_xlmhg_index_vectors(attribute, truth):
     runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
     runner.ranked_genes = np.array(['WBGene00000106', 'WBGene00000019', 'WBGene00000865', 'WBGene00001131'],
                                    dtype='str')
-    runner.mod_annotation_dfs = (pd.read_csv('tests/test_files/attr_ref_table_for_tests.csv', index_col=0).notna(),)
+    runner.mod_annotation_dfs = (
+        AnnotationMatrix.from_dataframe(pd.read_csv('tests/test_files/attr_ref_table_for_tests.csv', index_col=0)),)
     res = runner._generate_xlmhg_index_vectors(attribute, 0)
     assert np.all(res[0] == truth[0])
     assert np.all(res[1] == truth[1])
 
 
+@pytest.mark.parametrize('mode', ['EnrichmentRunner', 'GOEnrichmentRunner'])
+@pytest.mark.parametrize('pvalue_kwargs', [{}, {'L': 2, 'X': 1}])
+def test_enrichment_runner_xlmhg_enrichment_batch(monkeypatch, mode, pvalue_kwargs):
+    class ResultObject:
+        def __init__(self, pval, escore):
+            self.pval = pval
+            self.escore = escore
+
+    def _fake_xlmhg_test(N, indices, X, L, table):
+        assert table.shape == (len(indices) + 1, N - len(indices) + 1)
+        assert table.dtype == np.longdouble
+        return ResultObject(1 / (2 + int(np.sum(indices)) + X + L), 1 + len(indices) / N)
+
+    monkeypatch.setattr(xlmhg, 'get_xlmhg_test_result', _fake_xlmhg_test)
+    annotation_df = pd.read_csv('tests/test_files/attr_ref_table_for_tests.csv', index_col=0)
+    ranked_genes = np.array(['WBGene00000106', 'WBGene00000019', 'WBGene00000865', 'WBGene00001131',
+                             'WBGene00000041', 'WBGene00003915'], dtype='str')
+    attributes = list(annotation_df.columns)
+
+    if mode == 'GOEnrichmentRunner':
+        class FakeGOTerm:
+            def __init__(self, go_id):
+                self.name = go_id + '_name'
+
+        runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
+        runner.mod_annotation_dfs = (AnnotationMatrix.from_dataframe(annotation_df),)
+        runner.dag_tree = {attr: FakeGOTerm(attr) for attr in attributes}
+        annotations = runner.mod_annotation_dfs[0]
+        mod_df_args = (0,)
+    else:
+        runner = EnrichmentRunner.__new__(EnrichmentRunner)
+        runner.annotation_df = annotation_df
+        runner.parallel = False
+        annotations = runner.annotation_df
+        mod_df_args = ()
+    runner.ranked_genes = ranked_genes
+    runner.pvalue_kwargs = pvalue_kwargs
+    runner.enrichment_func = runner._xlmhg_enrichment
+    truth = [runner._xlmhg_enrichment(attr, *mod_df_args) for attr in attributes]
+    vecs_truth = [runner._generate_xlmhg_index_vectors(attr, *mod_df_args)[0] for attr in attributes]
+
+    assert runner._get_batch_enrichment_func().__name__ == '_xlmhg_enrichment_batch'
+    for vec, vec_truth in zip(runner._get_xlmhg_index_vectors_batch(annotations, attributes), vecs_truth):
+        assert vec.dtype == vec_truth.dtype
+        assert np.all(vec == vec_truth)
+    assert runner._xlmhg_enrichment_batch(attributes) == truth
+
+
 @pytest.mark.parametrize('params,go_id,truth',
                          [((38, 6, 11, 3), 'attribute1',
                            ['attribute1_name', 6, 3, (13 / 38) * 6, np.log2(3 / ((13 / 38) * 6)), 0.05]), ])
@@ -1646,7 +1884,8 @@ def test_go_enrichment_runner_hypergeometric_enrichment(monkeypatch, params, go_
 
     monkeypatch.setattr(GOEnrichmentRunner, '_calc_hypergeometric_pval', alt_calc_pval)
     runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
-    runner.annotation_df = pd.read_csv('tests/test_files/attr_ref_table_for_tests.csv', index_col=0).apply(np.ceil)
+    df = pd.read_csv('tests/test_files/attr_ref_table_for_tests.csv', index_col=0).apply(np.ceil).fillna(0)
+    runner.annotation_df = AnnotationMatrix(df.values, df.index, df.columns)
     runner.gene_set = {'WBGene00000019', 'WBGene00000041', 'WBGene00000106', 'WBGene00001133', 'WBGene00003915',
                        'WBGene00268195'}
 
@@ -1671,7 +1910,8 @@ def test_go_enrichment_runner_fisher_enrichment(monkeypatch, params, go_id, trut
 
     monkeypatch.setattr(GOEnrichmentRunner, '_calc_fisher_pval', alt_calc_pval)
     runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
-    runner.annotation_df = pd.read_csv('tests/test_files/attr_ref_table_for_tests.csv', index_col=0).apply(np.ceil)
+    df = pd.read_csv('tests/test_files/attr_ref_table_for_tests.csv', index_col=0).apply(np.ceil).fillna(0)
+    runner.annotation_df = AnnotationMatrix(df.values, df.index, df.columns)
     runner.gene_set = {'WBGene00000019', 'WBGene00000041', 'WBGene00000106', 'WBGene00001133', 'WBGene00003915',
                        'WBGene00268195'}
 
@@ -1690,7 +1930,8 @@ def test_go_enrichment_runner_fisher_enrichment(monkeypatch, params, go_id, trut
                           ('attribute4', (38, 6, 1, 2), 2)])
 def test_go_enrichment_runner_get_hypergeometric_parameters(monkeypatch, go_id, results, mod_df_ind):
     runner = GOEnrichmentRunner.__new__(GOEnrichmentRunner)
-    annotation_df = pd.read_csv('tests/test_files/attr_ref_table_for_tests.csv', index_col=0)
+    df = pd.read_csv('tests/test_files/attr_ref_table_for_tests.csv', index_col=0).fillna(0)
+    annotation_df = AnnotationMatrix(df.values, df.index, df.columns)
     runner.mod_annotation_dfs = [None, None, None]
     runner.mod_annotation_dfs[mod_df_ind] = annotation_df
     runner.gene_set = {'WBGene00000019', 'WBGene00000041', 'WBGene00000106', 'WBGene00001133', 'WBGene00003915',
@@ -1784,6 +2025,7 @@ def test_kegg_enrichment_runner_format_results(monkeypatch):
     truth = pd.read_csv('tests/test_files/kegg_enrichment_runner_format_results_truth.csv', index_col=0)
     runner.en_score_col = 'colName'
     runner.single_set = False
+    runner.pvalue_kwargs = {}
     runner.return_nonsignificant = False
     runner.pathway_names_dict = {'name1': 'desc1', 'name2': 'desc2', 'name3': 'desc3'}
 
@@ -1810,7 +2052,7 @@ def test_kegg_enrichment_runner_fetch_annotations(monkeypatch):
 def test_kegg_enrichment_runner_generate_annotation_df(monkeypatch):
     annotation_dict = {}
     name_dict = {}
-    truth = pd.DataFrame([[True, np.nan], [np.nan, np.nan]])
+    truth = pd.DataFrame([[True, False], [False, False]], index=['gene1', 'gene2'], columns=['path1', 'path2'])
 
     def process_annotations(self):
         annotation_dict['proccess_annotations'] = True
@@ -1820,19 +2062,15 @@ def test_kegg_enrichment_runner_generate_annotation_df(monkeypatch):
     def translate_gene_ids(self, annotation_dict):
         assert annotation_dict['proccess_annotations']
         assert name_dict['process_annotations_source']
-        return {'translate_annotation': True}
-
-    def sparse_dict_to_bool_df(annotation_dict, progress_bar_desc):
-        assert annotation_dict['translate_annotation']
-        return pd.DataFrame([[True, False], [False, False]])
+        return {'gene1': {'path1'}, 'gene2': set()}
 
     monkeypatch.setattr(KEGGEnrichmentRunner, '_process_annotations', process_annotations)
     monkeypatch.setattr(KEGGEnrichmentRunner, '_translate_gene_ids', translate_gene_ids)
-    monkeypatch.setattr(parsing, 'sparse_dict_to_bool_df', sparse_dict_to_bool_df)
     runner = KEGGEnrichmentRunner.__new__(KEGGEnrichmentRunner)
 
     res, name_res = runner._generate_annotation_df()
-    assert np.all(res.notna() == truth.notna())
+    assert isinstance(res, AnnotationMatrix)
+    assert res.to_dataframe().reindex(columns=truth.columns, fill_value=False).equals(truth)
 
 
 def test_kegg_enrichment_runner_process_annotations(monkeypatch):
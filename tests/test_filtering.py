@@ -1,4 +1,5 @@
 import asyncio.log
+import gc
 
 import pytest
 import pandas as pd
@@ -8,6 +9,7 @@ from sklearn.preprocessing import PowerTransformer, StandardScaler
 import matplotlib
 
 from rnalysis.filtering import *
+from rnalysis.utils import ontology
 import os
 from tests import __attr_ref__, __biotype_ref__
 
@@ -1114,6 +1116,235 @@ def test_filter_by_row_sum():
     assert np.all(h.df == truth)
 
 
+@pytest.fixture
+def memmap_counts(tmp_path):
+    counts = CountFilter.from_dataframe(io.load_csv('tests/test_files/counted.csv', 0), tmp_path.joinpath('counted.csv'))
+    counts.save_memmap()
+    return counts, CountFilter(tmp_path.joinpath('counted.mmap'))
+
+
+def test_countfilter_memmap_init(memmap_counts):
+    counts, counts_mmap = memmap_counts
+    assert io.get_memmap_table_path(counts_mmap.df) == counts_mmap.fname
+    assert io.get_memmap_table_path(counts.df) is None
+    assert np.all(counts_mmap.df == counts.df)
+    assert list(counts_mmap.df.index) == list(counts.df.index)
+    # memory-mapped tables are shared between copies instead of being loaded into memory
+    assert io.get_memmap_table_path(counts_mmap.__copy__().df) == counts_mmap.fname
+    with pytest.raises(AssertionError):
+        counts_mmap.save_memmap()
+
+
+@pytest.mark.parametrize('func_name,kwargs', [('filter_low_reads', dict(threshold=60)),
+                                              ('filter_low_reads', dict(threshold=5)),
+                                              ('filter_by_row_sum', dict(threshold=29)),
+                                              ('normalize_to_rpm', dict()),
+                                              ('normalize_to_quantile', dict()),
+                                              ('normalize_to_rpm_htseqcount',
+                                               dict(special_counter_fname='tests/test_files/uncounted.csv'))])
+def test_countfilter_memmap_out_of_core(memmap_counts, func_name, kwargs):
+    counts, counts_mmap = memmap_counts
+    truth = getattr(counts, func_name)(**kwargs, inplace=False)
+    res = getattr(counts_mmap, func_name)(**kwargs, inplace=False)
+    res_path = io.get_memmap_table_path(res.df)
+    assert res_path is not None
+    assert res_path.parent == counts_mmap.fname.parent
+    assert res_path != counts_mmap.fname
+    assert np.isclose(res.df, truth.df).all()
+    assert list(res.df.index) == list(truth.df.index)
+    assert res.is_normalized == truth.is_normalized
+    # the original memory-mapped table is not modified
+    assert np.all(counts_mmap.df == counts.df)
+
+
+def test_countfilter_memmap_dir(memmap_counts, tmp_path):
+    counts, _ = memmap_counts
+    out_dir = tmp_path.joinpath('intermediate', 'tables')
+    counts_mmap = CountFilter(tmp_path.joinpath('counted.mmap'), memmap_dir=out_dir)
+    res = counts_mmap.filter_low_reads(5, inplace=False).normalize_to_rpm(inplace=False)
+    assert io.get_memmap_table_path(res.df).parent == out_dir
+    assert res.df.equals(counts.filter_low_reads(5, inplace=False).normalize_to_rpm(inplace=False).df)
+
+
+def test_countfilter_memmap_intermediate_cleanup(memmap_counts, tmp_path):
+    _, counts_mmap = memmap_counts
+    out_dir = tmp_path.joinpath('out')
+
+    def list_tables():
+        gc.collect()
+        return sorted(path.name for path in out_dir.iterdir())
+
+    counts_mmap = CountFilter(counts_mmap.fname, memmap_dir=out_dir)
+    res = counts_mmap.filter_low_reads(5, inplace=False)
+    res.filter_by_row_sum(30)
+    res.normalize_to_rpm()
+    # the tables of the replaced intermediate steps are deleted, and only the table in use is kept
+    assert list_tables() == [io.get_memmap_table_path(res._df).name]
+    assert counts_mmap.fname.exists()
+
+    pipe = Pipeline('countfilter')
+    pipe.add_function('filter_low_reads', 5)
+    pipe.add_function('filter_by_row_sum', 30)
+    pipe.add_function('normalize_to_rpm')
+    pipe_res = pipe.apply_to(counts_mmap, inplace=False)
+    assert len(list_tables()) == 2
+    assert pipe_res.df.equals(res.df)
+
+    # tables that share their values with a copy are kept as long as the copy is in use
+    res_copy = res.__copy__()
+    del res
+    assert len(list_tables()) == 2
+    del res_copy, pipe_res
+    assert list_tables() == []
+
+
+def test_countfilter_memmap_split_by_reads(memmap_counts):
+    counts, counts_mmap = memmap_counts
+    for res, truth in zip(counts_mmap.split_by_reads(60), counts.split_by_reads(60)):
+        assert io.get_memmap_table_path(res.df) is not None
+        assert res.df.equals(truth.df)
+
+
+@pytest.mark.parametrize('filter_obj', [Filter('tests/test_files/test_deseq.csv'),
+                                        DESeqFilter('tests/test_files/test_deseq.csv', padj_col='pvalue'),
+                                        CountFilter('tests/test_files/counted.csv', is_normalized=True),
+                                        FoldChangeFilter('tests/test_files/fc_1.csv', 'num', 'denom')])
+def test_filter_copy_on_write(filter_obj):
+    obj = filter_obj.__copy__()
+    obj_copy = obj.__copy__()
+    assert type(obj_copy) == type(obj)
+    for slot in ['fname', 'log2fc_col', 'padj_col', 'is_normalized', 'numerator', 'denominator']:
+        if hasattr(obj, slot):
+            assert getattr(obj_copy, slot) == getattr(obj, slot)
+    # the copy shares the values of the table until its table is accessed
+    assert np.shares_memory(obj._df.values, obj_copy._df.values)
+    original_df = obj._df.copy(deep=True)
+    obj_copy.df.iloc[0] = 0
+    assert obj.df.equals(original_df)
+    assert not np.shares_memory(obj._df.values, obj_copy._df.values)
+
+    obj_copy = obj.__copy__()
+    obj.df.iloc[0] = 0
+    assert obj_copy.df.equals(original_df)
+
+
+def test_filter_df_view_does_not_copy():
+    d = DESeqFilter('tests/test_files/test_deseq.csv')
+    d_copy = d.__copy__()
+    view = d_copy.df_view
+    assert view.equals(d._df)
+    assert np.shares_memory(view.values, d._df.values)
+    assert d_copy._df_shared
+    # modifying the structure of the view does not modify the table of the Filter object
+    view['new_col'] = 0
+    assert 'new_col' not in d_copy.columns
+
+
+def test_filter_not_inplace_copy_on_write():
+    d = DESeqFilter('tests/test_files/test_deseq.csv')
+    original_df = d.df.copy(deep=True)
+    # the filtered table is a view of the original table
+    res = d.filter_top_n('padj', 3, inplace=False)
+    res.df.iloc[0, 0] = -1
+    assert d.df.equals(original_df)
+
+    res = d.filter_significant(0.1, inplace=False)
+    assert not res._df_shared
+    assert not d._df_shared
+
+
+def test_lazy_deseqfilter():
+    d = DESeqFilter('tests/test_files/test_deseq_with_nan.csv')
+    d_original = d.__copy__()
+    truth = d.filter_missing_values(inplace=False).filter_significant(0.1, inplace=False). \
+        number_filters('baseMean', 'gt', 10, inplace=False).sort('padj', inplace=False)
+    lazy = d.lazy().filter_missing_values().filter_significant(0.1).number_filters('baseMean', 'gt', 10).sort('padj')
+    assert isinstance(lazy, LazyFilter)
+    assert len(lazy) == 4
+    assert [name for name, _, _ in lazy.plan] == ['filter_missing_values', 'filter_significant', 'number_filters',
+                                                  'sort']
+    res = lazy.collect()
+    assert type(res) == DESeqFilter
+    assert res.df.equals(truth.df)
+    assert res.fname == truth.fname
+    assert d == d_original
+    assert lazy.collect() is res
+
+
+def test_lazy_opposite():
+    d = DESeqFilter('tests/test_files/test_deseq.csv')
+    truth = d.filter_significant(0.1, opposite=True, inplace=False).filter_abs_log2_fold_change(1, inplace=False). \
+        filter_fold_change_direction('pos', opposite=True, inplace=False)
+    res = d.lazy().filter_significant(0.1, opposite=True).filter_abs_log2_fold_change(1). \
+        filter_fold_change_direction('pos', opposite=True).collect()
+    assert res.df.equals(truth.df)
+    assert res.fname == truth.fname
+
+
+def test_lazy_countfilter():
+    c = CountFilter('tests/test_files/counted.csv')
+    c_original = c.__copy__()
+    truth = c.filter_low_reads(5, inplace=False).filter_by_row_sum(20, inplace=False). \
+        normalize_to_rpm(inplace=False).filter_percentile(0.5, 'cond1', inplace=False)
+    res = c.lazy().filter_low_reads(5).filter_by_row_sum(20).normalize_to_rpm().filter_percentile(0.5,
+                                                                                                  'cond1').collect()
+    assert type(res) == CountFilter
+    assert res.df.equals(truth.df)
+    assert res.fname == truth.fname
+    assert res.is_normalized
+    assert c == c_original
+    assert not c.is_normalized
+
+
+@pytest.mark.parametrize('plan', [lambda lazy: lazy.sort('baseMean'),
+                                  lambda lazy: lazy.filter_top_n('baseMean', 5),
+                                  lambda lazy: lazy.sort('baseMean', ascending=False).filter_significant(0.1)])
+def test_lazy_sort_does_not_modify_source(plan):
+    d = DESeqFilter('tests/test_files/test_deseq.csv')
+    original_df = d.df.copy(deep=True)
+    res = plan(d.lazy()).collect()
+    assert d.df.equals(original_df)
+    assert list(d.df.index) == list(original_df.index)
+    assert list(res.df.index) != list(original_df.index)
+
+
+def test_lazy_printout(capsys):
+    d = DESeqFilter('tests/test_files/test_deseq.csv')
+    d.lazy().filter_significant(0.1).sort('padj').collect()
+    printout = capsys.readouterr().out
+    assert 'inplace' not in printout
+    assert printout.count('result saved to new object.') == 2
+
+    res = d.filter_significant(0.1, inplace=False)
+    res.sort('padj')
+    assert 'Sorted inplace.' in capsys.readouterr().out
+
+
+def test_lazy_empty_plan():
+    d = DESeqFilter('tests/test_files/test_deseq.csv')
+    res = d.lazy().collect()
+    assert res == d
+    assert res.df is not d.df
+
+
+def test_lazy_materialize_on_other_attributes():
+    d = DESeqFilter('tests/test_files/test_deseq.csv')
+    truth = d.filter_significant(0.1, inplace=False)
+    lazy = d.lazy().filter_significant(0.1)
+    assert lazy.shape == truth.shape
+    assert lazy.index_set == truth.index_set
+
+
+def test_lazy_invalid_arguments():
+    d = DESeqFilter('tests/test_files/test_deseq.csv')
+    with pytest.raises(TypeError):
+        d.lazy().filter_significant(0.1, invalid_arg=5)
+    with pytest.raises(AssertionError):
+        d.lazy().filter_significant(0.1, inplace=False)
+    with pytest.raises(AttributeError):
+        d.lazy()._inplace
+
+
 def test_sort_inplace():
     c = CountFilter('tests/test_files/counted.csv')
     c.sort(by='cond3', ascending=True, inplace=True)
@@ -1312,6 +1543,22 @@ def test_pipeline_apply_to():
     assert np.all(cnt_pipelined.df == cnt_truth.df)
 
 
+@pytest.mark.parametrize('first_func,first_kwargs', [('sort', {'by': 'baseMean'}),
+                                                       ('filter_top_n', {'by': 'baseMean', 'n': 5})])
+def test_pipeline_apply_to_not_inplace_sort_does_not_modify_source(first_func, first_kwargs, capsys):
+    d = DESeqFilter('tests/test_files/test_deseq.csv')
+    original_df = d.df.copy(deep=True)
+    p = Pipeline('deseqfilter')
+    p.add_function(first_func, **first_kwargs)
+    p.add_function('filter_significant', 0.1)
+    capsys.readouterr()
+    res = p.apply_to(d, inplace=False)
+    assert d.df.equals(original_df)
+    assert list(d.df.index) == list(original_df.index)
+    assert res != d
+    assert 'inplace' not in capsys.readouterr().out
+
+
 def test_pipeline_apply_to_with_multiple_functions():
     d = DESeqFilter('tests/test_files/test_deseq_with_nan.csv')
     d_copy = d.__copy__()
@@ -1333,6 +1580,46 @@ def test_pipeline_apply_to_with_multiple_functions():
     assert d.df.equals(d_copy.df)
 
 
+@pytest.mark.parametrize('n_jobs', [2, -2])
+@pytest.mark.parametrize('backend', ['thread', 'process'])
+def test_pipeline_apply_to_many(backend, n_jobs):
+    p = Pipeline('deseqfilter')
+    p.add_function('filter_missing_values')
+    p.add_function('filter_significant', 0.1)
+    p.add_function('split_fold_change_direction')
+    p.add_function('sort', 'baseMean', ascending=False)
+    d_lst = [DESeqFilter('tests/test_files/test_deseq_with_nan.csv'), DESeqFilter('tests/test_files/test_deseq.csv'),
+             DESeqFilter('tests/test_files/test_deseq_with_nan.csv', padj_col='pvalue')]
+    d_copies = [d.__copy__() for d in d_lst]
+    res = p.apply_to_many(d_lst, n_jobs=n_jobs, backend=backend)
+    assert len(res) == len(d_lst)
+    for res_obj, d, d_copy in zip(res, d_lst, d_copies):
+        assert d == d_copy
+        truth = p.apply_to(d_copy, inplace=False)
+        assert len(res_obj) == len(truth)
+        for res_split, truth_split in zip(res_obj, truth):
+            assert res_split == truth_split
+            assert res_split.fname == truth_split.fname
+
+
+def test_pipeline_apply_to_many_invalid_input():
+    p = Pipeline('deseqfilter')
+    p.add_function('filter_missing_values')
+    d = DESeqFilter('tests/test_files/test_deseq.csv')
+    with pytest.raises(AssertionError):
+        p.apply_to_many([d, CountFilter('tests/test_files/counted.csv')])
+    with pytest.raises(AssertionError):
+        p.apply_to_many([])
+    with pytest.raises(AssertionError):
+        p.apply_to_many([d], backend='invalid')
+    with pytest.raises(AssertionError):
+        p.apply_to_many([d], n_jobs=0)
+    with pytest.raises(AssertionError):
+        p.apply_to_many([d], n_jobs=1.5)
+    with pytest.raises(AssertionError):
+        Pipeline('deseqfilter').apply_to_many([d])
+
+
 def test_pipeline_apply_to_invalid_object():
     pl = Pipeline('deseqfilter')
     pl.add_function(DESeqFilter.filter_significant, alpha=10 ** -70)
@@ -1645,6 +1932,77 @@ def test_fc_randomization():
     assert np.isclose(truth.iloc[:, :-1], res.iloc[:, :-1]).all()
 
 
+def test_fc_randomization_reproducible():
+    fc1 = FoldChangeFilter("tests/test_files/fc_1.csv", 'a', 'b')
+    res = fc1.randomization_test(fc1, reps=1000, random_seed=42)
+    np.random.random(5)
+    assert res.equals(fc1.randomization_test(fc1, reps=1000, random_seed=42))
+
+
+def test_fc_randomization_adaptive():
+    truth = io.load_csv('tests/test_files/fc_randomization_truth.csv')
+    fc1 = FoldChangeFilter("tests/test_files/fc_1.csv", 'a', 'b')
+    fc2 = FoldChangeFilter("tests/test_files/fc_2.csv", "c", "d")
+    # a significant result never reaches 'stop_after', and is identical to the non-adaptive test
+    res = fc1.randomization_test(fc2, random_seed=0, stop_after=100)
+    assert res['reps'].iloc[0] == 10000
+    assert np.all(truth['significant'] == res['significant'])
+    assert np.isclose(truth.iloc[:, :-1], res.iloc[:, :-2]).all()
+    # a clearly non-significant result stops early
+    res_nonsig = fc1.randomization_test(fc1, random_seed=0, stop_after=100)
+    assert 100 <= res_nonsig['reps'].iloc[0] < 10000
+    assert np.isclose(res_nonsig['pval'].iloc[0], 100 / res_nonsig['reps'].iloc[0])
+    assert not res_nonsig['significant'].iloc[0]
+    with pytest.raises(AssertionError):
+        fc1.randomization_test(fc2, stop_after=0)
+
+
+def test_fc_randomization_many():
+    fc1 = FoldChangeFilter("tests/test_files/fc_1.csv", 'a', 'b')
+    fc2 = FoldChangeFilter("tests/test_files/fc_2.csv", "c", "d")
+    attrs = ['attribute1', 'attribute2', 'attribute3', 'attribute4']
+    res = fc2.randomization_test_many({'fc1': fc1, 'first_genes': set(fc2.df.index[:7])}, attributes=attrs,
+                                      attr_ref_path='tests/test_files/attr_ref_table_for_examples.csv',
+                                      random_seed=0, parallel=False)
+    assert list(res.index) == ['fc1', 'first_genes'] + attrs
+    assert list(res.columns) == ['group size', 'observed fold change', 'expected fold change', 'pval', 'padj',
+                                 'significant']
+    assert np.all(res['group size'] == [22, 7, 7, 2, 4, 3])
+    assert np.isclose(res.loc['first_genes', 'observed fold change'], fc2.df.iloc[:7].mean())
+    assert np.isclose(res['expected fold change'], fc2.df.mean()).all()
+    _, padj_truth = multitest.fdrcorrection(res['pval'].values, 0.05)
+    assert np.isclose(res['padj'], padj_truth).all()
+    # groups of the same size share the same random draws
+    single = fc2.randomization_test_many([set(fc2.df.index[:7])], random_seed=0, parallel=False)
+    assert single.loc['group_1', 'pval'] == res.loc['first_genes', 'pval']
+    # results do not depend on parallel processing
+    res_parallel = fc2.randomization_test_many({'fc1': fc1, 'first_genes': set(fc2.df.index[:7])}, attributes=attrs,
+                                               attr_ref_path='tests/test_files/attr_ref_table_for_examples.csv',
+                                               random_seed=0, parallel=True)
+    assert res.equals(res_parallel)
+
+
+def test_fc_randomization_many_matches_single_test():
+    fc2 = FoldChangeFilter("tests/test_files/fc_2.csv", "c", "d")
+    test_set = fc2.filter_by_attribute('attribute1', ref='tests/test_files/attr_ref_table_for_examples.csv',
+                                       inplace=False)
+    truth = test_set.randomization_test(fc2, reps=20000, random_seed=0)
+    res = fc2.randomization_test_many([test_set], reps=20000, random_seed=0)
+    assert np.isclose(res['observed fold change'].iloc[0], truth['observed fold change'].iloc[0])
+    assert np.isclose(res['pval'].iloc[0], truth['pval'].iloc[0], atol=0.01, rtol=0.1)
+
+
+def test_fc_randomization_many_invalid_input():
+    fc2 = FoldChangeFilter("tests/test_files/fc_2.csv", "c", "d")
+    with pytest.raises(AssertionError):
+        fc2.randomization_test_many()
+    with pytest.raises(AssertionError):
+        fc2.randomization_test_many({'set': set(fc2.df.index[:3])}, reps=0)
+    with pytest.raises(AssertionError):
+        fc2.randomization_test_many({'attribute1': set(fc2.df.index[:3])}, attributes='attribute1',
+                                    attr_ref_path='tests/test_files/attr_ref_table_for_examples.csv')
+
+
 def test_filter_save_csv():
     d = DESeqFilter('tests/test_files/test_deseq_with_nan.csv')
     d.filter_missing_values()
@@ -1667,6 +2025,83 @@ def test_filter_save_csv():
     pth_sig_suffix.unlink()
 
 
+@pytest.mark.skipif(not io.HAS_PYARROW, reason="Python package 'pyarrow' is not installed")
+@pytest.mark.parametrize('filter_obj,metadata', [
+    (Filter('tests/test_files/test_deseq.csv'), {}),
+    (DESeqFilter('tests/test_files/test_deseq.csv', log2fc_col='baseMean', padj_col='pvalue'),
+     {'log2fc_col': 'baseMean', 'padj_col': 'pvalue'}),
+    (CountFilter('tests/test_files/counted.csv', is_normalized=True), {'is_normalized': True}),
+    (FoldChangeFilter('tests/test_files/fc_1.csv', 'num', 'denom'),
+     {'numerator': 'num', 'denominator': 'denom'})])
+@pytest.mark.parametrize('suffix', ['.parquet', '.feather'])
+def test_filter_save_parquet(tmp_path, filter_obj, metadata, suffix):
+    filter_obj.fname = tmp_path.joinpath(filter_obj.fname.name)
+    filter_obj.save_parquet(alt_filename=f'saved{suffix}')
+    pth = tmp_path.joinpath(f'saved{suffix}')
+    assert pth.exists()
+
+    loaded = type(filter_obj).from_parquet(pth)
+    assert loaded == filter_obj
+    assert loaded.fname == pth
+    assert isinstance(loaded.df, type(filter_obj.df))
+    for attr, val in metadata.items():
+        assert getattr(loaded, attr) == val
+
+    if isinstance(filter_obj, FoldChangeFilter):
+        loaded_init = FoldChangeFilter(pth, 'num', 'denom')
+    else:
+        loaded_init = type(filter_obj)(pth)
+    assert loaded_init == filter_obj
+
+
+@pytest.mark.skipif(not io.HAS_PYARROW, reason="Python package 'pyarrow' is not installed")
+def test_filter_save_parquet_default_filename(tmp_path):
+    counts = CountFilter.from_dataframe(io.load_csv('tests/test_files/counted.csv', 0), tmp_path.joinpath('counts.csv'))
+    counts.save_parquet()
+    assert tmp_path.joinpath('counts.parquet').exists()
+    with pytest.warns(UserWarning):
+        loaded = Filter.from_parquet(tmp_path.joinpath('counts.parquet'))
+    assert loaded.df.equals(counts.df)
+    assert CountFilter(tmp_path.joinpath('counts.parquet'), drop_columns=['cond1']).columns == ['cond2', 'cond3',
+                                                                                                'cond4']
+
+
+@pytest.mark.skipif(not io.HAS_PYARROW, reason="Python package 'pyarrow' is not installed")
+@pytest.mark.parametrize('suffix', ['.parquet', '.feather'])
+def test_filter_init_from_parquet_restores_metadata(tmp_path, suffix):
+    counts = CountFilter('tests/test_files/counted.csv', is_normalized=True)
+    counts.save_parquet(tmp_path.joinpath(f'counts{suffix}'))
+    assert CountFilter(tmp_path.joinpath(f'counts{suffix}')).is_normalized
+
+    d = DESeqFilter('tests/test_files/test_deseq.csv', log2fc_col='baseMean', padj_col='pvalue')
+    d.save_parquet(tmp_path.joinpath(f'deseq{suffix}'))
+    loaded = DESeqFilter(tmp_path.joinpath(f'deseq{suffix}'))
+    assert loaded.log2fc_col == 'baseMean'
+    assert loaded.padj_col == 'pvalue'
+    assert loaded == d
+
+    # explicit arguments that conflict with the saved metadata take precedence, with a warning
+    with pytest.warns(UserWarning, match='padj_col'):
+        loaded = DESeqFilter(tmp_path.joinpath(f'deseq{suffix}'), padj_col='padj')
+    assert loaded.padj_col == 'padj'
+    assert loaded.log2fc_col == 'baseMean'
+
+    fc = FoldChangeFilter('tests/test_files/fc_1.csv', 'num', 'denom')
+    fc.save_parquet(tmp_path.joinpath(f'fc{suffix}'))
+    with pytest.warns(UserWarning, match='numerator_name'):
+        loaded = FoldChangeFilter(tmp_path.joinpath(f'fc{suffix}'), 'other', 'denom')
+    assert loaded.numerator == 'other'
+    assert loaded.denominator == 'denom'
+
+
+def test_filter_from_parquet_no_pyarrow(monkeypatch):
+    monkeypatch.setattr(io, 'HAS_PYARROW', False)
+    with pytest.raises(ImportError):
+        Filter('tests/test_files/counted.parquet')
+    with pytest.raises(ImportError):
+        Filter('tests/test_files/counted.csv').save_parquet()
+
+
 def test_assert_padj_col():
     d = DESeqFilter('tests/test_files/test_deseq.csv')
     d._assert_padj_col()
@@ -1882,3 +2317,23 @@ def test_filter_by_go_annotations(monkeypatch, ids, mode, truth_path):
         print(res.df)
         print(truth)
         raise e
+
+
+@pytest.mark.parametrize('ids,mode,propagate,truth', [
+    ('GO:0034308', 'union', True, ['WBGene00000001', 'WBGene00000003']),
+    ('GO:0034308', 'union', False, ['WBGene00000001']),
+    (['GO:0006040', 'GO:2001315'], 'union', True, ['WBGene00000001', 'WBGene00000003']),
+    (['GO:0006793', 'GO:0034308'], 'intersection', True, ['WBGene00000003'])])
+def test_filter_by_go_annotations_annotation_file(monkeypatch, ids, mode, propagate, truth):
+    with open('tests/test_files/go_mini.obo') as f:
+        dag = ontology.DAGTree(f, ['is_a', 'part_of', 'regulates'])
+    monkeypatch.setattr(io, 'fetch_go_basic', lambda: dag)
+    monkeypatch.setattr(io, 'map_taxon_id', lambda *args, **kwargs: pytest.fail('should not query taxon IDs'))
+    monkeypatch.setattr(io, 'map_gene_ids', lambda ids, map_from, map_to: {gene_id: gene_id for gene_id in ids})
+    df = pd.DataFrame({'counts': [1, 2, 3, 4]},
+                      index=['WBGene00000001', 'WBGene00000002', 'WBGene00000003', 'WBGene00000004'])
+    f = Filter.from_dataframe(df, 'table')
+    res = f.filter_by_go_annotations(ids, mode, gene_id_type='WormBase', propagate_annotations=propagate,
+                                     databases='WB', annotation_file='tests/test_files/go_annotations_for_tests.gaf',
+                                     inplace=False)
+    assert sorted(res.df.index) == truth
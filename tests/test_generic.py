@@ -3,6 +3,7 @@ from rnalysis.utils.generic import *
 import numpy as np
 import typing
 import inspect
+import joblib
 
 
 def test_intersection_nonempty():
@@ -115,3 +116,63 @@ def test_get_signature(func, obj, truth):
         assert param.name == key
         assert param.annotation == val['annotation']
         assert param.default == val['default']
+
+
+@pytest.mark.parametrize('kwargs,truth', [({}, -2), ({'n_jobs': 2}, 2), ({'n_jobs': 1}, 1)])
+def test_progress_parallel_n_jobs(kwargs, truth):
+    parallel = ProgressParallel(use_tqdm=False, **kwargs)
+    assert parallel.n_jobs == truth
+    assert parallel(joblib.delayed(abs)(i) for i in range(-3, 3)) == [3, 2, 1, 0, 1, 2]
+
+
+@pytest.mark.parametrize('random_seed', [0, 42, None])
+def test_get_seed_sequence(random_seed):
+    root = get_seed_sequence(random_seed)
+    assert isinstance(root, np.random.SeedSequence)
+    assert get_seed_sequence(root) is root
+    # keyed streams depend only on the root and the key, and not on the order of calls
+    state_a = get_seed_sequence(root, key='attribute1').generate_state(4)
+    state_b = get_seed_sequence(root, key='attribute2').generate_state(4)
+    assert np.all(get_seed_sequence(root, key='attribute1').generate_state(4) == state_a)
+    assert not np.all(state_a == state_b)
+    if random_seed is not None:
+        assert np.all(get_seed_sequence(random_seed, key='attribute1').generate_state(4) == state_a)
+
+
+def test_get_seed_sequence_keys():
+    root = get_seed_sequence(42)
+    keys = [1, '1', 'GO:0000001', np.str_('GO:0000001'), np.int64(1)]
+    states = [tuple(get_seed_sequence(root, key=key).generate_state(4)) for key in keys]
+    assert states[0] != states[1]
+    assert states[2] == states[3]
+    assert states[0] == states[4]
+    # every key extends the spawn key with 128 bits
+    assert len(get_seed_sequence(root, key='GO:0000001').spawn_key) == len(root.spawn_key) + 4
+    go_ids = [f'GO:{i:07d}' for i in range(5000)]
+    assert len({get_seed_sequence(root, key=go_id).spawn_key for go_id in go_ids}) == len(go_ids)
+
+
+@pytest.mark.parametrize('random_seed', [-1, 0.5, 'seed'])
+def test_get_seed_sequence_invalid(random_seed):
+    with pytest.raises(AssertionError):
+        get_seed_sequence(random_seed)
+
+
+def test_spawn_rngs():
+    rngs = spawn_rngs(42, 3)
+    assert len(rngs) == 3
+    draws = [rng.random(10) for rng in rngs]
+    assert not np.all(draws[0] == draws[1])
+    for rng, draw in zip(spawn_rngs(42, 3), draws):
+        assert np.all(rng.random(10) == draw)
+
+
+def test_seed_jit_rng():
+    @numba.jit(nopython=True)
+    def draw():
+        return np.random.random()
+
+    seed_jit_rng(get_seed_sequence(7))
+    first = draw()
+    seed_jit_rng(get_seed_sequence(7))
+    assert draw() == first
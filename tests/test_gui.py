@@ -1451,6 +1451,22 @@ def test_FilterTabPage_undo_function(qtbot, filtertabpage_with_undo_stack):
     assert window.obj() == truth
 
 
+def test_FilterTabPage_undo_preview_shares_memory(qtbot, countfiltertabpage_with_undo_stack):
+    window, stack = countfiltertabpage_with_undo_stack
+    window.stack_buttons[0].click()
+    window.stack.currentWidget().func_combo.setCurrentText(filtering.CountFilter.filter_low_reads.readable_name)
+    qtbot.mouseClick(window.basic_widgets['apply_button'], LEFT_CLICK)
+    snapshot = stack.command(stack.count() - 1).obj_copy
+
+    stack.undo()
+    # undoing and previewing the table does not copy the table of the snapshot
+    window.update_table_preview()
+    window.cache()
+    assert window.obj() == snapshot
+    assert window.obj()._df_shared
+    assert np.shares_memory(window.obj()._df.values, snapshot._df.values)
+
+
 def test_FilterTabPage_apply_pipeline(qtbot, filtertabpage_with_undo_stack, pipeline):
     window, stack = filtertabpage_with_undo_stack
     filter_obj_orig = window.obj().__copy__()
@@ -1523,6 +1539,8 @@ def test_FilterTabPage_get_all_actions(qtbot, countfiltertabpage_with_undo_stack
         for action in itertools.chain(res['General'], res['Visualize'], res['Summarize']):
             for keyword in ['split', 'filter', 'normalize']:
                 assert keyword not in action
+        for action in ['lazy', 'save_parquet', 'from_parquet', 'save_memmap']:
+            assert action not in itertools.chain.from_iterable(res.values())
 
 
 def test_SetTabPage_init(qtbot):
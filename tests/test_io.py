@@ -1,4 +1,8 @@
+import json
 import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 import pytest
 
@@ -8,6 +12,13 @@ from rnalysis.utils.io import *
 from rnalysis.utils.io import _format_ids_iter, _ensmbl_lookup_post_request
 
 
+@pytest.fixture(autouse=True)
+def gene_id_cache_path(monkeypatch, tmp_path):
+    path = tmp_path.joinpath('gene_id_translations.sqlite')
+    monkeypatch.setattr(io, 'get_gene_id_cache_path', lambda: path)
+    return path
+
+
 class MockResponse(object):
     def __init__(self, status_code: int = 200, url: str = 'http://httpbin.org/get', headers: dict = 'default',
                  text: str = '', json_output: dict = dict(), content: str = ''):
@@ -61,6 +72,100 @@ def test_load_csv_drop_columns():
         load_csv('tests/test_files/counted.csv', 0, drop_columns=['cond1', 'cond6'])
 
 
+def test_load_csv_dtype():
+    loaded = load_csv('tests/test_files/counted.csv', 0, dtype={'cond1': 'float32'})
+    assert loaded['cond1'].dtype == 'float32'
+    assert loaded['cond2'].dtype == 'int64'
+    assert loaded.equals(load_csv('tests/test_files/counted.csv', 0).astype({'cond1': 'float32'}))
+
+
+@pytest.mark.parametrize('sep', [',', '\t', ';'])
+def test_load_csv_sniff_delimiter(tmp_path, sep, monkeypatch):
+    path = tmp_path.joinpath('table.txt')
+    path.write_text(f'# comment line\n idxcol {sep} othercol {sep} strcol\n'
+                    f'one {sep} 4 {sep}  a \ntwo {sep} 5 {sep} \nthree {sep} 6 {sep} c\n')
+    truth = pd.DataFrame({'othercol': [4, 5, 6], 'strcol': ['a', np.nan, 'c']}, index=['one', 'two', 'three'])
+
+    read_csv = pd.read_csv
+    engines = []
+
+    def read_csv_spy(*args, **kwargs):
+        engines.append(kwargs['engine'])
+        return read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(pd, 'read_csv', read_csv_spy)
+    loaded = load_csv(path, 0, comment='#')
+    assert engines == ['c']
+    assert loaded.equals(truth)
+    assert list(loaded.index) == list(truth.index)
+
+
+@pytest.mark.parametrize('version,truth', [('1.2.5', False), ('1.3.5', True), ('1.5.3', True), ('2.0.0rc1', True),
+                                           ('2.2.3', True), ('3.0.0', False)])
+def test_is_pandas_internals_supported(version, truth):
+    assert io._is_pandas_internals_supported(version) == truth
+
+
+def test_installed_pandas_internals():
+    # the block manager of the installed pandas version must expose the arrays of a table if it is supported,
+    # otherwise the supported versions in PANDAS_INTERNALS_VERSIONS need to be updated
+    if not io._is_pandas_internals_supported():
+        pytest.skip(f"pandas {pd.__version__} is not in the supported range, so the public pandas API is used.")
+    df = pd.DataFrame({'a': [1.0, 2.0], 'b': [3.0, 4.0], 'c': ['x', 'y']})
+    arrays = df._mgr.arrays
+    assert isinstance(arrays, list)
+    assert sum(arr.shape[0] if arr.ndim == 2 else 1 for arr in arrays) == df.shape[1]
+
+
+@pytest.mark.parametrize('use_internals', [True, False])
+def test_get_table_arrays(monkeypatch, tmp_path, use_internals):
+    monkeypatch.setattr(io, '_is_pandas_internals_supported', lambda: use_internals)
+    df = pd.DataFrame({'a': [1.0, 2.0, 3.0], 'b': [4.0, 5.0, 6.0]})
+    shallow = df.copy(deep=False)
+    deep = df.copy(deep=True)
+    for other, truth in [(shallow, True), (deep, False)]:
+        assert any(np.shares_memory(arr, other_arr) for arr in get_table_arrays(df) for other_arr in
+                   get_table_arrays(other)) == truth
+    assert np.shares_memory(get_table_arrays(df['a'])[0], get_table_arrays(df)[0])
+
+    categorical = pd.DataFrame({'a': pd.Categorical(['x', 'y', 'x'])})
+    assert not any(isinstance(arr, np.ndarray) for arr in get_table_arrays(categorical))
+
+    path = tmp_path.joinpath('table.mmap')
+    save_memmap_table(df, path)
+    assert get_memmap_table_path(load_memmap_table(path)) == path
+    assert get_memmap_table_path(df) is None
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 3, 65536])
+def test_memmap_table(tmp_path, chunk_rows):
+    df = load_csv('tests/test_files/counted.csv', 0)
+    path = tmp_path.joinpath('counted.mmap')
+    save_memmap_table(df, path, chunk_rows)
+    assert is_memmap_table(path)
+    assert not is_memmap_table('tests/test_files/counted.csv')
+    loaded = load_memmap_table(path)
+    assert loaded.equals(df)
+    assert get_memmap_table_path(loaded) == path
+    assert get_memmap_table_path(df) is None
+    with pytest.raises(ValueError):
+        loaded.iloc[0, 0] = 0
+
+    mask = (df['cond1'] > 10).to_numpy()
+    subset = subset_memmap_table(loaded, mask, tmp_path.joinpath('subset.mmap'), chunk_rows)
+    assert subset.equals(df[mask])
+    factors = pd.Series({'cond1': 2, 'cond2': 0.5, 'cond3': 1, 'cond4': 4})
+    scaled = scale_memmap_table(loaded, factors, tmp_path.joinpath('scaled.mmap'), chunk_rows)
+    assert scaled.equals(df / factors)
+    assert sum(len(chunk) for chunk in iter_row_chunks(loaded, chunk_rows)) == len(df)
+
+
+def test_memmap_table_non_numeric(tmp_path):
+    df = pd.DataFrame({'a': [1, 2], 'b': ['x', 'y']})
+    with pytest.raises(AssertionError):
+        save_memmap_table(df, tmp_path.joinpath('table.mmap'))
+
+
 def test_save_csv():
     try:
         df = pd.read_csv('tests/test_files/enrichment_hypergeometric_res.csv', index_col=0)
@@ -87,6 +192,30 @@ def test_fetch_go_basic_connectivity():
     _ = fetch_go_basic()
 
 
+def test_fetch_go_basic_dag_tree_cache(monkeypatch, tmp_path):
+    with open('tests/test_files/go_mini.obo') as f:
+        content = f.read()
+    monkeypatch.setattr(io, 'load_cached_file', lambda filename: content)
+    monkeypatch.setattr(io, 'get_annotation_cache_dir', lambda: tmp_path)
+    fetch_go_basic.cache_clear()
+    try:
+        dag_tree = fetch_go_basic()
+        assert dag_tree.data_version == 'releases/2020-07-16'
+        assert len(list(tmp_path.iterdir())) == 1
+
+        def parse_file(self, line_iterator):
+            raise AssertionError('the DAGTree should have been loaded from the on-disk cache')
+
+        monkeypatch.setattr(ontology.DAGTree, '_parse_file', parse_file)
+        fetch_go_basic.cache_clear()
+        res = fetch_go_basic()
+        assert res is not dag_tree
+        assert res.data_version == dag_tree.data_version
+        assert res.go_terms.keys() == dag_tree.go_terms.keys()
+    finally:
+        fetch_go_basic.cache_clear()
+
+
 def test_format_ids_iter():
     assert list(_format_ids_iter('one two three')) == ['one two three']
     assert list(_format_ids_iter(123)) == ['123']
@@ -204,6 +333,54 @@ def test_golr_annotation_iterator_generate_query():
     assert sorted(golr._generate_query()) == sorted(query_truth)
 
 
+def test_golr_annotation_iterator_annotation_generator_bounded(monkeypatch):
+    n_annotations = 11
+    iter_size = 2
+    fetched_pages = []
+
+    def fake_request(self, params, cached_filename):
+        fetched_pages.append(params['start'])
+        docs = [{'annotation_class': f'GO:{i}', 'bioentity_internal_id': f'gene{i}', 'source': 'DB'} for i in
+                range(params['start'], min(params['start'] + iter_size, n_annotations))]
+        return json.dumps({'response': {'docs': docs}})
+
+    monkeypatch.setattr(GOlrAnnotationIterator, '_golr_request', fake_request)
+    monkeypatch.setattr(GOlrAnnotationIterator, '_generate_cached_filename', lambda self, start: f'{start}.json')
+    monkeypatch.setattr(GOlrAnnotationIterator, 'MAX_PENDING_PAGES', 2)
+    golr = GOlrAnnotationIterator.__new__(GOlrAnnotationIterator)
+    golr.default_params = {}
+    golr.iter_size = iter_size
+    golr.n_annotations = n_annotations
+
+    res = []
+    for record in golr:
+        # at most MAX_PENDING_PAGES pages beyond the page currently being consumed may have been requested
+        assert len(fetched_pages) <= len(res) // iter_size + 1 + GOlrAnnotationIterator.MAX_PENDING_PAGES
+        res.append(record['bioentity_internal_id'])
+    assert res == [f'gene{i}' for i in range(n_annotations)]
+    assert sorted(fetched_pages) == list(range(0, n_annotations, iter_size))
+
+
+def test_golr_annotation_iterator_annotation_generator_close_early(monkeypatch):
+    fetched_pages = []
+
+    def fake_request(self, params, cached_filename):
+        fetched_pages.append(params['start'])
+        return json.dumps({'response': {'docs': [{'start': params['start']}] * params['rows']}})
+
+    monkeypatch.setattr(GOlrAnnotationIterator, '_golr_request', fake_request)
+    monkeypatch.setattr(GOlrAnnotationIterator, '_generate_cached_filename', lambda self, start: f'{start}.json')
+    golr = GOlrAnnotationIterator.__new__(GOlrAnnotationIterator)
+    golr.default_params = {}
+    golr.iter_size = 10
+    golr.n_annotations = 1000
+
+    generator = iter(golr)
+    assert next(generator) == {'start': 0}
+    generator.close()
+    assert len(fetched_pages) <= 1 + GOlrAnnotationIterator.MAX_PENDING_PAGES
+
+
 def test_golr_annotation_iterator_golr_request_connectivity(monkeypatch):
     fake_params = {'param': 'value', 'other_param': 'other_value'}
     assert isinstance(GOlrAnnotationIterator._golr_request(fake_params), str)
@@ -228,14 +405,14 @@ def test_golr_annotation_iterator_golr_request(monkeypatch):
         assert params == correct_params
         return MockResponse(text='the correct text')
 
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(io, 'http_get', mock_get)
     monkeypatch.setattr(GOlrAnnotationIterator, '_generate_cached_filename', lambda self, start: 'test.json')
     assert GOlrAnnotationIterator._golr_request(correct_params, cached_filename) == 'the correct text'
 
     def mock_get_uncached(url, params: dict):
         raise AssertionError("This function should not be called if a cached file was found!")
 
-    monkeypatch.setattr(requests, 'get', mock_get_uncached)
+    monkeypatch.setattr(io, 'http_get', mock_get_uncached)
     try:
         assert GOlrAnnotationIterator._golr_request(correct_params, cached_filename) == 'the correct text'
     finally:
@@ -246,7 +423,7 @@ def test_golr_annotation_iterator_golr_request(monkeypatch):
         assert params == correct_params
         return MockResponse(text='the correct text', status_code=404)
 
-    monkeypatch.setattr(requests, 'get', mock_get_failed)
+    monkeypatch.setattr(io, 'http_get', mock_get_failed)
     try:
         with pytest.raises(ConnectionError):
             _ = GOlrAnnotationIterator._golr_request(correct_params)
@@ -299,6 +476,53 @@ def test_golr_annotation_iterator_parsing(monkeypatch):
         assert record == true_record
 
 
+def _gaf_records(*rows):
+    sources = {'WBGene00000001': 'WB', 'WBGene00000002': 'WB', 'WBGene00000003': 'WB', 'P12345': 'UniProtKB'}
+    return [{'annotation_class': go_id, 'bioentity_internal_id': gene_id, 'source': sources[gene_id]} for
+            gene_id, go_id in rows]
+
+
+@pytest.mark.parametrize('kwargs,truth', [
+    ({}, _gaf_records(('WBGene00000001', 'GO:0034308'), ('WBGene00000001', 'GO:0034619'),
+                      ('WBGene00000002', 'GO:0006793'), ('WBGene00000002', 'GO:0051125'),
+                      ('WBGene00000003', 'GO:2001315'), ('P12345', 'GO:0009225'))),
+    (dict(aspects='molecular_function'), _gaf_records(('WBGene00000002', 'GO:0051125'))),
+    (dict(evidence_types='experimental', excluded_qualifiers='not'),
+     _gaf_records(('WBGene00000001', 'GO:0034308'), ('WBGene00000002', 'GO:0051125'),
+                  ('WBGene00000003', 'GO:2001315'))),
+    (dict(excluded_evidence_types='electronic', databases='WB', qualifiers=['not', 'contributes_to']),
+     _gaf_records(('WBGene00000002', 'GO:0006793'), ('WBGene00000003', 'GO:2001315'))),
+    (dict(excluded_databases='WB'), _gaf_records(('P12345', 'GO:0009225')))])
+@pytest.mark.parametrize('fname', ['go_annotations_for_tests.gaf', 'go_annotations_for_tests.gpad'])
+def test_gaf_annotation_iterator(fname, kwargs, truth):
+    with open('tests/test_files/go_mini.obo') as f:
+        dag = ontology.DAGTree(f, ['is_a', 'part_of', 'regulates'])
+    iterator = GAFAnnotationIterator(f'tests/test_files/{fname}', dag_tree=dag, chunk_size=4, **kwargs)
+    assert iterator.file_format == ('gaf' if fname.endswith('gaf') else 'gpad2')
+    assert iterator.n_annotations == len(truth)
+    assert list(iterator) == truth
+
+
+@pytest.mark.parametrize('taxon_id,truth', [(6239, 5), (9606, 1), (10090, 0)])
+def test_gaf_annotation_iterator_taxon_id_gzip(tmp_path, taxon_id, truth):
+    path = tmp_path.joinpath('annotations.gaf.gz')
+    with open('tests/test_files/go_annotations_for_tests.gaf', 'rb') as infile, gzip.open(path, 'wb') as outfile:
+        outfile.write(infile.read())
+    iterator = GAFAnnotationIterator(path, taxon_id=taxon_id)
+    assert iterator.n_annotations == truth
+    assert len(list(iterator)) == truth
+
+
+def test_gaf_annotation_iterator_gpad_1(tmp_path):
+    path = tmp_path.joinpath('annotations.gpad')
+    path.write_text('!gpa-version: 1.1\n'
+                    'WB\tWBGene00000001\tinvolved_in\tGO:0034308\tWB_REF:1\tECO:0000315\t\t\t20200101\tWB\t\t\n'
+                    'WB\tWBGene00000002\tNOT|enables\tGO:0051125\tWB_REF:1\tECO:0000314\t\t\t20200101\tWB\t\t\n')
+    iterator = GAFAnnotationIterator(path, excluded_qualifiers='not')
+    assert iterator.file_format == 'gpad1'
+    assert list(iterator) == _gaf_records(('WBGene00000001', 'GO:0034308'))
+
+
 def test_map_taxon_id_connectivity():
     assert map_taxon_id(6239) == (6239, 'Caenorhabditis elegans')
     assert map_taxon_id('canis lupus familiaris') == (9615, 'Canis lupus familiaris')
@@ -319,7 +543,7 @@ def test_map_taxon_id(monkeypatch):
                                  'Chromadorea; Rhabditida; Rhabditina; Rhabditomorpha; Rhabditoidea; Rhabditidae; '
                                  'Peloderinae; Caenorhabditis\t6237\t\n')
 
-    monkeypatch.setattr(requests, 'get', mock_requests_get)
+    monkeypatch.setattr(io, 'http_get', mock_requests_get)
     assert map_taxon_id(taxon_name) == (6239, 'Caenorhabditis elegans')
 
 
@@ -327,7 +551,7 @@ def test_map_taxon_id_no_results(monkeypatch):
     def mock_requests_get(url, params):
         return MockResponse(text='')
 
-    monkeypatch.setattr(requests, 'get', mock_requests_get)
+    monkeypatch.setattr(io, 'http_get', mock_requests_get)
     with pytest.raises(ValueError):
         map_taxon_id('')
 
@@ -338,7 +562,7 @@ def test_map_taxon_id_multiple_results(monkeypatch):
             text='Taxon Id\tScientific name\n9615\tCanis lupus familiaris\n2509620\t'
                  'Wlobachia endosymbiont of Canis lupus familiaris\n990119\tCanis lupus x Canis lupus familiaris')
 
-    monkeypatch.setattr(requests, 'get', mock_requests_get)
+    monkeypatch.setattr(io, 'http_get', mock_requests_get)
     assert map_taxon_id('') == (9615, 'Canis lupus familiaris')
 
 
@@ -346,11 +570,144 @@ def test_map_taxon_id_no_connection(monkeypatch):
     def mock_requests_get(url, params):
         return MockResponse(status_code=100)
 
-    monkeypatch.setattr(requests, 'get', mock_requests_get)
+    monkeypatch.setattr(io, 'http_get', mock_requests_get)
     with pytest.raises(ConnectionError):
         map_taxon_id('name')
 
 
+class StubServer(ThreadingHTTPServer):
+    def __init__(self):
+        self.hits = {}
+        self.n_active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        super().__init__(('127.0.0.1', 0), StubRequestHandler)
+
+    @property
+    def host(self):
+        return f'127.0.0.1:{self.server_address[1]}'
+
+    @property
+    def url(self):
+        return f'http://{self.host}'
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self, status: int, body: bytes = b'ok'):
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.hits[self.path] = self.server.hits.get(self.path, 0) + 1
+            n_hits = self.server.hits[self.path]
+            self.server.n_active += 1
+            self.server.max_active = max(self.server.max_active, self.server.n_active)
+        try:
+            if self.path == '/flaky':
+                self._respond(503 if n_hits <= 2 else 200)
+            elif self.path == '/down':
+                self._respond(503)
+            elif self.path == '/slow':
+                time.sleep(0.1)
+                self._respond(200)
+            else:
+                self._respond(200)
+        finally:
+            with self.server.lock:
+                self.server.n_active -= 1
+
+    def do_POST(self):
+        with self.server.lock:
+            self.server.hits[self.path] = self.server.hits.get(self.path, 0) + 1
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self._respond(503 if self.path == '/down' else 200, body)
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_http_client_retries_transient_errors(stub_server):
+    client = HTTPClient(backoff_factor=0)
+    response = client.get(stub_server.url + '/flaky')
+    assert response.ok
+    assert stub_server.hits['/flaky'] == 3
+
+
+def test_http_client_retries_exhausted(stub_server):
+    client = HTTPClient(max_retries=2, backoff_factor=0)
+    response = client.get(stub_server.url + '/down')
+    assert response.status_code == 503
+    assert stub_server.hits['/down'] == 3
+
+
+def test_http_client_post(stub_server):
+    client = HTTPClient()
+    response = client.post(stub_server.url + '/post', data='content')
+    assert response.ok
+    assert response.text == 'content'
+
+
+def test_http_client_does_not_retry_post(stub_server):
+    client = HTTPClient(max_retries=2, backoff_factor=0)
+    response = client.post(stub_server.url + '/down', data='content')
+    assert response.status_code == 503
+    assert stub_server.hits['/down'] == 1
+
+
+def test_http_client_concurrency_limit(stub_server):
+    client = HTTPClient(max_concurrent_requests=2)
+    threads = [threading.Thread(target=client.get, args=(stub_server.url + '/slow',)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stub_server.hits['/slow'] == 6
+    assert stub_server.max_active <= 2
+
+
+def test_http_client_rate_limit(stub_server):
+    client = HTTPClient(host_rate_limits={stub_server.host: 20})
+    start = time.monotonic()
+    for _ in range(5):
+        assert client.get(stub_server.url + '/fast').ok
+    assert time.monotonic() - start >= 4 / 20
+
+
+def test_http_client_invalid_params():
+    with pytest.raises(AssertionError):
+        HTTPClient(max_retries=-1)
+    with pytest.raises(AssertionError):
+        HTTPClient(max_concurrent_requests=0)
+    with pytest.raises(AssertionError):
+        HTTPClient(host_rate_limits={'host': 0})
+
+
+def test_configure_http_client(monkeypatch, stub_server):
+    monkeypatch.setattr(io, '_HTTP_CLIENT', None)
+    default_client = get_http_client()
+    assert get_http_client() is default_client
+    client = configure_http_client(max_concurrent_requests=1, backoff_factor=0)
+    assert get_http_client() is client
+    assert client.max_concurrent_requests == 1
+    assert http_get(stub_server.url + '/flaky').ok
+    assert http_post(stub_server.url + '/post', data='data').text == 'data'
+
+
 def test_ensmbl_lookup_post_request(monkeypatch):
     ids = ('id1', 'id2', 'id3')
 
@@ -362,7 +719,7 @@ def test_ensmbl_lookup_post_request(monkeypatch):
 
         return MockResponse(json_output={this_id: {} for this_id in ids})
 
-    monkeypatch.setattr(requests, 'post', mock_post_request)
+    monkeypatch.setattr(io, 'http_post', mock_post_request)
     assert _ensmbl_lookup_post_request(ids) == {'id1': {}, 'id2': {}, 'id3': {}}
 
 
@@ -450,7 +807,7 @@ def test_map_gene_ids_request(monkeypatch, ids, map_from, map_to, req_from, req_
                           'columns': 'id'}
         return MockResponse(text=txt)
 
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(io, 'http_get', mock_get)
     res = map_gene_ids(ids, map_from, map_to)
     for gene_id in truth:
         assert res[gene_id] == truth[gene_id]
@@ -492,6 +849,141 @@ def test_map_gene_ids_with_duplicates(monkeypatch, ids, map_from, map_to, txt, r
         assert res[gene_id] == truth[gene_id]
 
 
+def test_gene_id_cache(gene_id_cache_path, monkeypatch):
+    cache = GeneIDCache()
+    assert cache.path == gene_id_cache_path
+    assert cache.lookup('WormBase', 'UniProtKB', ['WBGene1', 'WBGene2']) == ({}, set())
+
+    cache.store('WormBase', 'UniProtKB', ['WBGene1', 'WBGene2', 'WBGene3'], {'WBGene1': 'P1', 'WBGene3': 'P3'})
+    assert cache.lookup('WormBase', 'UniProtKB', ['WBGene1', 'WBGene2', 'WBGene4']) == ({'WBGene1': 'P1'},
+                                                                                      {'WBGene2'})
+    assert cache.lookup('UniProtKB', 'WormBase', ['WBGene1']) == ({}, set())
+    # translations are updated when stored again
+    cache.store('WormBase', 'UniProtKB', ['WBGene2'], {'WBGene2': 'P2'})
+    assert GeneIDCache().lookup('WormBase', 'UniProtKB', ['WBGene2', 'WBGene3']) == ({'WBGene2': 'P2',
+                                                                                     'WBGene3': 'P3'}, set())
+    # expired translations are ignored
+    monkeypatch.setattr(time, 'time', lambda: 10 ** 12)
+    assert cache.lookup('WormBase', 'UniProtKB', ['WBGene1', 'WBGene2']) == ({}, set())
+
+    cache.clear()
+    assert not gene_id_cache_path.exists()
+
+
+def test_gene_id_cache_many_ids():
+    ids = [f'id{i}' for i in range(2500)]
+    cache = GeneIDCache()
+    cache.store('WormBase', 'UniProtKB', ids, {gene_id: gene_id.upper() for gene_id in ids[::2]})
+    mapped, unmapped = cache.lookup('WormBase', 'UniProtKB', ids)
+    assert mapped == {gene_id: gene_id.upper() for gene_id in ids[::2]}
+    assert unmapped == set(ids[1::2])
+
+
+def _mock_abbrev_dict():
+    d = {'WormBase': 'WormBase', 'UniProtKB_to': 'UniProtKB', 'UniProtKB_from': 'UniProtKB_AC-ID',
+         'UniProtKB': 'UniProtKB'}
+    return d, d
+
+
+def test_map_gene_ids_cached(monkeypatch):
+    submitted = []
+
+    def mock_get_mapping_results(api_url: str, from_db: str, to_db: str, ids: List[str], polling_interval: float,
+                                 session, verbose):
+        submitted.append(sorted(ids))
+        return ['From\tTo'] + [f'{gene_id}\tP{gene_id[-1]}' for gene_id in ids if gene_id != 'WBGene3']
+
+    monkeypatch.setattr(io, '_get_id_abbreviation_dicts', _mock_abbrev_dict)
+    monkeypatch.setattr(io, 'get_mapping_results', mock_get_mapping_results)
+    truth = {'WBGene1': 'P1', 'WBGene2': 'P2'}
+    assert map_gene_ids(['WBGene1', 'WBGene2', 'WBGene3'], 'WormBase', 'UniProtKB').mapping_dict == truth
+    assert submitted == [['WBGene1', 'WBGene2', 'WBGene3']]
+
+    # previously translated (or unmappable) gene IDs should not be submitted again
+    truth['WBGene4'] = 'P4'
+    assert map_gene_ids(['WBGene1', 'WBGene2', 'WBGene3', 'WBGene4'], 'WormBase',
+                        'UniProtKB').mapping_dict == truth
+    assert submitted == [['WBGene1', 'WBGene2', 'WBGene3'], ['WBGene4']]
+    assert map_gene_ids(['WBGene4', 'WBGene3'], 'WormBase', 'UniProtKB').mapping_dict == {'WBGene4': 'P4'}
+    assert len(submitted) == 2
+
+
+def test_map_gene_ids_failed_job_not_cached(monkeypatch):
+    submitted = []
+
+    def mock_get_mapping_results(api_url: str, from_db: str, to_db: str, ids: List[str], polling_interval: float,
+                                 session, verbose):
+        submitted.append(ids)
+        return None
+
+    monkeypatch.setattr(io, '_get_id_abbreviation_dicts', _mock_abbrev_dict)
+    monkeypatch.setattr(io, 'get_mapping_results', mock_get_mapping_results)
+    for _ in range(2):
+        assert map_gene_ids(['WBGene1'], 'WormBase', 'UniProtKB').mapping_dict == {}
+    assert len(submitted) == 2
+
+
+def _mock_all_abbrev_dicts():
+    d = {id_type: id_type for id_type in GENE_ID_SIGNATURES}
+    d.update({'UniProtKB_to': 'UniProtKB', 'UniProtKB_from': 'UniProtKB_AC-ID', 'UniProtKB': 'UniProtKB'})
+    return d, d
+
+
+@pytest.mark.parametrize('ids,truth', [
+    (['ENSG00000141510', 'ENSG00000012048.5', 'ENSG00000139618'], ('Ensembl',)),
+    (['ENSMUST00000027035', 'ENSMUST00000027036'], ('Ensembl Transcript',)),
+    (['WBGene00019883', 'WBGene00023497', 'WBGene00003515', 'WBGene0000351'], ('WormBase',)),
+    (['FBgn0000008', 'FBgn0000014'], ('FlyBase',)),
+    (['NM_000546.6', 'NM_007294', 'XR_001737578.2'], ('RefSeq Nucleotide',)),
+    (['P34544', 'Q27395', 'A0A0K3AVL7', 'P04637-2'], ('UniProtKB AC/ID',)),
+    (['7157', '672', '176183'], ('GeneID',)),
+    (['AT1G01010', 'AT5G67640.1'], ('Araport', 'TAIR', 'Ensembl Genomes')),
+    (['YAL001C', 'YBR020W'], ('Ensembl Genomes',)),
+    (['TP53', 'BRCA1', 'daf-2'], ('Gene Name',)),
+    (['!!!', '???'], tuple()),
+    ([], tuple())])
+def test_guess_gene_id_types(monkeypatch, ids, truth):
+    monkeypatch.setattr(io, '_get_id_abbreviation_dicts', _mock_all_abbrev_dicts)
+    assert guess_gene_id_types(ids) == truth
+
+
+def test_guess_gene_id_types_params(monkeypatch):
+    def mock_abbrev_dicts():
+        d_to, d_from = _mock_all_abbrev_dicts()
+        d_to = d_to.copy()
+        d_to.pop('GeneID')
+        return d_to, d_from
+
+    monkeypatch.setattr(io, '_get_id_abbreviation_dicts', mock_abbrev_dicts)
+    ids = ['7157'] * 60 + ['WBGene00000001'] * 40
+    assert guess_gene_id_types(ids) == ('GeneID',)
+    assert guess_gene_id_types(ids, min_score=0.3) == ('GeneID', 'WormBase')
+    assert guess_gene_id_types(ids, min_score=0.3, max_candidates=1) == ('GeneID',)
+    assert guess_gene_id_types(ids, 'to', min_score=0.3) == ('WormBase',)
+    assert guess_gene_id_types(ids, min_score=0.3, sample_size=10) == ('GeneID', 'WormBase')
+
+
+@pytest.mark.parametrize('ids,candidate_mapped,truth_probed_from', [
+    (('WBGene00000001', 'WBGene00000002'), True, {'WormBase'}),
+    (('WBGene00000003', 'WBGene00000004'), False, set(GENE_ID_SIGNATURES).union({'UniProtKB_to', 'UniProtKB_from'}))])
+def test_find_best_gene_mapping_candidates(monkeypatch, ids, candidate_mapped, truth_probed_from):
+    probed_from = set()
+
+    def mock_map_gene_ids(ids, map_from, map_to, verbose=True):
+        probed_from.add(map_from)
+        if (map_from == 'WormBase' and candidate_mapped) or (map_from == 'Gene Name' and not candidate_mapped):
+            return GeneIDTranslator({gene_id: gene_id + '_mapped' for gene_id in ids})
+        return GeneIDTranslator({})
+
+    monkeypatch.setattr(io, '_get_id_abbreviation_dicts', _mock_all_abbrev_dicts)
+    monkeypatch.setattr(io, 'map_gene_ids', mock_map_gene_ids)
+    translator, map_from, map_to = find_best_gene_mapping(ids, None, ('UniProtKB',))
+    assert probed_from == truth_probed_from
+    assert map_from == ('WormBase' if candidate_mapped else 'Gene Name')
+    assert map_to == 'UniProtKB'
+    assert translator.mapping_dict == {gene_id: gene_id + '_mapped' for gene_id in ids}
+
+
 def test_get_todays_cache_dir():
     today = date.today()
     today_str = str(today.year) + '_' + str(today.month).zfill(2) + '_' + str(today.day).zfill(2)
@@ -578,7 +1070,7 @@ def test_kegg_annotation_iterator_kegg_request(monkeypatch, arguments, url_truth
         return MockResponse(text=truth)
 
     monkeypatch.setattr(io, 'load_cached_file', mock_get_cached_file)
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(io, 'http_get', mock_get)
     monkeypatch.setattr(io, 'cache_file', mock_cache_file)
     assert KEGGAnnotationIterator._kegg_request('operation', arguments, 'cached_filename.csv') == (
         truth, False)
@@ -711,7 +1203,7 @@ def test_kegg_annotation_iterator_get_taxon_tree(monkeypatch):
         return MockResponse(content=truth_text)
 
     monkeypatch.setattr(io, 'load_cached_file', mock_get_cached_file)
-    monkeypatch.setattr(requests, 'get', mock_get)
+    monkeypatch.setattr(io, 'http_get', mock_get)
     monkeypatch.setattr(io, 'cache_file', mock_cache_file)
 
     assert KEGGAnnotationIterator._get_taxon_tree() == truth
@@ -812,3 +1304,120 @@ def test_is_rnalysis_outdated(monkeypatch, this_version, response, expected):
     monkeypatch.setattr(requests, 'get', lambda *args, **kwargs: response)
     monkeypatch.setattr(rnalysis.utils.io, '__version__', this_version)
     assert is_rnalysis_outdated() == expected
+
+
+def _write_gtf(path):
+    lines = [
+        '#!genome-build test',
+        '1\tsrc\tgene\t1\t100\t.\t+\t.\tgene_id "GENE1.1"; gene_version "3"; gene_name "gen-1"; '
+        'gene_biotype "protein_coding";',
+        '1\tsrc\ttranscript\t1\t100\t.\t+\t.\tgene_id "GENE1.1"; gene_version "3"; transcript_id "TRAN1"; '
+        'transcript_version "2"; gene_name "gen-1"; transcript_name "gen-1.a"; gene_biotype "protein_coding"; '
+        'transcript_biotype "protein_coding"; tag "basic";',
+        '1\tsrc\texon\t1\t50\t.\t+\t.\tgene_id "GENE1.1"; gene_version "3"; transcript_id "TRAN1"; '
+        'transcript_version "2"; gene_name "gen-1"; transcript_name "gen-1.a"; gene_biotype "protein_coding"; '
+        'transcript_biotype "protein_coding"; exon_number "1";',
+        '1\tsrc\tgene\t200\t300\t.\t-\t.\tgene_id "GENE2"; gene_version "1"; gene_biotype "lncRNA";',
+        '1\tsrc\ttranscript\t200\t300\t.\t-\t.\tgene_id "GENE2"; gene_version "1"; transcript_id "TRAN2.5"; '
+        'gene_biotype "lncRNA"; transcript_biotype "lncRNA";']
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+@pytest.fixture
+def gtf_path(monkeypatch, tmp_path):
+    monkeypatch.setattr(io, 'get_annotation_cache_dir', lambda: tmp_path.joinpath('cache'))
+    path = tmp_path.joinpath('test.gtf')
+    _write_gtf(path)
+    return path
+
+
+@pytest.mark.parametrize('use_name,use_version,split_ids,truth', [
+    (False, False, True, {'TRAN1': 'GENE1', 'TRAN2': 'GENE2'}),
+    (False, False, False, {'TRAN1': 'GENE1.1', 'TRAN2.5': 'GENE2'}),
+    (False, True, True, {'TRAN1.2': 'GENE1.3', 'TRAN2': 'GENE2'}),
+    (True, False, True, {'TRAN1': 'gen-1'})])
+def test_map_transcripts_to_genes(gtf_path, use_name, use_version, split_ids, truth):
+    assert map_transcripts_to_genes(gtf_path, use_name, use_version, split_ids) == truth
+
+
+@pytest.mark.parametrize('attribute,feature_type,use_name,use_version,split_ids,truth', [
+    ('gene_biotype', 'gene', False, False, True, {'GENE1': 'protein_coding', 'GENE2': 'lncRNA'}),
+    ('gene_biotype', 'gene', False, True, False, {'GENE1.1.3': 'protein_coding', 'GENE2.1': 'lncRNA'}),
+    ('gene_biotype', 'gene', True, False, True, {'gen-1': 'protein_coding'}),
+    ('transcript_biotype', 'transcript', False, False, False, {'TRAN1': 'protein_coding', 'TRAN2.5': 'lncRNA'}),
+    ('transcript_biotype', 'transcript', True, False, True, {'gen-1.a': 'protein_coding'}),
+    ('tag', 'transcript', False, False, True, {'TRAN1': 'basic'}),
+    ('exon_number', 'gene', False, False, True, {'GENE1': '1'}),
+    ('gene_biotype', 'transcript', False, False, True, KeyError),
+    ('transcript_biotype', 'transcript', False, True, True, KeyError)])
+def test_map_gene_to_attr(gtf_path, attribute, feature_type, use_name, use_version, split_ids, truth):
+    if truth is KeyError:
+        with pytest.raises(KeyError):
+            map_gene_to_attr(gtf_path, attribute, feature_type, use_name, use_version, split_ids)
+    else:
+        assert map_gene_to_attr(gtf_path, attribute, feature_type, use_name, use_version, split_ids) == truth
+
+
+def test_load_gtf_index(gtf_path, monkeypatch):
+    index = load_gtf_index(gtf_path)
+    assert list(index['feature']) == ['gene', 'transcript', 'exon', 'gene', 'transcript']
+    assert list(index['gene_id']) == ['GENE1.1', 'GENE1.1', 'GENE1.1', 'GENE2', 'GENE2']
+    assert index['transcript_id'].isna().sum() == 2
+    assert 'exon_number' not in index.columns
+    assert load_gtf_index(gtf_path, 'transcript')['transcript_id'].tolist() == ['TRAN1', 'TRAN2.5']
+
+    # the index is re-used from memory and from the on-disk cache, without parsing the GTF file again
+    def build_gtf_index(*args, **kwargs):
+        raise AssertionError('the GTF file should not be parsed again')
+
+    monkeypatch.setattr(io, '_build_gtf_index', build_gtf_index)
+    assert load_gtf_index(gtf_path) is index
+    io._GTF_INDEX_CACHE.clear()
+    assert load_gtf_index(gtf_path).equals(index)
+    assert get_gtf_index_path(gtf_path).exists()
+    monkeypatch.undo()
+    monkeypatch.setattr(io, 'get_annotation_cache_dir', lambda: gtf_path.parent.joinpath('cache'))
+
+    # requesting an attribute that was not indexed extends the index
+    index = load_gtf_index(gtf_path, attributes=['exon_number'])
+    assert index['exon_number'].tolist()[2] == '1'
+    # modifying the GTF file invalidates the index
+    old_index_path = get_gtf_index_path(gtf_path)
+    with open(gtf_path, 'a') as f:
+        f.write('1\tsrc\tgene\t400\t500\t.\t+\t.\tgene_id "GENE3"; gene_biotype "miRNA";\n')
+    assert get_gtf_index_path(gtf_path) != old_index_path
+    assert load_gtf_index(gtf_path)['gene_id'].tolist()[-1] == 'GENE3'
+
+
+@pytest.mark.parametrize('chunksize', [1, 2, 250000])
+def test_read_gtf(gtf_path, chunksize):
+    res = read_gtf(gtf_path, ['gene_id', 'transcript_id', 'gene_name', 'tag'], columns=['feature', 'start', 'strand'],
+                   chunksize=chunksize)
+    assert list(res.columns) == ['feature', 'start', 'strand', 'gene_id', 'transcript_id', 'gene_name', 'tag']
+    assert res['start'].tolist() == [1, 1, 1, 200, 200]
+    assert res['start'].dtype == 'int64'
+    assert res['gene_id'].dtype == 'category'
+    assert res['strand'].tolist() == ['+', '+', '+', '-', '-']
+    assert res['transcript_id'].tolist()[1:] == ['TRAN1', 'TRAN1', np.nan, 'TRAN2.5']
+    assert res['tag'].tolist()[1] == 'basic'
+
+    res = read_gtf(gtf_path, ['gene_id', 'transcript_biotype'], feature_type='transcript', chunksize=chunksize)
+    assert res['feature'].tolist() == ['transcript', 'transcript']
+    assert res['transcript_biotype'].tolist() == ['protein_coding', 'lncRNA']
+
+    assert read_gtf(gtf_path, ['gene_id'], feature_type='CDS', chunksize=chunksize).shape == (0, 2)
+
+
+def test_read_gtf_irregular_attributes(tmp_path):
+    path = tmp_path.joinpath('irregular.gtf.gz')
+    with gzip.open(path, 'wt') as f:
+        f.write('1\tsrc\tgene\t1\t100\t.\t+\t.\tgene_id "GENE1"; level 2; gene_name "gen-1"; '
+                'tag "basic"; tag "CCDS"\n')
+        f.write('# comment line\n')
+        f.write('1\tsrc\tgene\t200\t300\t.\t+\t.\tgene_id "GENE2";gene_name "gen-2;b";\n')
+    res = read_gtf(path, ['gene_id', 'gene_name', 'tag', 'level'])
+    assert res['gene_id'].tolist() == ['GENE1', 'GENE2']
+    assert res['gene_name'].tolist() == ['gen-1', 'gen-2;b']
+    assert res['tag'].tolist() == ['CCDS', np.nan]
+    assert res['level'].isna().all()
@@ -1,5 +1,6 @@
 import pytest
 from rnalysis.utils.ontology import *
+from rnalysis.utils.annotations import AnnotationMatrix
 
 
 def test_parse_go_id():
@@ -170,3 +171,84 @@ def test_dag_tree_parser_upper_induced_tree_iterator():
         ui_tree = list(dag_tree.upper_induced_graph_iter(node))
         ui_tree.sort()
         assert ui_tree == parents_truth_file_2[node]
+
+
+def test_parse_data_version():
+    with open('tests/test_files/go_mini.obo') as f:
+        content = f.read()
+    assert parse_data_version(content) == 'releases/2020-07-16'
+    assert parse_data_version('format-version: 1.2\n\n[Term]\nid: GO:0000001\n') is None
+
+
+def test_dag_tree_save_load(tmp_path):
+    file = 'tests/test_files/go_mini.obo'
+    with open(file, 'r') as f:
+        dag_tree = DAGTree(f, ['is_a', 'part_of', 'regulates'])
+    path = tmp_path.joinpath('dag_tree.pickle')
+    dag_tree.save(path)
+    assert list(tmp_path.iterdir()) == [path]
+
+    res = DAGTree.load(path)
+    assert res.data_version == dag_tree.data_version
+    assert res.parent_relationship_types == dag_tree.parent_relationship_types
+    assert res.alt_ids == dag_tree.alt_ids
+    assert res.namespaces == dag_tree.namespaces
+    assert [list(level) for level in res.levels] == [list(level) for level in dag_tree.levels]
+    for go_id in dag_tree.go_terms:
+        assert res[go_id].name == dag_tree[go_id].name
+        assert res[go_id].level == dag_tree[go_id].level
+        assert res[go_id].relationships == dag_tree[go_id].relationships
+        assert res[go_id].children_relationships == dag_tree[go_id].children_relationships
+        assert res[go_id] is res.levels[res[go_id].level][go_id]
+        assert sorted(res.upper_induced_graph_iter(go_id)) == sorted(dag_tree.upper_induced_graph_iter(go_id))
+
+
+def test_dag_tree_load_incompatible_version(tmp_path, monkeypatch):
+    with open('tests/test_files/go_mini.obo', 'r') as f:
+        dag_tree = DAGTree(f)
+    path = tmp_path.joinpath('dag_tree.pickle')
+    dag_tree.save(path)
+    monkeypatch.setattr(DAGTree, 'CACHE_FORMAT_VERSION', DAGTree.CACHE_FORMAT_VERSION + 1)
+    with pytest.raises(ValueError):
+        DAGTree.load(path)
+
+
+def test_dag_tree_ancestors_topological_order():
+    with open('tests/test_files/obo_for_go_tests.obo', 'r') as f:
+        dag_tree = DAGTree(f, ['is_a'])
+    for go_id in dag_tree.go_terms:
+        ancestors = list(dag_tree.ancestors(go_id))
+        assert sorted(ancestors) == sorted(dag_tree.upper_induced_graph_iter(go_id))
+        assert [dag_tree[ancestor].level for ancestor in ancestors] == sorted(
+            dag_tree[ancestor].level for ancestor in ancestors)
+        assert all(dag_tree[ancestor].level < dag_tree[go_id].level for ancestor in ancestors)
+
+
+def test_dag_tree_propagate_annotations():
+    with open('tests/test_files/go_mini.obo', 'r') as f:
+        dag_tree = DAGTree(f, ['is_a', 'part_of', 'regulates'])
+    annotations = {'gene1': {'GO:2001315'}, 'gene2': {'GO:0034315', 'GO:0006040'}, 'gene3': {'GO:0034308'},
+                   'gene4': set()}
+    truth = {'gene1': {'GO:2001315', 'GO:0009226', 'GO:0006793', 'GO:0034308'},
+             'gene2': {'GO:0034315', 'GO:0051125', 'GO:0006040', 'GO:0034308'}, 'gene3': {'GO:0034308'},
+             'gene4': set()}
+    res = dag_tree.propagate_annotations(AnnotationMatrix.from_sparse_dict(annotations))
+    assert res.dtype == 'bool'
+    res_df = res.to_dataframe()
+    assert list(res_df.index) == list(annotations.keys())
+    assert {gene_id: set(res_df.columns[res_df.loc[gene_id]]) for gene_id in res_df.index} == truth
+    for go_id in res_df.columns:
+        assert res_df[go_id].any()
+
+
+def test_dag_tree_encode_decode():
+    with open('tests/test_files/go_mini.obo', 'r') as f:
+        dag_tree = DAGTree(f, ['is_a', 'part_of', 'regulates'])
+    go_ids = list(dag_tree.go_terms.keys())
+    codes = dag_tree.encode(go_ids)
+    assert codes.dtype == 'int32'
+    assert sorted(codes) == list(range(len(go_ids)))
+    assert list(dag_tree.decode(codes)) == go_ids
+    assert dag_tree.term_code('GO:0034619') == dag_tree.term_code('GO:0006040')
+    with pytest.raises(KeyError):
+        dag_tree.term_code('GO:9999999')